@@ -252,12 +252,35 @@ class NotaEntregaAdmin(admin.ModelAdmin):
         return "PAGADO"
     saldo_pendiente_formateado.short_description = 'Saldo Pendiente'
     
+    actions = ['convertir_notas_pagadas']
+
+    def convertir_notas_pagadas(self, request, queryset):
+        """Convierte a factura las notas seleccionadas que ya están pagadas"""
+        notas = list(NotaEntrega.notas_pagadas().filter(pk__in=queryset.values('pk')))
+        omitidas = queryset.count() - len(notas)
+
+        facturas = NotaEntrega.convertir_lote(notas)
+        if facturas:
+            self.message_user(request, f"{len(facturas)} nota(s) convertida(s) a factura fiscal.")
+        if omitidas:
+            self.message_user(
+                request,
+                f"{omitidas} nota(s) omitida(s): ya convertidas o con saldo pendiente.",
+                level='warning'
+            )
+    convertir_notas_pagadas.short_description = "Convertir notas pagadas a factura fiscal"
+
     def save_model(self, request, obj, form, change):
         if not obj.numero_nota:
             config = ConfiguracionSistema.get_config()
             obj.numero_nota = config.get_siguiente_numero_nota_entrega()
         super().save_model(request, obj, form, change)
 
+    def save_related(self, request, form, formsets, change):
+        # Las líneas editadas en inlines recalculan la nota una sola vez
+        with form.instance.deferred_totals():
+            super().save_related(request, form, formsets, change)
+
 @admin.register(DetalleNotaEntrega)
 class DetalleNotaEntregaAdmin(admin.ModelAdmin):
     list_display = ('nota_entrega', 'producto', 'cantidad', 'precio_unitario_formateado', 'subtotal_linea_formateado')
@@ -316,6 +339,11 @@ class FacturaAdmin(admin.ModelAdmin):
             obj.numero_factura = config.get_siguiente_numero_factura()
         super().save_model(request, obj, form, change)
 
+    def save_related(self, request, form, formsets, change):
+        # Las líneas editadas en inlines recalculan la factura una sola vez
+        with form.instance.deferred_totals():
+            super().save_related(request, form, formsets, change)
+
 @admin.register(DetalleGanancia)
 class DetalleGananciaAdmin(admin.ModelAdmin):
     list_display = (
@@ -391,4 +419,14 @@ class VentaHistorialAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         # Solo lectura
-        return False
\ No newline at end of file
+        return False
+
+@admin.register(EjecucionTarea)
+class EjecucionTareaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'resultado', 'ultima_ejecucion', 'duracion', 'ejecuciones', 'fallos', 'en_curso_desde')
+    list_filter = ('resultado',)
+    readonly_fields = ('nombre', 'ultima_ejecucion', 'duracion', 'resultado', 'mensaje', 'ejecuciones', 'fallos')
+    fields = ('nombre', 'resultado', 'ultima_ejecucion', 'duracion', 'ejecuciones', 'fallos', 'en_curso_desde', 'mensaje')
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,259 @@
+"""
+Ajuste masivo de precios.
+
+Una regla (porcentaje, margen sobre el precio de compra, variación de la
+tasa de cambio o solo redondeo) se aplica a un conjunto filtrado de
+productos. calcular() lee los precios con una consulta y retorna la vista
+previa de los productos que cambian; aplicar() vuelve a calcular dentro de
+una transacción, escribe los precios con un UPDATE ... CASE por cada LOTE
+productos (en lugar de un save() con full_clean() por producto) y registra
+los valores anteriores y nuevos en HistorialPrecio con bulk_create.
+
+Los precios resultantes se limitan a Producto.PRECIO_MINIMO y
+PRECIO_MAXIMO; los productos limitados se marcan en la vista previa.
+
+Las ediciones individuales también quedan en el historial (conectar_senales)
+y la importación del catálogo registra sus cambios de precio en lote.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import models, transaction
+from django.utils import timezone
+
+
+REGLA_CHOICES = [
+    ('porcentaje', 'Aumentar o rebajar un porcentaje'),
+    ('margen', 'Margen sobre el precio de compra'),
+    ('tasa', 'Según la variación de la tasa de cambio'),
+    ('redondeo', 'Solo redondear'),
+]
+CAMPO_CHOICES = [
+    ('precio', 'Precio de venta'),
+    ('precio_compra', 'Precio de compra'),
+    ('ambos', 'Ambos precios'),
+]
+REDONDEO_CHOICES = [
+    ('', 'Sin redondeo'),
+    ('0.05', 'Múltiplo de 0.05'),
+    ('0.10', 'Múltiplo de 0.10'),
+    ('0.50', 'Múltiplo de 0.50'),
+    ('1.00', 'Entero'),
+    ('0.99', 'Terminar en .99'),
+]
+LOTE = 500
+CENTAVO = Decimal('0.01')
+CIEN = Decimal('100')
+
+
+def filtrar(texto='', unidad=None, solo_activos=True):
+    """Productos a los que se aplica la regla"""
+    from .models import Producto
+
+    productos = Producto.objects.all()
+    if texto:
+        productos = productos.filter(models.Q(sku__istartswith=texto) | models.Q(nombre__icontains=texto))
+    if unidad:
+        productos = productos.filter(unidad_medida=unidad)
+    if solo_activos:
+        productos = productos.filter(activo=True)
+    return productos
+
+
+def redondear(valor, banda):
+    """Redondea al múltiplo más cercano de la banda ('0.99': al entero más cercano menos un centavo)"""
+    if not banda:
+        return valor.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+    if banda == '0.99':
+        return valor.quantize(Decimal('1'), rounding=ROUND_HALF_UP) - CENTAVO
+    paso = Decimal(banda)
+    return ((valor / paso).quantize(Decimal('1'), rounding=ROUND_HALF_UP) * paso).quantize(CENTAVO)
+
+
+class Regla:
+    """
+    tipo: una clave de REGLA_CHOICES. valor: el porcentaje (porcentaje y
+    margen) o la tasa de referencia en Bs por dólar (tasa: los precios se
+    multiplican por tasa actual / tasa de referencia). campo: qué precio
+    cambia; la regla de margen siempre calcula el precio de venta.
+    """
+
+    def __init__(self, tipo, valor=None, campo='precio', redondeo='', tasa_actual=None):
+        from .models import Producto, TasaCambio
+
+        self.tipo = tipo
+        self.valor = Decimal(str(valor)) if valor not in (None, '') else None
+        self.campo = 'precio' if tipo == 'margen' else campo
+        self.redondeo = redondeo
+        self.minimo = Decimal(str(Producto.PRECIO_MINIMO)).quantize(CENTAVO)
+        self.maximo = Decimal(str(Producto.PRECIO_MAXIMO)).quantize(CENTAVO)
+
+        if tipo in ('porcentaje', 'margen') and self.valor is None:
+            raise ValueError('Indique el porcentaje.')
+        if tipo == 'porcentaje' and self.valor <= -100:
+            raise ValueError('La rebaja no puede ser del 100% o más.')
+        if tipo == 'redondeo' and not redondeo:
+            raise ValueError('Seleccione el redondeo a aplicar.')
+        if tipo == 'tasa':
+            if not self.valor or self.valor <= 0:
+                raise ValueError('Indique la tasa de referencia (Bs por dólar).')
+            if tasa_actual is None:
+                actual = TasaCambio.get_tasa_actual()
+                if actual is None:
+                    raise ValueError('No hay una tasa de cambio activa registrada.')
+                tasa_actual = actual.tasa_usd_ves
+            self.tasa_actual = Decimal(str(tasa_actual))
+            self.factor = self.tasa_actual / self.valor
+        elif tipo == 'porcentaje':
+            self.factor = 1 + self.valor / CIEN
+        else:
+            self.factor = Decimal('1')
+
+    @property
+    def descripcion(self):
+        campo = dict(CAMPO_CHOICES)[self.campo].lower()
+        if self.tipo == 'porcentaje':
+            texto = f'{self.valor:+}% al {campo}'
+        elif self.tipo == 'margen':
+            texto = f'Margen de {self.valor}% sobre el precio de compra'
+        elif self.tipo == 'tasa':
+            texto = f'Tasa {self.valor} → {self.tasa_actual} (x{self.factor:.4f}) al {campo}'
+        else:
+            texto = f'Redondeo del {campo}'
+        if self.redondeo:
+            texto += f', {dict(REDONDEO_CHOICES)[self.redondeo].lower()}'
+        return texto[:200]
+
+    def _ajustar(self, valor):
+        """(valor redondeado y limitado, si se limitó)"""
+        valor = redondear(valor * self.factor, self.redondeo)
+        if valor < self.minimo:
+            return self.minimo, True
+        if valor > self.maximo:
+            return self.maximo, True
+        return valor, False
+
+    def aplicar(self, precio, precio_compra):
+        """(nuevo precio, nuevo precio de compra, si alguno se limitó)"""
+        limitado = False
+        if self.tipo == 'margen':
+            precio, limitado = self._ajustar(precio_compra * (1 + self.valor / CIEN))
+            return precio, precio_compra, limitado
+        if self.campo in ('precio', 'ambos'):
+            precio, limitado = self._ajustar(precio)
+        if self.campo in ('precio_compra', 'ambos'):
+            precio_compra, limitado_compra = self._ajustar(precio_compra)
+            limitado = limitado or limitado_compra
+        return precio, precio_compra, limitado
+
+
+def calcular(productos, regla):
+    """
+    Vista previa: lista de {'id', 'sku', 'nombre', 'precio', 'precio_nuevo',
+    'precio_compra', 'precio_compra_nuevo', 'limitado', 'bajo_costo'} de los
+    productos cuyo precio cambia. bajo_costo indica que el precio de venta
+    nuevo no supera al precio de compra.
+    """
+    cambios = []
+    for pk, sku, nombre, precio, precio_compra in productos.order_by('nombre').values_list(
+            'id', 'sku', 'nombre', 'precio', 'precio_compra').iterator():
+        precio_nuevo, precio_compra_nuevo, limitado = regla.aplicar(precio, precio_compra)
+        if precio_nuevo == precio and precio_compra_nuevo == precio_compra:
+            continue
+        cambios.append({
+            'id': pk,
+            'sku': sku,
+            'nombre': nombre,
+            'precio': precio,
+            'precio_nuevo': precio_nuevo,
+            'precio_compra': precio_compra,
+            'precio_compra_nuevo': precio_compra_nuevo,
+            'limitado': limitado,
+            'bajo_costo': precio_nuevo <= precio_compra_nuevo,
+        })
+    return cambios
+
+
+def registrar_historial(cambios, origen, detalle='', empleado=None, fecha=None):
+    """Guarda en HistorialPrecio los cambios (con las claves de calcular()) en una sola operación"""
+    from .models import HistorialPrecio
+
+    fecha = fecha or timezone.now()
+    return HistorialPrecio.objects.bulk_create([
+        HistorialPrecio(
+            producto_id=cambio['id'],
+            precio_anterior=cambio['precio'],
+            precio_nuevo=cambio['precio_nuevo'],
+            precio_compra_anterior=cambio['precio_compra'],
+            precio_compra_nuevo=cambio['precio_compra_nuevo'],
+            origen=origen,
+            detalle=detalle,
+            empleado=empleado,
+            fecha=fecha,
+        )
+        for cambio in cambios
+    ], batch_size=LOTE)
+
+
+def aplicar(productos, regla, empleado=None, lote=LOTE):
+    """
+    Recalcula y escribe los precios en una transacción: un UPDATE por cada
+    lote productos y el historial en bulk_create. Retorna los cambios aplicados.
+    """
+    from .models import Producto
+    from . import cache_reportes
+
+    campo_precio = Producto._meta.get_field('precio')
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        # Se calcula otra vez: los precios pudieron cambiar desde la vista previa
+        cambios = calcular(productos.select_for_update(), regla)
+        for inicio in range(0, len(cambios), lote):
+            bloque = cambios[inicio:inicio + lote]
+            Producto.objects.filter(pk__in=[cambio['id'] for cambio in bloque]).update(
+                precio=models.Case(
+                    *[models.When(pk=cambio['id'], then=models.Value(cambio['precio_nuevo'])) for cambio in bloque],
+                    output_field=campo_precio
+                ),
+                precio_compra=models.Case(
+                    *[models.When(pk=cambio['id'], then=models.Value(cambio['precio_compra_nuevo'])) for cambio in bloque],
+                    output_field=campo_precio
+                ),
+                updated_at=ahora,
+            )
+        registrar_historial(cambios, 'ajuste', regla.descripcion, empleado, ahora)
+
+        # QuerySet.update no emite señales; un cambio de precio afecta a todos los reportes
+        if any(cambio['precio_nuevo'] != cambio['precio'] for cambio in cambios):
+            cache_reportes.invalidar()
+
+    return cambios
+
+
+# --- Historial de ediciones individuales ---
+
+def _al_cargar_producto(sender, instance, **kwargs):
+    instance._precios_historial = (instance.__dict__.get('precio'), instance.__dict__.get('precio_compra'))
+
+
+def _al_guardar_producto(sender, instance, created, raw=False, **kwargs):
+    anterior = instance._precios_historial
+    instance._precios_historial = (instance.precio, instance.precio_compra)
+    if raw or created or instance._precios_historial == anterior or None in anterior:
+        return
+    registrar_historial([{
+        'id': instance.pk,
+        'precio': anterior[0],
+        'precio_nuevo': instance.precio,
+        'precio_compra': anterior[1],
+        'precio_compra_nuevo': instance.precio_compra,
+    }], 'edicion', empleado=getattr(instance, 'empleado_historial', None))
+
+
+def conectar_senales():
+    """Registra en HistorialPrecio los cambios de precio hechos con Producto.save()"""
+    from django.db.models.signals import post_init, post_save
+    from .models import Producto
+
+    post_init.connect(_al_cargar_producto, sender=Producto, dispatch_uid='ajuste_precios_init_Producto')
+    post_save.connect(_al_guardar_producto, sender=Producto, dispatch_uid='ajuste_precios_save_Producto')
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BlackInvoicesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'black_invoices'
+
+    def ready(self):
+        from . import ajuste_precios, cache_reportes, eventos, middleware, referencias
+        referencias.conectar_senales()
+        middleware.conectar_senales()
+        cache_reportes.conectar_senales()
+        eventos.conectar_senales()
+        ajuste_precios.conectar_senales()
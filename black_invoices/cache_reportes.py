@@ -0,0 +1,271 @@
+"""
+Cache de resultados de reportes.
+
+La clave de cada resultado es (reporte, parámetros normalizados, versión de
+los datos). Las versiones se guardan en el cache 'reportes' y se incrementan
+con señales cuando se escriben ventas, facturas, notas, detalles, pagos o
+ganancias, así que un resultado nunca se sirve después de que cambian sus
+datos; no hace falta adivinar un TTL.
+
+Hay una versión por mes (según la fecha de la venta) y una global:
+
+- Un reporte con rango de fechas depende solo de los meses que abarca. Editar
+  una venta de marzo no invalida el reporte de enero, y los períodos cerrados
+  (que terminan antes de hoy) se guardan REPORTES_CACHE_TTL_CERRADO segundos.
+- Un reporte sin fecha de inicio depende de la versión global, que cambia
+  con cualquier escritura.
+
+Un cambio de precio de un producto invalida todos los reportes, porque los
+ingresos de productos más vendidos se calculan con el precio actual.
+
+Las operaciones masivas (bulk_create, bulk_update, QuerySet.update) no emiten
+señales: después de ellas se debe llamar a invalidar(fechas).
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.utils import timezone
+
+
+ALIAS_CACHE = 'reportes'
+CLAVE_GENERACION = 'reportes:generacion'
+CLAVE_GLOBAL = 'reportes:version'
+CLAVE_MES = 'reportes:version:{}'
+CLAVE_RESULTADO = 'reportes:{}:{}:{}'
+CLAVE_CONTADOR = 'reportes:{}:{}'
+REPORTES_REGISTRADOS = 'reportes:nombres'
+MAXIMO_MESES = 36  # rangos más largos dependen de la versión global
+
+# Fecha de la venta a la que pertenece cada modelo observado
+RUTAS_FECHA = {
+    'Ventas': ('fecha_venta',),
+    'PagoVenta': ('venta', 'fecha_venta'),
+    'Factura': ('fecha_fac',),
+    'NotaEntrega': ('fecha_nota',),
+    'DetalleFactura': ('factura', 'fecha_fac'),
+    'DetalleNotaEntrega': ('nota_entrega', 'fecha_nota'),
+    'DetalleGanancia': ('fecha_venta',),
+}
+
+_pendientes = threading.local()
+
+
+def _cache():
+    return caches[ALIAS_CACHE]
+
+
+def _mes(fecha):
+    if isinstance(fecha, datetime) and timezone.is_aware(fecha):
+        fecha = timezone.localtime(fecha)
+    return f'{fecha.year:04d}{fecha.month:02d}'
+
+
+def _meses(inicio, fin):
+    anio, mes = inicio.year, inicio.month
+    while (anio, mes) <= (fin.year, fin.month):
+        yield f'{anio:04d}{mes:02d}'
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+def _incrementar(clave):
+    cache = _cache()
+    cache.add(clave, 0, None)
+    try:
+        return cache.incr(clave)
+    except ValueError:  # expulsada entre add e incr
+        cache.set(clave, 1, None)
+        return 1
+
+
+def _a_fecha(valor):
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+# --- Invalidación ---
+
+def invalidar(fechas=None):
+    """
+    Incrementa la versión global y la de los meses de las fechas indicadas
+    al confirmarse la transacción en curso (o de inmediato si no hay una).
+    Sin fechas invalida todos los reportes.
+    """
+    if fechas is None:
+        _registrar(None)
+        return
+    for fecha in fechas:
+        if fecha is not None:
+            _registrar(_mes(fecha))
+
+
+def _aplicar_pendientes():
+    meses = getattr(_pendientes, 'meses', None)
+    if not meses:
+        return
+    _pendientes.meses = set()
+    _incrementar(CLAVE_GLOBAL)
+    if None in meses:
+        _incrementar(CLAVE_GENERACION)
+    for mes in meses - {None}:
+        _incrementar(CLAVE_MES.format(mes))
+
+
+def _fecha_de(instancia):
+    valor = instancia
+    try:
+        for atributo in RUTAS_FECHA[type(instancia).__name__]:
+            valor = getattr(valor, atributo)
+    except ObjectDoesNotExist:
+        return None
+    return valor
+
+
+def _registrar(mes):
+    meses = getattr(_pendientes, 'meses', None)
+    if meses is None:
+        meses = _pendientes.meses = set()
+    meses.add(mes)
+    transaction.on_commit(_aplicar_pendientes)
+
+
+def _al_escribir(sender, instance, **kwargs):
+    # Una venta guarda muchas líneas en la misma transacción: los meses se
+    # acumulan y las versiones se incrementan una sola vez al confirmarla
+    fecha = _fecha_de(instance)
+    _registrar(_mes(fecha) if fecha else None)
+
+
+def _al_cargar_producto(sender, instance, **kwargs):
+    instance._precio_reportes = instance.__dict__.get('precio')
+
+
+def _al_guardar_producto(sender, instance, created, **kwargs):
+    # Los ingresos de productos más vendidos usan el precio actual del
+    # producto: un cambio de precio afecta a todos los períodos
+    if not created and instance.precio != instance._precio_reportes:
+        _registrar(None)
+    instance._precio_reportes = instance.precio
+
+
+def conectar_senales():
+    """Conecta el incremento de versiones a las escrituras de ventas y precios"""
+    from django.apps import apps
+    from django.db.models.signals import post_init, post_save, post_delete, post_migrate
+
+    for nombre in RUTAS_FECHA:
+        modelo = apps.get_model('black_invoices', nombre)
+        post_save.connect(_al_escribir, sender=modelo, dispatch_uid=f'cache_reportes_save_{nombre}')
+        post_delete.connect(_al_escribir, sender=modelo, dispatch_uid=f'cache_reportes_delete_{nombre}')
+
+    producto = apps.get_model('black_invoices', 'Producto')
+    post_init.connect(_al_cargar_producto, sender=producto, dispatch_uid='cache_reportes_init_Producto')
+    post_save.connect(_al_guardar_producto, sender=producto, dispatch_uid='cache_reportes_save_Producto')
+    # flush y loaddata reemplazan los datos sin señales por fila
+    post_migrate.connect(lambda **kwargs: invalidar(), weak=False, dispatch_uid='cache_reportes_post_migrate')
+
+
+# --- Lectura ---
+
+def _version(inicio, fin):
+    cache = _cache()
+    claves = [CLAVE_GENERACION]
+    if inicio is None:
+        claves.append(CLAVE_GLOBAL)
+    else:
+        meses = list(_meses(inicio, fin))
+        if len(meses) > MAXIMO_MESES:
+            claves.append(CLAVE_GLOBAL)
+        else:
+            claves.extend(CLAVE_MES.format(mes) for mes in meses)
+    valores = cache.get_many(claves)
+    return '.'.join(str(valores.get(clave, 0)) for clave in claves)
+
+
+def _normalizar(parametros):
+    texto = json.dumps(parametros, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode()).hexdigest()[:16]
+
+
+def _contar(reporte, tipo):
+    cache = _cache()
+    clave = CLAVE_CONTADOR.format(tipo, reporte)
+    if cache.add(clave, 1, None):
+        nombres = cache.get(REPORTES_REGISTRADOS) or set()
+        if reporte not in nombres:
+            cache.set(REPORTES_REGISTRADOS, nombres | {reporte}, None)
+        return
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 1, None)
+
+
+def obtener(reporte, calcular, inicio=None, fin=None, ttl=None, **parametros):
+    """
+    Retorna el resultado cacheado de calcular() para el reporte y parámetros
+    dados. inicio y fin son el rango de fechas de las ventas que usa el
+    reporte (fin None = hasta hoy); ttl reemplaza a los TTL de settings. El
+    resultado debe ser serializable con pickle: las consultas se convierten
+    a listas antes de retornarlas.
+    """
+    from . import copia_reportes
+
+    hoy = timezone.localdate()
+    inicio, fin = _a_fecha(inicio), _a_fecha(fin)
+    cerrado = inicio is not None and fin is not None and fin < hoy
+
+    # Calculado desde la copia de reportes: vale solo para esa copia
+    copia = copia_reportes.marca()
+    if copia is not None:
+        parametros['copia'] = copia
+
+    clave = CLAVE_RESULTADO.format(
+        reporte,
+        _normalizar({'inicio': inicio, 'fin': fin, **parametros}),
+        _version(inicio, fin or hoy),
+    )
+    cache = _cache()
+    resultado = cache.get(clave)
+    if resultado is not None:
+        _contar(reporte, 'aciertos')
+        return resultado
+
+    _contar(reporte, 'fallos')
+    resultado = calcular()
+    if ttl is None and cerrado:
+        ttl = getattr(settings, 'REPORTES_CACHE_TTL_CERRADO', 30 * 24 * 3600)
+    elif ttl is None:
+        ttl = getattr(settings, 'REPORTES_CACHE_TTL', 600)
+    cache.set(clave, resultado, ttl)
+    return resultado
+
+
+def estadisticas():
+    """Aciertos y fallos por reporte: {reporte: {'aciertos', 'fallos', 'porcentaje'}}"""
+    cache = _cache()
+    nombres = sorted(cache.get(REPORTES_REGISTRADOS) or ())
+    claves = [CLAVE_CONTADOR.format(tipo, nombre) for nombre in nombres for tipo in ('aciertos', 'fallos')]
+    valores = cache.get_many(claves)
+    datos = {}
+    for nombre in nombres:
+        aciertos = valores.get(CLAVE_CONTADOR.format('aciertos', nombre), 0)
+        fallos = valores.get(CLAVE_CONTADOR.format('fallos', nombre), 0)
+        total = aciertos + fallos
+        datos[nombre] = {
+            'aciertos': aciertos,
+            'fallos': fallos,
+            'porcentaje': round(aciertos * 100 / total, 1) if total else 0,
+        }
+    return datos
+
+
+def reiniciar_estadisticas():
+    cache = _cache()
+    nombres = cache.get(REPORTES_REGISTRADOS) or ()
+    cache.delete_many([CLAVE_CONTADOR.format(tipo, nombre) for nombre in nombres for tipo in ('aciertos', 'fallos')])
+    cache.delete(REPORTES_REGISTRADOS)
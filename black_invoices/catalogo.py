@@ -0,0 +1,300 @@
+"""
+Importación masiva del catálogo de productos desde CSV o XLSX.
+
+El archivo se lee fila por fila y cada fila se valida en memoria contra los
+SKU, nombres y unidades de medida precargados (tres consultas en total), en
+lugar de Producto.save() con full_clean(), que consulta la unicidad de sku y
+nombre por cada producto. El resultado es un plan (productos nuevos,
+cambios por producto y errores por fila) que se muestra como vista previa y
+luego se aplica con bulk_create y bulk_update por lotes en una transacción.
+
+La columna sku identifica al producto: si existe se actualizan solo las
+columnas presentes en el archivo, si no se crea. Los XLSX necesitan el
+paquete openpyxl.
+"""
+import csv
+import io
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.utils import timezone
+
+from .formatos import normalizar, parsear_monto
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl es opcional: sin él solo se importan CSV
+    openpyxl = None
+
+
+# Nombres de columna aceptados (ya normalizados: minúsculas y sin acentos)
+COLUMNAS = {
+    'sku': ('sku', 'codigo', 'cod', 'referencia', 'sku/codigo'),
+    'nombre': ('nombre', 'producto', 'articulo'),
+    'descripcion': ('descripcion', 'detalle'),
+    'precio': ('precio', 'precio venta', 'pvp', 'precio usd'),
+    'precio_compra': ('precio compra', 'costo', 'precio costo', 'precio de compra'),
+    'stock': ('stock', 'existencia', 'cantidad', 'inventario'),
+    'unidad': ('unidad', 'unidad medida', 'unidad de medida', 'um'),
+    'activo': ('activo', 'estado'),
+}
+
+# Campos de Producto que puede escribir la importación
+CAMPOS = ('nombre', 'descripcion', 'precio', 'precio_compra', 'stock', 'unidad_medida_id', 'activo')
+VALORES_SI = ('si', 's', '1', 'true', 'verdadero', 'x', 'activo')
+VALORES_NO = ('no', 'n', '0', 'false', 'falso', 'inactivo')
+TAMANO_MUESTRA = 64 * 1024
+LOTE = 1000
+CENTAVO = Decimal('0.01')
+MILESIMA = Decimal('0.001')
+
+
+# --- Lectura ---
+
+def _filas_csv(archivo):
+    muestra = archivo.read(TAMANO_MUESTRA)
+    archivo.seek(0)
+    try:
+        texto = muestra.decode('utf-8-sig')
+        codificacion = 'utf-8-sig'
+    except UnicodeDecodeError as e:
+        # Un carácter multibyte cortado al final de la muestra no es un error
+        if e.start < len(muestra) - 3:
+            texto, codificacion = muestra.decode('latin-1'), 'latin-1'
+        else:
+            texto, codificacion = muestra[:e.start].decode('utf-8-sig'), 'utf-8-sig'
+
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=',;\t|')
+    except csv.Error:
+        dialecto = csv.excel
+
+    contenido = io.TextIOWrapper(archivo, encoding=codificacion, newline='')
+    try:
+        yield from csv.reader(contenido, dialecto)
+    finally:
+        contenido.detach()
+
+
+def _filas_xlsx(archivo):
+    if openpyxl is None:
+        raise ValueError('Para importar archivos .xlsx instale el paquete openpyxl (o guarde el archivo como CSV)')
+    libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        for fila in libro.active.iter_rows(values_only=True):
+            yield ['' if valor is None else str(valor) for valor in fila]
+    finally:
+        libro.close()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Generador de (número de fila, {campo: texto}) a partir de un archivo
+    binario abierto. Solo incluye las columnas reconocidas del encabezado.
+    """
+    filas = _filas_xlsx(archivo) if nombre.lower().endswith('.xlsx') else _filas_csv(archivo)
+    encabezados = [normalizar(columna) for columna in next(filas, [])]
+
+    indices = {}
+    for campo, alias in COLUMNAS.items():
+        for posicion, encabezado in enumerate(encabezados):
+            if encabezado in alias:
+                indices[campo] = posicion
+                break
+
+    if 'sku' not in indices:
+        raise ValueError("El archivo debe tener una columna 'sku' (o 'código')")
+
+    for numero_fila, fila in enumerate(filas, start=2):
+        if not any(str(valor).strip() for valor in fila):
+            continue
+        yield numero_fila, {
+            campo: str(fila[posicion]).strip() if posicion < len(fila) else ''
+            for campo, posicion in indices.items()
+        }
+
+
+# --- Validación ---
+
+class _Referencias:
+    """Datos existentes precargados para validar todas las filas en memoria"""
+
+    def __init__(self):
+        from .models import Producto, UnidadMedida
+
+        self.productos = {
+            valores['sku']: valores
+            for valores in Producto.objects.values('id', 'sku', *CAMPOS)
+        }
+        self.nombres = {valores['nombre']: sku for sku, valores in self.productos.items()}
+        self.unidades = {}
+        for unidad_id, nombre, abreviatura in UnidadMedida.objects.filter(activo=True).values_list(
+                'id', 'nombre', 'abreviatura'):
+            self.unidades[normalizar(nombre)] = unidad_id
+            self.unidades[normalizar(abreviatura)] = unidad_id
+
+
+def _decimal(texto, campo, minimo, maximo, exponente):
+    valor = parsear_monto(texto)
+    if valor is None:
+        raise ValueError(f"{campo}: '{texto}' no es un número")
+    valor = valor.quantize(exponente, rounding=ROUND_HALF_UP)
+    if not Decimal(str(minimo)) <= valor <= Decimal(str(maximo)):
+        raise ValueError(f'{campo}: {valor} fuera del rango permitido ({minimo:,.2f} a {maximo:,.2f})')
+    return valor
+
+
+def _validar(datos, referencias):
+    """Convierte los textos de una fila en valores de Producto; ValueError si no son válidos"""
+    from .models import Producto
+
+    valores = {}
+    if datos.get('nombre'):
+        if len(datos['nombre']) > 50:
+            raise ValueError('nombre: máximo 50 caracteres')
+        valores['nombre'] = datos['nombre']
+    if datos.get('descripcion'):
+        if len(datos['descripcion']) > 200:
+            raise ValueError('descripción: máximo 200 caracteres')
+        valores['descripcion'] = datos['descripcion']
+    if datos.get('precio'):
+        valores['precio'] = _decimal(
+            datos['precio'], 'precio', Producto.PRECIO_MINIMO, Producto.PRECIO_MAXIMO, CENTAVO)
+    if datos.get('precio_compra'):
+        valores['precio_compra'] = _decimal(
+            datos['precio_compra'], 'precio de compra', Producto.PRECIO_MINIMO, Producto.PRECIO_MAXIMO, CENTAVO)
+    if datos.get('stock'):
+        valores['stock'] = _decimal(
+            datos['stock'], 'stock', Producto.STOCK_MINIMO, Producto.STOCK_MAXIMO, MILESIMA)
+    if datos.get('unidad'):
+        unidad_id = referencias.unidades.get(normalizar(datos['unidad']))
+        if unidad_id is None:
+            raise ValueError(f"unidad: '{datos['unidad']}' no existe o está inactiva")
+        valores['unidad_medida_id'] = unidad_id
+    if datos.get('activo'):
+        texto = normalizar(datos['activo'])
+        if texto not in VALORES_SI + VALORES_NO:
+            raise ValueError(f"activo: '{datos['activo']}' no es sí/no")
+        valores['activo'] = texto in VALORES_SI
+    return valores
+
+
+def preparar(filas):
+    """
+    Valida las filas y retorna el plan de importación:
+    {'crear': [valores], 'actualizar': [{'id', 'sku', 'nombre', 'cambios', 'precios'}],
+     'sin_cambios': n, 'errores': [(fila, sku, mensaje)]}.
+    'cambios' es {campo: (anterior, nuevo)} con solo los campos que cambian;
+    'precios' es (precio, precio_compra) actuales, para el historial.
+    """
+    referencias = _Referencias()
+    plan = {'crear': [], 'actualizar': [], 'sin_cambios': 0, 'errores': []}
+    vistos = set()
+
+    for numero_fila, datos in filas:
+        sku = datos['sku']
+        try:
+            if not sku:
+                raise ValueError('sku vacío')
+            if len(sku) > 50:
+                raise ValueError('sku: máximo 50 caracteres')
+            if sku in vistos:
+                raise ValueError('sku repetido en el archivo')
+            valores = _validar(datos, referencias)
+
+            existente = referencias.productos.get(sku)
+            nombre = valores.get('nombre', existente['nombre'] if existente else None)
+            if nombre is None:
+                raise ValueError('nombre: requerido para productos nuevos')
+            duenio = referencias.nombres.get(nombre)
+            if duenio is not None and duenio != sku:
+                raise ValueError(f"nombre: '{nombre}' ya lo usa el SKU {duenio}")
+            if existente is None and 'precio' not in valores:
+                raise ValueError('precio: requerido para productos nuevos')
+        except ValueError as e:
+            plan['errores'].append((numero_fila, sku, str(e)))
+            continue
+
+        vistos.add(sku)
+        if existente is None:
+            valores.setdefault('descripcion', nombre)
+            plan['crear'].append({'sku': sku, **valores})
+            referencias.nombres[nombre] = sku
+            continue
+
+        cambios = {
+            campo: (existente[campo], valor)
+            for campo, valor in valores.items()
+            if existente[campo] != valor
+        }
+        if not cambios:
+            plan['sin_cambios'] += 1
+            continue
+        if 'nombre' in cambios:
+            referencias.nombres.pop(existente['nombre'], None)
+            referencias.nombres[nombre] = sku
+        plan['actualizar'].append({
+            'id': existente['id'],
+            'sku': sku,
+            'nombre': nombre,
+            'cambios': cambios,
+            'precios': (existente['precio'], existente['precio_compra']),
+        })
+
+    return plan
+
+
+# --- Aplicación ---
+
+def _cambios_de_precio(plan):
+    """Cambios de precio del plan con las claves de ajuste_precios.registrar_historial"""
+    cambios = []
+    for actualizacion in plan['actualizar']:
+        if 'precio' not in actualizacion['cambios'] and 'precio_compra' not in actualizacion['cambios']:
+            continue
+        precio_actual, precio_compra_actual = actualizacion['precios']
+        precio = actualizacion['cambios'].get('precio', (precio_actual, precio_actual))
+        compra = actualizacion['cambios'].get('precio_compra', (precio_compra_actual, precio_compra_actual))
+        cambios.append({
+            'id': actualizacion['id'],
+            'precio': precio[0],
+            'precio_nuevo': precio[1],
+            'precio_compra': compra[0],
+            'precio_compra_nuevo': compra[1],
+        })
+    return cambios
+
+
+def aplicar(plan, lote=LOTE, empleado=None, detalle=''):
+    """
+    Crea y actualiza los productos del plan en una transacción, por lotes.
+    Los cambios de precio quedan en HistorialPrecio. Retorna
+    {'creados': n, 'actualizados': n}.
+    """
+    from .models import Producto
+    from . import ajuste_precios, cache_reportes
+
+    ahora = timezone.now()
+    nuevos = [Producto(**valores) for valores in plan['crear']]
+
+    # bulk_update escribe los mismos campos en todas las filas del lote:
+    # se agrupan los productos según los campos que cambian
+    grupos = {}
+    for actualizacion in plan['actualizar']:
+        campos = tuple(sorted(actualizacion['cambios']))
+        producto = Producto(id=actualizacion['id'], updated_at=ahora)
+        for campo, (anterior, nuevo) in actualizacion['cambios'].items():
+            setattr(producto, campo, nuevo)
+        grupos.setdefault(campos, []).append(producto)
+
+    with transaction.atomic():
+        ajuste_precios.registrar_historial(_cambios_de_precio(plan), 'importacion', detalle[:200], empleado, ahora)
+        Producto.objects.bulk_create(nuevos, batch_size=lote)
+        for campos, productos in grupos.items():
+            Producto.objects.bulk_update(productos, [*campos, 'updated_at'], batch_size=lote)
+
+        # bulk_update no emite señales; un cambio de precio afecta a todos los reportes
+        if any('precio' in campos for campos in grupos):
+            cache_reportes.invalidar()
+
+    return {'creados': len(nuevos), 'actualizados': len(plan['actualizar'])}
@@ -0,0 +1,167 @@
+"""
+Estados de cuenta de ventas y comisiones por empleado y mes.
+
+calcular() obtiene con una consulta agrupada sobre DetalleGanancia (por
+empleado y mes) las ventas, unidades, monto vendido, ganancia y las ventas
+canceladas de cada empleado, y aplica los tramos de comisión de
+settings.COMISIONES: el porcentaje es el del tramo más alto cuyo mínimo
+alcanza la base (monto vendido o ganancia) y se aplica a toda la base.
+
+Los meses cerrados se congelan en ComisionEmpleado (congelar(), tarea
+comisiones del programador o al abrir por primera vez un mes cerrado): su
+estado de cuenta se lee de esa tabla y no cambia. El mes en curso se
+calcula al consultarlo.
+
+El monto vendido es la suma de precio × cantidad de las líneas, sin
+impuestos.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .reportes import inicio_mes, mes_actual, mes_siguiente, momento
+
+
+CENTESIMA = Decimal('0.01')
+CAMPOS = ['ventas', 'unidades', 'monto_ventas', 'ganancia', 'canceladas', 'monto_cancelado', 'comision']
+
+
+def parametros():
+    """Base de la comisión ('ventas' o 'ganancia') y tramos [(mínimo, porcentaje)]"""
+    return {
+        'base': 'ventas',
+        'tramos': [(0, 1)],
+        **getattr(settings, 'COMISIONES', {}),
+    }
+
+
+def porcentaje(monto, tramos):
+    """Porcentaje del tramo más alto cuyo mínimo alcanza el monto (0 si ninguno)"""
+    alcanzados = [Decimal(str(pct)) for minimo, pct in tramos if monto >= Decimal(str(minimo))]
+    return max(alcanzados, default=Decimal('0'))
+
+
+def cerrado(periodo):
+    return periodo < mes_actual()
+
+
+def resumen_por_mes(desde, hasta, empleado=None):
+    """
+    Totales por empleado y mes de las ventas entre los meses desde
+    (incluido) y hasta (excluido), en una consulta
+    """
+    from django.db.models import Count, DateField, DecimalField, F, Q, Sum
+    from django.db.models.functions import TruncMonth
+    from .models import DetalleGanancia
+
+    activa = Q(venta__status__vent_cancelada=False)
+    importe = F('precio_venta_unitario') * F('cantidad')
+    monto = DecimalField(max_digits=14, decimal_places=2)
+    consulta = DetalleGanancia.objects.filter(
+        fecha_venta__gte=momento(desde),
+        fecha_venta__lt=momento(hasta),
+    )
+    if empleado is not None:
+        consulta = consulta.filter(venta__empleado=empleado)
+    return consulta.annotate(
+        periodo=TruncMonth('fecha_venta', output_field=DateField()),
+    ).values('venta__empleado_id', 'periodo').annotate(
+        ventas=Count('venta', distinct=True, filter=activa),
+        unidades=Sum('cantidad', filter=activa),
+        monto_ventas=Sum(importe, filter=activa, output_field=monto),
+        ganancia=Sum('ganancia_total', filter=activa),
+        canceladas=Count('venta', distinct=True, filter=~activa),
+        monto_cancelado=Sum(importe, filter=~activa, output_field=monto),
+    ).order_by()
+
+
+def calcular(desde, hasta=None, empleado=None):
+    """
+    ComisionEmpleado sin guardar (con su empleado) de cada empleado con
+    ventas en los meses desde..hasta (por defecto solo el mes desde)
+    """
+    from .models import ComisionEmpleado, Empleado
+
+    hasta = hasta or mes_siguiente(desde)
+    p = parametros()
+    filas = list(resumen_por_mes(desde, hasta, empleado))
+    empleados = Empleado.objects.in_bulk({fila['venta__empleado_id'] for fila in filas})
+
+    resultado = []
+    for fila in filas:
+        comision = ComisionEmpleado(
+            empleado=empleados[fila['venta__empleado_id']],
+            periodo=fila['periodo'],
+            ventas=fila['ventas'],
+            unidades=fila['unidades'] or 0,
+            monto_ventas=(fila['monto_ventas'] or Decimal('0')).quantize(CENTESIMA, rounding=ROUND_HALF_UP),
+            ganancia=fila['ganancia'] or Decimal('0'),
+            canceladas=fila['canceladas'],
+            monto_cancelado=(fila['monto_cancelado'] or Decimal('0')).quantize(CENTESIMA, rounding=ROUND_HALF_UP),
+            base_comision=p['base'],
+        )
+        base = comision.ganancia if p['base'] == 'ganancia' else comision.monto_ventas
+        comision.porcentaje_comision = porcentaje(base, p['tramos'])
+        comision.comision = (max(base, Decimal('0')) * comision.porcentaje_comision / 100).quantize(
+            CENTESIMA, rounding=ROUND_HALF_UP
+        )
+        resultado.append(comision)
+    resultado.sort(key=lambda c: (c.periodo, c.empleado.apellido, c.empleado.nombre))
+    return resultado
+
+
+def congelar():
+    """
+    Guarda los meses cerrados posteriores al último congelado (todos la
+    primera vez). Retorna la cantidad de estados de cuenta guardados.
+    """
+    from django.db.models import Max, Min
+    from .models import ComisionEmpleado, DetalleGanancia
+
+    ultimo = ComisionEmpleado.objects.aggregate(ultimo=Max('periodo'))['ultimo']
+    if ultimo is not None:
+        desde = mes_siguiente(ultimo)
+    else:
+        primera = DetalleGanancia.objects.aggregate(primera=Min('fecha_venta'))['primera']
+        if primera is None:
+            return 0
+        desde = inicio_mes(timezone.localtime(primera).date())
+    hasta = mes_actual()
+    if desde >= hasta:
+        return 0
+
+    registros = calcular(desde, hasta)
+    # Otro proceso pudo congelar el mismo mes: lo ya guardado no se toca
+    with transaction.atomic():
+        ComisionEmpleado.objects.bulk_create(registros, ignore_conflicts=True)
+    return len(registros)
+
+
+def estado_cuenta(periodo):
+    """
+    (comisiones, congelado) del mes: de ComisionEmpleado si está cerrado
+    (congelándolo si aún no se hizo) o calculado al momento si está en curso
+    """
+    from .models import ComisionEmpleado
+
+    if not cerrado(periodo):
+        return calcular(periodo), False
+    guardadas = ComisionEmpleado.objects.filter(periodo=periodo).select_related('empleado').order_by(
+        'empleado__apellido', 'empleado__nombre'
+    )
+    if not guardadas.exists():
+        congelar()
+    return list(guardadas), True
+
+
+def historial(empleado, meses=12):
+    """Estados de cuenta del empleado en los últimos meses, el más reciente primero"""
+    congelar()
+    actual = calcular(mes_actual(), empleado=empleado)
+    return actual + list(empleado.comisiones.select_related('empleado').order_by('-periodo')[:meses - 1])
+
+
+def totales(comisiones):
+    return {campo: sum((getattr(c, campo) for c in comisiones), 0) for campo in CAMPOS}
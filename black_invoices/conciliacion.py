@@ -0,0 +1,394 @@
+"""
+Conciliación bancaria de transferencias y pago móvil.
+
+Lee un estado de cuenta en CSV, propone a qué venta a crédito abierta
+corresponde cada abono (por documento, cédula del cliente y monto) y
+aplica los pagos confirmados en una sola transacción.
+"""
+import csv
+import io
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Case, When, F, Value, DecimalField
+
+from .models import Ventas, PagoVenta, TasaCambio, NotaEntrega
+from . import cache_reportes, eventos, referencias
+from .formatos import normalizar, parsear_monto
+
+
+CENTAVO = Decimal('0.01')
+
+# Nombres de columna aceptados (ya normalizados: minúsculas y sin acentos)
+COLUMNAS = {
+    'fecha': ('fecha', 'fecha operacion', 'fecha valor', 'fecha transaccion'),
+    'referencia': ('referencia', 'ref', 'nro referencia', 'numero referencia', 'comprobante'),
+    'descripcion': ('descripcion', 'concepto', 'detalle', 'observacion'),
+    'monto': ('monto', 'abono', 'credito', 'importe', 'haber'),
+    'cedula': ('cedula', 'ci', 'rif', 'cedula/rif', 'documento', 'cedula ordenante'),
+}
+
+FORMATOS_FECHA = ('%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d', '%d/%m/%y', '%d/%m/%Y %H:%M', '%Y-%m-%d %H:%M:%S')
+
+RE_DOCUMENTO = re.compile(r'\b(NE|NOTA|FACT|FACTURA|FAC)\s*[#N°º:.-]*\s*(\d+)\b', re.IGNORECASE)
+RE_CEDULA = re.compile(r'\b[VEJG]?-?(\d{6,9})\b', re.IGNORECASE)
+
+
+def _parsear_fecha(valor):
+    valor = (valor or '').strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _inferir_metodo(descripcion, por_defecto):
+    texto = normalizar(descripcion)
+    if 'pago movil' in texto or 'pagomovil' in texto or texto.startswith('pm '):
+        return 'pago_movil'
+    if 'transf' in texto or 'trf' in texto:
+        return 'transferencia'
+    return por_defecto
+
+
+def leer_estado_cuenta(archivo, metodo_por_defecto='transferencia'):
+    """
+    Lee el CSV del banco y retorna una lista de abonos normalizados.
+    Las filas sin monto positivo (débitos, saldos, totales) se ignoran.
+    """
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        try:
+            contenido = contenido.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            contenido = contenido.decode('latin-1')
+
+    try:
+        dialecto = csv.Sniffer().sniff(contenido[:4096], delimiters=',;\t|')
+    except csv.Error:
+        dialecto = csv.excel
+
+    lector = csv.reader(io.StringIO(contenido), dialecto)
+    encabezados = [normalizar(c) for c in next(lector, [])]
+
+    indices = {}
+    for campo, alias in COLUMNAS.items():
+        for posicion, encabezado in enumerate(encabezados):
+            if encabezado in alias:
+                indices[campo] = posicion
+                break
+
+    if 'monto' not in indices or 'referencia' not in indices:
+        raise ValueError("El archivo debe tener al menos las columnas 'referencia' y 'monto'")
+
+    def columna(fila, campo):
+        posicion = indices.get(campo)
+        if posicion is None or posicion >= len(fila):
+            return ''
+        return fila[posicion].strip()
+
+    abonos = []
+    for numero_fila, fila in enumerate(lector, start=2):
+        if not any(fila):
+            continue
+        monto = parsear_monto(columna(fila, 'monto'))
+        if monto is None or monto <= 0:
+            continue
+        descripcion = columna(fila, 'descripcion')
+        abonos.append({
+            'fila': numero_fila,
+            'fecha': _parsear_fecha(columna(fila, 'fecha')),
+            'referencia': columna(fila, 'referencia')[:50],
+            'descripcion': descripcion,
+            'cedula': columna(fila, 'cedula'),
+            'monto_original': monto,
+            'metodo_pago': _inferir_metodo(descripcion, metodo_por_defecto),
+        })
+    return abonos
+
+
+def ventas_abiertas():
+    """Ventas a crédito no canceladas con saldo pendiente"""
+    return Ventas.objects.filter(
+        credito=True,
+        status__vent_cancelada=False
+    ).select_related(
+        'status', 'factura__cliente', 'nota_entrega__cliente'
+    ).annotate(
+        total_documento=Case(
+            When(factura__isnull=False, then=F('factura__total_fac')),
+            When(nota_entrega__isnull=False, then=F('nota_entrega__total')),
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField()
+        )
+    ).exclude(
+        monto_pagado__gte=F('total_documento')
+    ).order_by('fecha_venta')
+
+
+class IndiceVentas:
+    """Índices en memoria sobre las ventas abiertas para casar abonos sin consultas por fila"""
+
+    def __init__(self, ventas):
+        self.ventas = {}
+        self.saldos = {}
+        self.por_cedula = defaultdict(list)
+        self.por_documento = {}
+        self.por_saldo = defaultdict(list)
+
+        for venta in ventas:
+            documento = venta.documento_fiscal
+            if documento is None:
+                continue
+            self.ventas[venta.id] = venta
+            self.saldos[venta.id] = venta.saldo_pendiente
+            self.por_cedula[documento.cliente.numero_documento].append(venta.id)
+            self.por_saldo[venta.saldo_pendiente.quantize(CENTAVO)].append(venta.id)
+            if venta.factura:
+                self.por_documento[('factura', venta.factura.numero_factura)] = venta.id
+            else:
+                self.por_documento[('nota', venta.nota_entrega.numero_nota)] = venta.id
+
+    def buscar_documento(self, texto):
+        for prefijo, numero in RE_DOCUMENTO.findall(texto or ''):
+            tipo = 'nota' if prefijo.upper() in ('NE', 'NOTA') else 'factura'
+            venta_id = self.por_documento.get((tipo, int(numero)))
+            if venta_id:
+                return venta_id
+        return None
+
+    def buscar_cliente(self, *textos):
+        for texto in textos:
+            for digitos in RE_CEDULA.findall(texto or ''):
+                candidatas = [v for v in self.por_cedula.get(digitos, []) if self.saldos[v] > 0]
+                if candidatas:
+                    return candidatas
+        return []
+
+    def buscar_monto(self, monto, tolerancia):
+        # El índice se arma con los saldos iniciales; se descartan las ventas ya consumidas
+        candidatas = []
+        for clave in (monto - tolerancia, monto, monto + tolerancia):
+            for venta_id in self.por_saldo.get(clave.quantize(CENTAVO), []):
+                if venta_id not in candidatas and abs(self.saldos[venta_id] - monto) <= tolerancia:
+                    candidatas.append(venta_id)
+        return candidatas
+
+
+def _tasas_por_fecha(abonos):
+    """Tasa USD/VES vigente para cada fecha del estado de cuenta (una sola consulta)"""
+    fechas = sorted({a['fecha'] for a in abonos if a['fecha']})
+    actual = TasaCambio.get_tasa_actual()
+    if not fechas:
+        return {}, actual.tasa_usd_ves if actual else None
+
+    tasas = list(
+        TasaCambio.objects.filter(fecha__lte=fechas[-1]).order_by('fecha').values_list('fecha', 'tasa_usd_ves')
+    )
+    resultado = {}
+    posicion, vigente = 0, None
+    for fecha in fechas:
+        while posicion < len(tasas) and tasas[posicion][0] <= fecha:
+            vigente = tasas[posicion][1]
+            posicion += 1
+        resultado[fecha] = vigente
+    return resultado, actual.tasa_usd_ves if actual else None
+
+
+def proponer_coincidencias(abonos, moneda='VES', tolerancia=CENTAVO):
+    """
+    Casa cada abono con una venta abierta y retorna las propuestas listas
+    para mostrarse (y guardarse en sesión). Los saldos se van consumiendo en
+    memoria para que dos abonos no paguen dos veces el mismo saldo.
+    """
+    indice = IndiceVentas(ventas_abiertas())
+    referencias_registradas = set(
+        PagoVenta.objects.filter(
+            referencia__in=[a['referencia'] for a in abonos if a['referencia']]
+        ).values_list('referencia', flat=True)
+    )
+    tasas, tasa_actual = _tasas_por_fecha(abonos) if moneda == 'VES' else ({}, None)
+
+    metodos = dict(PagoVenta.METODOS_PAGO_CHOICES)
+    propuestas = []
+    referencias_vistas = set()
+    for abono in abonos:
+        propuesta = {
+            'fila': abono['fila'],
+            'fecha': abono['fecha'].isoformat() if abono['fecha'] else '',
+            'referencia': abono['referencia'],
+            'descripcion': abono['descripcion'],
+            'metodo_pago': abono['metodo_pago'],
+            'metodo_display': metodos[abono['metodo_pago']],
+            'monto_original': str(abono['monto_original']),
+            'moneda': moneda,
+            'monto': '',
+            'venta_id': None,
+            'cliente': '',
+            'documento': '',
+            'saldo': '',
+            'confianza': '',
+            'motivo': '',
+        }
+        propuestas.append(propuesta)
+
+        if abono['referencia'] and abono['referencia'] in referencias_registradas:
+            propuesta['motivo'] = 'Referencia ya registrada'
+            continue
+        if abono['referencia'] and abono['referencia'] in referencias_vistas:
+            propuesta['motivo'] = 'Referencia repetida en el archivo'
+            continue
+        referencias_vistas.add(abono['referencia'])
+
+        monto = abono['monto_original']
+        if moneda == 'VES':
+            tasa = tasas.get(abono['fecha']) or tasa_actual
+            if not tasa:
+                propuesta['motivo'] = 'No hay tasa de cambio para convertir el monto'
+                continue
+            monto = (monto / tasa).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+        propuesta['monto'] = str(monto)
+
+        venta_id, confianza = None, ''
+        por_documento = indice.buscar_documento(f"{abono['descripcion']} {abono['referencia']}")
+        if por_documento and indice.saldos[por_documento] + tolerancia >= monto:
+            venta_id, confianza = por_documento, 'alta'
+        else:
+            del_cliente = indice.buscar_cliente(abono['cedula'], abono['descripcion'])
+            if del_cliente:
+                exactas = [v for v in del_cliente if abs(indice.saldos[v] - monto) <= tolerancia]
+                parciales = [v for v in del_cliente if indice.saldos[v] >= monto]
+                if exactas:
+                    venta_id, confianza = exactas[0], 'alta'
+                elif parciales:
+                    venta_id, confianza = parciales[0], 'media'
+            else:
+                por_monto = indice.buscar_monto(monto, tolerancia)
+                if len(por_monto) == 1:
+                    venta_id, confianza = por_monto[0], 'media'
+                elif por_monto:
+                    propuesta['motivo'] = f'{len(por_monto)} ventas con el mismo saldo'
+                    continue
+
+        if venta_id is None:
+            propuesta['motivo'] = propuesta['motivo'] or 'Sin coincidencia'
+            continue
+
+        venta = indice.ventas[venta_id]
+        documento = venta.documento_fiscal
+        propuesta.update({
+            'venta_id': venta_id,
+            'cliente': documento.cliente.nombre_completo,
+            'documento': f"{venta.tipo_documento} #{venta.numero_documento}",
+            'saldo': str(indice.saldos[venta_id]),
+            'confianza': confianza,
+        })
+        indice.saldos[venta_id] = max(Decimal('0.00'), indice.saldos[venta_id] - monto)
+
+    return propuestas
+
+
+def aplicar_pagos(propuestas, tolerancia=CENTAVO):
+    """
+    Registra los pagos confirmados en un solo lote:
+    inserción masiva de PagoVenta, actualización de saldos en un UPDATE,
+    cambio de estado de las ventas completadas y conversión de sus notas.
+    """
+    montos = defaultdict(Decimal)
+    for propuesta in propuestas:
+        montos[int(propuesta['venta_id'])] += Decimal(propuesta['monto'])
+
+    resultado = {'pagos': 0, 'completadas': 0, 'facturas': [], 'rechazadas': []}
+    if not montos:
+        return resultado
+
+    with transaction.atomic():
+        ventas = {v.id: v for v in ventas_abiertas().filter(pk__in=montos.keys())}
+        referencias_registradas = set(
+            PagoVenta.objects.filter(
+                referencia__in=[p['referencia'] for p in propuestas if p['referencia']]
+            ).values_list('referencia', flat=True)
+        )
+
+        aceptadas = {}
+        for venta_id, total in montos.items():
+            venta = ventas.get(venta_id)
+            if venta is None:
+                resultado['rechazadas'].append((venta_id, 'La venta ya no tiene saldo pendiente'))
+            elif total > venta.saldo_pendiente + tolerancia:
+                resultado['rechazadas'].append(
+                    (venta_id, f'Los abonos (${total}) exceden el saldo pendiente (${venta.saldo_pendiente})')
+                )
+            else:
+                aceptadas[venta_id] = total
+
+        pagos = [
+            PagoVenta(
+                venta_id=int(p['venta_id']),
+                monto=Decimal(p['monto']),
+                metodo_pago=p['metodo_pago'],
+                referencia=p['referencia'] or None,
+            )
+            for p in propuestas
+            if int(p['venta_id']) in aceptadas and p['referencia'] not in referencias_registradas
+        ]
+        PagoVenta.objects.bulk_create(pagos)
+        resultado['pagos'] = len(pagos)
+
+        # Los montos pueden cambiar si alguna referencia ya estaba registrada
+        aplicados = defaultdict(Decimal)
+        for pago in pagos:
+            aplicados[pago.venta_id] += pago.monto
+        if not aplicados:
+            return resultado
+
+        # Se completa con la misma tolerancia con la que se casó el abono; la
+        # diferencia que queda dentro de ella se da por saldada
+        completadas = [
+            ventas[venta_id]
+            for venta_id, monto in aplicados.items()
+            if ventas[venta_id].monto_pagado + monto + tolerancia >= ventas[venta_id].total_venta
+        ]
+        for venta in completadas:
+            aplicados[venta.id] = max(aplicados[venta.id], venta.saldo_pendiente)
+
+        campo_monto = DecimalField(max_digits=12, decimal_places=2)
+        Ventas.objects.filter(pk__in=aplicados.keys()).update(
+            monto_pagado=F('monto_pagado') + Case(
+                *[When(pk=venta_id, then=Value(monto)) for venta_id, monto in aplicados.items()],
+                default=Value(Decimal('0.00')),
+                output_field=campo_monto
+            )
+        )
+        # bulk_create y update no emiten señales
+        cache_reportes.invalidar(ventas[venta_id].fecha_venta for venta_id in aplicados)
+
+        if completadas:
+            Ventas.objects.filter(pk__in=[v.id for v in completadas]).update(
+                status=referencias.estado_completada()
+            )
+            resultado['completadas'] = len(completadas)
+
+            facturas = NotaEntrega.convertir_lote(
+                [venta.nota_entrega for venta in completadas if venta.nota_entrega]
+            )
+            resultado['facturas'] = [factura.numero_factura for factura in facturas]
+
+        for venta_id, monto in aplicados.items():
+            venta = ventas[venta_id]
+            saldo = max(Decimal('0.00'), venta.saldo_pendiente - monto)
+            eventos.publicar(
+                'pago',
+                venta=venta_id,
+                pendiente=saldo > 0,
+                cancelada=False,
+                total=str(venta.total_venta),
+                saldo=str(saldo),
+            )
+
+    return resultado
@@ -0,0 +1,15 @@
+from . import copia_reportes
+from .middleware import empleado_actual, rol_actual
+
+
+def principal(request):
+    """
+    Empleado y rol del usuario autenticado para las plantillas, y la fecha
+    de los datos si la página se arma con la copia de reportes.
+    Se pasan como funciones para que solo se evalúen si la plantilla los usa.
+    """
+    return {
+        'empleado_actual': lambda: empleado_actual(request),
+        'rol_actual': lambda: rol_actual(request),
+        'datos_reportes_al': lambda: copia_reportes.fecha_copia() if copia_reportes.en_uso() else None,
+    }
@@ -0,0 +1,159 @@
+"""
+Copia de solo lectura de la base de datos para reportes.
+
+Los reportes de ganancias, los productos más vendidos (página y PDF) y la
+exportación de datos hacen lecturas largas; sobre el mismo archivo SQLite
+en que se registran las ventas provocan 'database is locked' en caja. Si
+COPIA_REPORTES tiene una ruta, esos reportes leen de una copia que el
+comando actualizar_copia_reportes refresca con la API de respaldo en línea
+de SQLite (la tarea copia_reportes del programador lo hace cada 5 minutos).
+
+La copia se registra como el alias ALIAS de DATABASES, abierta en modo solo
+lectura. RouterReportes envía a ella las lecturas de los modelos de la
+aplicación mientras se atiende una vista de reporte (CopiaReportesMixin o
+vista_reporte); usuarios y sesiones se siguen leyendo de la base principal
+y toda escritura va a la principal. Las páginas que usan la copia muestran
+la fecha de los datos (context_processors.principal). Los resultados que
+cache_reportes guarda mientras se usa la copia llevan su fecha en la clave.
+
+La copia no se migra: es una foto de la base principal ya migrada.
+
+Sin COPIA_REPORTES, o mientras no exista la copia, todo lee de la base principal.
+"""
+import contextvars
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+
+ALIAS = 'copia_reportes'
+# Aplicaciones que siempre se leen de la base principal (login y sesiones al día)
+APLICACIONES_PRINCIPAL = ('auth', 'sessions', 'contenttypes', 'admin')
+
+_en_uso = contextvars.ContextVar('copia_reportes_en_uso', default=False)
+
+
+def ruta():
+    valor = getattr(settings, 'COPIA_REPORTES', None)
+    return str(valor) if valor else None
+
+
+def configurada():
+    return ALIAS in settings.DATABASES and ruta() is not None
+
+
+def fecha_copia():
+    """Fecha y hora de los datos de la copia, o None si no existe"""
+    if not configurada():
+        return None
+    try:
+        marca = os.path.getmtime(ruta())
+    except OSError:
+        return None
+    return datetime.fromtimestamp(marca, tz=timezone.get_current_timezone())
+
+
+def en_uso():
+    return _en_uso.get()
+
+
+def marca():
+    """Identifica la copia en uso (para claves de cache), o None si se lee de la principal"""
+    if not en_uso():
+        return None
+    fecha = fecha_copia()
+    return fecha.timestamp() if fecha else None
+
+
+@contextmanager
+def usar():
+    """Las lecturas dentro del bloque van a la copia (si está disponible)"""
+    token = _en_uso.set(fecha_copia() is not None)
+    try:
+        yield
+    finally:
+        _en_uso.reset(token)
+
+
+def vista_reporte(vista):
+    """Decorador para vistas de reporte: consultas y plantilla leen de la copia"""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        # El usuario se carga antes, desde la base principal
+        request.user.is_authenticated
+        with usar():
+            respuesta = vista(request, *args, **kwargs)
+            # Las consultas de la plantilla se evalúan al dibujarla
+            if callable(getattr(respuesta, 'render', None)) and not respuesta.is_rendered:
+                respuesta.render()
+        return respuesta
+    return envoltura
+
+
+class CopiaReportesMixin:
+    """Mixin de vistas basadas en clases; va antes de los demás mixins"""
+
+    def dispatch(self, request, *args, **kwargs):
+        return vista_reporte(super().dispatch)(request, *args, **kwargs)
+
+
+class RouterReportes:
+    """DATABASE_ROUTERS: lecturas a la copia dentro de usar(), escrituras siempre a la principal"""
+
+    def db_for_read(self, model, **hints):
+        if en_uso() and model._meta.app_label not in APLICACIONES_PRINCIPAL:
+            return ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db == ALIAS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, ALIAS}:
+            return True
+        return None
+
+
+def actualizar():
+    """
+    Copia la base principal a un archivo temporal con la API de respaldo y
+    lo pone en lugar de la copia (los reportes en curso terminan con la
+    anterior). Retorna {'ruta', 'tamano', 'segundos'}.
+    """
+    from .respaldos import PAGINAS_POR_TRAMO, PAUSA_ENTRE_TRAMOS, ErrorRespaldo, ruta_base_datos
+
+    if not configurada():
+        raise ErrorRespaldo('COPIA_REPORTES no está configurada')
+
+    inicio = time.perf_counter()
+    destino = ruta()
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+    temporal = f'{destino}.tmp'
+    try:
+        origen = sqlite3.connect(ruta_base_datos(), timeout=20)
+        copia = sqlite3.connect(temporal)
+        try:
+            origen.backup(copia, pages=PAGINAS_POR_TRAMO, sleep=PAUSA_ENTRE_TRAMOS)
+            # Un solo archivo, sin -wal: se puede abrir en modo solo lectura
+            copia.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            copia.close()
+            origen.close()
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    # Las conexiones de este proceso vuelven a abrir el archivo nuevo
+    connections[ALIAS].close()
+    return {'ruta': destino, 'tamano': os.path.getsize(destino), 'segundos': time.perf_counter() - inicio}
@@ -0,0 +1,104 @@
+"""
+Archivos estáticos para el perfil de producción.
+
+ManifestComprimidoStorage agrega el hash del contenido al nombre de cada
+archivo (igual que ManifestStaticFilesStorage) y además deja junto a cada
+CSS/JS una copia .gz y, si el paquete brotli está instalado, una .br.
+servir_estatico() entrega esas copias según Accept-Encoding, con cache de un
+año para los nombres versionados. Solo se usa cuando no hay un servidor web
+sirviendo STATIC_ROOT (SERVIR_ESTATICOS = True).
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan los .gz
+    brotli = None
+
+
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html', '.xml')
+TAMANO_MINIMO = 1024  # bytes; por debajo la compresión no compensa
+# Nombre con hash de ManifestStaticFilesStorage: archivo.0123456789ab.css
+PATRON_VERSIONADO = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+class ManifestComprimidoStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        nombres = set(paths) | set(self.hashed_files.values())
+        for nombre in nombres:
+            if nombre.endswith(EXTENSIONES_COMPRIMIBLES) and self.exists(nombre):
+                self._comprimir(nombre)
+
+    def _comprimir(self, nombre):
+        ruta = self.path(nombre)
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        if len(contenido) < TAMANO_MINIMO:
+            return
+
+        # mtime=0 para que el .gz sea idéntico entre despliegues
+        variantes = [('.gz', gzip.compress(contenido, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variantes.append(('.br', brotli.compress(contenido)))
+
+        for extension, comprimido in variantes:
+            if len(comprimido) < len(contenido) * 0.95:
+                with open(ruta + extension, 'wb') as destino:
+                    destino.write(comprimido)
+
+
+def _codificaciones_aceptadas(request):
+    aceptadas = set()
+    for parte in request.headers.get('Accept-Encoding', '').split(','):
+        codificacion, _, parametros = parte.strip().partition(';')
+        if parametros.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if codificacion:
+            aceptadas.add(codificacion.lower())
+    return aceptadas
+
+
+@require_safe
+def servir_estatico(request, path):
+    """Entrega un archivo de STATIC_ROOT, precomprimido si el navegador lo acepta"""
+    try:
+        ruta = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Archivo no encontrado')
+    if not os.path.isfile(ruta):
+        raise Http404('Archivo no encontrado')
+
+    archivo, codificacion = ruta, None
+    aceptadas = _codificaciones_aceptadas(request)
+    for extension, nombre in (('.br', 'br'), ('.gz', 'gzip')):
+        if nombre in aceptadas and os.path.isfile(ruta + extension):
+            archivo, codificacion = ruta + extension, nombre
+            break
+
+    content_type, _ = mimetypes.guess_type(ruta)
+    response = FileResponse(open(archivo, 'rb'), content_type=content_type or 'application/octet-stream')
+    if codificacion:
+        response['Content-Encoding'] = codificacion
+    response['Vary'] = 'Accept-Encoding'
+
+    if PATRON_VERSIONADO.search(path):
+        # El nombre cambia cuando cambia el contenido: se puede cachear indefinidamente
+        response['Cache-Control'] = f"public, max-age={getattr(settings, 'ESTATICOS_MAX_AGE', 31536000)}, immutable"
+    else:
+        response['Cache-Control'] = 'public, max-age=3600'
+    return response
@@ -0,0 +1,212 @@
+"""
+Actualizaciones en vivo por Server-Sent Events.
+
+Cuando se confirma una venta, un pago o una cancelación se guarda un
+EventoTiempoReal pequeño (id de la venta, si sigue pendiente, total, saldo y
+los widgets del dashboard que cambian). La tabla es el canal entre procesos:
+cada proceso ASGI tiene un solo Canal que la consulta cada
+EVENTOS_INTERVALO segundos mientras haya páginas conectadas y reparte los
+eventos nuevos a todas. Así el costo por evento es una consulta por proceso
+y no una recarga completa de la página por cada usuario.
+
+Las páginas abiertas (dashboard y ventas pendientes) se conectan a
+EventosView con EventSource. Si la conexión se corta, el navegador reconecta
+con la cabecera Last-Event-ID y recibe los eventos que se perdió (mientras
+sigan en la tabla: se depuran después de EVENTOS_RETENCION segundos).
+
+Las operaciones masivas (bulk_create, QuerySet.update) no emiten señales:
+después de ellas se debe llamar a publicar_venta() por cada venta afectada.
+"""
+import asyncio
+import json
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+# Widgets del dashboard (tablero.WIDGETS) que cambian con cada tipo de evento
+WIDGETS_POR_TIPO = {
+    'venta': ['ventas', 'stock_bajo', 'ganancias', 'empleados', 'grafico', 'productos_top'],
+    'pago': ['ganancias'],
+    'cancelacion': ['ventas', 'stock_bajo', 'ganancias', 'empleados', 'grafico', 'productos_top'],
+}
+LOTE = 200
+LIMPIAR_CADA = 100  # eventos publicados entre depuraciones de la tabla
+PING = 15  # segundos sin eventos antes de enviar un comentario (mantiene viva la conexión)
+REINTENTO_MS = 3000
+MAXIMO_EN_COLA = 500
+
+_pendientes = threading.local()
+
+
+# --- Publicación ---
+
+def datos_venta(venta):
+    cancelada = venta.status.vent_cancelada
+    return {
+        'venta': venta.pk,
+        'pendiente': venta.credito and not cancelada and not venta.completada,
+        'cancelada': cancelada,
+        'total': str(venta.total_venta),
+        'saldo': str(venta.saldo_pendiente),
+    }
+
+
+def publicar(tipo, **datos):
+    """
+    Publica un evento al confirmarse la transacción en curso (o de inmediato
+    si no hay una). Los eventos de una misma transacción se guardan juntos.
+    """
+    eventos = getattr(_pendientes, 'eventos', None)
+    if eventos is None:
+        eventos = _pendientes.eventos = []
+    eventos.append((tipo, {**datos, 'widgets': WIDGETS_POR_TIPO.get(tipo, [])}))
+    transaction.on_commit(_guardar_pendientes)
+
+
+def publicar_venta(venta, tipo):
+    publicar(tipo, **datos_venta(venta))
+
+
+def _guardar_pendientes():
+    from .models import EventoTiempoReal
+
+    eventos = getattr(_pendientes, 'eventos', None)
+    if not eventos:
+        return
+    _pendientes.eventos = []
+    creados = EventoTiempoReal.objects.bulk_create(
+        EventoTiempoReal(tipo=tipo, datos=datos) for tipo, datos in eventos
+    )
+    if any(evento.pk and evento.pk % LIMPIAR_CADA == 0 for evento in creados):
+        limpiar()
+
+
+def limpiar():
+    """Elimina los eventos más antiguos que EVENTOS_RETENCION segundos"""
+    from .models import EventoTiempoReal
+
+    limite = timezone.now() - timedelta(seconds=getattr(settings, 'EVENTOS_RETENCION', 3600))
+    return EventoTiempoReal.objects.filter(creado__lt=limite).delete()[0]
+
+
+def _al_cargar_venta(sender, instance, **kwargs):
+    instance._estado_eventos = (instance.__dict__.get('monto_pagado'), instance.__dict__.get('status_id'))
+
+
+def _al_guardar_venta(sender, instance, created, raw=False, **kwargs):
+    anterior = instance._estado_eventos
+    instance._estado_eventos = (instance.monto_pagado, instance.status_id)
+    if raw or (not created and instance._estado_eventos == anterior):
+        return
+    if created:
+        tipo = 'venta'
+    elif instance.status.vent_cancelada:
+        tipo = 'cancelacion'
+    elif instance.monto_pagado != anterior[0]:
+        tipo = 'pago'
+    else:
+        tipo = 'venta'
+    publicar_venta(instance, tipo)
+
+
+def conectar_senales():
+    """Publica un evento cuando cambian el estado o el monto pagado de una venta"""
+    from django.db.models.signals import post_init, post_save
+    from .models import Ventas
+
+    post_init.connect(_al_cargar_venta, sender=Ventas, dispatch_uid='eventos_init_Ventas')
+    post_save.connect(_al_guardar_venta, sender=Ventas, dispatch_uid='eventos_save_Ventas')
+
+
+# --- Lectura ---
+
+def _leer_desde(ultimo_id):
+    from .models import EventoTiempoReal
+
+    return list(
+        EventoTiempoReal.objects.filter(pk__gt=ultimo_id).order_by('pk').values('id', 'tipo', 'datos')[:LOTE]
+    )
+
+
+def _ultimo_id():
+    from .models import EventoTiempoReal
+
+    ultimo = EventoTiempoReal.objects.order_by('-pk').values_list('pk', flat=True).first()
+    return ultimo or 0
+
+
+class Canal:
+    """
+    Reparte los eventos nuevos a las conexiones abiertas de este proceso.
+    Una sola tarea consulta la tabla mientras haya al menos un suscriptor.
+    """
+
+    def __init__(self):
+        self.suscriptores = set()
+        self.tarea = None
+
+    def suscribir(self):
+        cola = asyncio.Queue(maxsize=MAXIMO_EN_COLA)
+        self.suscriptores.add(cola)
+        if self.tarea is None or self.tarea.done():
+            self.tarea = asyncio.get_running_loop().create_task(self._sondear())
+        return cola
+
+    def desuscribir(self, cola):
+        self.suscriptores.discard(cola)
+
+    async def _sondear(self):
+        intervalo = getattr(settings, 'EVENTOS_INTERVALO', 1)
+        ultimo_id = await sync_to_async(_ultimo_id)()
+        while self.suscriptores:
+            for evento in await sync_to_async(_leer_desde)(ultimo_id):
+                ultimo_id = evento['id']
+                for cola in list(self.suscriptores):
+                    try:
+                        cola.put_nowait(evento)
+                    except asyncio.QueueFull:
+                        # Conexión que no lee: al reconectar recupera con Last-Event-ID
+                        self.desuscribir(cola)
+            await asyncio.sleep(intervalo)
+
+
+canal = Canal()
+
+
+def _formatear(evento):
+    datos = json.dumps({'id': evento['id'], **evento['datos']})
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+async def transmitir(ultimo_id=None):
+    """
+    Generador asíncrono con el flujo text/event-stream de una conexión.
+    ultimo_id es el Last-Event-ID del navegador: se envían primero los
+    eventos posteriores que sigan guardados.
+    """
+    cola = canal.suscribir()
+    try:
+        yield f'retry: {REINTENTO_MS}\n\n'
+        enviado = ultimo_id or 0
+        if ultimo_id is not None:
+            for evento in await sync_to_async(_leer_desde)(ultimo_id):
+                enviado = evento['id']
+                yield _formatear(evento)
+
+        while cola in canal.suscriptores:
+            try:
+                evento = await asyncio.wait_for(cola.get(), PING)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if evento['id'] <= enviado:
+                continue
+            enviado = evento['id']
+            yield _formatear(evento)
+    finally:
+        canal.desuscribir(cola)
@@ -0,0 +1,35 @@
+"""
+Lectura de textos y montos de archivos externos (estados de cuenta del
+banco y catálogo de productos), que llegan con acentos, mayúsculas y
+números en formato venezolano o internacional.
+"""
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos, '_' como espacio y espacios simples (para comparar encabezados y nombres)"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().replace('_', ' ').split())
+
+
+def parsear_monto(valor):
+    """
+    Interpreta montos en formato venezolano (1.234,56) o internacional
+    (1,234.56), con o sin 'Bs' o '$'. Retorna Decimal o None si no es un número.
+    """
+    valor = (valor or '').strip().replace('Bs', '').replace('$', '').replace(' ', '')
+    if not valor:
+        return None
+    if ',' in valor and '.' in valor:
+        if valor.rfind(',') > valor.rfind('.'):
+            valor = valor.replace('.', '').replace(',', '.')
+        else:
+            valor = valor.replace(',', '')
+    elif ',' in valor:
+        valor = valor.replace(',', '.')
+    try:
+        return Decimal(valor)
+    except InvalidOperation:
+        return None
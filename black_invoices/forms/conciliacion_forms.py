@@ -0,0 +1,37 @@
+from django import forms
+
+
+class EstadoCuentaForm(forms.Form):
+    MONEDA_CHOICES = [
+        ('VES', 'Bolívares (se convierte con la tasa del día del abono)'),
+        ('USD', 'Dólares'),
+    ]
+    METODO_CHOICES = [
+        ('transferencia', 'Transferencia Bancaria'),
+        ('pago_movil', 'Pago Móvil'),
+    ]
+
+    archivo = forms.FileField(
+        label='Estado de cuenta (.csv)',
+        help_text="Columnas requeridas: referencia y monto. Opcionales: fecha, descripción/concepto y cédula.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control-file', 'accept': '.csv,.txt'})
+    )
+    moneda = forms.ChoiceField(
+        choices=MONEDA_CHOICES,
+        initial='VES',
+        label='Moneda del estado de cuenta',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    metodo_pago = forms.ChoiceField(
+        choices=METODO_CHOICES,
+        initial='transferencia',
+        label='Método por defecto',
+        help_text='Se usa cuando la descripción no indica si es pago móvil o transferencia.',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.txt')):
+            raise forms.ValidationError('El archivo debe ser un CSV exportado por el banco.')
+        return archivo
@@ -1,5 +1,6 @@
 from django import forms
 from ..models import Producto, UnidadMedida
+from .. import ajuste_precios
 
 class ProductoForm(forms.ModelForm):
     class Meta:
@@ -106,4 +107,87 @@ class ProductoSearchForm(forms.Form):
         required=False,
         initial=True,
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
-    )
\ No newline at end of file
+    )
+
+class ImportarCatalogoForm(forms.Form):
+    archivo = forms.FileField(
+        label='Lista de precios (.csv o .xlsx)',
+        help_text="Columna requerida: sku. Opcionales: nombre, descripción, precio, precio compra, "
+                  "stock, unidad (abreviatura o nombre) y activo. Los productos nuevos necesitan nombre y precio.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control-file', 'accept': '.csv,.txt,.xlsx'})
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.txt', '.xlsx')):
+            raise forms.ValidationError('El archivo debe ser CSV o XLSX.')
+        return archivo
+
+
+class AjustePreciosForm(forms.Form):
+    regla = forms.ChoiceField(
+        label='Regla',
+        choices=ajuste_precios.REGLA_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    valor = forms.DecimalField(
+        label='Valor',
+        required=False,
+        max_digits=12,
+        decimal_places=4,
+        help_text='Porcentaje (ej: 10 o -5), margen deseado en % o tasa de referencia en Bs por dólar.',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': 'any'})
+    )
+    campo = forms.ChoiceField(
+        label='Precio a ajustar',
+        choices=ajuste_precios.CAMPO_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    redondeo = forms.ChoiceField(
+        label='Redondeo',
+        choices=ajuste_precios.REDONDEO_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    texto = forms.CharField(
+        label='SKU o nombre',
+        max_length=50,
+        required=False,
+        help_text='Prefijo del SKU o parte del nombre. Vacío: todos los productos.',
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+    unidad = forms.ModelChoiceField(
+        label='Unidad de medida',
+        queryset=UnidadMedida.objects.filter(activo=True),
+        required=False,
+        empty_label='Todas las unidades',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    solo_activos = forms.BooleanField(
+        label='Solo productos activos',
+        required=False,
+        initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        try:
+            cleaned_data['ajuste'] = ajuste_precios.Regla(
+                cleaned_data['regla'],
+                cleaned_data.get('valor'),
+                cleaned_data['campo'],
+                cleaned_data.get('redondeo', ''),
+            )
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        return cleaned_data
+
+    def productos(self):
+        return ajuste_precios.filtrar(
+            self.cleaned_data.get('texto', ''),
+            self.cleaned_data.get('unidad'),
+            self.cleaned_data.get('solo_activos'),
+        )
@@ -0,0 +1,212 @@
+"""
+Carga de ganancias históricas (DetalleGanancia) para ventas que no las tienen.
+
+Las ventas se recorren por rangos de clave primaria, no con OFFSET: cada
+tramo es [inicio, inicio + tamaño) y su consulta usa el índice de la clave,
+así que el costo no crece con la posición en la tabla. Por cada tramo se
+cargan las ventas pendientes con sus líneas y productos, los precios
+vigentes en la fecha de cada venta (HistorialPrecio, una consulta) y se
+escriben todos los registros con un bulk_create en una transacción.
+
+El avance se guarda en un archivo de control (GANANCIAS_CONTROL) después de
+cada tramo: una ejecución interrumpida continúa desde el primer tramo no
+terminado. Los tramos son independientes, así que pueden repartirse entre
+varios procesos (procesar_tramo es la unidad de trabajo).
+"""
+import json
+import os
+
+from django.conf import settings
+from django.db import transaction
+
+
+TAMANO_TRAMO = 500
+
+
+def ruta_control():
+    return getattr(
+        settings, 'GANANCIAS_CONTROL',
+        os.path.join(settings.BASE_DIR, 'cache', 'poblar_ganancias_historicas.json')
+    )
+
+
+class Control:
+    """
+    Avance de una carga: el rango de claves [desde, hasta] fijado al empezar,
+    el tamaño de tramo y los tramos terminados. 'continuo' es el inicio del
+    primer tramo no terminado; los terminados más adelante (con varios
+    procesos no terminan en orden) se guardan aparte.
+    """
+
+    def __init__(self, ruta, desde, hasta, tamano, continuo=None, terminados=()):
+        self.ruta = ruta
+        self.desde = desde
+        self.hasta = hasta
+        self.tamano = tamano
+        self.continuo = desde if continuo is None else continuo
+        self.terminados = set(terminados)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """El control guardado, o None si no hay una carga interrumpida"""
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+        return cls(ruta, datos['desde'], datos['hasta'], datos['tamano'],
+                   datos['continuo'], datos['terminados'])
+
+    def tramos_pendientes(self):
+        inicio = self.continuo
+        while inicio <= self.hasta:
+            if inicio not in self.terminados:
+                yield inicio, min(inicio + self.tamano, self.hasta + 1)
+            inicio += self.tamano
+
+    def marcar(self, inicio):
+        self.terminados.add(inicio)
+        while self.continuo in self.terminados:
+            self.terminados.discard(self.continuo)
+            self.continuo += self.tamano
+        self.guardar()
+
+    def guardar(self):
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        temporal = f'{self.ruta}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({
+                'desde': self.desde,
+                'hasta': self.hasta,
+                'tamano': self.tamano,
+                'continuo': self.continuo,
+                'terminados': sorted(self.terminados),
+            }, archivo)
+        os.replace(temporal, self.ruta)
+
+    def terminado(self):
+        return self.continuo > self.hasta
+
+    def eliminar(self):
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+
+def rango_ventas():
+    """(primera, última) clave de las ventas no canceladas, o None si no hay"""
+    from django.db.models import Max, Min
+    from .models import Ventas
+
+    limites = Ventas.objects.filter(status__vent_cancelada=False).aggregate(desde=Min('pk'), hasta=Max('pk'))
+    if limites['desde'] is None:
+        return None
+    return limites['desde'], limites['hasta']
+
+
+def pendientes():
+    """Ventas no canceladas sin registros de ganancia"""
+    from .models import Ventas
+
+    return Ventas.objects.filter(status__vent_cancelada=False, detalles_ganancia__isnull=True)
+
+
+def _lineas(venta):
+    """(producto, cantidad, precio de venta fijo o None) de cada línea de la venta"""
+    if venta.factura_id:
+        return [(d.producto, d.cantidad, None) for d in venta.factura.detallefactura_set.all()]
+    if venta.nota_entrega_id:
+        return [(d.producto, d.cantidad, d.precio_unitario) for d in venta.nota_entrega.detalles_nota.all()]
+    return []
+
+
+def procesar_tramo(inicio, fin, simular=False):
+    """
+    Crea los registros de ganancia de las ventas pendientes con clave en
+    [inicio, fin). Retorna {'ventas': n, 'registros': n, 'sin_detalles': n}.
+    """
+    from .models import DetalleGanancia, HistorialPrecio
+    from . import cache_reportes
+
+    ventas = list(
+        pendientes().filter(pk__gte=inicio, pk__lt=fin).select_related('factura', 'nota_entrega').prefetch_related(
+            'factura__detallefactura_set__producto', 'nota_entrega__detalles_nota__producto'
+        ).order_by('pk')
+    )
+    lineas = {venta.pk: _lineas(venta) for venta in ventas}
+    vigentes = HistorialPrecio.precios_vigentes(
+        (producto, venta.fecha_venta) for venta in ventas for producto, cantidad, precio in lineas[venta.pk]
+    )
+
+    registros = []
+    for venta in ventas:
+        for producto, cantidad, precio_fijo in lineas[venta.pk]:
+            precio, precio_compra = vigentes[(producto.pk, venta.fecha_venta)]
+            registros.append(DetalleGanancia(
+                venta=venta,
+                producto=producto,
+                cantidad=cantidad,
+                precio_venta_unitario=precio if precio_fijo is None else precio_fijo,
+                precio_compra_unitario=precio_compra,
+                fecha_venta=venta.fecha_venta,
+            ).calcular_ganancia())
+
+    if registros and not simular:
+        with transaction.atomic():
+            DetalleGanancia.objects.bulk_create(registros)
+            # bulk_create no emite señales: se invalidan los meses de las ventas
+            cache_reportes.invalidar({venta.fecha_venta for venta in ventas})
+
+    return {
+        'ventas': len(ventas),
+        'registros': len(registros),
+        'sin_detalles': sum(1 for venta in ventas if not lineas[venta.pk]),
+    }
+
+
+def _procesar_en_proceso(inicio, fin, simular):
+    """Unidad de trabajo de los procesos auxiliares: cada uno abre su conexión"""
+    import django
+    from django.db import connections
+
+    django.setup()
+    try:
+        return inicio, procesar_tramo(inicio, fin, simular)
+    finally:
+        connections.close_all()
+
+
+def ejecutar(control, procesos=1, simular=False, al_terminar_tramo=None):
+    """
+    Procesa los tramos pendientes del control (en este proceso o repartidos
+    entre procesos) y marca cada uno al terminar. al_terminar_tramo(inicio,
+    fin, resultado) permite informar el avance. Retorna los totales.
+    """
+    totales = {'ventas': 0, 'registros': 0, 'sin_detalles': 0, 'tramos': 0}
+
+    def registrar(inicio, fin, resultado):
+        for clave in ('ventas', 'registros', 'sin_detalles'):
+            totales[clave] += resultado[clave]
+        totales['tramos'] += 1
+        if not simular:
+            control.marcar(inicio)
+        if al_terminar_tramo:
+            al_terminar_tramo(inicio, fin, resultado)
+
+    tramos = list(control.tramos_pendientes())
+    if procesos <= 1:
+        for inicio, fin in tramos:
+            registrar(inicio, fin, procesar_tramo(inicio, fin, simular))
+        return totales
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from django.db import connections
+
+    # Los procesos hijos no deben heredar la conexión abierta de este
+    connections.close_all()
+    fines = dict(tramos)
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        futuros = [ejecutor.submit(_procesar_en_proceso, inicio, fin, simular) for inicio, fin in tramos]
+        for futuro in as_completed(futuros):
+            inicio, resultado = futuro.result()
+            registrar(inicio, fines[inicio], resultado)
+    return totales
@@ -0,0 +1,212 @@
+"""
+Libro de Ventas mensual (facturas) en CSV, XLSX o PDF.
+
+LibroVentas recorre las facturas del mes en orden de fecha con una sola
+consulta (cliente y estado de la venta en el mismo join) leída por bloques
+con .iterator(): la memoria no crece con la cantidad de facturas. Cada
+factura lleva la tasa USD/VES vigente en su fecha, la última TasaCambio con
+fecha igual o anterior, sin importar 'activo' (que solo marca la tasa
+actual). Las tasas del mes se cargan en una consulta al empezar.
+
+Las facturas de ventas canceladas se listan como anuladas, con montos en
+cero. El sistema no emite notas de crédito; las notas de entrega no son
+documentos fiscales y no van al libro.
+
+CSV se genera línea a línea. XLSX (requiere openpyxl, opcional) y PDF se
+escriben por filas en un archivo (temporal) que luego se envía por bloques.
+"""
+from bisect import bisect_right
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl es opcional: sin él no hay exportación XLSX
+    openpyxl = None
+
+from . import reportes
+from .reportes import mes_siguiente, momento
+
+
+BLOQUE = 2000
+CENTESIMA = Decimal('0.01')
+COLUMNAS = [
+    'N°', 'Fecha', 'N° Factura', 'Cédula/RIF', 'Cliente', 'Estado',
+    'Subtotal USD', 'IVA USD', 'Total USD', 'Tasa', 'Subtotal Bs', 'IVA Bs', 'Total Bs',
+]
+MONTOS = ['subtotal', 'iva', 'total', 'subtotal_ves', 'iva_ves', 'total_ves']
+
+
+class LibroVentas:
+    """
+    Filas del libro de un mes (periodo = primer día del mes). Al iterar
+    acumula en 'totales' los montos y en 'facturas' y 'anuladas' las
+    cantidades.
+    """
+
+    def __init__(self, periodo):
+        self.periodo = periodo
+        self.totales = dict.fromkeys(MONTOS, Decimal('0'))
+        self.facturas = 0
+        self.anuladas = 0
+
+    def consulta(self):
+        from .models import Factura
+
+        return Factura.objects.filter(
+            fecha_fac__gte=momento(self.periodo),
+            fecha_fac__lt=momento(mes_siguiente(self.periodo)),
+        ).order_by('fecha_fac', 'numero_factura').values_list(
+            'fecha_fac', 'numero_factura', 'cliente__cedula', 'cliente__nombre_completo',
+            'ventas__status__vent_cancelada', 'subtotal', 'iva', 'total_fac',
+        )
+
+    def tasas(self):
+        """([fechas], [tasas]) desde la última tasa anterior al mes hasta su fin, ordenadas por fecha"""
+        from .models import TasaCambio
+
+        fin = mes_siguiente(self.periodo)
+        anterior = TasaCambio.objects.filter(fecha__lte=self.periodo).order_by('-fecha').values_list(
+            'fecha', 'tasa_usd_ves'
+        )[:1]
+        del_mes = TasaCambio.objects.filter(fecha__gt=self.periodo, fecha__lt=fin).order_by('fecha').values_list(
+            'fecha', 'tasa_usd_ves'
+        )
+        filas = list(anterior) + list(del_mes)
+        return [fecha for fecha, _ in filas], [tasa for _, tasa in filas]
+
+    def __iter__(self):
+        fechas, tasas = self.tasas()
+        cero = Decimal('0')
+        for numero, (fecha_fac, factura, cedula, cliente, cancelada, subtotal, iva, total) in enumerate(
+            self.consulta().iterator(chunk_size=BLOQUE), 1
+        ):
+            fecha = timezone.localtime(fecha_fac).date()
+            posicion = bisect_right(fechas, fecha)
+            tasa = tasas[posicion - 1] if posicion else None
+
+            if cancelada:
+                self.anuladas += 1
+                subtotal = iva = total = cero
+            else:
+                self.facturas += 1
+            montos = {'subtotal': subtotal, 'iva': iva, 'total': total}
+            if tasa is not None:
+                # El total en Bs es la suma de sus columnas redondeadas, para que cuadren
+                for campo in ('subtotal', 'iva'):
+                    montos[f'{campo}_ves'] = (montos[campo] * tasa).quantize(CENTESIMA, rounding=ROUND_HALF_UP)
+                montos['total_ves'] = montos['subtotal_ves'] + montos['iva_ves']
+            else:
+                montos.update(subtotal_ves=None, iva_ves=None, total_ves=None)
+            for campo, monto in montos.items():
+                self.totales[campo] += monto or cero
+
+            yield [
+                numero, fecha, factura, cedula, cliente, 'Anulada' if cancelada else 'Emitida',
+                montos['subtotal'], montos['iva'], montos['total'], tasa,
+                montos['subtotal_ves'], montos['iva_ves'], montos['total_ves'],
+            ]
+
+    def fila_totales(self):
+        t = self.totales
+        return ['', 'Totales', '', '', f'{self.facturas} emitidas, {self.anuladas} anuladas', '',
+                t['subtotal'], t['iva'], t['total'], '', t['subtotal_ves'], t['iva_ves'], t['total_ves']]
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'strftime'):
+        return valor.strftime('%d/%m/%Y')
+    return str(valor)
+
+
+def _filas_texto(libro):
+    for fila in libro:
+        yield [_texto(valor) for valor in fila]
+    # Los totales se acumulan al recorrer las facturas
+    yield [_texto(valor) for valor in libro.fila_totales()]
+
+
+def csv_lineas(libro):
+    """Líneas CSV del libro (encabezado, facturas y totales), generadas una a una"""
+    return reportes.csv_lineas(COLUMNAS, _filas_texto(libro))
+
+
+def escribir_xlsx(libro, archivo):
+    """Escribe el libro en archivo con un libro de openpyxl de solo escritura"""
+    if openpyxl is None:
+        raise ValueError('Para exportar a Excel instale el paquete openpyxl (o use CSV)')
+    documento = openpyxl.Workbook(write_only=True)
+    hoja = documento.create_sheet(f'Ventas {libro.periodo:%m-%Y}')
+    hoja.append(COLUMNAS)
+    for fila in libro:
+        hoja.append(fila)
+    hoja.append(libro.fila_totales())
+    documento.save(archivo)
+
+
+def escribir_pdf(libro, archivo, config):
+    """
+    Escribe el libro en archivo página por página con el canvas de reportlab
+    (sin tablas de platypus, que necesitan todas las filas antes de dibujar)
+    """
+    from reportlab.lib.pagesizes import landscape, letter
+    from reportlab.pdfgen import canvas
+
+    ancho, alto = landscape(letter)
+    margen = 30
+    alto_fila = 11
+    # Posición x de cada columna; los montos se alinean a la derecha
+    columnas = [margen, 50, 95, 140, 200, 330, 375, 425, 470, 520, 570, 635, 695]
+    derecha = 6
+
+    pdf = canvas.Canvas(archivo, pagesize=(ancho, alto), pageCompression=1)
+    pdf.setTitle(f'Libro de Ventas {libro.periodo:%m/%Y}')
+    pagina = 0
+
+    bordes = columnas[1:] + [ancho - margen]
+
+    def escribir_fila(y, valores, fuente='Helvetica', tamano=7):
+        # Un solo objeto de texto por fila (drawString crea uno por celda)
+        texto = pdf.beginText()
+        texto.setFont(fuente, tamano)
+        for i, valor in enumerate(valores):
+            celda = _texto(valor)
+            if i >= derecha:
+                x = bordes[i] - 4 - pdf.stringWidth(celda, fuente, tamano)
+            else:
+                x, celda = columnas[i], celda[:32]
+            texto.setTextOrigin(x, y)
+            texto.textOut(celda)
+        pdf.drawText(texto)
+
+    def nueva_pagina():
+        nonlocal pagina
+        if pagina:
+            pdf.showPage()
+        pagina += 1
+        y = alto - margen
+        pdf.setFont('Helvetica-Bold', 10)
+        pdf.drawString(margen, y, f'{config.nombre_empresa}  RIF: {config.rif_empresa}')
+        pdf.drawRightString(ancho - margen, y, f'Página {pagina}')
+        y -= 14
+        pdf.drawString(margen, y, f'LIBRO DE VENTAS - {libro.periodo:%m/%Y}')
+        y -= 18
+        escribir_fila(y, COLUMNAS, 'Helvetica-Bold')
+        pdf.line(margen, y - 3, ancho - margen, y - 3)
+        return y - alto_fila - 2
+
+    y = nueva_pagina()
+    for fila in libro:
+        if y < margen:
+            y = nueva_pagina()
+        escribir_fila(y, fila)
+        y -= alto_fila
+
+    if y < margen + alto_fila:
+        y = nueva_pagina()
+    pdf.line(margen, y + alto_fila - 3, ancho - margen, y + alto_fila - 3)
+    escribir_fila(y, libro.fila_totales(), 'Helvetica-Bold')
+    pdf.save()
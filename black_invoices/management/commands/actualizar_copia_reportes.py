@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import copia_reportes
+from ...respaldos import ErrorRespaldo
+
+
+class Command(BaseCommand):
+    help = 'Actualiza la copia de solo lectura que usan los reportes (COPIA_REPORTES)'
+
+    def handle(self, *args, **options):
+        if not copia_reportes.configurada():
+            self.stdout.write('ℹ️  COPIA_REPORTES no está configurada: los reportes leen de la base principal')
+            return
+        try:
+            resultado = copia_reportes.actualizar()
+        except (ErrorRespaldo, OSError) as e:
+            raise CommandError(f'No se pudo actualizar la copia de reportes: {e}')
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Copia de reportes actualizada: {resultado['ruta']} "
+            f"({resultado['tamano'] / 1024:,.0f} KB en {resultado['segundos']:.2f} s)"
+        ))
@@ -1,9 +1,8 @@
-import requests
 from decimal import Decimal
 from datetime import date
 from django.core.management.base import BaseCommand
-from django.db import transaction
 from ...models import TasaCambio, ConfiguracionSistema
+from ... import tasas
 
 class Command(BaseCommand):
     help = 'Actualiza la tasa de cambio usando APIs externas'
@@ -19,8 +18,29 @@ class Command(BaseCommand):
             type=float,
             help='Establecer tasa manualmente (ejemplo: --manual 36.50)',
         )
+        parser.add_argument(
+            '--estrategia',
+            choices=tasas.ESTRATEGIAS,
+            default='primero',
+            help='Cómo elegir entre proveedores: primero (por defecto), mediana o quorum',
+        )
+        parser.add_argument(
+            '--quorum',
+            type=int,
+            default=tasas.QUORUM,
+            help=f'Proveedores que deben coincidir con --estrategia quorum (por defecto {tasas.QUORUM})',
+        )
+        parser.add_argument(
+            '--sin-cache',
+            action='store_true',
+            help='Ignorar la respuesta cacheada y consultar a los proveedores',
+        )
+        parser.add_argument(
+            '--local',
+            metavar='URL',
+            help='Consultar el servidor de prueba (ejemplo: --local http://127.0.0.1:8765)',
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         self.stdout.write('💱 Actualizando tasa de cambio...\n')
         
@@ -49,77 +69,35 @@ class Command(BaseCommand):
             )
             return
         
-        # Intentar múltiples APIs
-        apis = [
-            {
-                'name': 'ExchangeRate-API',
-                'url': 'https://api.exchangerate-api.com/v4/latest/USD',
-                'parser': self.parse_exchangerate_api
-            },
-            {
-                'name': 'Fixer.io (Free)',
-                'url': 'https://api.fixer.io/latest?base=USD&symbols=VES',
-                'parser': self.parse_fixer_api
-            },
-            {
-                'name': 'CurrencyAPI (Free)',
-                'url': 'https://api.currencyapi.com/v3/latest?apikey=demo&currencies=VES&base_currency=USD',
-                'parser': self.parse_currencyapi
-            }
-        ]
-        
-        for api in apis:
-            try:
-                self.stdout.write(f'🔍 Intentando {api["name"]}...')
-                tasa = self.obtener_tasa_desde_api(api['url'], api['parser'])
-                
-                if tasa:
-                    self.actualizar_tasa_automatica(hoy, tasa, api['name'])
-                    return
-                    
-            except Exception as e:
+        # Consultar todos los proveedores en paralelo (sin transacción abierta)
+        resultado = tasas.consultar_tasa(
+            proveedores=tasas.proveedores_configurados(url_local=options['local']),
+            estrategia=options['estrategia'],
+            quorum=options['quorum'],
+            usar_cache=not options['sin_cache'],
+        )
+
+        if resultado['desde_cache']:
+            self.stdout.write('📦 Respuesta tomada del cache')
+        for respuesta in resultado['respuestas']:
+            if respuesta['tasa'] is not None:
+                self.stdout.write(f'🔍 {respuesta["proveedor"]}: {respuesta["tasa"]} ({respuesta["ms"]} ms)')
+            else:
                 self.stdout.write(
-                    self.style.WARNING(f'❌ Error con {api["name"]}: {str(e)}')
+                    self.style.WARNING(f'❌ Error con {respuesta["proveedor"]}: {respuesta["error"]} ({respuesta["ms"]} ms)')
                 )
-                continue
-        
+        self.stdout.write(f'⏱️  Consulta completada en {resultado["ms"]} ms')
+
+        if resultado['tasa'] is not None:
+            self.actualizar_tasa_automatica(hoy, resultado['tasa'], resultado['fuente'])
+            return
+
         # Si todas las APIs fallan, usar tasa de emergencia
         self.stdout.write(
             self.style.ERROR('❌ Todas las APIs fallaron')
         )
         self.usar_tasa_emergencia(hoy)
     
-    def obtener_tasa_desde_api(self, url, parser_func):
-        """Obtiene tasa desde una API específica"""
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return parser_func(data)
-            
-        except requests.RequestException as e:
-            raise Exception(f"Error de conexión: {str(e)}")
-        except Exception as e:
-            raise Exception(f"Error al procesar respuesta: {str(e)}")
-    
-    def parse_exchangerate_api(self, data):
-        """Parser para ExchangeRate-API"""
-        if 'rates' in data and 'VES' in data['rates']:
-            return Decimal(str(data['rates']['VES']))
-        return None
-    
-    def parse_fixer_api(self, data):
-        """Parser para Fixer.io"""
-        if 'rates' in data and 'VES' in data['rates']:
-            return Decimal(str(data['rates']['VES']))
-        return None
-    
-    def parse_currencyapi(self, data):
-        """Parser para CurrencyAPI"""
-        if 'data' in data and 'VES' in data['data'] and 'value' in data['data']['VES']:
-            return Decimal(str(data['data']['VES']['value']))
-        return None
-    
     def actualizar_tasa_manual(self, fecha, tasa):
         """Actualiza tasa manualmente"""
         self.stdout.write(f'📝 Estableciendo tasa manual: {tasa}')
@@ -151,32 +129,17 @@ class Command(BaseCommand):
     def guardar_tasa(self, fecha, tasa, fuente):
         """Guarda la tasa en la base de datos"""
         try:
-            # Usar get_or_create para manejar la restricción UNIQUE
-            tasa_obj, created = TasaCambio.objects.get_or_create(
-                fecha=fecha,
-                defaults={
-                    'tasa_usd_ves': tasa,
-                    'fuente': fuente,
-                    'activo': True
-                }
-            )
-            
-            if not created:
-                # Actualizar tasa existente
-                tasa_obj.tasa_usd_ves = tasa
-                tasa_obj.fuente = fuente
-                tasa_obj.activo = True
-                tasa_obj.save()
-                
+            tasa_obj, created = tasas.guardar_tasa(fecha, tasa, fuente)
+            if created:
                 self.stdout.write(
-                    self.style.SUCCESS(f'✅ Tasa actualizada: {tasa_obj}')
+                    self.style.SUCCESS(f'✅ Nueva tasa creada: {tasa_obj}')
                 )
             else:
                 self.stdout.write(
-                    self.style.SUCCESS(f'✅ Nueva tasa creada: {tasa_obj}')
+                    self.style.SUCCESS(f'✅ Tasa actualizada: {tasa_obj}')
                 )
             
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'❌ Error al guardar: {str(e)}')
-            )
\ No newline at end of file
+            )
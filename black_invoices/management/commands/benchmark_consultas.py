@@ -0,0 +1,214 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara cuántas consultas concurrentes (búsqueda de productos) atiende un proceso '
+        'bajo ASGI y bajo WSGI con un número fijo de hilos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrencia',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50, 100],
+            help='Clientes simultáneos a medir (por defecto 1 10 50 100)',
+        )
+        parser.add_argument(
+            '--peticiones',
+            type=int,
+            default=300,
+            help='Peticiones por medición (por defecto 300)',
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=4,
+            help='Hilos del proceso WSGI, como los workers de gunicorn/waitress (por defecto 4)',
+        )
+        parser.add_argument(
+            '--ruta',
+            default='/api/productos/buscar/?q=a',
+            help='Consulta a medir (por defecto /api/productos/buscar/?q=a)',
+        )
+        parser.add_argument(
+            '--usuario',
+            help='Usuario con el que se inicia sesión (por defecto el primer superusuario)',
+        )
+
+    def handle(self, *args, **options):
+        from django.core.asgi import get_asgi_application
+        from django.core.wsgi import get_wsgi_application
+        from django.test import Client
+
+        # Sesión real (la del motor configurado), como la de un navegador
+        sesion = Client()
+        sesion.force_login(self._usuario(options['usuario']))
+        self.cookie = f'{settings.SESSION_COOKIE_NAME}={sesion.cookies[settings.SESSION_COOKIE_NAME].value}'
+        self.ruta, _, self.query = options['ruta'].partition('?')
+        self.host = next(
+            (host.lstrip('.') for host in settings.ALLOWED_HOSTS if host not in ('*', '')), 'localhost'
+        )
+
+        wsgi = get_wsgi_application()
+        asgi = get_asgi_application()
+        peticiones = max(1, options['peticiones'])
+        hilos = max(1, options['hilos'])
+
+        try:
+            self.stdout.write(
+                f"⏱️  Benchmark de {options['ruta']} ({peticiones} peticiones por medición, "
+                f"WSGI con {hilos} hilos)\n"
+            )
+            self.stdout.write(
+                f"{'Clientes':>9} {'Servidor':<9} {'Pet./s':>9} {'p50 ms':>9} {'p95 ms':>9} {'Errores':>8}"
+            )
+            for clientes in options['concurrencia']:
+                clientes = max(1, clientes)
+                for nombre, medir in (
+                    ('WSGI', lambda: self._medir_wsgi(wsgi, clientes, peticiones, hilos)),
+                    ('ASGI', lambda: asyncio.run(self._medir_asgi(asgi, clientes, peticiones))),
+                ):
+                    segundos, latencias, errores = medir()
+                    latencias.sort()
+                    p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))]
+                    self.stdout.write(
+                        f"{clientes:>9} {nombre:<9} {len(latencias) / segundos:>9.0f} "
+                        f"{statistics.median(latencias) * 1000:>9.1f} {p95 * 1000:>9.1f} {errores:>8}"
+                    )
+                self.stdout.write('')
+        finally:
+            sesion.logout()
+
+        self.stdout.write(
+            'ℹ️  Bajo WSGI un cliente espera mientras los hilos están ocupados; bajo ASGI las '
+            'consultas async esperan la base de datos sin retener la conexión del cliente.'
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    def _usuario(self, nombre):
+        usuarios = User.objects.filter(is_active=True)
+        usuario = usuarios.filter(username=nombre).first() if nombre else (
+            usuarios.filter(is_superuser=True).order_by('pk').first() or usuarios.order_by('pk').first()
+        )
+        if usuario is None:
+            raise CommandError('No hay un usuario activo para iniciar sesión')
+        return usuario
+
+    # --- WSGI: los clientes comparten un número fijo de hilos del servidor ---
+
+    def _medir_wsgi(self, aplicacion, clientes, peticiones, hilos):
+        servidor = threading.Semaphore(hilos)
+        latencias = []
+        errores = [0]
+        cerrojo = threading.Lock()
+        pendientes = iter(range(peticiones))
+
+        def cliente():
+            while True:
+                with cerrojo:
+                    if next(pendientes, None) is None:
+                        return
+                inicio = time.perf_counter()
+                with servidor:
+                    estado = self._peticion_wsgi(aplicacion)
+                with cerrojo:
+                    latencias.append(time.perf_counter() - inicio)
+                    if not estado.startswith('200'):
+                        errores[0] += 1
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as ejecutor:
+            for _ in range(clientes):
+                ejecutor.submit(cliente)
+        return time.perf_counter() - inicio, latencias, errores[0]
+
+    def _peticion_wsgi(self, aplicacion):
+        from django.db import close_old_connections
+
+        entorno = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': self.ruta,
+            'QUERY_STRING': self.query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'HTTP_HOST': self.host,
+            'HTTP_COOKIE': self.cookie,
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': BytesIO(),
+        }
+        estado = []
+        respuesta = aplicacion(entorno, lambda status, headers, exc_info=None: estado.append(status))
+        try:
+            b''.join(respuesta)
+        finally:
+            respuesta.close()
+            close_old_connections()
+        return estado[0]
+
+    # --- ASGI: un solo proceso con un bucle de eventos ---
+
+    async def _medir_asgi(self, aplicacion, clientes, peticiones):
+        latencias = []
+        errores = 0
+        restantes = peticiones
+
+        async def cliente():
+            nonlocal restantes, errores
+            while restantes > 0:
+                restantes -= 1
+                inicio = time.perf_counter()
+                estado = await self._peticion_asgi(aplicacion)
+                latencias.append(time.perf_counter() - inicio)
+                if estado != 200:
+                    errores += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(clientes)))
+        return time.perf_counter() - inicio, latencias, errores
+
+    async def _peticion_asgi(self, aplicacion):
+        alcance = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': self.ruta,
+            'raw_path': self.ruta.encode(),
+            'query_string': self.query.encode(),
+            'root_path': '',
+            'headers': [(b'host', self.host.encode()), (b'cookie', self.cookie.encode())],
+            'client': ('127.0.0.1', 0),
+            'server': (self.host, 80),
+        }
+        cuerpo_enviado = False
+        desconexion = asyncio.Event()
+        estado = []
+
+        async def recibir():
+            nonlocal cuerpo_enviado
+            if not cuerpo_enviado:
+                cuerpo_enviado = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await desconexion.wait()
+            return {'type': 'http.disconnect'}
+
+        async def enviar(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                estado.append(mensaje['status'])
+
+        await aplicacion(alcance, recibir, enviar)
+        desconexion.set()
+        return estado[0]
@@ -0,0 +1,60 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from ... import precios
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo del cálculo de totales en memoria para ventas de distinto tamaño'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lineas',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 5000, 10000],
+            help='Cantidades de líneas a medir (por defecto 10 100 1000 5000 10000)',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Veces que se repite cada medición; se toma la mejor (por defecto 20)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('⏱️  Benchmark del cálculo de precios (sin base de datos)\n')
+        self.stdout.write(f"{'Líneas':>8} {'Mejor (ms)':>12} {'µs/línea':>10} {'Total USD':>16}")
+
+        aleatorio = random.Random(42)
+        repeticiones = max(1, options['repeticiones'])
+
+        for cantidad_lineas in options['lineas']:
+            lineas = [
+                (
+                    Decimal(aleatorio.randint(50, 50000)) / 100,
+                    Decimal(aleatorio.randint(1, 20000)) / 1000,
+                )
+                for _ in range(cantidad_lineas)
+            ]
+
+            mejor = None
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                totales = precios.calcular_totales(lineas, Decimal('16.00'), True, Decimal('110.00'))
+                transcurrido = time.perf_counter() - inicio
+                mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+
+            por_linea = mejor / cantidad_lineas * 1_000_000
+            self.stdout.write(
+                f"{cantidad_lineas:>8} {mejor * 1000:>12.3f} {por_linea:>10.2f} {totales['total']:>16,.2f}"
+            )
+
+        self.stdout.write(
+            '\nℹ️  Si el cálculo escala linealmente, el tiempo por línea se mantiene '
+            'estable al aumentar la cantidad de líneas.'
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
@@ -0,0 +1,128 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ...models import Cliente, Producto
+
+
+ESCRITURAS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class Reversion(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara consultas a SQLite por inicio de sesión y por ciclo de venta (formulario, '
+        'registro y detalle) con cada motor de sesiones (sin guardar cambios)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--motores',
+            nargs='+',
+            choices=list(settings.MOTORES_SESION),
+            default=list(settings.MOTORES_SESION),
+            help='Motores de sesión a medir (por defecto todos)',
+        )
+        parser.add_argument(
+            '--ventas',
+            type=int,
+            default=5,
+            help='Ciclos de venta por motor (por defecto 5)',
+        )
+
+    def handle(self, *args, **options):
+        ventas = max(1, options['ventas'])
+        usuario = User.objects.filter(is_active=True, empleado__isnull=False).order_by('pk').first()
+        cliente = Cliente.objects.order_by('pk').first()
+        producto = Producto.objects.filter(activo=True, stock__gte=ventas).order_by('pk').first()
+        if usuario is None or cliente is None or producto is None:
+            raise CommandError('Se necesita un usuario con empleado, un cliente y un producto activo con stock')
+
+        self.stdout.write(
+            f'⏱️  Benchmark de sesiones: {ventas} ciclo(s) de venta por motor '
+            f'(los datos se revierten al terminar)\n'
+        )
+        self.stdout.write(
+            f"{'Motor':<10} {'Medición':<18} {'Consultas':>10} {'Sesión lect.':>13} "
+            f"{'Sesión escr.':>13} {'Escrituras':>11} {'ms':>9}"
+        )
+        for motor in options['motores']:
+            with override_settings(SESSION_ENGINE=settings.MOTORES_SESION[motor]):
+                for medicion, (consultas, segundos) in self._medir(usuario, cliente, producto, ventas).items():
+                    divisor = 1 if medicion == 'inicio de sesión' else ventas
+                    sesion_lectura, sesion_escritura, escrituras = self._clasificar(consultas)
+                    self.stdout.write(
+                        f"{motor:<10} {medicion:<18} {len(consultas) / divisor:>10.1f} "
+                        f"{sesion_lectura / divisor:>13.1f} {sesion_escritura / divisor:>13.1f} "
+                        f"{escrituras / divisor:>11.1f} {segundos / divisor * 1000:>9.1f}"
+                    )
+            self.stdout.write('')
+
+        self.stdout.write(
+            'ℹ️  Los valores del ciclo de venta son promedios por venta. Los mensajes viajan en '
+            'una cookie; las escrituras restantes son las de la venta misma.'
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    def _medir(self, usuario, cliente, producto, ventas):
+        resultados = {}
+        navegador = Client()
+        try:
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    navegador.force_login(usuario)
+                    resultados['inicio de sesión'] = (list(capturadas), time.perf_counter() - inicio)
+
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    for _ in range(ventas):
+                        self._ciclo_venta(navegador, cliente, producto)
+                    resultados['ciclo de venta'] = (list(capturadas), time.perf_counter() - inicio)
+
+                navegador.logout()
+                raise Reversion()
+        except Reversion:
+            pass
+        return resultados
+
+    def _ciclo_venta(self, navegador, cliente, producto):
+        url = reverse('black_invoices:venta_create')
+        respuesta = navegador.get(url)
+        if respuesta.status_code != 200:
+            raise CommandError(f'GET {url} respondió {respuesta.status_code}')
+        respuesta = navegador.post(url, {
+            'clave_idempotencia': uuid.uuid4().hex,
+            'cliente': cliente.pk,
+            'tipo_venta': 'contado',
+            'metodo_pag': 'efectivo',
+            'form-TOTAL_FORMS': '1',
+            'form-0-producto': producto.pk,
+            'form-0-cantidad': '1',
+        }, follow=True)
+        # Una venta rechazada vuelve al formulario en lugar de ir al detalle
+        if not respuesta.redirect_chain or respuesta.redirect_chain[0][0] == url:
+            raise CommandError('La venta de prueba no se registró')
+
+    def _clasificar(self, consultas):
+        sesion_lectura = sesion_escritura = escrituras = 0
+        for consulta in consultas:
+            sql = consulta['sql'].lstrip().upper()
+            escritura = sql.startswith(ESCRITURAS)
+            escrituras += escritura
+            if 'DJANGO_SESSION' in sql:
+                if escritura:
+                    sesion_escritura += 1
+                else:
+                    sesion_lectura += 1
+        return sesion_lectura, sesion_escritura, escrituras
@@ -0,0 +1,91 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from ...models import Producto, UnidadMedida
+
+
+class Reversion(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara consultas y tiempo por línea al descontar stock con save() y con ajustar_stock (sin guardar cambios)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lineas',
+            type=int,
+            nargs='+',
+            default=[1, 10, 100, 1000],
+            help='Cantidades de líneas (productos distintos) a medir (por defecto 1 10 100 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('⏱️  Benchmark de escritura de stock (los datos se revierten al terminar)\n')
+        self.stdout.write(
+            f"{'Líneas':>7} {'Método':<26} {'Consultas':>10} {'Cons./línea':>12} {'ms':>10} {'µs/línea':>10}"
+        )
+
+        for cantidad_lineas in options['lineas']:
+            for nombre, metodo in (
+                ('save(update_fields)', self._con_save),
+                ('ajustar_stock', self._con_ajustar),
+                ('ajustar_stock_lote', self._con_lote),
+            ):
+                consultas, segundos = self._medir(cantidad_lineas, metodo)
+                self.stdout.write(
+                    f"{cantidad_lineas:>7} {nombre:<26} {consultas:>10} {consultas / cantidad_lineas:>12.2f} "
+                    f"{segundos * 1000:>10.2f} {segundos / cantidad_lineas * 1_000_000:>10.1f}"
+                )
+            self.stdout.write('')
+
+        self.stdout.write(
+            'ℹ️  save() ejecuta full_clean(): valida todos los campos y consulta la unicidad '
+            'de sku y nombre antes del UPDATE.'
+        )
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark completado'))
+
+    def _medir(self, cantidad_lineas, metodo):
+        resultado = None
+        try:
+            with transaction.atomic():
+                unidad = UnidadMedida.objects.order_by('pk').first()
+                productos = Producto.objects.bulk_create([
+                    Producto(
+                        sku=f'BENCH-STOCK-{i}',
+                        nombre=f'Benchmark stock {i}',
+                        descripcion='Producto temporal del benchmark',
+                        precio=Decimal('10.00'),
+                        precio_compra=Decimal('5.00'),
+                        stock=Decimal('1000'),
+                        unidad_medida=unidad,
+                    )
+                    for i in range(cantidad_lineas)
+                ])
+                productos = list(Producto.objects.filter(pk__in=[p.pk for p in productos]))
+
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    metodo(productos, Decimal('1.5'))
+                    segundos = time.perf_counter() - inicio
+                resultado = (len(capturadas), segundos)
+                raise Reversion()
+        except Reversion:
+            pass
+        return resultado
+
+    def _con_save(self, productos, cantidad):
+        for producto in productos:
+            producto.stock -= cantidad
+            producto.save(update_fields=['stock'])
+
+    def _con_ajustar(self, productos, cantidad):
+        for producto in productos:
+            producto.ajustar_stock(-cantidad)
+
+    def _con_lote(self, productos, cantidad):
+        Producto.ajustar_stock_lote({producto.pk: -cantidad for producto in productos})
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from ... import cache_reportes
+
+
+class Command(BaseCommand):
+    help = 'Muestra aciertos y fallos del cache de reportes, o lo invalida'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--invalidar',
+            action='store_true',
+            help='Invalidar todos los reportes cacheados (por ejemplo, después de cargar datos con SQL)',
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Poner en cero los contadores de aciertos y fallos',
+        )
+
+    def handle(self, *args, **options):
+        if options['invalidar']:
+            cache_reportes.invalidar()
+            self.stdout.write(self.style.SUCCESS('✅ Reportes cacheados invalidados'))
+
+        estadisticas = cache_reportes.estadisticas()
+        if not estadisticas:
+            self.stdout.write('📭 Sin consultas registradas')
+        for reporte, datos in estadisticas.items():
+            self.stdout.write(
+                f"📊 {reporte:<25} aciertos {datos['aciertos']:>7}  fallos {datos['fallos']:>7}  "
+                f"({datos['porcentaje']}% desde cache)"
+            )
+
+        if options['reiniciar']:
+            cache_reportes.reiniciar_estadisticas()
+            self.stdout.write(self.style.SUCCESS('✅ Contadores reiniciados'))
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import reposicion
+
+
+class Command(BaseCommand):
+    help = 'Actualiza la velocidad de venta y los puntos de reorden de los productos (solo los días nuevos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help=f'Recalcula los últimos {reposicion.VENTANA_DIAS} días (por ejemplo después de cancelar ventas)',
+        )
+        parser.add_argument(
+            '--hasta',
+            help='Último día a incluir, AAAA-MM-DD (por defecto ayer)',
+        )
+
+    def handle(self, *args, **options):
+        hasta = None
+        if options['hasta']:
+            try:
+                hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--hasta debe tener el formato AAAA-MM-DD')
+
+        resultado = reposicion.calcular(hasta=hasta, completo=options['completo'])
+        if not resultado['dias']:
+            self.stdout.write(f"ℹ️  La reposición ya está calculada hasta el {resultado['hasta']:%d/%m/%Y}")
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Reposición de {resultado['productos']} producto(s) calculada con "
+            f"{resultado['dias']} día(s) de ventas ({resultado['desde']:%d/%m/%Y} - {resultado['hasta']:%d/%m/%Y})"
+        ))
+        pendientes = reposicion.a_reponer().count()
+        if pendientes:
+            self.stdout.write(self.style.WARNING(f'⚠️  {pendientes} producto(s) en o bajo su punto de reorden'))
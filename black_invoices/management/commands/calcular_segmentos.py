@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ... import segmentos
+from ...models import ClienteSegmento
+
+
+class Command(BaseCommand):
+    help = 'Recalcula la segmentación RFM (recencia, frecuencia y monto) de todos los clientes'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        resumen = segmentos.calcular()
+        segundos = time.perf_counter() - inicio
+
+        nombres = dict(ClienteSegmento.SEGMENTO_CHOICES)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {sum(resumen.values())} cliente(s) segmentado(s) en {segundos:.2f} s'
+        ))
+        for clave, nombre in nombres.items():
+            if resumen.get(clave):
+                self.stdout.write(f'   {nombre}: {resumen[clave]}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ... import comisiones
+
+
+class Command(BaseCommand):
+    help = 'Guarda los estados de cuenta de comisiones de los meses cerrados que aún no se congelaron'
+
+    def handle(self, *args, **options):
+        guardados = comisiones.congelar()
+        if guardados:
+            self.stdout.write(self.style.SUCCESS(f'✅ {guardados} estado(s) de cuenta congelado(s)'))
+        else:
+            self.stdout.write('ℹ️  No hay meses cerrados pendientes de congelar')
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from ...models import NotaEntrega
+
+
+class Command(BaseCommand):
+    help = 'Convierte a factura fiscal todas las notas de entrega cuya venta a crédito ya fue pagada'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Cantidad de notas a convertir por transacción (por defecto 200)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo mostrar las notas que se convertirían',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🧾 Buscando notas de entrega pagadas...\n')
+
+        notas = list(NotaEntrega.notas_pagadas().order_by('numero_nota'))
+        if not notas:
+            self.stdout.write(self.style.SUCCESS('✅ No hay notas pagadas pendientes de conversión'))
+            return
+
+        self.stdout.write(f'📋 Notas por convertir: {len(notas)}')
+
+        if options['dry_run']:
+            for nota in notas:
+                self.stdout.write(f'   • Nota #{nota.numero_nota} - Total: ${nota.total:,.2f}')
+            self.stdout.write(self.style.WARNING('\n⚠️  Modo prueba: no se convirtió ninguna nota'))
+            return
+
+        lote = max(1, options['lote'])
+        convertidas = 0
+        for inicio in range(0, len(notas), lote):
+            facturas = NotaEntrega.convertir_lote(notas[inicio:inicio + lote])
+            convertidas += len(facturas)
+            self.stdout.write(f'   ✓ Lote {inicio // lote + 1}: {len(facturas)} facturas generadas')
+
+        self.stdout.write(self.style.SUCCESS(f'\n🎉 {convertidas} notas convertidas a factura fiscal'))
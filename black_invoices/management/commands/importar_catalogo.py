@@ -0,0 +1,77 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import catalogo
+
+
+class Command(BaseCommand):
+    help = 'Importa o actualiza productos desde un CSV o XLSX (por defecto solo muestra la vista previa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx (columna sku obligatoria)')
+        parser.add_argument(
+            '--aplicar',
+            action='store_true',
+            help='Guardar los cambios (sin esta opción no se modifica nada)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=catalogo.LOTE,
+            help=f'Filas por consulta de bulk_create/bulk_update (por defecto {catalogo.LOTE})',
+        )
+        parser.add_argument(
+            '--mostrar',
+            type=int,
+            default=20,
+            help='Cuántos productos nuevos, cambios y errores listar (por defecto 20)',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                plan = catalogo.preparar(catalogo.leer_filas(archivo, options['archivo']))
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el archivo: {e}')
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'🔎 Archivo validado en {time.perf_counter() - inicio:.2f} s\n')
+
+        self.mostrar_plan(plan, options['mostrar'])
+
+        if not options['aplicar']:
+            self.stdout.write(self.style.WARNING('\n⚠️  Vista previa: no se guardó nada. Use --aplicar para importar.'))
+            return
+        if not plan['crear'] and not plan['actualizar']:
+            self.stdout.write(self.style.SUCCESS('\n✅ El catálogo ya está al día'))
+            return
+
+        inicio = time.perf_counter()
+        resultado = catalogo.aplicar(plan, lote=options['lote'], detalle=os.path.basename(options['archivo']))
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ {resultado['creados']} producto(s) creado(s) y {resultado['actualizados']} "
+            f"actualizado(s) en {time.perf_counter() - inicio:.2f} s"
+        ))
+
+    def mostrar_plan(self, plan, limite):
+        self.stdout.write(f"➕ Nuevos: {len(plan['crear'])}")
+        for valores in plan['crear'][:limite]:
+            self.stdout.write(f"   {valores['sku']}: {valores['nombre']} (${valores['precio']})")
+
+        self.stdout.write(f"✏️  Con cambios: {len(plan['actualizar'])}")
+        for actualizacion in plan['actualizar'][:limite]:
+            cambios = ', '.join(
+                f'{campo}: {anterior} → {nuevo}'
+                for campo, (anterior, nuevo) in actualizacion['cambios'].items()
+            )
+            self.stdout.write(f"   {actualizacion['sku']}: {cambios}")
+
+        self.stdout.write(f"＝ Sin cambios: {plan['sin_cambios']}")
+
+        estilo = self.style.ERROR if plan['errores'] else self.style.SUCCESS
+        self.stdout.write(estilo(f"❌ Filas con errores (se omiten): {len(plan['errores'])}"))
+        for fila, sku, mensaje in plan['errores'][:limite]:
+            self.stdout.write(f'   Fila {fila} ({sku or "sin sku"}): {mensaje}')
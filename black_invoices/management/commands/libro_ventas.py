@@ -0,0 +1,58 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import libro_ventas
+from ...reportes import mes_actual
+from ...models import ConfiguracionSistema
+
+
+class Command(BaseCommand):
+    help = 'Genera el Libro de Ventas de un mes en CSV, XLSX o PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            help='Mes en formato AAAA-MM (por defecto el mes en curso)',
+        )
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'xlsx', 'pdf'],
+            default='csv',
+            help='Formato del archivo (por defecto csv)',
+        )
+        parser.add_argument(
+            '--salida',
+            help='Ruta del archivo (por defecto Libro_Ventas_AAAA_MM.<formato>)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            periodo = datetime.strptime(options['periodo'], '%Y-%m').date() if options['periodo'] else mes_actual()
+        except ValueError:
+            raise CommandError('El período debe tener el formato AAAA-MM')
+        formato = options['formato']
+        salida = options['salida'] or f'Libro_Ventas_{periodo:%Y_%m}.{formato}'
+
+        libro = libro_ventas.LibroVentas(periodo)
+        inicio = time.perf_counter()
+        try:
+            if formato == 'csv':
+                with open(salida, 'w', encoding='utf-8', newline='') as archivo:
+                    archivo.writelines(libro_ventas.csv_lineas(libro))
+            else:
+                with open(salida, 'wb') as archivo:
+                    if formato == 'xlsx':
+                        libro_ventas.escribir_xlsx(libro, archivo)
+                    else:
+                        libro_ventas.escribir_pdf(libro, archivo, ConfiguracionSistema.get_config())
+        except ValueError as e:
+            raise CommandError(str(e))
+        segundos = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Libro de Ventas {periodo:%m/%Y}: {libro.facturas} factura(s) emitida(s), '
+            f'{libro.anuladas} anulada(s) en {segundos:.2f} s → {salida}'
+        ))
+        self.stdout.write(f"   Total: ${libro.totales['total']:,.2f} / Bs {libro.totales['total_ves']:,.2f}")
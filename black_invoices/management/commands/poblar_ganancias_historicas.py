@@ -1,10 +1,10 @@
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from black_invoices.models import Ventas, DetalleGanancia
-from decimal import Decimal
-import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import ganancias_historicas
+from ...ganancias_historicas import Control
 
-logger = logging.getLogger(__name__)
 
 class Command(BaseCommand):
     help = 'Pobla los registros de ganancias históricas para ventas existentes que no tienen DetalleGanancia'
@@ -18,85 +18,90 @@ class Command(BaseCommand):
         parser.add_argument(
             '--verbose',
             action='store_true',
-            help='Muestra información detallada del proceso',
+            help='Muestra el avance de cada tramo',
         )
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=100,
-            help='Tamaño del lote para procesar ventas (default: 100)',
+            default=ganancias_historicas.TAMANO_TRAMO,
+            help=f'Claves de venta por tramo (default: {ganancias_historicas.TAMANO_TRAMO})',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=1,
+            help='Procesos que reparten los tramos entre sí (default: 1)',
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Descarta el avance guardado de una ejecución interrumpida y empieza de nuevo',
+        )
+        parser.add_argument(
+            '--control',
+            help='Archivo donde se guarda el avance (default: settings.GANANCIAS_CONTROL)',
         )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        verbose = options['verbose']
-        batch_size = options['batch_size']
+        tamano = options['batch_size']
+        if tamano < 1 or options['procesos'] < 1:
+            raise CommandError('--batch-size y --procesos deben ser mayores que cero')
 
         if dry_run:
             self.stdout.write(
                 self.style.WARNING('MODO DRY-RUN: No se realizarán cambios reales')
             )
 
-        # Obtener ventas que no tienen registros de ganancias
-        ventas_sin_ganancias = Ventas.objects.filter(
-            detalleganancia__isnull=True,
-            status__vent_cancelada=False
-        ).select_related('empleado').prefetch_related('detalles_factura', 'detalles_nota')
-
-        total_ventas = ventas_sin_ganancias.count()
-        
-        if total_ventas == 0:
+        ruta = options['control'] or ganancias_historicas.ruta_control()
+        control = None if options['reiniciar'] else Control.cargar(ruta)
+        if control is not None:
             self.stdout.write(
-                self.style.SUCCESS('No hay ventas sin registros de ganancias.')
+                f'⏯️  Continuando la carga interrumpida desde la venta #{control.continuo} '
+                f'(hasta #{control.hasta}, {len(control.terminados)} tramo(s) adelantados)'
             )
-            return
+        else:
+            total_ventas = ganancias_historicas.pendientes().count()
+            if total_ventas == 0:
+                self.stdout.write(
+                    self.style.SUCCESS('No hay ventas sin registros de ganancias.')
+                )
+                Control(ruta, 0, -1, tamano).eliminar()
+                return
+            self.stdout.write(f'Encontradas {total_ventas} ventas sin registros de ganancias.')
 
-        self.stdout.write(
-            f'Encontradas {total_ventas} ventas sin registros de ganancias.'
+            # El rango se fija al empezar: las ventas nuevas ya crean sus registros
+            desde, hasta = ganancias_historicas.rango_ventas()
+            control = Control(ruta, desde, hasta, tamano)
+            if not dry_run:
+                control.guardar()
+
+        inicio = time.perf_counter()
+        totales = ganancias_historicas.ejecutar(
+            control,
+            procesos=options['procesos'],
+            simular=dry_run,
+            al_terminar_tramo=self.mostrar_tramo if options['verbose'] else None,
         )
+        segundos = time.perf_counter() - inicio
 
-        if verbose:
-            self.stdout.write('Procesando ventas...')
-
-        registros_creados = 0
-        errores = 0
-        
-        # Procesar en lotes
-        for i in range(0, total_ventas, batch_size):
-            batch = ventas_sin_ganancias[i:i + batch_size]
-            
-            if verbose:
-                self.stdout.write(
-                    f'Procesando lote {i//batch_size + 1} ({len(batch)} ventas)...'
-                )
-            
-            with transaction.atomic():
-                for venta in batch:
-                    try:
-                        if self._procesar_venta(venta, dry_run, verbose):
-                            registros_creados += 1
-                    except Exception as e:
-                        errores += 1
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f'Error procesando venta {venta.id}: {str(e)}'
-                            )
-                        )
-                        if verbose:
-                            logger.exception(f'Error en venta {venta.id}')
+        if not dry_run and control.terminado():
+            control.eliminar()
 
         # Resumen final
         self.stdout.write('\n' + '='*50)
         self.stdout.write(
-            self.style.SUCCESS(f'RESUMEN:')
+            self.style.SUCCESS('RESUMEN:')
         )
-        self.stdout.write(f'Ventas procesadas: {total_ventas}')
-        self.stdout.write(f'Registros creados: {registros_creados}')
-        if errores > 0:
+        self.stdout.write(f"Tramos procesados: {totales['tramos']}")
+        self.stdout.write(f"Ventas procesadas: {totales['ventas']}")
+        self.stdout.write(f"Registros {'a crear' if dry_run else 'creados'}: {totales['registros']}")
+        if totales['sin_detalles']:
             self.stdout.write(
-                self.style.ERROR(f'Errores: {errores}')
+                self.style.WARNING(f"Ventas sin detalles (sin registros): {totales['sin_detalles']}")
             )
-        
+        self.stdout.write(f'Tiempo: {segundos:.2f} s')
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(
@@ -109,91 +114,8 @@ class Command(BaseCommand):
                 self.style.SUCCESS('¡Proceso completado exitosamente!')
             )
 
-    def _procesar_venta(self, venta, dry_run, verbose):
-        """Procesa una venta individual y crea sus registros de ganancia"""
-        
-        # Obtener detalles según el tipo de venta
-        if hasattr(venta, 'factura') and venta.factura:
-            detalles = venta.detalles_factura.all()
-        elif hasattr(venta, 'nota_entrega') and venta.nota_entrega:
-            detalles = venta.detalles_nota.all()
-        else:
-            if verbose:
-                self.stdout.write(
-                    self.style.WARNING(
-                        f'Venta {venta.id}: No tiene factura ni nota de entrega'
-                    )
-                )
-            return False
-
-        if not detalles.exists():
-            if verbose:
-                self.stdout.write(
-                    self.style.WARNING(f'Venta {venta.id}: No tiene detalles')
-                )
-            return False
-
-        registros_creados = 0
-        ganancia_total = Decimal('0.00')
-
-        for detalle in detalles:
-            # Calcular datos del detalle
-            if hasattr(detalle, 'producto'):  # Detalle de factura
-                producto = detalle.producto
-                cantidad = detalle.cantidad
-                precio_venta = producto.precio
-                subtotal = detalle.sub_total
-            else:  # Detalle de nota de entrega
-                producto = detalle.producto
-                cantidad = detalle.cantidad
-                precio_venta = detalle.precio_unitario
-                subtotal = detalle.subtotal_linea
-
-            # Usar precio actual como costo (esto es una aproximación para datos históricos)
-            costo_unitario = producto.precio_actual or Decimal('0.00')
-            costo_total = costo_unitario * cantidad
-            ganancia_unitaria = precio_venta - costo_unitario
-            ganancia_total_producto = ganancia_unitaria * cantidad
-            
-            # Calcular margen
-            if precio_venta > 0:
-                margen = (ganancia_unitaria / precio_venta) * 100
-            else:
-                margen = Decimal('0.00')
-
-            ganancia_total += ganancia_total_producto
-
-            if verbose:
-                self.stdout.write(
-                    f'  Producto: {producto.nombre} | '
-                    f'Cant: {cantidad} | '
-                    f'Ganancia: ${ganancia_total_producto:.2f}'
-                )
-
-            if not dry_run:
-                DetalleGanancia.objects.create(
-                    venta=venta,
-                    producto=producto,
-                    cantidad=cantidad,
-                    precio_venta=precio_venta,
-                    costo_unitario=costo_unitario,
-                    ganancia_unitaria=ganancia_unitaria,
-                    ganancia_total=ganancia_total_producto,
-                    margen_porcentaje=margen,
-                    fecha_registro=venta.fecha_venta,
-                    es_historico=True
-                )
-                registros_creados += 1
-
-        if verbose:
-            self.stdout.write(
-                f'Venta {venta.id}: {registros_creados} registros creados. '
-                f'Ganancia total: ${ganancia_total:.2f}'
-            )
-
-        return True
-
-    def _confirmar_accion(self):
-        """Solicita confirmación del usuario"""
-        respuesta = input('¿Desea continuar? [y/N]: ').lower().strip()
-        return respuesta in ['y', 'yes', 'sí', 'si']
\ No newline at end of file
+    def mostrar_tramo(self, inicio, fin, resultado):
+        self.stdout.write(
+            f"  Ventas #{inicio}-#{fin - 1}: {resultado['ventas']} venta(s), "
+            f"{resultado['registros']} registro(s)"
+        )
@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import programador
+from ...models import EjecucionTarea
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas periódicas (tasa de cambio, ganancias, respaldos, mantenimiento) en un proceso permanente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=2,
+            help='Tareas que pueden ejecutarse a la vez (por defecto 2)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Ejecutar las tareas vencidas y terminar (para usarlo desde cron)',
+        )
+        parser.add_argument(
+            '--ejecutar',
+            metavar='TAREA',
+            help='Ejecutar ahora una tarea, sin importar su programación',
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Mostrar las tareas configuradas y su último resultado',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tareas = programador.tareas_configuradas()
+        except (TypeError, ValueError) as e:
+            raise CommandError(f'Configuración de tareas inválida: {e}')
+
+        if options['listar']:
+            self.listar(tareas)
+            return
+
+        if options['ejecutar']:
+            tarea = next((t for t in tareas if t.nombre == options['ejecutar']), None)
+            if tarea is None:
+                raise CommandError(
+                    f"Tarea desconocida: {options['ejecutar']}. "
+                    f"Disponibles: {', '.join(t.nombre for t in tareas)}"
+                )
+            self.stdout.write(f'▶️  Ejecutando {tarea.nombre}...')
+            resultado = programador.ejecutar_tarea(tarea)
+            self.mostrar_resultado(tarea.nombre, resultado)
+            return
+
+        planificador = programador.Programador(
+            tareas, hilos=max(1, options['hilos']), avisar=self.stdout.write
+        )
+
+        if options['una_vez']:
+            resultados = planificador.ejecutar_una_vez()
+            if not resultados:
+                self.stdout.write(self.style.SUCCESS('✅ No hay tareas vencidas'))
+            for nombre, resultado in resultados.items():
+                self.mostrar_resultado(nombre, resultado)
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'⏰ Programador iniciado con {len(tareas)} tarea(s):'))
+        for tarea in tareas:
+            self.stdout.write(f'   • {tarea.nombre}: {tarea.programacion}')
+        try:
+            planificador.ejecutar()
+        except KeyboardInterrupt:
+            self.stdout.write('\n⏹️  Deteniendo: esperando a que terminen las tareas en curso...')
+            planificador.detener.set()
+            planificador.pool.shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS('👋 Programador detenido'))
+
+    def listar(self, tareas):
+        estados = {e.nombre: e for e in EjecucionTarea.objects.all()}
+        for tarea in tareas:
+            estado = estados.get(tarea.nombre)
+            self.stdout.write(f'📋 {tarea.nombre} ({tarea.programacion}) → {tarea.comando} {" ".join(tarea.args)}')
+            if estado and estado.ultima_ejecucion:
+                self.stdout.write(
+                    f'     Última: {estado.ultima_ejecucion:%d/%m/%Y %H:%M} - '
+                    f'{estado.get_resultado_display()} en {estado.duracion:.1f} s '
+                    f'({estado.ejecuciones} ejecuciones, {estado.fallos} fallos)'
+                )
+            else:
+                self.stdout.write('     Sin ejecuciones registradas')
+
+    def mostrar_resultado(self, nombre, resultado):
+        if resultado == 'ok':
+            self.stdout.write(self.style.SUCCESS(f'✅ {nombre}: completada'))
+        elif resultado == 'omitida':
+            self.stdout.write(self.style.WARNING(f'⏭️  {nombre}: ya está en curso en otro proceso'))
+        else:
+            self.stdout.write(self.style.ERROR(f'❌ {nombre}: falló (ver salida en Tareas programadas)'))
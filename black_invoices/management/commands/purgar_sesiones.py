@@ -0,0 +1,106 @@
+import os
+import pickle
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Elimina las sesiones vencidas de django_session en lotes cortos (sin bloquear '
+        'las ventas con un DELETE largo) y los archivos vencidos del cache de sesiones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Sesiones por DELETE (por defecto 1000)',
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.05,
+            help='Segundos de espera entre lotes (por defecto 0.05)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo cuenta las sesiones vencidas',
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        if lote < 1:
+            raise CommandError('--lote debe ser mayor que cero')
+        ahora = timezone.now()
+
+        # La tabla se limpia con cualquier motor: guarda las sesiones de
+        # 'db' y 'cached_db' y las anteriores a un cambio de motor
+        vencidas = Session.objects.filter(expire_date__lt=ahora)
+        if options['dry_run']:
+            self.stdout.write(f'🔎 {vencidas.count()} sesión(es) vencida(s) en django_session')
+        else:
+            inicio = time.perf_counter()
+            eliminadas = lotes = 0
+            while True:
+                claves = list(vencidas.values_list('pk', flat=True)[:lote])
+                if not claves:
+                    break
+                with transaction.atomic():
+                    Session.objects.filter(pk__in=claves).delete()
+                eliminadas += len(claves)
+                lotes += 1
+                time.sleep(options['pausa'])
+            self.stdout.write(
+                f'🧹 {eliminadas} sesión(es) vencida(s) eliminada(s) de django_session '
+                f'en {lotes} lote(s) ({time.perf_counter() - inicio:.2f} s)'
+            )
+
+        if settings.SESSION_ENGINE.endswith(('.cache', '.cached_db')):
+            self._purgar_cache(caches[settings.SESSION_CACHE_ALIAS], options['dry_run'])
+
+        self.stdout.write(self.style.SUCCESS('✅ Limpieza de sesiones completada'))
+
+    def _purgar_cache(self, cache, dry_run):
+        # Redis y la memoria local vencen las claves por sí mismos; el cache
+        # de archivos solo borra un archivo vencido cuando alguien lo lee
+        if not isinstance(cache, FileBasedCache):
+            self.stdout.write(f'ℹ️  El cache de sesiones ({type(cache).__name__}) vence las sesiones por sí mismo')
+            return
+        directorio = settings.CACHES[settings.SESSION_CACHE_ALIAS]['LOCATION']
+        try:
+            rutas = [
+                os.path.join(directorio, nombre) for nombre in os.listdir(directorio)
+                if nombre.endswith('.djcache')
+            ]
+        except FileNotFoundError:
+            rutas = []
+        if dry_run:
+            self.stdout.write(f'🔎 {len(rutas)} archivo(s) en el cache de sesiones')
+            return
+
+        ahora = time.time()
+        eliminados = 0
+        for ruta in rutas:
+            # Cada archivo empieza con la fecha de vencimiento (pickle de un
+            # timestamp; None = no vence) seguida del valor comprimido
+            try:
+                modificado = os.stat(ruta).st_mtime_ns
+                with open(ruta, 'rb') as archivo:
+                    vence = pickle.load(archivo)
+                # Si otro proceso reescribió la sesión mientras se leía, se deja
+                if vence and vence < ahora and os.stat(ruta).st_mtime_ns == modificado:
+                    os.remove(ruta)
+                    eliminados += 1
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                # Borrado por otro proceso o ilegible: se deja al cache
+                pass
+        self.stdout.write(f'🧹 {eliminados} archivo(s) vencido(s) eliminado(s) del cache de sesiones')
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import respaldos
+
+
+class Command(BaseCommand):
+    help = 'Respalda la base de datos en caliente (API de respaldo de SQLite), rota y restaura respaldos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sin-rotar',
+            action='store_true',
+            help='No eliminar respaldos antiguos según la política de retención',
+        )
+        parser.add_argument(
+            '--listar',
+            action='store_true',
+            help='Mostrar los respaldos existentes',
+        )
+        parser.add_argument(
+            '--verificar',
+            metavar='NOMBRE',
+            help='Comprobar la integridad de un respaldo',
+        )
+        parser.add_argument(
+            '--restaurar',
+            metavar='NOMBRE',
+            help='Reemplazar la base de datos por un respaldo (detenga antes el servidor)',
+        )
+        parser.add_argument(
+            '--no-input',
+            action='store_true',
+            help='No pedir confirmación al restaurar',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['listar']:
+                self.listar()
+            elif options['verificar']:
+                respaldos.verificar_respaldo(options['verificar'])
+                self.stdout.write(self.style.SUCCESS(f"✅ {options['verificar']}: integridad correcta"))
+            elif options['restaurar']:
+                self.restaurar(options['restaurar'], options['no_input'])
+            else:
+                self.respaldar(not options['sin_rotar'])
+        except respaldos.ErrorRespaldo as e:
+            raise CommandError(str(e))
+
+    def respaldar(self, rotar):
+        self.stdout.write('💾 Respaldando base de datos...')
+        resultado = respaldos.crear_respaldo()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultado['nombre']}: {resultado['tamano_original'] / 1024:,.0f} KB → "
+            f"{resultado['tamano'] / 1024:,.0f} KB en {resultado['segundos']} s (integridad verificada)"
+        ))
+        if rotar:
+            eliminados = respaldos.rotar()
+            for nombre in eliminados:
+                self.stdout.write(f'🗑️  Eliminado por rotación: {nombre}')
+
+    def listar(self):
+        lista = respaldos.listar_respaldos()
+        if not lista:
+            self.stdout.write('📭 No hay respaldos')
+            return
+        for respaldo in lista:
+            self.stdout.write(
+                f"📦 {respaldo['nombre']}  {respaldo['fecha']:%d/%m/%Y %H:%M}  {respaldo['tamano'] / 1024:,.0f} KB"
+            )
+
+    def restaurar(self, nombre, sin_confirmar):
+        if not sin_confirmar:
+            self.stdout.write(self.style.WARNING(
+                '⚠️  Detenga el servidor web y el programador antes de restaurar: las ventas que se '
+                'registren durante la restauración se pierden'
+            ))
+            respuesta = input(f'⚠️  Se reemplazará la base de datos actual por {nombre}. ¿Continuar? [s/N]: ')
+            if respuesta.strip().lower() not in ('s', 'si', 'sí', 'y', 'yes'):
+                self.stdout.write('Cancelado')
+                return
+        previo = respaldos.restaurar(nombre)
+        self.stdout.write(self.style.SUCCESS(f'✅ Base de datos restaurada desde {nombre}'))
+        self.stdout.write(f"💾 Estado anterior guardado en {previo['nombre']}")
@@ -0,0 +1,113 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _respuesta_exchangerate(tasa):
+    return {'base': 'USD', 'rates': {'USD': 1, 'VES': tasa}}
+
+
+def _respuesta_fixer(tasa):
+    return {'success': True, 'base': 'USD', 'rates': {'VES': tasa}}
+
+
+def _respuesta_currencyapi(tasa):
+    return {'data': {'VES': {'code': 'VES', 'value': tasa}}}
+
+
+# Mismas rutas que tasas.RUTAS_LOCALES, con el formato de cada API real
+FORMATOS = {
+    'exchangerate': _respuesta_exchangerate,
+    'fixer': _respuesta_fixer,
+    'currencyapi': _respuesta_currencyapi,
+}
+
+
+class Command(BaseCommand):
+    help = 'Servidor HTTP local que imita a los proveedores de tasa de cambio (para pruebas y benchmarks sin red)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--puerto', type=int, default=8765, help='Puerto (por defecto 8765)')
+        parser.add_argument('--tasa', type=float, default=36.50, help='Tasa que responden todos (por defecto 36.50)')
+        parser.add_argument(
+            '--retardo',
+            action='append',
+            default=[],
+            metavar='PROVEEDOR=SEGUNDOS',
+            help='Demora la respuesta de un proveedor (ejemplo: --retardo fixer=5)',
+        )
+        parser.add_argument(
+            '--desviar',
+            action='append',
+            default=[],
+            metavar='PROVEEDOR=TASA',
+            help='Hace que un proveedor responda otra tasa (para probar mediana y quorum)',
+        )
+        parser.add_argument(
+            '--fallar',
+            action='append',
+            default=[],
+            metavar='PROVEEDOR',
+            help='Hace que un proveedor responda error 500',
+        )
+
+    def handle(self, *args, **options):
+        retardos = self._pares(options['retardo'], float)
+        tasas = {nombre: options['tasa'] for nombre in FORMATOS}
+        tasas.update(self._pares(options['desviar'], float))
+        fallar = set(options['fallar'])
+        desconocidos = (set(retardos) | set(tasas) | fallar) - set(FORMATOS)
+        if desconocidos:
+            raise CommandError(f"Proveedores desconocidos: {', '.join(sorted(desconocidos))}. "
+                               f"Use: {', '.join(FORMATOS)}")
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                nombre = urlparse(self.path).path.strip('/')
+                if nombre not in FORMATOS:
+                    self.send_error(404)
+                    return
+                time.sleep(retardos.get(nombre, 0))
+                if nombre in fallar:
+                    self.send_error(500, 'Falla simulada')
+                    return
+                cuerpo = json.dumps(FORMATOS[nombre](tasas[nombre])).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        servidor = ThreadingHTTPServer(('127.0.0.1', options['puerto']), Manejador)
+        self.stdout.write(self.style.SUCCESS(
+            f'🧪 Proveedores de prueba en http://127.0.0.1:{options["puerto"]}/'
+            f'{{{",".join(FORMATOS)}}}'
+        ))
+        for nombre in FORMATOS:
+            estado = 'error 500' if nombre in fallar else f'tasa {tasas[nombre]}'
+            self.stdout.write(f'   • /{nombre}: {estado}, retardo {retardos.get(nombre, 0)} s')
+        self.stdout.write(f'Uso: python manage.py actualizar_tasa_cambio --force --local http://127.0.0.1:{options["puerto"]}')
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('\n👋 Servidor detenido')
+        finally:
+            servidor.server_close()
+
+    def _pares(self, valores, tipo):
+        pares = {}
+        for valor in valores:
+            nombre, separador, dato = valor.partition('=')
+            if not separador:
+                raise CommandError(f"Formato inválido '{valor}', se espera PROVEEDOR=VALOR")
+            try:
+                pares[nombre.strip()] = tipo(dato)
+            except ValueError:
+                raise CommandError(f"Valor inválido en '{valor}'")
+        return pares
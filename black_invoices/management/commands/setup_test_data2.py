@@ -354,14 +354,12 @@ class Command(BaseCommand):
                     
                     # Reducir stock
                     if producto.stock >= cantidad:
-                        producto.stock -= cantidad
-                        producto.save()
+                        producto.ajustar_stock(-cantidad)
                     else:
                         # Puedes manejar el caso de stock insuficiente
                         # Por ejemplo, reducir la cantidad a lo disponible
                         cantidad = producto.stock
-                        producto.stock = 0
-                        producto.save()
+                        producto.ajustar_stock(-cantidad)
                     
                     DetalleFactura.objects.create(
                         factura=factura,
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.utils.module_loading import import_string
+
+from ...estaticos import brotli
+
+
+FORMATOS_FUENTE_OBSOLETOS = ('.eot', '.ttf', '.svg')
+ARCHIVO_MUESTRA = 'css/adminlte.min.css'
+
+
+class Command(BaseCommand):
+    help = 'Verifica que el perfil de producción esté activo y que collectstatic se haya ejecutado'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'🔎 Verificando perfil "{settings.PERFIL}"...\n')
+        self.fallos = 0
+
+        self._verificar('Perfil de producción activo', settings.PERFIL == 'produccion',
+                        'Defina BLACK_SYSTEM_PERFIL=produccion')
+        self._verificar('DEBUG desactivado', not settings.DEBUG,
+                        'Con DEBUG=True Django guarda cada consulta SQL en memoria')
+        self._verificar('SECRET_KEY propia', not settings.SECRET_KEY.startswith('django-insecure-'),
+                        'Defina DJANGO_SECRET_KEY; la clave de desarrollo está en el repositorio')
+
+        motor = engines['django'].engine
+        cacheado = any(
+            type(loader).__module__ == 'django.template.loaders.cached'
+            for loader in motor.template_loaders
+        )
+        self._verificar('Plantillas con cached.Loader', cacheado)
+
+        manifest = isinstance(staticfiles_storage, ManifestStaticFilesStorage)
+        self._verificar('Estáticos con ManifestStaticFilesStorage', manifest,
+                        f'Storage actual: {type(staticfiles_storage).__name__}')
+
+        if manifest:
+            try:
+                versionado = staticfiles_storage.stored_name(ARCHIVO_MUESTRA)
+            except ValueError:
+                versionado = None
+            self._verificar('Manifest generado por collectstatic', versionado is not None,
+                            'Ejecute: python manage.py collectstatic --noinput')
+            if versionado:
+                self.stdout.write(f'     {ARCHIVO_MUESTRA} → {versionado}')
+                ruta = staticfiles_storage.path(versionado)
+                self._verificar('Copia gzip precomprimida', staticfiles_storage.exists(versionado + '.gz'),
+                                f'No existe {ruta}.gz')
+                if brotli is not None:
+                    self._verificar('Copia brotli precomprimida', staticfiles_storage.exists(versionado + '.br'),
+                                    f'No existe {ruta}.br')
+                else:
+                    self.stdout.write(self.style.WARNING(
+                        '⚠️  Paquete brotli no instalado: solo se generan copias .gz'
+                    ))
+
+        self._verificar('GZipMiddleware activo', any(
+            ruta in settings.MIDDLEWARE
+            for ruta in ('black_invoices.middleware.GZipSinEventosMiddleware',
+                         'django.middleware.gzip.GZipMiddleware')
+        ))
+
+        sincronos = [
+            ruta for ruta in settings.MIDDLEWARE
+            if not getattr(import_string(ruta), 'async_capable', True)
+        ]
+        self._verificar('Middleware compatible con ASGI', not sincronos,
+                        'Bajo ASGI cada petición pasaría por un hilo: ' + ', '.join(sincronos))
+
+        self._verificar('Sesiones fuera de SQLite', settings.SESIONES != 'db',
+                        'Defina BLACK_SYSTEM_SESIONES=cached_db, cache o cookies')
+        locmem = settings.CACHES[settings.SESSION_CACHE_ALIAS]['BACKEND'].endswith('LocMemCache')
+        if settings.SESIONES in ('cache', 'cached_db') and locmem:
+            self.stdout.write(self.style.WARNING(
+                '⚠️  Cache de sesiones en memoria del proceso: con varios procesos use archivos o Redis'
+            ))
+
+        obsoletos = [
+            ruta
+            for finder in finders.get_finders()
+            for ruta, storage in finder.list([])
+            if 'webfonts' in ruta and ruta.endswith(FORMATOS_FUENTE_OBSOLETOS)
+        ]
+        self._verificar('Sin fuentes .eot/.ttf/.svg en el bundle', not obsoletos, ', '.join(obsoletos))
+
+        if settings.SERVIR_ESTATICOS:
+            self.stdout.write(f'ℹ️  Django sirve {settings.STATIC_URL} con Cache-Control de '
+                              f'{settings.ESTATICOS_MAX_AGE} segundos para archivos versionados')
+        else:
+            self.stdout.write(f'ℹ️  Configure el servidor web para servir {settings.STATIC_ROOT} '
+                              f'en {settings.STATIC_URL} con cache de larga duración')
+
+        if self.fallos:
+            raise CommandError(f'El perfil de producción no está completo: {self.fallos} verificación(es) fallida(s)')
+        self.stdout.write(self.style.SUCCESS('\n✅ Perfil de producción activo y completo'))
+
+    def _verificar(self, descripcion, correcto, detalle=''):
+        if correcto:
+            self.stdout.write(self.style.SUCCESS(f'✅ {descripcion}'))
+            return
+        self.fallos += 1
+        mensaje = f'❌ {descripcion}'
+        if detalle:
+            mensaje += f' - {detalle}'
+        self.stdout.write(self.style.ERROR(mensaje))
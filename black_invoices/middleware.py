@@ -0,0 +1,213 @@
+"""
+Carga del usuario autenticado junto con su empleado y nivel de acceso.
+
+AuthenticationMiddleware obtiene el usuario con una consulta y luego cada
+acceso a request.user.empleado y a empleado.nivel_acceso hacía otra. Con
+EmpleadoBackend el usuario se carga con select_related en una sola consulta
+y PrincipalMiddleware puede además guardarlo en cache por sesión durante
+PRINCIPAL_CACHE_SEGUNDOS (0 = desactivado).
+
+Ese cache y los contadores de versión que lo invalidan viven en el alias
+PRINCIPAL_CACHE ('sesiones' por defecto), que debe ser compartido entre
+procesos: con un LocMemCache la invalidación hecha en un proceso (al
+desactivar un usuario o cambiar su nivel) no llegaría a los demás, y el
+middleware se niega a arrancar con el cache activo sobre ese backend.
+
+PrincipalMiddleware funciona en modo síncrono y asíncrono: bajo ASGI no
+obliga a Django a pasar cada petición por un hilo, y las vistas asíncronas
+obtienen el mismo usuario con await request.auser().
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, aget_user, get_user
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.middleware.gzip import GZipMiddleware
+from django.utils.functional import SimpleLazyObject
+
+
+VERSION_USUARIO = 'principal:version:{}'
+VERSION_GLOBAL = 'principal:version:global'
+
+
+class EmpleadoBackend(ModelBackend):
+    """ModelBackend que trae el empleado y su nivel de acceso con el usuario"""
+
+    def get_user(self, user_id):
+        try:
+            user = User._default_manager.select_related(
+                'empleado__nivel_acceso'
+            ).get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await User._default_manager.select_related(
+                'empleado__nivel_acceso'
+            ).aget(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+def _cache():
+    return caches[getattr(settings, 'PRINCIPAL_CACHE', 'sesiones')]
+
+
+def _formatear_clave(request, user_id, versiones):
+    return 'principal:{}:{}:{}:{}'.format(
+        user_id,
+        versiones.get(VERSION_USUARIO.format(user_id), 0),
+        versiones.get(VERSION_GLOBAL, 0),
+        request.session.session_key,
+    )
+
+
+def _clave_cache(request, user_id):
+    versiones = _cache().get_many([VERSION_USUARIO.format(user_id), VERSION_GLOBAL])
+    return _formatear_clave(request, user_id, versiones)
+
+
+def cargar_usuario(request):
+    """Usuario de la sesión (con empleado y nivel), usando el cache si está activo"""
+    segundos = getattr(settings, 'PRINCIPAL_CACHE_SEGUNDOS', 0)
+    user_id = request.session.get(SESSION_KEY)
+    if not segundos or user_id is None or not request.session.session_key:
+        return get_user(request)
+
+    cache = _cache()
+    clave = _clave_cache(request, user_id)
+    user = cache.get(clave)
+    if user is None:
+        user = get_user(request)
+        if user.is_authenticated:
+            cache.set(clave, user, segundos)
+    return user
+
+
+async def acargar_usuario(request):
+    """Versión asíncrona de cargar_usuario() para vistas async"""
+    segundos = getattr(settings, 'PRINCIPAL_CACHE_SEGUNDOS', 0)
+    user_id = await request.session.aget(SESSION_KEY)
+    if not segundos or user_id is None or not request.session.session_key:
+        return await aget_user(request)
+
+    cache = _cache()
+    versiones = await cache.aget_many([VERSION_USUARIO.format(user_id), VERSION_GLOBAL])
+    clave = _formatear_clave(request, user_id, versiones)
+    user = await cache.aget(clave)
+    if user is None:
+        user = await aget_user(request)
+        if user.is_authenticated:
+            await cache.aset(clave, user, segundos)
+    return user
+
+
+def invalidar_principal(user_id=None):
+    """Descarta los usuarios cacheados de un usuario, o de todos si no se indica"""
+    cache = _cache()
+    clave = VERSION_USUARIO.format(user_id) if user_id else VERSION_GLOBAL
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, 1, None)
+
+
+def empleado_actual(request):
+    """Empleado del usuario autenticado o None, sin consultas adicionales"""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.empleado
+    except ObjectDoesNotExist:
+        return None
+
+
+def rol_actual(request):
+    """Nombre del nivel de acceso del usuario autenticado o None"""
+    empleado = empleado_actual(request)
+    if empleado is None or empleado.nivel_acceso_id is None:
+        return None
+    return empleado.nivel_acceso.nombre
+
+
+class PrincipalMiddleware:
+    """
+    Reemplaza el request.user perezoso de AuthenticationMiddleware por uno que
+    se carga con cargar_usuario(). Debe ir después de AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if getattr(settings, 'PRINCIPAL_CACHE_SEGUNDOS', 0) and isinstance(_cache(), LocMemCache):
+            raise ImproperlyConfigured(
+                'PRINCIPAL_CACHE_SEGUNDOS requiere que PRINCIPAL_CACHE sea un cache compartido '
+                'entre procesos (archivos o Redis), no LocMemCache'
+            )
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.user = SimpleLazyObject(lambda: cargar_usuario(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.user = SimpleLazyObject(lambda: cargar_usuario(request))
+
+        async def auser():
+            if not hasattr(request, '_acached_user'):
+                request._acached_user = await acargar_usuario(request)
+            return request._acached_user
+
+        request.auser = auser
+        return await self.get_response(request)
+
+
+
+class GZipSinEventosMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware que no comprime los flujos text/event-stream: el
+    compresor acumula los datos hasta llenar su búfer y los eventos no
+    llegarían al navegador a tiempo.
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            return response
+        return super().process_response(request, response)
+
+
+def conectar_senales():
+    """Invalida el cache de usuarios cuando cambian el usuario, su empleado o los niveles"""
+    from django.db.models.signals import post_save, post_delete
+    from .models import Empleado, NivelAcceso
+
+    def _por_usuario(sender, instance, **kwargs):
+        invalidar_principal(instance.pk)
+
+    def _por_empleado(sender, instance, **kwargs):
+        if instance.user_id:
+            invalidar_principal(instance.user_id)
+
+    def _global(sender, **kwargs):
+        invalidar_principal()
+
+    for senal in (post_save, post_delete):
+        senal.connect(_por_usuario, sender=User, weak=False,
+                      dispatch_uid=f'principal_usuario_{senal is post_save}')
+        senal.connect(_por_empleado, sender=Empleado, weak=False,
+                      dispatch_uid=f'principal_empleado_{senal is post_save}')
+        senal.connect(_global, sender=NivelAcceso, weak=False,
+                      dispatch_uid=f'principal_nivel_{senal is post_save}')
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0010_ventahistorial_detalleganancia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Tarea')),
+                ('en_curso_desde', models.DateTimeField(blank=True, null=True, verbose_name='En curso desde')),
+                ('ultima_ejecucion', models.DateTimeField(blank=True, null=True, verbose_name='Última ejecución')),
+                ('duracion', models.FloatField(blank=True, null=True, verbose_name='Duración (segundos)')),
+                ('resultado', models.CharField(blank=True, choices=[('ok', 'Correcta'), ('error', 'Con error'), ('en_curso', 'En curso')], max_length=10, verbose_name='Resultado')),
+                ('mensaje', models.TextField(blank=True, help_text='Últimas líneas de la salida o del error', verbose_name='Salida')),
+                ('ejecuciones', models.PositiveIntegerField(default=0, verbose_name='Ejecuciones')),
+                ('fallos', models.PositiveIntegerField(default=0, verbose_name='Fallos')),
+            ],
+            options={
+                'verbose_name': 'Ejecución de Tarea',
+                'verbose_name_plural': 'Ejecuciones de Tareas',
+                'ordering': ['nombre'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-19 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0011_ejecuciontarea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoTiempoReal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('venta', 'Venta'), ('pago', 'Pago'), ('cancelacion', 'Cancelación')], max_length=20, verbose_name='Tipo')),
+                ('datos', models.JSONField(default=dict, verbose_name='Datos')),
+                ('creado', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Creado')),
+            ],
+            options={
+                'verbose_name': 'Evento en Tiempo Real',
+                'verbose_name_plural': 'Eventos en Tiempo Real',
+                'ordering': ['id'],
+            },
+        ),
+    ]
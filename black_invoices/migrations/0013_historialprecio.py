@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-19 12:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0012_eventotiemporeal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialPrecio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precio_anterior', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio anterior')),
+                ('precio_nuevo', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio nuevo')),
+                ('precio_compra_anterior', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio de compra anterior')),
+                ('precio_compra_nuevo', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio de compra nuevo')),
+                ('origen', models.CharField(choices=[('edicion', 'Edición'), ('importacion', 'Importación de catálogo'), ('ajuste', 'Ajuste masivo')], max_length=20, verbose_name='Origen')),
+                ('detalle', models.CharField(blank=True, help_text='Regla aplicada o archivo importado', max_length=200, verbose_name='Detalle')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('empleado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='black_invoices.empleado', verbose_name='Empleado')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial_precios', to='black_invoices.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Historial de Precio',
+                'verbose_name_plural': 'Historial de Precios',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['producto', 'fecha'], name='black_invoi_product_20bfeb_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0013_historialprecio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventas',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='Clave de idempotencia'),
+        ),
+    ]
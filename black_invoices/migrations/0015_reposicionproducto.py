@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0014_ventas_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReposicionProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serie', models.JSONField(default=list, verbose_name='Unidades vendidas por día')),
+                ('hasta', models.DateField(verbose_name='Último día calculado')),
+                ('promedio_7', models.DecimalField(decimal_places=3, default=0, max_digits=12, verbose_name='Promedio diario (7 días)')),
+                ('promedio_30', models.DecimalField(decimal_places=3, default=0, max_digits=12, verbose_name='Promedio diario (30 días)')),
+                ('velocidad', models.DecimalField(decimal_places=3, default=0, help_text='El mayor de los dos promedios', max_digits=12, verbose_name='Velocidad de venta diaria')),
+                ('punto_reorden', models.DecimalField(decimal_places=3, default=0, help_text='Stock que cubre la entrega del proveedor más los días de seguridad', max_digits=12, verbose_name='Punto de reorden')),
+                ('stock_objetivo', models.DecimalField(decimal_places=3, default=0, help_text='Stock que cubre la entrega más los días de cobertura deseados', max_digits=12, verbose_name='Stock objetivo')),
+                ('calculado_en', models.DateTimeField(auto_now=True, verbose_name='Calculado en')),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reposicion', to='black_invoices.producto', verbose_name='Producto')),
+            ],
+            options={
+                'verbose_name': 'Reposición de Producto',
+                'verbose_name_plural': 'Reposición de Productos',
+                'ordering': ['producto__nombre'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-19 13:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0015_reposicionproducto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClienteSegmento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segmento', models.CharField(choices=[('campeones', 'Campeones'), ('leales', 'Leales'), ('nuevos', 'Nuevos'), ('activos', 'Activos'), ('en_riesgo', 'Alto valor en riesgo'), ('decayendo', 'Decayendo'), ('inactivos', 'Inactivos'), ('sin_compras', 'Sin compras')], max_length=20, verbose_name='Segmento')),
+                ('primera_compra', models.DateTimeField(blank=True, null=True, verbose_name='Primera compra')),
+                ('ultima_compra', models.DateTimeField(blank=True, null=True, verbose_name='Última compra')),
+                ('dias_sin_comprar', models.PositiveIntegerField(blank=True, null=True, verbose_name='Días sin comprar')),
+                ('compras', models.PositiveIntegerField(default=0, verbose_name='Compras en la ventana')),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto en la ventana')),
+                ('compras_total', models.PositiveIntegerField(default=0, verbose_name='Compras históricas')),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto histórico')),
+                ('puntaje_recencia', models.PositiveSmallIntegerField(default=0, verbose_name='R')),
+                ('puntaje_frecuencia', models.PositiveSmallIntegerField(default=0, verbose_name='F')),
+                ('puntaje_monto', models.PositiveSmallIntegerField(default=0, verbose_name='M')),
+                ('calculado_en', models.DateTimeField(auto_now=True, verbose_name='Calculado en')),
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='segmento', to='black_invoices.cliente', verbose_name='Cliente')),
+            ],
+            options={
+                'verbose_name': 'Segmento de Cliente',
+                'verbose_name_plural': 'Segmentos de Clientes',
+                'ordering': ['cliente__nombre_completo'],
+                'indexes': [models.Index(fields=['segmento'], name='black_invoi_segment_b0f100_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-19 13:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0016_clientesegmento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComisionEmpleado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(help_text='Primer día del mes', verbose_name='Período')),
+                ('ventas', models.PositiveIntegerField(default=0, verbose_name='Ventas')),
+                ('unidades', models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Unidades vendidas')),
+                ('monto_ventas', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto vendido')),
+                ('ganancia', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ganancia')),
+                ('canceladas', models.PositiveIntegerField(default=0, verbose_name='Ventas canceladas')),
+                ('monto_cancelado', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Monto cancelado')),
+                ('base_comision', models.CharField(choices=[('ventas', 'Monto vendido'), ('ganancia', 'Ganancia')], max_length=10, verbose_name='Base de la comisión')),
+                ('porcentaje_comision', models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name='Comisión %')),
+                ('comision', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Comisión')),
+                ('calculado_en', models.DateTimeField(auto_now_add=True, verbose_name='Congelado en')),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comisiones', to='black_invoices.empleado', verbose_name='Empleado')),
+            ],
+            options={
+                'verbose_name': 'Comisión de Empleado',
+                'verbose_name_plural': 'Comisiones de Empleados',
+                'ordering': ['-periodo', 'empleado__apellido', 'empleado__nombre'],
+                'constraints': [models.UniqueConstraint(fields=('empleado', 'periodo'), name='comision_empleado_periodo_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('black_invoices', '0017_comisionempleado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventas',
+            name='huella_idempotencia',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Huella de idempotencia'),
+        ),
+    ]
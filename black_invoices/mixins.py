@@ -3,6 +3,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import HttpResponseForbidden
 from django.contrib import messages
 from django.shortcuts import redirect
+from .middleware import empleado_actual, rol_actual
 
 class EmpleadoRolMixin(LoginRequiredMixin):
     """
@@ -20,12 +21,12 @@ class EmpleadoRolMixin(LoginRequiredMixin):
             return self.handle_no_permission()
         
         # Verificar si tiene empleado asociado
-        if not hasattr(request.user, 'empleado'):
+        if empleado_actual(request) is None:
             messages.error(request, 'No tienes un perfil de empleado asociado.')
             return redirect('black_invoices:inicio')
         
-        # Verificar el rol del empleado
-        rol_empleado = request.user.empleado.nivel_acceso.nombre
+        # Verificar el rol del empleado (ya cargado junto con el usuario)
+        rol_empleado = rol_actual(request)
         
         if rol_empleado not in self.roles_permitidos:
             messages.error(
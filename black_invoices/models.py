@@ -1,3 +1,5 @@
+import threading
+from contextlib import contextmanager
 from decimal import Decimal
 from django.utils import timezone
 from django.db import models
@@ -236,6 +238,71 @@ class Producto(models.Model):
         """Ejecutar validaciones antes de guardar"""
         self.full_clean()
         super().save(*args, **kwargs)
+
+    # Las ventas, cancelaciones y ajustes solo cambian el stock. save() ejecuta
+    # full_clean(), que valida todos los campos y consulta la unicidad de sku
+    # y nombre; estos métodos validan solo el rango del stock y lo escriben
+    # con un UPDATE relativo (stock = stock + cantidad), sin pisar cambios
+    # hechos por otra venta al mismo tiempo.
+
+    LOTE_STOCK = 500
+
+    @classmethod
+    def _stock_fuera_de_rango(cls, nombre, stock):
+        if stock < cls.STOCK_MINIMO:
+            mensaje = f'Stock insuficiente para {nombre}: quedaría en {stock}'
+        else:
+            mensaje = f'El stock de {nombre} quedaría en {stock}, mayor a {cls.STOCK_MAXIMO:,} unidades'
+        return ValidationError({'stock': mensaje})
+
+    def ajustar_stock(self, cantidad):
+        """
+        Suma cantidad al stock (negativa para descontar) con un solo UPDATE.
+        Lanza ValidationError si el stock quedaría fuera de STOCK_MINIMO y
+        STOCK_MAXIMO, sin modificar nada.
+        """
+        cantidad = Decimal(str(cantidad))
+        actualizados = Producto.objects.filter(
+            pk=self.pk,
+            stock__gte=self.STOCK_MINIMO - cantidad,
+            stock__lte=self.STOCK_MAXIMO - cantidad,
+        ).update(stock=models.F('stock') + cantidad, updated_at=timezone.now())
+        if not actualizados:
+            self.refresh_from_db(fields=['stock'])
+            raise self._stock_fuera_de_rango(self.nombre, self.stock + cantidad)
+        self.stock += cantidad
+
+    @classmethod
+    def ajustar_stock_lote(cls, ajustes):
+        """
+        Aplica {producto_id: cantidad} con un UPDATE por cada LOTE_STOCK
+        productos y una consulta que verifica el rango. Si algún producto
+        queda fuera de rango se revierte todo el lote y se lanza ValidationError.
+        """
+        from django.db import transaction
+
+        ajustes = [(pk, Decimal(str(cantidad))) for pk, cantidad in ajustes.items() if cantidad]
+        campo_stock = cls._meta.get_field('stock')
+
+        with transaction.atomic():
+            for inicio in range(0, len(ajustes), cls.LOTE_STOCK):
+                lote = ajustes[inicio:inicio + cls.LOTE_STOCK]
+                ids = [pk for pk, cantidad in lote]
+                cls.objects.filter(pk__in=ids).update(
+                    stock=models.F('stock') + models.Case(
+                        *[models.When(pk=pk, then=models.Value(cantidad)) for pk, cantidad in lote],
+                        default=models.Value(Decimal('0')),
+                        output_field=campo_stock
+                    ),
+                    # update() no toca auto_now; el catálogo incremental usa updated_at
+                    updated_at=timezone.now(),
+                )
+                fuera = cls.objects.filter(pk__in=ids).filter(
+                    models.Q(stock__lt=cls.STOCK_MINIMO) | models.Q(stock__gt=cls.STOCK_MAXIMO)
+                ).values_list('nombre', 'stock').first()
+                if fuera:
+                    raise cls._stock_fuera_de_rango(*fuera)
+        return len(ajustes)
     
     def stock_available(self):
         """Verifica si hay stock disponible"""
@@ -505,6 +572,25 @@ class Ventas(models.Model):
         null=True,
         blank=True
     )
+    # Clave generada por el cliente (formulario o API): un reintento con la
+    # misma clave retorna esta venta en lugar de registrar otra
+    clave_idempotencia = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Clave de idempotencia"
+    )
+    # Huella del contenido (empleado, cliente, tipo y líneas) registrado con
+    # la clave: la misma clave con otro contenido es un conflicto, no un reintento
+    huella_idempotencia = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Huella de idempotencia"
+    )
         
     class Meta:
         verbose_name = "Venta"
@@ -520,25 +606,26 @@ class Ventas(models.Model):
     
         with transaction.atomic():
             # Descontar stock inmediatamente
-            detalles = self.factura.detallefactura_set.all()
+            detalles = self.factura.detallefactura_set.select_related('producto')
+            ajustes = {}
             for detalle in detalles:
                 if detalle.cantidad > detalle.producto.stock:
                     raise ValueError(f"Stock insuficiente para {detalle.producto.nombre}")
-                
-                detalle.producto.stock -= detalle.cantidad
-                detalle.producto.save(update_fields=['stock'])
+                ajustes[detalle.producto_id] = ajustes.get(detalle.producto_id, 0) - detalle.cantidad
+            Producto.ajustar_stock_lote(ajustes)
             
             # Establecer estado según tipo de venta
+            from . import referencias
             if self.credito:
                 if self.monto_pagado <= 0:
-                    self.status = StatusVentas.objects.get(nombre="Pendiente")
+                    self.status = referencias.estado_pendiente()
                 else:
-                    self.status = StatusVentas.objects.get(
-                        nombre="Completada" if self.completada else "Pendiente"
+                    self.status = referencias.estado_venta(
+                        "Completada" if self.completada else "Pendiente"
                     )
             else:
                 # Contado = pagado completo
-                self.status = StatusVentas.objects.get(nombre="Completada")
+                self.status = referencias.estado_completada()
                 self.monto_pagado = self.factura.total_fac
             
             self.save()
@@ -580,14 +667,8 @@ class Ventas(models.Model):
             
             # CAMBIAR ESTADO si se completó el pago
             if self.completada and self.credito:
-                estado_completado, created = StatusVentas.objects.get_or_create(
-                    nombre="Completada",
-                    defaults={
-                        'vent_espera': False,
-                        'vent_cancelada': False
-                    }
-                )
-                self.status = estado_completado
+                from . import referencias
+                self.status = referencias.estado_completada()
                 
             self.save(update_fields=['monto_pagado', 'status'])
             
@@ -616,8 +697,8 @@ class Ventas(models.Model):
         
         # Cambiar estado si se completó el pago
         if self.completada and self.credito:
-            estado_completado = StatusVentas.objects.get(nombre="Completada")
-            self.status = estado_completado
+            from . import referencias
+            self.status = referencias.estado_completada()
             
         self.save(update_fields=['monto_pagado', 'status'])
         
@@ -665,25 +746,19 @@ class Ventas(models.Model):
         with transaction.atomic():
             # Restaurar stock según el tipo de documento
             if self.factura:
-                detalles = self.factura.detallefactura_set.all()
-                for detalle in detalles:
-                    detalle.producto.stock += detalle.cantidad
-                    detalle.producto.save(update_fields=['stock'])
+                detalles = self.factura.detallefactura_set.values_list('producto_id', 'cantidad')
             elif self.nota_entrega:
-                detalles = self.nota_entrega.detalles_nota.all()
-                for detalle in detalles:
-                    detalle.producto.stock += detalle.cantidad
-                    detalle.producto.save(update_fields=['stock'])
+                detalles = self.nota_entrega.detalles_nota.values_list('producto_id', 'cantidad')
+            else:
+                detalles = []
+            ajustes = {}
+            for producto_id, cantidad in detalles:
+                ajustes[producto_id] = ajustes.get(producto_id, 0) + cantidad
+            Producto.ajustar_stock_lote(ajustes)
             
             # Marcar como cancelada
-            estado_cancelado, created = StatusVentas.objects.get_or_create(
-                vent_cancelada=True,
-                defaults={
-                    'nombre': 'Cancelada',
-                    'vent_espera': False
-                }
-            )
-            self.status = estado_cancelado
+            from . import referencias
+            self.status = referencias.estado_cancelada()
             self.save()
     @property
     def saldo_pendiente(self):
@@ -733,13 +808,21 @@ class Ventas(models.Model):
         # Limpiar registros anteriores si existen
         self.detalles_ganancia.all().delete()
         
-        # Crear nuevos registros según el tipo de documento
+        # Crear nuevos registros según el tipo de documento, con los precios
+        # que regían en la fecha de la venta (importa al recalcular ventas viejas)
         if self.factura:
-            for detalle in self.factura.detallefactura_set.all():
-                DetalleGanancia.crear_desde_detalle_factura(self, detalle)
+            detalles = list(self.factura.detallefactura_set.select_related('producto'))
+            crear = DetalleGanancia.crear_desde_detalle_factura
         elif self.nota_entrega:
-            for detalle in self.nota_entrega.detalles_nota.all():
-                DetalleGanancia.crear_desde_detalle_nota(self, detalle)
+            detalles = list(self.nota_entrega.detalles_nota.select_related('producto'))
+            crear = DetalleGanancia.crear_desde_detalle_nota
+        else:
+            return
+        vigentes = HistorialPrecio.precios_vigentes(
+            (detalle.producto, self.fecha_venta) for detalle in detalles
+        )
+        for detalle in detalles:
+            crear(self, detalle, vigentes[(detalle.producto_id, self.fecha_venta)])
     
     def get_ganancia_total_venta(self):
         """Obtiene la ganancia total calculada para esta venta"""
@@ -786,7 +869,8 @@ class Ventas(models.Model):
                         f"Disponible: {producto.stock}, Requerido: {diferencia}"
                     )
 
-            # ✅ ACTUALIZAR UNO POR UNO (más seguro en SQLite)
+            # ✅ ACTUALIZAR TODO EN UN SOLO UPDATE
+            ajustes = {}
             for producto_id in productos_afectados:
                 producto = productos_dict.get(producto_id)
                 if not producto:
@@ -794,13 +878,8 @@ class Ventas(models.Model):
 
                 cantidad_anterior = Decimal(str(detalles_anteriores.get(producto_id, 0)))
                 cantidad_nueva = Decimal(str(detalles_nuevos.get(producto_id, 0)))
-                diferencia = cantidad_nueva - cantidad_anterior
-
-                if diferencia != 0:
-                    producto.stock -= diferencia
-                    producto.save(update_fields=['stock'])
-                    
-                    print(f"DEBUG: {producto.nombre} - Stock nuevo: {producto.stock}")    
+                ajustes[producto.pk] = cantidad_anterior - cantidad_nueva
+            Producto.ajustar_stock_lote(ajustes)
 
 class PagoVenta(models.Model):
     METODOS_PAGO_CHOICES = [
@@ -870,6 +949,46 @@ class StatusVentas(models.Model):
         return "COMPLETADA"
     
     
+_ambito_totales = threading.local()
+
+
+@contextmanager
+def totales_diferidos():
+    """
+    Difiere el recálculo de totales de facturas y notas de entrega.
+
+    Mientras el ámbito está activo, guardar un DetalleFactura o un
+    DetalleNotaEntrega solo marca su documento como pendiente; al salir se
+    recalcula cada documento una sola vez. Los ámbitos anidados se unen al
+    externo y, si ocurre una excepción, no se recalcula nada.
+    """
+    if getattr(_ambito_totales, 'pendientes', None) is not None:
+        yield
+        return
+
+    pendientes = _ambito_totales.pendientes = {}
+    try:
+        yield
+    finally:
+        _ambito_totales.pendientes = None
+
+    config = ConfiguracionSistema.get_config() if pendientes else None
+    for documento in pendientes.values():
+        if isinstance(documento, Factura):
+            documento.calcular_total_mejorado(config=config)
+        else:
+            documento.calcular_totales(config=config)
+
+
+def _diferir_totales(documento):
+    """Marca el documento como pendiente si hay un ámbito activo; retorna False si no lo hay"""
+    pendientes = getattr(_ambito_totales, 'pendientes', None)
+    if pendientes is None:
+        return False
+    pendientes.setdefault((documento._meta.label, documento.pk), documento)
+    return True
+
+
 class Factura(models.Model):
     METODO_PAGO_CHOICES = [
         ('efectivo', 'Efectivo'),
@@ -971,13 +1090,17 @@ class Factura(models.Model):
         """
         from decimal import Decimal
         
-        detalle = self.detallefactura_set.create(
-            producto=producto,
-            cantidad=cantidad,
-            sub_total=Decimal(str(producto.precio)) * Decimal(str(cantidad))
-        )
-        self.calcular_total()
+        with self.deferred_totals():
+            detalle = self.detallefactura_set.create(
+                producto=producto,
+                cantidad=cantidad,
+                sub_total=Decimal(str(producto.precio)) * Decimal(str(cantidad))
+            )
         return detalle
+
+    def deferred_totals(self):
+        """Ámbito para agregar o modificar líneas recalculando los totales una sola vez"""
+        return totales_diferidos()
     def save(self, *args, **kwargs):
         # Asignar número de factura si no tiene
         if not self.numero_factura:
@@ -986,34 +1109,35 @@ class Factura(models.Model):
         
         super().save(*args, **kwargs)
     
-    def calcular_total_mejorado(self):
+    def calcular_total_mejorado(self, config=None):
         """
-        Calcula totales con IVA incluido
+        Calcula totales con IVA incluido a partir del sub_total de cada línea
         """
-        config = ConfiguracionSistema.get_config()
-        
-        # Calcular subtotal (sin IVA)
-        subtotal = self.detallefactura_set.aggregate(
-            total=models.Sum(models.F('cantidad') * models.F('producto__precio'))
-        )['total'] or 0
+        from . import precios
+
+        if config is None:
+            config = ConfiguracionSistema.get_config()
         
-        # Calcular IVA
-        iva = config.calcular_iva(subtotal)
+        # Subtotales de línea: precargados o una sola consulta sin joins
+        detalles = getattr(self, '_prefetched_objects_cache', {}).get('detallefactura_set')
+        if detalles is not None:
+            subtotales = [detalle.sub_total for detalle in detalles]
+        else:
+            subtotales = self.detallefactura_set.values_list('sub_total', flat=True)
         
-        # Calcular total
-        total = subtotal + iva
+        totales = precios.totalizar(subtotales, config.porcentaje_iva, config.aplicar_iva)
         
         # Actualizar campos
-        self.subtotal = subtotal
-        self.iva = iva
-        self.total_fac = total
+        self.subtotal = totales['subtotal']
+        self.iva = totales['iva']
+        self.total_fac = totales['total']
         
         self.save(update_fields=['subtotal', 'iva', 'total_fac'])
         
         return {
-            'subtotal': subtotal,
-            'iva': iva,
-            'total': total
+            'subtotal': self.subtotal,
+            'iva': self.iva,
+            'total': self.total_fac
         }
     
     def get_totales_formateados(self):
@@ -1079,12 +1203,15 @@ class DetalleFactura(models.Model):
         return f"Detalle #{self.id} - Factura #{self.factura.id}"
 
     def save(self, *args, **kwargs):
+        from . import precios
+
         # Calcular subtotal de la línea
-        self.sub_total = self.cantidad * self.producto.precio
+        self.sub_total = precios.subtotal_linea(self.producto.precio, precios.parsear_cantidad(self.cantidad))
         super().save(*args, **kwargs)
         
-        # Actualizar totales de la factura con IVA
-        self.factura.calcular_total_mejorado()
+        # Actualizar totales de la factura con IVA (una sola vez al final si hay un ámbito diferido)
+        if not _diferir_totales(self.factura):
+            self.factura.calcular_total_mejorado()
     
 
     def validar_stock(self):
@@ -1356,9 +1483,9 @@ class ConfiguracionSistema(models.Model):
     
     def calcular_iva(self, monto_base):
         """Calcula el IVA de un monto base"""
-        if self.aplicar_iva:
-            return (monto_base * self.porcentaje_iva) / 100
-        return 0
+        from . import precios
+
+        return precios.calcular_iva(precios.a_decimal(monto_base), self.porcentaje_iva, self.aplicar_iva)
     
     def calcular_total_con_iva(self, monto_base):
         """Calcula el total incluyendo IVA"""
@@ -1372,6 +1499,14 @@ class ConfiguracionSistema(models.Model):
         self.save(update_fields=['numero_factura_actual'])
         return numero
     
+    def reservar_numeros_factura(self, cantidad):
+        """Reserva un bloque consecutivo de números de factura con un solo UPDATE"""
+        ConfiguracionSistema.objects.filter(pk=self.pk).update(
+            numero_factura_actual=models.F('numero_factura_actual') + cantidad
+        )
+        self.refresh_from_db(fields=['numero_factura_actual'])
+        return list(range(self.numero_factura_actual - cantidad, self.numero_factura_actual))
+
     def get_siguiente_numero_nota_entrega(self):
         """Obtiene y actualiza el siguiente número de nota de entrega"""
         numero = self.numero_nota_entrega_actual
@@ -1473,62 +1608,31 @@ class NotaEntrega(models.Model):
         """Verifica si la nota está completamente pagada"""
         return self.monto_pagado >= self.total
     
-    def calcular_totales(self):
+    def calcular_totales(self, config=None):
         """Calcula subtotal, IVA y total basado en los detalles"""
-        config = ConfiguracionSistema.get_config()
-        
-        # Calcular subtotal
-        self.subtotal = self.detalles_nota.aggregate(
-            total=models.Sum(models.F('cantidad') * models.F('precio_unitario'))
-        )['total'] or 0
+        from . import precios
+
+        if config is None:
+            config = ConfiguracionSistema.get_config()
         
-        # Calcular IVA
-        self.iva = config.calcular_iva(self.subtotal)
+        # Líneas precargadas o una sola consulta sin joins
+        detalles = getattr(self, '_prefetched_objects_cache', {}).get('detalles_nota')
+        if detalles is not None:
+            lineas = [(detalle.precio_unitario, detalle.cantidad) for detalle in detalles]
+        else:
+            lineas = self.detalles_nota.values_list('precio_unitario', 'cantidad')
         
-        # Calcular total
-        self.total = self.subtotal + self.iva
+        totales = precios.calcular_con_config(lineas, config)
+        self.subtotal = totales['subtotal']
+        self.iva = totales['iva']
+        self.total = totales['total']
         
         self.save(update_fields=['subtotal', 'iva', 'total'])
         return {'subtotal': self.subtotal, 'iva': self.iva, 'total': self.total}
-    def convertir_a_factura(self):
-        from django.db import transaction
-        """Convierte la nota de entrega a factura fiscal"""
-        if self.convertida_a_factura:
-            raise ValueError("Esta nota ya fue convertida a factura")
-        
-        with transaction.atomic():
-            # Crear factura
-            factura = Factura.objects.create(
-                cliente=self.cliente,
-                empleado=self.empleado,
-                metodo_pag='credito',
-                subtotal=self.subtotal,
-                iva=self.iva,
-                total_fac=self.total
-            )
-            
-            # Copiar detalles
-            for detalle_nota in self.detalles_nota.all():
-                DetalleFactura.objects.create(
-                    factura=factura,
-                    producto=detalle_nota.producto,
-                    cantidad=detalle_nota.cantidad,
-                    tipo_factura=TipoFactura.objects.get(credito_fac=True),
-                    sub_total=detalle_nota.subtotal_linea
-                )
-            
-            # Marcar como convertida
-            self.convertida_a_factura = True
-            self.factura_generada = factura
-            self.save()
-            
-            # Actualizar venta
-            venta = self.ventas  # relación inversa
-            venta.factura = factura
-            venta.nota_entrega = None
-            venta.save()
-        
-            return factura
+
+    def deferred_totals(self):
+        """Ámbito para agregar o modificar líneas recalculando los totales una sola vez"""
+        return totales_diferidos()
     # En models.py - Agregar al modelo NotaEntrega
     def get_totales_formateados(self):
         """Retorna totales en USD y VES formateados (similar a Factura)"""
@@ -1552,50 +1656,90 @@ class NotaEntrega(models.Model):
     }
     def convertir_a_factura(self):
         """Convierte la nota de entrega a factura fiscal"""
-        from django.db import transaction
-        
         if self.convertida_a_factura:
             raise ValueError("Esta nota ya fue convertida a factura")
-        
+
+        return NotaEntrega.convertir_lote([self])[0]
+
+    @classmethod
+    def notas_pagadas(cls):
+        """Notas sin convertir cuya venta a crédito ya está pagada por completo"""
+        return cls.objects.filter(
+            convertida_a_factura=False,
+            ventas__credito=True,
+            ventas__status__vent_cancelada=False,
+            ventas__monto_pagado__gte=models.F('total')
+        )
+
+    @classmethod
+    def convertir_lote(cls, notas):
+        """
+        Convierte varias notas de entrega a factura en una sola transacción.
+
+        Las líneas se copian con bulk_create (sin pasar por DetalleFactura.save,
+        que recalcula la factura completa en cada línea) y los totales de cada
+        factura se toman directamente de su nota.
+        """
+        from django.db import transaction
+
+        notas = [nota for nota in notas if not nota.convertida_a_factura]
+        if not notas:
+            return []
+
         with transaction.atomic():
-            # Crear factura
-            factura = Factura.objects.create(
-                cliente=self.cliente,
-                empleado=self.empleado,
-                metodo_pag='credito',
-                subtotal=self.subtotal,
-                iva=self.iva,
-                total_fac=self.total
-            )
-            
-            # Copiar detalles
-            tipo_factura, created = TipoFactura.objects.get_or_create(
-                credito_fac=True,
-                contado_fac=False,
-                defaults={'plazo_credito': 30}
-            )
-            
-            for detalle_nota in self.detalles_nota.all():
-                DetalleFactura.objects.create(
-                    factura=factura,
-                    producto=detalle_nota.producto,
-                    cantidad=detalle_nota.cantidad,
+            from . import referencias
+            tipo_factura = referencias.tipo_factura(credito=True)
+            numeros = ConfiguracionSistema.get_config().reservar_numeros_factura(len(notas))
+
+            facturas = {}
+            for nota, numero in zip(notas, numeros):
+                factura = Factura(
+                    cliente_id=nota.cliente_id,
+                    empleado_id=nota.empleado_id,
+                    metodo_pag='credito',
+                    numero_factura=numero,
+                    subtotal=nota.subtotal,
+                    iva=nota.iva,
+                    total_fac=nota.total
+                )
+                factura.save()
+                facturas[nota.id] = factura
+
+            # Copiar detalles de todas las notas de una vez
+            DetalleFactura.objects.bulk_create([
+                DetalleFactura(
+                    factura=facturas[detalle.nota_entrega_id],
+                    producto_id=detalle.producto_id,
+                    cantidad=detalle.cantidad,
                     tipo_factura=tipo_factura,
-                    sub_total=detalle_nota.subtotal_linea
+                    sub_total=detalle.subtotal_linea
                 )
-            
-            # Marcar como convertida
-            self.convertida_a_factura = True
-            self.factura_generada = factura
-            self.save(update_fields=['convertida_a_factura', 'factura_generada'])
-            
-            # Actualizar venta
-            venta = self.ventas  # relación inversa OneToOne
-            venta.factura = factura
-            venta.nota_entrega = None
-            venta.save(update_fields=['factura', 'nota_entrega'])
-            
-            return factura
+                for detalle in DetalleNotaEntrega.objects.filter(nota_entrega__in=notas)
+            ], batch_size=500)
+
+            # Marcar como convertidas
+            for nota in notas:
+                nota.convertida_a_factura = True
+                nota.factura_generada = facturas[nota.id]
+            cls.objects.bulk_update(notas, ['convertida_a_factura', 'factura_generada'])
+
+            # Actualizar ventas (relación inversa OneToOne)
+            notas_por_id = {nota.id: nota for nota in notas}
+            ventas = []
+            for venta in Ventas.objects.filter(nota_entrega__in=notas):
+                nota = notas_por_id[venta.nota_entrega_id]
+                if cls.ventas.is_cached(nota):
+                    venta = nota.ventas
+                venta.factura = facturas[nota.id]
+                venta.nota_entrega = None
+                ventas.append(venta)
+            Ventas.objects.bulk_update(ventas, ['factura', 'nota_entrega'])
+
+            from . import cache_reportes
+            cache_reportes.invalidar(venta.fecha_venta for venta in ventas)
+
+        return [facturas[nota.id] for nota in notas]
+
 class DetalleNotaEntrega(models.Model):
     """
     Detalles de una nota de entrega
@@ -1644,12 +1788,17 @@ class DetalleNotaEntrega(models.Model):
         return f"{self.producto.nombre} - {self.cantidad} {unidad}"
     
     def save(self, *args, **kwargs):
+        from . import precios
+
         # Calcular subtotal de la línea
-        self.subtotal_linea = self.cantidad * self.precio_unitario
+        self.subtotal_linea = precios.subtotal_linea(
+            precios.a_decimal(self.precio_unitario), precios.parsear_cantidad(self.cantidad)
+        )
         super().save(*args, **kwargs)
         
-        # Actualizar totales de la nota
-        self.nota_entrega.calcular_totales()
+        # Actualizar totales de la nota (una sola vez al final si hay un ámbito diferido)
+        if not _diferir_totales(self.nota_entrega):
+            self.nota_entrega.calcular_totales()
 
 
 class DetalleGanancia(models.Model):
@@ -1736,6 +1885,11 @@ class DetalleGanancia(models.Model):
     
     def save(self, *args, **kwargs):
         """Calcular ganancia automáticamente antes de guardar"""
+        self.calcular_ganancia()
+        super().save(*args, **kwargs)
+
+    def calcular_ganancia(self):
+        """Ganancia unitaria, total y margen (también para registros creados con bulk_create)"""
         self.ganancia_unitaria = self.precio_venta_unitario - self.precio_compra_unitario
         self.ganancia_total = self.ganancia_unitaria * self.cantidad
         
@@ -1744,30 +1898,35 @@ class DetalleGanancia(models.Model):
             self.margen_porcentaje = (self.ganancia_unitaria / self.precio_compra_unitario) * 100
         else:
             self.margen_porcentaje = 0
-            
-        super().save(*args, **kwargs)
+        return self
     
     @classmethod
-    def crear_desde_detalle_factura(cls, venta, detalle_factura):
-        """Crear registro de ganancia desde un detalle de factura"""
+    def crear_desde_detalle_factura(cls, venta, detalle_factura, precios=None):
+        """
+        Crear registro de ganancia desde un detalle de factura. precios es
+        (precio, precio_compra) vigentes en la fecha de la venta; por defecto
+        los actuales del producto.
+        """
+        precio, precio_compra = precios or (detalle_factura.producto.precio, detalle_factura.producto.precio_compra)
         return cls.objects.create(
             venta=venta,
             producto=detalle_factura.producto,
             cantidad=detalle_factura.cantidad,
-            precio_venta_unitario=detalle_factura.producto.precio,
-            precio_compra_unitario=detalle_factura.producto.precio_compra,
+            precio_venta_unitario=precio,
+            precio_compra_unitario=precio_compra,
             fecha_venta=venta.fecha_venta
         )
     
     @classmethod
-    def crear_desde_detalle_nota(cls, venta, detalle_nota):
-        """Crear registro de ganancia desde un detalle de nota de entrega"""
+    def crear_desde_detalle_nota(cls, venta, detalle_nota, precios=None):
+        """Crear registro de ganancia desde un detalle de nota de entrega (ver crear_desde_detalle_factura)"""
+        precio_compra = precios[1] if precios else detalle_nota.producto.precio_compra
         return cls.objects.create(
             venta=venta,
             producto=detalle_nota.producto,
             cantidad=detalle_nota.cantidad,
             precio_venta_unitario=detalle_nota.precio_unitario,
-            precio_compra_unitario=detalle_nota.producto.precio_compra,
+            precio_compra_unitario=precio_compra,
             fecha_venta=venta.fecha_venta
         )
     
@@ -1904,3 +2063,420 @@ class VentaHistorial(models.Model):
     def __str__(self):
         return f"Modificación Venta #{self.venta.id} - {self.fecha_modificacion.strftime('%d/%m/%Y %H:%M')}"
 
+
+
+class EjecucionTarea(models.Model):
+    """
+    Estado de cada tarea del programador (management command programador).
+    La fila también sirve de bloqueo: una tarea con en_curso_desde no se
+    vuelve a iniciar, ni en este proceso ni en otro, hasta que termine o
+    venza su tiempo máximo.
+    """
+    RESULTADO_CHOICES = [
+        ('ok', 'Correcta'),
+        ('error', 'Con error'),
+        ('en_curso', 'En curso'),
+    ]
+
+    nombre = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Tarea"
+    )
+
+    en_curso_desde = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="En curso desde"
+    )
+
+    ultima_ejecucion = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Última ejecución"
+    )
+
+    duracion = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name="Duración (segundos)"
+    )
+
+    resultado = models.CharField(
+        max_length=10,
+        choices=RESULTADO_CHOICES,
+        blank=True,
+        verbose_name="Resultado"
+    )
+
+    mensaje = models.TextField(
+        blank=True,
+        verbose_name="Salida",
+        help_text="Últimas líneas de la salida o del error"
+    )
+
+    ejecuciones = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Ejecuciones"
+    )
+
+    fallos = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Fallos"
+    )
+
+    class Meta:
+        verbose_name = "Ejecución de Tarea"
+        verbose_name_plural = "Ejecuciones de Tareas"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return f"{self.nombre} ({self.get_resultado_display() or 'sin ejecutar'})"
+
+
+class EventoTiempoReal(models.Model):
+    """
+    Evento publicado al confirmarse una venta, un pago o una cancelación.
+    Las páginas abiertas lo reciben por Server-Sent Events (eventos.py);
+    la tabla es el canal entre procesos y se depura sola.
+    """
+    TIPO_CHOICES = [
+        ('venta', 'Venta'),
+        ('pago', 'Pago'),
+        ('cancelacion', 'Cancelación'),
+    ]
+
+    tipo = models.CharField(
+        max_length=20,
+        choices=TIPO_CHOICES,
+        verbose_name="Tipo"
+    )
+
+    datos = models.JSONField(
+        default=dict,
+        verbose_name="Datos"
+    )
+
+    creado = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name="Creado"
+    )
+
+    class Meta:
+        verbose_name = "Evento en Tiempo Real"
+        verbose_name_plural = "Eventos en Tiempo Real"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.id}"
+
+
+class HistorialPrecio(models.Model):
+    """
+    Cambio de precio o precio de compra de un producto. Se registra al
+    editar un producto, al importar el catálogo y en los ajustes masivos
+    (ajuste_precios.py); permite saber qué precio regía en cada venta.
+    """
+    ORIGEN_CHOICES = [
+        ('edicion', 'Edición'),
+        ('importacion', 'Importación de catálogo'),
+        ('ajuste', 'Ajuste masivo'),
+    ]
+
+    producto = models.ForeignKey(
+        'Producto',
+        on_delete=models.CASCADE,
+        verbose_name="Producto",
+        related_name='historial_precios'
+    )
+
+    precio_anterior = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio anterior")
+    precio_nuevo = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio nuevo")
+    precio_compra_anterior = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio de compra anterior")
+    precio_compra_nuevo = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Precio de compra nuevo")
+
+    origen = models.CharField(
+        max_length=20,
+        choices=ORIGEN_CHOICES,
+        verbose_name="Origen"
+    )
+
+    detalle = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name="Detalle",
+        help_text="Regla aplicada o archivo importado"
+    )
+
+    empleado = models.ForeignKey(
+        'Empleado',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Empleado"
+    )
+
+    fecha = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Fecha"
+    )
+
+    class Meta:
+        verbose_name = "Historial de Precio"
+        verbose_name_plural = "Historial de Precios"
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['producto', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id}: ${self.precio_anterior} → ${self.precio_nuevo} ({self.fecha:%d/%m/%Y})"
+
+    @classmethod
+    def precios_vigentes(cls, pares):
+        """
+        Precio y precio de compra que regían para cada (producto, fecha), con
+        una sola consulta: {(producto_id, fecha): (precio, precio_compra)}.
+        El valor vigente en una fecha es el 'anterior' del primer cambio
+        posterior; si no hubo cambios después, el actual del producto.
+        """
+        from bisect import bisect_right
+
+        pares = list(pares)
+        if not pares:
+            return {}
+
+        cambios = {}
+        for producto_id, fecha, precio, precio_compra in cls.objects.filter(
+            producto_id__in={producto.pk for producto, fecha in pares},
+            fecha__gt=min(fecha for producto, fecha in pares),
+        ).order_by('fecha', 'pk').values_list('producto_id', 'fecha', 'precio_anterior', 'precio_compra_anterior'):
+            fechas, valores = cambios.setdefault(producto_id, ([], []))
+            fechas.append(fecha)
+            valores.append((precio, precio_compra))
+
+        vigentes = {}
+        for producto, fecha in pares:
+            fechas, valores = cambios.get(producto.pk, ((), ()))
+            posicion = bisect_right(fechas, fecha)
+            if posicion < len(valores):
+                vigentes[(producto.pk, fecha)] = valores[posicion]
+            else:
+                vigentes[(producto.pk, fecha)] = (producto.precio, producto.precio_compra)
+        return vigentes
+
+
+class ReposicionProducto(models.Model):
+    """
+    Velocidad de venta y punto de reorden de un producto, calculados por
+    reposicion.calcular() a partir de DetalleGanancia. serie tiene las
+    unidades vendidas por día (la más antigua primero) hasta la fecha
+    'hasta'; los valores que dependen del stock actual se calculan al leer
+    (ReposicionProducto.con_stock).
+    """
+    producto = models.OneToOneField(
+        'Producto',
+        on_delete=models.CASCADE,
+        related_name='reposicion',
+        verbose_name="Producto"
+    )
+
+    serie = models.JSONField(
+        default=list,
+        verbose_name="Unidades vendidas por día"
+    )
+
+    hasta = models.DateField(
+        verbose_name="Último día calculado"
+    )
+
+    promedio_7 = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0,
+        verbose_name="Promedio diario (7 días)"
+    )
+
+    promedio_30 = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0,
+        verbose_name="Promedio diario (30 días)"
+    )
+
+    velocidad = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0,
+        verbose_name="Velocidad de venta diaria",
+        help_text="El mayor de los dos promedios"
+    )
+
+    punto_reorden = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0,
+        verbose_name="Punto de reorden",
+        help_text="Stock que cubre la entrega del proveedor más los días de seguridad"
+    )
+
+    stock_objetivo = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        default=0,
+        verbose_name="Stock objetivo",
+        help_text="Stock que cubre la entrega más los días de cobertura deseados"
+    )
+
+    calculado_en = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Calculado en"
+    )
+
+    class Meta:
+        verbose_name = "Reposición de Producto"
+        verbose_name_plural = "Reposición de Productos"
+        ordering = ['producto__nombre']
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.velocidad}/día, reorden en {self.punto_reorden}"
+
+    @classmethod
+    def con_stock(cls):
+        """
+        Anota el stock actual, los días de cobertura (None sin ventas), si
+        hay que reponer y la cantidad sugerida hasta el stock objetivo
+        """
+        from django.db.models.functions import Ceil, Greatest
+
+        decimal = models.DecimalField(max_digits=14, decimal_places=3)
+        return cls.objects.select_related('producto', 'producto__unidad_medida').annotate(
+            stock=models.F('producto__stock'),
+            dias_cobertura=models.Case(
+                models.When(velocidad__gt=0, then=models.F('producto__stock') / models.F('velocidad')),
+                default=None,
+                output_field=decimal
+            ),
+            reponer=models.Case(
+                models.When(velocidad__gt=0, producto__stock__lte=models.F('punto_reorden'), then=True),
+                default=False,
+                output_field=models.BooleanField()
+            ),
+            cantidad_sugerida=Greatest(
+                Ceil(models.F('stock_objetivo') - models.F('producto__stock')),
+                models.Value(0),
+                output_field=decimal
+            ),
+        )
+
+
+class ClienteSegmento(models.Model):
+    """
+    Recencia, frecuencia y monto de compras de un cliente y su segmento,
+    calculados por segmentos.calcular() (tarea nocturna). Compras y monto
+    cuentan las ventas no canceladas de los últimos VENTANA_DIAS; los
+    puntajes van de 1 a 5 por quintiles entre los clientes con compras.
+    """
+    SEGMENTO_CHOICES = [
+        ('campeones', 'Campeones'),
+        ('leales', 'Leales'),
+        ('nuevos', 'Nuevos'),
+        ('activos', 'Activos'),
+        ('en_riesgo', 'Alto valor en riesgo'),
+        ('decayendo', 'Decayendo'),
+        ('inactivos', 'Inactivos'),
+        ('sin_compras', 'Sin compras'),
+    ]
+
+    cliente = models.OneToOneField(
+        'Cliente',
+        on_delete=models.CASCADE,
+        related_name='segmento',
+        verbose_name="Cliente"
+    )
+
+    segmento = models.CharField(
+        max_length=20,
+        choices=SEGMENTO_CHOICES,
+        verbose_name="Segmento"
+    )
+
+    primera_compra = models.DateTimeField(null=True, blank=True, verbose_name="Primera compra")
+    ultima_compra = models.DateTimeField(null=True, blank=True, verbose_name="Última compra")
+    dias_sin_comprar = models.PositiveIntegerField(null=True, blank=True, verbose_name="Días sin comprar")
+
+    compras = models.PositiveIntegerField(default=0, verbose_name="Compras en la ventana")
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Monto en la ventana")
+    compras_total = models.PositiveIntegerField(default=0, verbose_name="Compras históricas")
+    monto_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Monto histórico")
+
+    puntaje_recencia = models.PositiveSmallIntegerField(default=0, verbose_name="R")
+    puntaje_frecuencia = models.PositiveSmallIntegerField(default=0, verbose_name="F")
+    puntaje_monto = models.PositiveSmallIntegerField(default=0, verbose_name="M")
+
+    calculado_en = models.DateTimeField(auto_now=True, verbose_name="Calculado en")
+
+    class Meta:
+        verbose_name = "Segmento de Cliente"
+        verbose_name_plural = "Segmentos de Clientes"
+        ordering = ['cliente__nombre_completo']
+        indexes = [
+            models.Index(fields=['segmento']),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente_id}: {self.get_segmento_display()} ({self.puntaje})"
+
+    @property
+    def puntaje(self):
+        return f"{self.puntaje_recencia}{self.puntaje_frecuencia}{self.puntaje_monto}"
+
+
+class ComisionEmpleado(models.Model):
+    """
+    Ventas, ganancia, cancelaciones y comisión de un empleado en un mes
+    cerrado, calculadas por comisiones.congelar() desde DetalleGanancia.
+    Se guardan una sola vez: el estado de cuenta de un período cerrado se
+    lee de aquí y no cambia aunque luego se cancelen ventas o cambien los
+    tramos de comisión.
+    """
+    empleado = models.ForeignKey(
+        'Empleado',
+        on_delete=models.CASCADE,
+        related_name='comisiones',
+        verbose_name="Empleado"
+    )
+
+    periodo = models.DateField(
+        verbose_name="Período",
+        help_text="Primer día del mes"
+    )
+
+    ventas = models.PositiveIntegerField(default=0, verbose_name="Ventas")
+    unidades = models.DecimalField(max_digits=14, decimal_places=3, default=0, verbose_name="Unidades vendidas")
+    monto_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Monto vendido")
+    ganancia = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ganancia")
+    canceladas = models.PositiveIntegerField(default=0, verbose_name="Ventas canceladas")
+    monto_cancelado = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Monto cancelado")
+
+    base_comision = models.CharField(
+        max_length=10,
+        choices=[('ventas', 'Monto vendido'), ('ganancia', 'Ganancia')],
+        verbose_name="Base de la comisión"
+    )
+    porcentaje_comision = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name="Comisión %")
+    comision = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Comisión")
+
+    calculado_en = models.DateTimeField(auto_now_add=True, verbose_name="Congelado en")
+
+    class Meta:
+        verbose_name = "Comisión de Empleado"
+        verbose_name_plural = "Comisiones de Empleados"
+        ordering = ['-periodo', 'empleado__apellido', 'empleado__nombre']
+        constraints = [
+            models.UniqueConstraint(fields=['empleado', 'periodo'], name='comision_empleado_periodo_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.empleado_id} {self.periodo:%m/%Y}: {self.comision}"
@@ -0,0 +1,110 @@
+"""
+Cálculo de montos de venta en memoria.
+
+Todas las operaciones usan Decimal sin pasar por float y redondean a
+centavos con ROUND_HALF_UP: primero cada línea, luego el IVA sobre la suma
+de las líneas ya redondeadas. Así el subtotal guardado siempre coincide con
+la suma de los sub_total de sus líneas.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+CENTAVO = Decimal('0.01')
+MILESIMA = Decimal('0.001')
+CERO = Decimal('0.00')
+
+
+def a_decimal(valor, exponente=CENTAVO):
+    """Convierte texto, entero o Decimal a Decimal redondeado (acepta coma decimal)"""
+    if isinstance(valor, Decimal):
+        numero = valor
+    else:
+        texto = str(valor).strip().replace(',', '.')
+        try:
+            numero = Decimal(texto)
+        except InvalidOperation:
+            raise ValueError(f"Valor numérico inválido: {valor!r}")
+    if not numero.is_finite():
+        raise ValueError(f"Valor numérico inválido: {valor!r}")
+    return numero.quantize(exponente, rounding=ROUND_HALF_UP)
+
+
+def parsear_cantidad(valor):
+    """Cantidad de un formulario a Decimal con 3 decimales (como DetalleFactura.cantidad)"""
+    return a_decimal(valor, MILESIMA)
+
+
+def redondear(monto):
+    return monto.quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def subtotal_linea(precio, cantidad):
+    return redondear(precio * cantidad)
+
+
+def calcular_iva(subtotal, porcentaje_iva, aplicar_iva=True):
+    if not aplicar_iva:
+        return CERO
+    return redondear(subtotal * porcentaje_iva / 100)
+
+
+def a_bolivares(monto, tasa):
+    return redondear(monto * tasa)
+
+
+def totalizar(subtotales, porcentaje_iva, aplicar_iva=True, tasa=None):
+    """
+    Suma subtotales de línea ya calculados y aplica el IVA.
+    Si se indica la tasa USD/VES también retorna los montos en bolívares.
+    """
+    subtotal = sum(subtotales, CERO)
+    iva = calcular_iva(subtotal, porcentaje_iva, aplicar_iva)
+    return totales_documento(subtotal, iva, subtotal + iva, tasa)
+
+
+def totales_documento(subtotal, iva, total, tasa=None):
+    """Totales de un documento ya guardado, con su conversión a bolívares"""
+    resultado = {
+        'subtotal': subtotal,
+        'iva': iva,
+        'total': total,
+        'tasa': tasa,
+        'subtotal_ves': None,
+        'iva_ves': None,
+        'total_ves': None,
+    }
+    if tasa:
+        resultado['subtotal_ves'] = a_bolivares(subtotal, tasa)
+        resultado['iva_ves'] = a_bolivares(iva, tasa)
+        resultado['total_ves'] = resultado['subtotal_ves'] + resultado['iva_ves']
+    return resultado
+
+
+def calcular_totales(lineas, porcentaje_iva, aplicar_iva=True, tasa=None):
+    """
+    Calcula una venta completa a partir de pares (producto o precio, cantidad).
+
+    Retorna los totales de totalizar() más la clave 'lineas', con el
+    producto, la cantidad, el precio unitario y el subtotal de cada línea
+    en el mismo orden de entrada.
+    """
+    detalle = []
+    for articulo, cantidad in lineas:
+        precio = articulo if isinstance(articulo, Decimal) else articulo.precio
+        detalle.append({
+            'producto': articulo,
+            'cantidad': cantidad,
+            'precio': precio,
+            'subtotal': subtotal_linea(precio, cantidad),
+        })
+
+    resultado = totalizar(
+        [linea['subtotal'] for linea in detalle], porcentaje_iva, aplicar_iva, tasa
+    )
+    resultado['lineas'] = detalle
+    return resultado
+
+
+def calcular_con_config(lineas, config, tasa=None):
+    """calcular_totales() con el IVA configurado en ConfiguracionSistema"""
+    return calcular_totales(lineas, config.porcentaje_iva, config.aplicar_iva, tasa)
@@ -0,0 +1,297 @@
+"""
+Programador de tareas periódicas dentro de un solo proceso Django.
+
+Cada tarea es un management command que se ejecuta cada cierto intervalo
+o según una expresión cron de 5 campos (minuto hora día mes día_semana).
+El comando `programador` mantiene un proceso caliente y ejecuta las tareas
+en un pool de hilos. Antes de empezar, cada ejecución toma el bloqueo de su
+fila en EjecucionTarea, así que la misma tarea no se solapa ni con otra
+instancia del programador ni con una ejecución manual (--ejecutar).
+
+Las tareas se definen en settings.PROGRAMADOR_TAREAS; si no existe se usa
+TAREAS_POR_DEFECTO.
+"""
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+TAREAS_POR_DEFECTO = [
+    {
+        'nombre': 'actualizar_tasa_cambio',
+        'comando': 'actualizar_tasa_cambio',
+        'args': ['--force'],
+        'cron': '0 9,13 * * *',
+        'tiempo_maximo': 120,
+    },
+    {
+        'nombre': 'poblar_ganancias_historicas',
+        'comando': 'poblar_ganancias_historicas',
+        'cron': '30 2 * * *',
+    },
+    {
+        # Sin COPIA_REPORTES configurada el comando no hace nada
+        'nombre': 'copia_reportes',
+        'comando': 'actualizar_copia_reportes',
+        'cron': '*/5 * * * *',
+        'tiempo_maximo': 600,
+    },
+    {
+        'nombre': 'respaldo_bd',
+        'comando': 'respaldar_bd',
+        'cron': '0 * * * *',
+        'tiempo_maximo': 900,
+    },
+    {
+        # Solo procesa los días terminados desde la última ejecución
+        'nombre': 'reposicion',
+        'comando': 'calcular_reposicion',
+        'cron': '15 0 * * *',
+    },
+    {
+        # Las cancelaciones de la semana se reflejan con el cálculo completo
+        'nombre': 'reposicion_completa',
+        'comando': 'calcular_reposicion',
+        'args': ['--completo'],
+        'cron': '45 3 * * 0',
+    },
+    {
+        'nombre': 'segmentos_clientes',
+        'comando': 'calcular_segmentos',
+        'cron': '30 0 * * *',
+    },
+    {
+        # Guarda los estados de cuenta de los meses cerrados que falten
+        'nombre': 'comisiones',
+        'comando': 'congelar_comisiones',
+        'cron': '20 0 1 * *',
+    },
+    {
+        'nombre': 'limpiar_sesiones',
+        'comando': 'purgar_sesiones',
+        'cron': '0 3 * * *',
+    },
+]
+
+# Hasta cuántos días atrás se busca una ejecución programada que se perdió
+DIAS_RECUPERACION = 8
+LARGO_MENSAJE = 4000
+
+
+class Cron:
+    """Expresión cron de 5 campos: *, */n, a-b, a-b/n y listas separadas por coma"""
+
+    RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expresion):
+        self.expresion = expresion
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f"La expresión cron '{expresion}' debe tener 5 campos")
+        self.minutos, self.horas, self.dias, self.meses, self.dias_semana = (
+            self._campo(campo, minimo, maximo)
+            for campo, (minimo, maximo) in zip(campos, self.RANGOS)
+        )
+        # Como en cron: si día y día de semana están restringidos basta con uno
+        self.dia_libre = campos[2] == '*'
+        self.semana_libre = campos[4] == '*'
+
+    def _campo(self, texto, minimo, maximo):
+        # En día de semana se acepta 7 como domingo
+        tope = 7 if maximo == 6 else maximo
+        valores = set()
+        for parte in texto.split(','):
+            rango, _, paso = parte.partition('/')
+            paso = int(paso) if paso else 1
+            if rango == '*':
+                inicio, fin = minimo, maximo
+            elif '-' in rango:
+                inicio, fin = (int(valor) for valor in rango.split('-', 1))
+            else:
+                inicio = fin = int(rango)
+            if inicio < minimo or fin > tope or inicio > fin or paso < 1:
+                raise ValueError(f"Valor fuera de rango en '{texto}' ({minimo}-{maximo})")
+            valores.update(range(inicio, fin + 1, paso))
+        if tope == 7 and 7 in valores:
+            valores.discard(7)
+            valores.add(0)
+        return frozenset(valores)
+
+    def coincide_dia(self, momento):
+        if momento.month not in self.meses:
+            return False
+        dia = momento.day in self.dias
+        semana = (momento.isoweekday() % 7) in self.dias_semana
+        if self.dia_libre or self.semana_libre:
+            return dia and semana
+        return dia or semana
+
+    def coincide(self, momento):
+        return (momento.minute in self.minutos and momento.hour in self.horas
+                and self.coincide_dia(momento))
+
+    def anterior(self, momento, dias=DIAS_RECUPERACION):
+        """
+        Último minuto programado en o antes de momento (None si no hay en los
+        últimos días). Recorre días hacia atrás y en el primer día que
+        coincide toma la mayor hora y minuto permitidos, sin ir minuto a minuto.
+        """
+        actual = momento.replace(second=0, microsecond=0)
+        limite = actual - timedelta(days=dias)
+        for atras in range(dias + 1):
+            dia = actual - timedelta(days=atras)
+            if not self.coincide_dia(dia):
+                continue
+            hora_tope = actual.hour if atras == 0 else 23
+            for hora in sorted((h for h in self.horas if h <= hora_tope), reverse=True):
+                minuto_tope = actual.minute if atras == 0 and hora == actual.hour else 59
+                minutos = [m for m in self.minutos if m <= minuto_tope]
+                if minutos:
+                    programada = dia.replace(hour=hora, minute=max(minutos))
+                    return programada if programada >= limite else None
+        return None
+
+    def __str__(self):
+        return self.expresion
+
+
+class Tarea:
+    def __init__(self, nombre, comando, args=(), intervalo=None, cron=None, tiempo_maximo=3600):
+        if (intervalo is None) == (cron is None):
+            raise ValueError(f"La tarea '{nombre}' necesita intervalo o cron (solo uno)")
+        self.nombre = nombre
+        self.comando = comando
+        self.args = list(args)
+        self.intervalo = intervalo
+        self.cron = Cron(cron) if cron else None
+        self.tiempo_maximo = tiempo_maximo
+
+    @property
+    def programacion(self):
+        if self.cron:
+            return f"cron {self.cron}"
+        return f"cada {self.intervalo} s"
+
+    def vencida(self, ahora, ultimo_inicio):
+        """Indica si la tarea debe ejecutarse según su último inicio"""
+        if self.cron:
+            programada = self.cron.anterior(timezone.localtime(ahora))
+            return programada is not None and (ultimo_inicio is None or ultimo_inicio < programada)
+        return ultimo_inicio is None or (ahora - ultimo_inicio).total_seconds() >= self.intervalo
+
+
+def tareas_configuradas():
+    return [Tarea(**datos) for datos in getattr(settings, 'PROGRAMADOR_TAREAS', TAREAS_POR_DEFECTO)]
+
+
+def _adquirir(tarea):
+    """Toma el bloqueo de la tarea en la base de datos; False si ya está en curso"""
+    from .models import EjecucionTarea
+
+    EjecucionTarea.objects.get_or_create(nombre=tarea.nombre)
+    ahora = timezone.now()
+    vencido = ahora - timedelta(seconds=tarea.tiempo_maximo)
+    tomadas = EjecucionTarea.objects.filter(nombre=tarea.nombre).filter(
+        Q(en_curso_desde__isnull=True) | Q(en_curso_desde__lt=vencido)
+    ).update(en_curso_desde=ahora, resultado='en_curso')
+    return tomadas == 1
+
+
+def ejecutar_tarea(tarea):
+    """
+    Ejecuta una tarea si nadie más la está ejecutando y registra el resultado.
+    Retorna 'ok', 'error' u 'omitida'.
+    """
+    from .models import EjecucionTarea
+
+    try:
+        if not _adquirir(tarea):
+            return 'omitida'
+
+        inicio = timezone.now()
+        reloj = time.perf_counter()
+        salida = io.StringIO()
+        try:
+            call_command(tarea.comando, *tarea.args, stdout=salida, stderr=salida)
+            resultado = 'ok'
+        except Exception as e:
+            salida.write(f"\n❌ {type(e).__name__}: {e}")
+            resultado = 'error'
+
+        EjecucionTarea.objects.filter(nombre=tarea.nombre).update(
+            en_curso_desde=None,
+            ultima_ejecucion=inicio,
+            duracion=round(time.perf_counter() - reloj, 3),
+            resultado=resultado,
+            mensaje=salida.getvalue()[-LARGO_MENSAJE:],
+            ejecuciones=F('ejecuciones') + 1,
+            fallos=F('fallos') + (1 if resultado == 'error' else 0),
+        )
+        return resultado
+    finally:
+        # Cada hilo abre su propia conexión; cerrarla al terminar
+        connections.close_all()
+
+
+class Programador:
+    """Revisa periódicamente las tareas y ejecuta las vencidas en un pool de hilos"""
+
+    def __init__(self, tareas, hilos=2, pausa=5, avisar=None):
+        self.tareas = tareas
+        self.pausa = pausa
+        self.avisar = avisar or (lambda mensaje: None)
+        self.detener = threading.Event()
+        self.pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='programador')
+        self.en_curso = {}
+        self.ultimo_inicio = self._ultimos_inicios()
+
+    def _ultimos_inicios(self):
+        from .models import EjecucionTarea
+
+        return dict(
+            EjecucionTarea.objects.filter(
+                nombre__in=[tarea.nombre for tarea in self.tareas]
+            ).values_list('nombre', 'ultima_ejecucion')
+        )
+
+    def revisar(self):
+        """Lanza las tareas vencidas que no estén ya en curso en este proceso"""
+        ahora = timezone.now()
+        lanzadas = []
+        for tarea in self.tareas:
+            futuro = self.en_curso.get(tarea.nombre)
+            if futuro is not None and not futuro.done():
+                continue
+            if tarea.vencida(ahora, self.ultimo_inicio.get(tarea.nombre)):
+                self.ultimo_inicio[tarea.nombre] = ahora
+                self.en_curso[tarea.nombre] = self.pool.submit(self._ejecutar, tarea)
+                lanzadas.append(tarea)
+        return lanzadas
+
+    def _ejecutar(self, tarea):
+        self.avisar(f"▶️  {tarea.nombre}")
+        resultado = ejecutar_tarea(tarea)
+        self.avisar(f"{'✅' if resultado == 'ok' else '⚠️ '} {tarea.nombre}: {resultado}")
+        return resultado
+
+    def ejecutar(self):
+        try:
+            while not self.detener.is_set():
+                self.revisar()
+                self.detener.wait(self.pausa)
+        finally:
+            self.pool.shutdown(wait=True)
+
+    def ejecutar_una_vez(self):
+        """Lanza las tareas vencidas y espera a que terminen"""
+        lanzadas = self.revisar()
+        self.pool.shutdown(wait=True)
+        return {tarea.nombre: self.en_curso[tarea.nombre].result() for tarea in lanzadas}
@@ -0,0 +1,218 @@
+"""
+Datos de referencia cacheados por proceso.
+
+StatusVentas, TipoFactura, UnidadMedida y NivelAcceso son tablas pequeñas que
+casi nunca cambian, pero se consultaban en cada venta, pago, edición y
+cancelación. Se cargan una sola vez por proceso (cuatro consultas) y se
+invalidan con señales cuando alguna de esas tablas cambia. Como las señales
+solo llegan al proceso que hizo el cambio, el cache además se recarga cada
+REFERENCIAS_TTL segundos.
+
+Mientras sigue abierta la transacción que modificó una de esas tablas, sus
+lecturas en ese hilo se cargan sin guardarse en el cache: si se revirtiera,
+el cache no debe quedarse con las filas descartadas.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+# Estados de venta que usa el sistema y sus valores por defecto
+ESTADOS = {
+    'Completada': {'vent_espera': False, 'vent_cancelada': False},
+    'Pendiente': {'vent_espera': True, 'vent_cancelada': False},
+    'Cancelada': {'vent_espera': False, 'vent_cancelada': True},
+}
+
+_lock = threading.Lock()
+_local = threading.local()
+_datos = None
+_cargado_en = 0.0
+
+
+def _ttl():
+    return getattr(settings, 'REFERENCIAS_TTL', 300)
+
+
+def _cargar():
+    from .models import StatusVentas, TipoFactura, UnidadMedida, NivelAcceso
+
+    estados = {}
+    for estado in StatusVentas.objects.order_by('pk'):
+        estados.setdefault(estado.nombre, estado)
+        # Las cancelaciones siempre se buscaron por la bandera, no por el nombre
+        if estado.vent_cancelada:
+            estados.setdefault('__cancelada__', estado)
+
+    tipos = {}
+    for tipo in TipoFactura.objects.order_by('pk'):
+        if tipo.credito_fac and not tipo.contado_fac:
+            tipos.setdefault('credito', tipo)
+        elif tipo.contado_fac and not tipo.credito_fac:
+            tipos.setdefault('contado', tipo)
+
+    unidades = list(UnidadMedida.objects.order_by('nombre'))
+    niveles = list(NivelAcceso.objects.all())
+
+    return {
+        'estados': estados,
+        'tipos_factura': tipos,
+        'unidades': {unidad.pk: unidad for unidad in unidades},
+        'unidades_abreviatura': {unidad.abreviatura.lower(): unidad for unidad in unidades},
+        'niveles': {nivel.pk: nivel for nivel in niveles},
+        'niveles_nombre': {nivel.nombre: nivel for nivel in niveles},
+    }
+
+
+def _obtener():
+    global _datos, _cargado_en
+    using = getattr(_local, 'sin_confirmar', None)
+    if using is not None:
+        if connections[using].in_atomic_block:
+            return _cargar()
+        # La transacción terminó sin pasar por on_commit: se revirtió
+        _local.sin_confirmar = None
+
+    datos = _datos
+    if datos is not None and time.monotonic() - _cargado_en < _ttl():
+        return datos
+
+    with _lock:
+        if _datos is None or time.monotonic() - _cargado_en >= _ttl():
+            _datos = _cargar()
+            _cargado_en = time.monotonic()
+        return _datos
+
+
+def invalidar(**kwargs):
+    """Descarta el cache; la próxima lectura lo vuelve a cargar"""
+    global _datos
+    _datos = None
+
+
+def _confirmado():
+    _local.sin_confirmar = None
+    invalidar()
+
+
+def _invalidar_al_confirmar(using=DEFAULT_DB_ALIAS, **kwargs):
+    # Dentro de una transacción no se cachea lo leído hasta que termine, y
+    # al confirmarla se invalida de nuevo (otros hilos pudieron cargar las
+    # filas anteriores mientras tanto)
+    invalidar()
+    if connections[using].in_atomic_block:
+        _local.sin_confirmar = using
+        transaction.on_commit(_confirmado, using=using)
+
+
+# --- Estados de venta ---
+
+def estado_venta(nombre):
+    """StatusVentas por nombre ('Completada', 'Pendiente' o 'Cancelada'), creándolo si falta"""
+    from .models import StatusVentas
+
+    clave = '__cancelada__' if nombre == 'Cancelada' else nombre
+    estado = _obtener()['estados'].get(clave)
+    if estado is not None:
+        return estado
+
+    defaults = ESTADOS.get(nombre, {'vent_espera': False, 'vent_cancelada': False})
+    if nombre == 'Cancelada':
+        estado, created = StatusVentas.objects.get_or_create(
+            vent_cancelada=True,
+            defaults={'nombre': nombre, 'vent_espera': False}
+        )
+    else:
+        estado, created = StatusVentas.objects.get_or_create(nombre=nombre, defaults=defaults)
+    return estado
+
+
+def estado_completada():
+    return estado_venta('Completada')
+
+
+def estado_pendiente():
+    return estado_venta('Pendiente')
+
+
+def estado_cancelada():
+    return estado_venta('Cancelada')
+
+
+# --- Tipos de factura ---
+
+def tipo_factura(credito=False):
+    """TipoFactura de contado o de crédito, creándolo si falta"""
+    from .models import TipoFactura
+
+    clave = 'credito' if credito else 'contado'
+    tipo = _obtener()['tipos_factura'].get(clave)
+    if tipo is not None:
+        return tipo
+
+    if credito:
+        tipo, created = TipoFactura.objects.get_or_create(
+            credito_fac=True,
+            contado_fac=False,
+            defaults={'plazo_credito': 30}
+        )
+    else:
+        tipo, created = TipoFactura.objects.get_or_create(
+            credito_fac=False,
+            contado_fac=True
+        )
+    return tipo
+
+
+# --- Unidades de medida ---
+
+def unidad_medida(pk):
+    return _obtener()['unidades'].get(pk)
+
+
+def unidad_por_abreviatura(abreviatura):
+    return _obtener()['unidades_abreviatura'].get((abreviatura or '').strip().lower())
+
+
+def unidades_activas():
+    return [unidad for unidad in _obtener()['unidades'].values() if unidad.activo]
+
+
+# --- Niveles de acceso ---
+
+def nivel_acceso(pk):
+    return _obtener()['niveles'].get(pk)
+
+
+def nivel_por_nombre(nombre):
+    return _obtener()['niveles_nombre'].get(nombre)
+
+
+def nombre_nivel(pk):
+    """Nombre del nivel de acceso sin consultar la base de datos"""
+    nivel = nivel_acceso(pk)
+    if nivel is None and pk is not None:
+        # Nivel creado en otro proceso: recargar una vez
+        invalidar()
+        nivel = nivel_acceso(pk)
+    return nivel.nombre if nivel else None
+
+
+def conectar_senales():
+    """Conecta la invalidación del cache a los cambios de las tablas de referencia"""
+    from django.db.models.signals import post_save, post_delete, post_migrate
+    from .models import StatusVentas, TipoFactura, UnidadMedida, NivelAcceso
+
+    for modelo in (StatusVentas, TipoFactura, UnidadMedida, NivelAcceso):
+        post_save.connect(
+            _invalidar_al_confirmar, sender=modelo,
+            dispatch_uid=f'referencias_save_{modelo.__name__}'
+        )
+        post_delete.connect(
+            _invalidar_al_confirmar, sender=modelo,
+            dispatch_uid=f'referencias_delete_{modelo.__name__}'
+        )
+    # flush y migrate no emiten post_save/post_delete
+    post_migrate.connect(invalidar, dispatch_uid='referencias_post_migrate')
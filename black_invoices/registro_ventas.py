@@ -0,0 +1,284 @@
+"""
+Registro de ventas: el formulario de venta y la API JSON /api/ventas/.
+
+registrar() crea una venta en su propia transacción: valida cliente, líneas
+y stock con una consulta de productos, calcula los totales en memoria
+(precios.calcular_con_config), crea la factura (contado) o la nota de
+entrega (crédito) con sus líneas en bulk_create, descuenta el stock con
+Producto.ajustar_stock_lote y crea los registros de ganancia.
+
+Cada venta puede llevar una clave de idempotencia generada por el cliente
+(Ventas.clave_idempotencia, con índice único). Si ya existe una venta con
+esa clave no se procesa otra vez: se retorna la original. Así un doble
+clic, o el reintento de una caja que perdió la conexión, no duplica la
+venta ni descuenta el stock dos veces. Junto a la clave se guarda la huella
+del contenido (huella()): si la clave llega con otro empleado, cliente, tipo
+de venta o líneas se lanza ClaveEnConflicto en lugar de retornar la venta
+original.
+"""
+import hashlib
+import json
+import re
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+
+LOTE_DETALLES = 100
+MAXIMO_LINEAS = 1000
+# Ventas por petición a la API (una caja que encoló ventas sin conexión)
+MAXIMO_VENTAS = 50
+CLAVE_VALIDA = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+class ErrorVenta(Exception):
+    """La venta no se registró; errores es la lista de mensajes para el usuario"""
+
+    def __init__(self, errores):
+        self.errores = [errores] if isinstance(errores, str) else list(errores)
+        super().__init__('; '.join(self.errores))
+
+
+class ClaveEnConflicto(ErrorVenta):
+    """La clave ya corresponde a una venta con otro contenido"""
+
+    def __init__(self, venta):
+        self.venta = venta
+        super().__init__(
+            f'La clave de idempotencia ya se usó en la venta #{venta.pk} con otro contenido. '
+            'Genere una clave nueva para registrar otra venta.'
+        )
+
+
+def leer_lineas(lineas):
+    """
+    [(producto_id, cantidad)] a partir de una lista de pares [id, cantidad]
+    o de objetos {'producto', 'cantidad'}. Omite las cantidades en cero.
+    """
+    from . import precios
+
+    if not isinstance(lineas, list):
+        raise ErrorVenta('Las líneas deben ser una lista.')
+    if len(lineas) > MAXIMO_LINEAS:
+        raise ErrorVenta(f'Una venta admite hasta {MAXIMO_LINEAS} líneas.')
+
+    resultado = []
+    errores = []
+    for numero, linea in enumerate(lineas, start=1):
+        if isinstance(linea, dict):
+            producto_id, cantidad = linea.get('producto'), linea.get('cantidad')
+        elif isinstance(linea, (list, tuple)) and len(linea) == 2:
+            producto_id, cantidad = linea
+        else:
+            errores.append(f'Línea {numero}: use [producto, cantidad].')
+            continue
+        try:
+            producto_id = int(producto_id)
+            cantidad = precios.parsear_cantidad(cantidad)
+        except (TypeError, ValueError):
+            errores.append(f'Línea {numero}: producto o cantidad inválidos.')
+            continue
+        if cantidad < 0:
+            errores.append(f'Línea {numero}: la cantidad no puede ser negativa.')
+        elif cantidad > 0:
+            resultado.append((producto_id, cantidad))
+
+    if errores:
+        raise ErrorVenta(errores)
+    return resultado
+
+
+def validar_clave(clave, obligatoria=False):
+    """La clave de idempotencia normalizada, o None si no se envió (y no es obligatoria)"""
+    if clave in (None, ''):
+        if obligatoria:
+            raise ErrorVenta('La clave de idempotencia es obligatoria.')
+        return None
+    clave = str(clave).strip()
+    if not CLAVE_VALIDA.match(clave):
+        raise ErrorVenta('La clave de idempotencia debe tener de 8 a 64 letras, números, "-" o "_".')
+    return clave
+
+
+def huella(empleado, cliente_id, lineas, credito):
+    """
+    SHA-256 del contenido de la venta: empleado, cliente, tipo y cantidad
+    total por producto (el orden y la división de las líneas no cuentan)
+    """
+    cantidades = {}
+    for producto_id, cantidad in lineas:
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+    contenido = {
+        'empleado': getattr(empleado, 'pk', None),
+        'cliente': str(cliente_id).strip(),
+        'credito': bool(credito),
+        'lineas': sorted(
+            [pk, f'{Decimal(cantidad).normalize():f}'] for pk, cantidad in cantidades.items() if cantidad
+        ),
+    }
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode()).hexdigest()
+
+
+def venta_con_clave(clave):
+    from .models import Ventas
+
+    if clave is None:
+        return None
+    return Ventas.objects.select_related('factura', 'nota_entrega').filter(clave_idempotencia=clave).first()
+
+
+def registrar(empleado, cliente_id, lineas, credito=False, metodo_pago=None, clave=None):
+    """
+    Registra una venta con las líneas [(producto_id, cantidad)]. Retorna
+    (venta, totales, creada): creada es False si la clave ya correspondía a
+    una venta con el mismo contenido (totales es None en ese caso). Lanza
+    ClaveEnConflicto si la clave corresponde a una venta con otro contenido
+    y ErrorVenta si la venta no se puede registrar; no queda nada escrito.
+    """
+    firma = huella(empleado, cliente_id, lineas, credito) if clave is not None else None
+    original = venta_con_clave(clave)
+    if original is not None:
+        return _repetida(original, firma)
+
+    try:
+        with transaction.atomic():
+            venta, totales = _crear(empleado, cliente_id, lineas, credito, metodo_pago, clave, firma)
+    except IntegrityError:
+        # Otra petición con la misma clave terminó primero
+        original = venta_con_clave(clave)
+        if original is None:
+            raise
+        return _repetida(original, firma)
+    return venta, totales, True
+
+
+def _repetida(original, firma):
+    if original.huella_idempotencia != firma:
+        raise ClaveEnConflicto(original)
+    return original, None, False
+
+
+def _crear(empleado, cliente_id, lineas, credito, metodo_pago, clave, firma):
+    from .models import (
+        Cliente, ConfiguracionSistema, DetalleFactura, DetalleNotaEntrega, Factura,
+        NotaEntrega, Producto, TasaCambio, Ventas,
+    )
+    from . import precios, referencias
+
+    if empleado is None:
+        raise ErrorVenta('No tienes un perfil de empleado asociado.')
+    if not cliente_id:
+        raise ErrorVenta('Debe seleccionar un cliente.')
+    if not lineas:
+        raise ErrorVenta('Debe agregar al menos un producto a la venta.')
+    try:
+        cliente = Cliente.objects.get(pk=cliente_id)
+    except (Cliente.DoesNotExist, ValueError, TypeError):
+        raise ErrorVenta(f'Cliente {cliente_id} no encontrado.')
+
+    # Todos los productos en una consulta; el stock se valida por producto
+    # sumando las líneas repetidas
+    productos = Producto.objects.select_related('unidad_medida').in_bulk({pk for pk, cantidad in lineas})
+    solicitado = {}
+    for pk, cantidad in lineas:
+        solicitado[pk] = solicitado.get(pk, 0) + cantidad
+    errores = []
+    for pk, cantidad in solicitado.items():
+        producto = productos.get(pk)
+        if producto is None:
+            errores.append(f'Producto ID {pk} no encontrado')
+        elif not producto.activo:
+            errores.append(f'El producto {producto.nombre} está inactivo')
+        elif cantidad > producto.stock:
+            errores.append(
+                f'Stock insuficiente para {producto.nombre}. '
+                f'Disponible: {producto.stock}, solicitado: {cantidad}'
+            )
+    if errores:
+        raise ErrorVenta(errores)
+
+    config = ConfiguracionSistema.get_config()
+    tasa_actual = TasaCambio.get_tasa_actual()
+    totales = precios.calcular_con_config(
+        [(productos[pk], cantidad) for pk, cantidad in lineas],
+        config,
+        tasa_actual.tasa_usd_ves if tasa_actual else None
+    )
+
+    if credito:
+        documento = NotaEntrega.objects.create(
+            cliente=cliente,
+            empleado=empleado,
+            numero_nota=config.get_siguiente_numero_nota_entrega(),
+            subtotal=totales['subtotal'],
+            iva=totales['iva'],
+            total=totales['total']
+        )
+        detalles = [
+            DetalleNotaEntrega(
+                nota_entrega=documento,
+                producto=linea['producto'],
+                cantidad=linea['cantidad'],
+                precio_unitario=linea['precio'],
+                subtotal_linea=linea['subtotal']
+            )
+            for linea in totales['lineas']
+        ]
+        DetalleNotaEntrega.objects.bulk_create(detalles, batch_size=LOTE_DETALLES)
+    else:
+        documento = Factura(
+            cliente=cliente,
+            empleado=empleado,
+            metodo_pag=metodo_pago or 'efectivo',
+            subtotal=totales['subtotal'],
+            iva=totales['iva'],
+            total_fac=totales['total']
+        )
+        documento.save()
+        tipo_factura = referencias.tipo_factura(credito=False)
+        detalles = [
+            DetalleFactura(
+                factura=documento,
+                producto=linea['producto'],
+                cantidad=linea['cantidad'],
+                tipo_factura=tipo_factura,
+                sub_total=linea['subtotal']
+            )
+            for linea in totales['lineas']
+        ]
+        DetalleFactura.objects.bulk_create(detalles, batch_size=LOTE_DETALLES)
+
+    try:
+        Producto.ajustar_stock_lote({pk: -cantidad for pk, cantidad in solicitado.items()})
+    except ValidationError as e:
+        # Otra venta descontó el stock después de la validación
+        raise ErrorVenta(e.messages)
+
+    venta = Ventas.objects.create(
+        empleado=empleado,
+        factura=None if credito else documento,
+        nota_entrega=documento if credito else None,
+        status=referencias.estado_pendiente() if credito else referencias.estado_completada(),
+        credito=credito,
+        monto_pagado=0 if credito else documento.total_fac,
+        clave_idempotencia=clave,
+        huella_idempotencia=firma,
+    )
+    venta.crear_registros_ganancia()
+    return venta, totales
+
+
+def resumen(venta, estado):
+    """Resultado de una venta para la API (el mismo para la venta original y sus reintentos)"""
+    if venta.factura_id:
+        documento = {'tipo': 'factura', 'numero': venta.factura.numero_factura, 'total': str(venta.factura.total_fac)}
+    else:
+        documento = {'tipo': 'nota_entrega', 'numero': venta.nota_entrega.numero_nota, 'total': str(venta.nota_entrega.total)}
+    return {
+        'clave': venta.clave_idempotencia,
+        'estado': estado,
+        'venta': venta.pk,
+        'credito': venta.credito,
+        'documento': documento,
+    }
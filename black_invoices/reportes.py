@@ -0,0 +1,53 @@
+"""
+Períodos mensuales y exportación CSV compartidos por los reportes del mes
+(Libro de Ventas y estados de cuenta de comisiones).
+
+Un período es el primer día de su mes. momento() da el inicio de un día en
+la zona horaria local, para filtrar campos de fecha y hora por mes:
+[momento(periodo), momento(mes_siguiente(periodo))).
+"""
+import csv
+from datetime import date, datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def inicio_mes(fecha):
+    return fecha.replace(day=1)
+
+
+def mes_siguiente(periodo):
+    return date(periodo.year + periodo.month // 12, periodo.month % 12 + 1, 1)
+
+
+def mes_actual():
+    return inicio_mes(timezone.localdate())
+
+
+def ultimos_meses(cantidad):
+    """Los últimos meses, del mes en curso hacia atrás"""
+    periodos = [mes_actual()]
+    while len(periodos) < cantidad:
+        periodos.append(inicio_mes(periodos[-1] - timedelta(days=1)))
+    return periodos
+
+
+def momento(fecha):
+    return timezone.make_aware(datetime.combine(fecha, time.min))
+
+
+class _Eco:
+    """Destino de csv.writer que retorna cada línea en lugar de guardarla"""
+    def write(self, valor):
+        return valor
+
+
+def csv_lineas(encabezados, filas):
+    """
+    Líneas CSV del encabezado y las filas, generadas una a una. La primera
+    lleva la marca BOM para que Excel abra el archivo como UTF-8.
+    """
+    escritor = csv.writer(_Eco())
+    yield '\ufeff' + escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow(fila)
@@ -0,0 +1,143 @@
+"""
+Velocidad de venta y puntos de reorden por producto.
+
+calcular() arma la serie de unidades vendidas por día de cada producto a
+partir de DetalleGanancia (ventas no canceladas) y guarda en
+ReposicionProducto los promedios de 7 y 30 días, la velocidad (el mayor de
+los dos), el punto de reorden y el stock objetivo. El dashboard y el reporte
+de reposición leen esa tabla; los días de cobertura y la cantidad sugerida
+se calculan al leer con el stock actual (ReposicionProducto.con_stock).
+
+El cálculo es incremental: cada producto guarda su serie hasta el último día
+procesado, y una ejecución solo consulta los días posteriores (una consulta
+agrupada por producto y día para todo el catálogo), desplaza las series y
+recalcula los promedios en una pasada. Las ventas canceladas después de
+procesar su día siguen contando hasta un cálculo completo (completo=True).
+
+Solo se procesan días terminados: por defecto hasta ayer. Con una fecha
+anterior a la de algunas series, esas series no se tocan (no se recortan
+hacia atrás); para rehacerlas hasta esa fecha se usa completo=True.
+"""
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+VENTANA_DIAS = 90
+LOTE = 500
+MILESIMA = Decimal('0.001')
+
+
+def parametros():
+    """Días de entrega del proveedor, de seguridad y de cobertura deseada"""
+    return {
+        'dias_entrega': 7,
+        'dias_seguridad': 3,
+        'dias_cobertura': 30,
+        **getattr(settings, 'REPOSICION', {}),
+    }
+
+
+def _promedio(serie, dias):
+    return (Decimal(str(sum(serie[-dias:]))) / dias).quantize(MILESIMA, rounding=ROUND_HALF_UP)
+
+
+def ventas_por_dia(desde, hasta):
+    """{producto_id: {fecha: unidades}} de las ventas no canceladas entre desde y hasta, en una consulta"""
+    from django.db.models import Sum
+    from django.db.models.functions import TruncDate
+    from .models import DetalleGanancia
+
+    resultado = {}
+    for producto_id, dia, cantidad in DetalleGanancia.objects.filter(
+        fecha_venta__date__gte=desde,
+        fecha_venta__date__lte=hasta,
+        venta__status__vent_cancelada=False,
+    ).annotate(dia=TruncDate('fecha_venta')).values('producto_id', 'dia').annotate(
+        cantidad=Sum('cantidad')
+    ).values_list('producto_id', 'dia', 'cantidad'):
+        resultado.setdefault(producto_id, {})[dia] = float(cantidad)
+    return resultado
+
+
+def calcular(hasta=None, completo=False):
+    """
+    Actualiza ReposicionProducto de todos los productos hasta la fecha
+    indicada (por defecto ayer). Retorna {'productos', 'dias', 'desde',
+    'hasta'}; 'dias' es 0 si ya estaba al día. Los productos ya calculados
+    hasta esa fecha o una posterior se dejan como están.
+    """
+    from .models import Producto, ReposicionProducto
+
+    hasta = hasta or timezone.localdate() - timedelta(days=1)
+    anteriores = {r.producto_id: r for r in ReposicionProducto.objects.only('producto_id', 'serie', 'hasta')}
+    productos = list(Producto.objects.values_list('pk', flat=True))
+
+    ultimo = min((r.hasta for r in anteriores.values()), default=None)
+    if completo or ultimo is None or (hasta - ultimo).days >= VENTANA_DIAS:
+        # Sin series que continuar: se arma la ventana completa
+        desde = hasta - timedelta(days=VENTANA_DIAS - 1)
+        anteriores = {}
+    else:
+        desde = ultimo + timedelta(days=1)
+    dias = (hasta - desde).days + 1
+    if dias <= 0:
+        return {'productos': 0, 'dias': 0, 'desde': desde, 'hasta': hasta}
+
+    ventas = ventas_por_dia(desde, hasta)
+    fechas = [desde + timedelta(days=i) for i in range(dias)]
+    p = parametros()
+    ceros = [0.0] * VENTANA_DIAS
+
+    registros = []
+    for producto_id in productos:
+        anterior = anteriores.get(producto_id)
+        if anterior is not None and anterior.hasta >= hasta:
+            continue
+        vendidos = ventas.get(producto_id, {})
+        # Un producto creado después del último cálculo no tiene ventas anteriores;
+        # uno que ya estaba más adelantado solo suma los días que le faltan
+        serie = anterior.serie if anterior is not None else ceros
+        nuevos = [vendidos.get(fecha, 0.0) for fecha in fechas
+                  if anterior is None or fecha > anterior.hasta]
+        serie = (serie + nuevos)[-VENTANA_DIAS:]
+
+        promedio_7 = _promedio(serie, 7)
+        promedio_30 = _promedio(serie, 30)
+        velocidad = max(promedio_7, promedio_30)
+        registros.append(ReposicionProducto(
+            producto_id=producto_id,
+            serie=serie,
+            hasta=hasta,
+            promedio_7=promedio_7,
+            promedio_30=promedio_30,
+            velocidad=velocidad,
+            punto_reorden=(velocidad * (p['dias_entrega'] + p['dias_seguridad'])).quantize(MILESIMA),
+            stock_objetivo=(velocidad * (p['dias_entrega'] + p['dias_cobertura'])).quantize(MILESIMA),
+            calculado_en=timezone.now(),
+        ))
+
+    # Un INSERT ... ON CONFLICT DO UPDATE por cada LOTE productos
+    with transaction.atomic():
+        ReposicionProducto.objects.bulk_create(
+            registros,
+            batch_size=LOTE,
+            update_conflicts=True,
+            unique_fields=['producto'],
+            update_fields=['serie', 'hasta', 'promedio_7', 'promedio_30', 'velocidad',
+                           'punto_reorden', 'stock_objetivo', 'calculado_en'],
+        )
+
+    return {'productos': len(registros), 'dias': dias, 'desde': desde, 'hasta': hasta}
+
+
+def a_reponer():
+    """Productos activos en o bajo su punto de reorden, los de menos cobertura primero"""
+    from .models import ReposicionProducto
+
+    return ReposicionProducto.con_stock().filter(producto__activo=True, reponer=True).order_by(
+        'dias_cobertura', 'producto__nombre'
+    )
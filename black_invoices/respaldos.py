@@ -0,0 +1,260 @@
+"""
+Respaldos en caliente de la base de datos SQLite.
+
+Se usa la API de respaldo en línea de SQLite (sqlite3.Connection.backup):
+copia las páginas por tramos y suelta el bloqueo entre tramos, así las
+ventas se siguen registrando mientras se respalda y el resultado es una
+foto consistente. La copia se verifica con PRAGMA integrity_check antes de
+comprimirla (zstd si está instalado el paquete zstandard, si no gzip).
+
+Retención por defecto (RESPALDOS_RETENCION): el respaldo más reciente de
+cada una de las últimas 24 horas, 7 días y 12 meses.
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+try:
+    import zstandard
+except ImportError:  # zstandard es opcional: sin él se comprime con gzip
+    zstandard = None
+
+
+PREFIJO = 'respaldo_'
+EXTENSIONES = ('.sqlite3.zst', '.sqlite3.gz')
+FORMATO_FECHA = '%Y%m%d_%H%M%S'
+RETENCION_POR_DEFECTO = {'horarios': 24, 'diarios': 7, 'mensuales': 12}
+PAGINAS_POR_TRAMO = 256
+PAUSA_ENTRE_TRAMOS = 0.005  # segundos; deja pasar a las escrituras en curso
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class ErrorRespaldo(Exception):
+    pass
+
+
+def directorio_respaldos():
+    directorio = Path(getattr(settings, 'RESPALDOS_DIR', settings.BASE_DIR / 'respaldos'))
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def ruta_base_datos():
+    base = settings.DATABASES['default']
+    if base['ENGINE'] != 'django.db.backends.sqlite3':
+        raise ErrorRespaldo('Los respaldos en caliente solo están disponibles para SQLite')
+    return Path(base['NAME'])
+
+
+def _verificar_integridad(ruta):
+    conexion = sqlite3.connect(ruta)
+    try:
+        resultado = conexion.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        conexion.close()
+    if resultado != 'ok':
+        raise ErrorRespaldo(f'La copia no pasó PRAGMA integrity_check: {resultado}')
+
+
+def _comprimir(origen, destino):
+    with open(origen, 'rb') as entrada:
+        if destino.name.endswith('.zst'):
+            with open(destino, 'wb') as salida:
+                with zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(salida) as escritor:
+                    shutil.copyfileobj(entrada, escritor, TAMANO_BLOQUE)
+        else:
+            with gzip.open(destino, 'wb', compresslevel=6) as salida:
+                shutil.copyfileobj(entrada, salida, TAMANO_BLOQUE)
+
+
+def _descomprimir(origen, destino):
+    with open(destino, 'wb') as salida:
+        if origen.name.endswith('.zst'):
+            if zstandard is None:
+                raise ErrorRespaldo('Para restaurar un respaldo .zst instale el paquete zstandard')
+            with open(origen, 'rb') as entrada:
+                with zstandard.ZstdDecompressor().stream_reader(entrada) as lector:
+                    shutil.copyfileobj(lector, salida, TAMANO_BLOQUE)
+        else:
+            with gzip.open(origen, 'rb') as entrada:
+                shutil.copyfileobj(entrada, salida, TAMANO_BLOQUE)
+
+
+def crear_respaldo(etiqueta=''):
+    """
+    Respalda la base de datos en el directorio de respaldos y retorna un
+    diccionario con 'nombre', 'ruta', 'tamano', 'tamano_original' y 'segundos'.
+    """
+    inicio = time.perf_counter()
+    base = ruta_base_datos()
+    directorio = directorio_respaldos()
+
+    extension = EXTENSIONES[0] if zstandard is not None else EXTENSIONES[1]
+    sufijo = f'_{etiqueta}' if etiqueta else ''
+    nombre = f'{PREFIJO}{datetime.now().strftime(FORMATO_FECHA)}{sufijo}{extension}'
+    destino = directorio / nombre
+
+    descriptor, temporal = tempfile.mkstemp(suffix='.sqlite3', dir=directorio)
+    os.close(descriptor)
+    try:
+        origen = sqlite3.connect(base, timeout=20)
+        copia = sqlite3.connect(temporal)
+        try:
+            origen.backup(copia, pages=PAGINAS_POR_TRAMO, sleep=PAUSA_ENTRE_TRAMOS)
+        finally:
+            copia.close()
+            origen.close()
+
+        _verificar_integridad(temporal)
+        tamano_original = os.path.getsize(temporal)
+        _comprimir(Path(temporal), destino)
+    except Exception:
+        if destino.exists():
+            destino.unlink()
+        raise
+    finally:
+        os.remove(temporal)
+
+    return {
+        'nombre': nombre,
+        'ruta': destino,
+        'tamano': destino.stat().st_size,
+        'tamano_original': tamano_original,
+        'segundos': round(time.perf_counter() - inicio, 2),
+    }
+
+
+def _fecha_de(nombre):
+    try:
+        return datetime.strptime(nombre[len(PREFIJO):len(PREFIJO) + 15], FORMATO_FECHA)
+    except ValueError:
+        return None
+
+
+def listar_respaldos():
+    """Respaldos existentes, del más reciente al más antiguo"""
+    respaldos = []
+    for ruta in directorio_respaldos().iterdir():
+        if not (ruta.name.startswith(PREFIJO) and ruta.name.endswith(EXTENSIONES)):
+            continue
+        fecha = _fecha_de(ruta.name)
+        if fecha is None:
+            continue
+        respaldos.append({
+            'nombre': ruta.name,
+            'ruta': ruta,
+            'fecha': fecha,
+            'tamano': ruta.stat().st_size,
+        })
+    return sorted(respaldos, key=lambda respaldo: respaldo['fecha'], reverse=True)
+
+
+def obtener_respaldo(nombre):
+    """Busca un respaldo por nombre (sin permitir rutas fuera del directorio)"""
+    for respaldo in listar_respaldos():
+        if respaldo['nombre'] == nombre:
+            return respaldo
+    raise ErrorRespaldo(f'No existe el respaldo {nombre}')
+
+
+def rotar(retencion=None):
+    """
+    Conserva el respaldo más reciente de cada hora, día y mes según la
+    retención y elimina el resto. Retorna los nombres eliminados.
+    """
+    retencion = retencion or getattr(settings, 'RESPALDOS_RETENCION', RETENCION_POR_DEFECTO)
+    periodos = (
+        ('horarios', '%Y%m%d%H'),
+        ('diarios', '%Y%m%d'),
+        ('mensuales', '%Y%m'),
+    )
+
+    respaldos = listar_respaldos()
+    conservar = set()
+    for clave, formato in periodos:
+        vistos = set()
+        for respaldo in respaldos:
+            periodo = respaldo['fecha'].strftime(formato)
+            if periodo in vistos:
+                continue
+            if len(vistos) >= retencion.get(clave, 0):
+                break
+            vistos.add(periodo)
+            conservar.add(respaldo['nombre'])
+
+    eliminados = []
+    for respaldo in respaldos:
+        if respaldo['nombre'] not in conservar:
+            respaldo['ruta'].unlink()
+            eliminados.append(respaldo['nombre'])
+    return eliminados
+
+
+def verificar_respaldo(nombre):
+    """Descomprime el respaldo en un temporal y ejecuta PRAGMA integrity_check"""
+    respaldo = obtener_respaldo(nombre)
+    descriptor, temporal = tempfile.mkstemp(suffix='.sqlite3', dir=directorio_respaldos())
+    os.close(descriptor)
+    try:
+        _descomprimir(respaldo['ruta'], Path(temporal))
+        _verificar_integridad(temporal)
+    finally:
+        os.remove(temporal)
+
+
+def restaurar(nombre, espera=5):
+    """
+    Reemplaza el contenido de la base de datos por el respaldo indicado.
+    Antes se respalda el estado actual con la etiqueta 'pre_restauracion'.
+
+    La copia se escribe con la API de respaldo de SQLite sobre la base en
+    uso (no se reemplaza el archivo ni se borran -wal/-shm): pasa por los
+    bloqueos y el WAL de SQLite, así que una conexión abierta de otro
+    proceso ve el contenido restaurado como una escritura más y no puede
+    aplicar páginas viejas sobre él. Si en 'espera' segundos no se obtiene
+    un bloqueo exclusivo (hay escrituras en curso) se lanza ErrorRespaldo
+    sin tocar nada; conviene detener el servidor web y el programador
+    antes de restaurar para no perder ventas registradas durante la
+    restauración.
+    """
+    respaldo = obtener_respaldo(nombre)
+    base = ruta_base_datos()
+
+    descriptor, temporal = tempfile.mkstemp(suffix='.sqlite3', dir=base.parent)
+    os.close(descriptor)
+    try:
+        _descomprimir(respaldo['ruta'], Path(temporal))
+        _verificar_integridad(temporal)
+
+        previo = crear_respaldo(etiqueta='pre_restauracion')
+
+        connections.close_all()
+        destino = sqlite3.connect(base, timeout=espera, isolation_level=None)
+        origen = sqlite3.connect(temporal)
+        try:
+            try:
+                destino.execute('BEGIN EXCLUSIVE')
+                destino.execute('COMMIT')
+            except sqlite3.OperationalError:
+                raise ErrorRespaldo(
+                    'La base de datos está en uso y no se pudo bloquear. Detenga el servidor web '
+                    'y el programador y vuelva a intentar.'
+                )
+            # Todas las páginas en un paso: el bloqueo de escritura se mantiene hasta terminar
+            origen.backup(destino)
+            destino.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            origen.close()
+            destino.close()
+    finally:
+        os.remove(temporal)
+
+    return previo
@@ -0,0 +1,131 @@
+"""
+Segmentación RFM de clientes (recencia, frecuencia y monto).
+
+calcular() obtiene con una consulta agrupada por cliente la primera y la
+última compra, y las compras y el monto (históricos y de los últimos
+VENTANA_DIAS) de las ventas no canceladas, sean facturas o notas de
+entrega. Luego asigna a cada cliente con compras un puntaje de 1 a 5 por
+quintiles en cada dimensión, le asigna un segmento (REGLAS) y guarda todo en
+ClienteSegmento. La lista de segmentos se filtra y ordena sobre esa tabla,
+sin tocar las tablas de ventas.
+
+Se recalcula completo cada noche (tarea segmentos_clientes del programador).
+"""
+from bisect import bisect_left
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+
+VENTANA_DIAS = 365
+LOTE = 500
+QUINTILES = 5
+
+# (segmento, condición sobre los puntajes r, f, m y las compras históricas);
+# se asigna la primera que se cumple
+REGLAS = [
+    ('campeones', lambda r, f, m, total: r >= 4 and f >= 4 and m >= 4),
+    ('nuevos', lambda r, f, m, total: r >= 4 and total == 1),
+    ('leales', lambda r, f, m, total: r >= 3 and f >= 3),
+    ('activos', lambda r, f, m, total: r >= 3),
+    ('en_riesgo', lambda r, f, m, total: f >= 4 or m >= 4),
+    ('decayendo', lambda r, f, m, total: r == 2),
+    ('inactivos', lambda r, f, m, total: True),
+]
+
+
+def puntajes(valores):
+    """
+    Quintil (1 a 5) de cada valor dentro de la lista; valores iguales
+    reciben el mismo puntaje. Ordena una sola vez y ubica cada valor con
+    búsqueda binaria.
+    """
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    return [1 + bisect_left(ordenados, valor) * QUINTILES // n for valor in valores]
+
+
+def segmento(r, f, m, compras_total):
+    if not compras_total:
+        return 'sin_compras'
+    return next(nombre for nombre, condicion in REGLAS if condicion(r, f, m, compras_total))
+
+
+def compras_por_cliente(desde):
+    """Compras por cliente (históricas y desde la fecha indicada) en una consulta"""
+    from django.db.models import Count, DecimalField, Max, Min, Q, Sum
+    from django.db.models.functions import Coalesce
+    from .models import Ventas
+
+    ventana = Q(fecha_venta__gte=desde)
+    return Ventas.objects.filter(status__vent_cancelada=False).annotate(
+        # Una venta tiene factura o nota de entrega, nunca ambas
+        comprador=Coalesce('factura__cliente_id', 'nota_entrega__cliente_id'),
+        importe=Coalesce('factura__total_fac', 'nota_entrega__total', output_field=DecimalField()),
+    ).filter(comprador__isnull=False).values('comprador').annotate(
+        primera=Min('fecha_venta'),
+        ultima=Max('fecha_venta'),
+        compras_total=Count('id'),
+        monto_total=Sum('importe'),
+        compras=Count('id', filter=ventana),
+        monto=Sum('importe', filter=ventana),
+    ).order_by()
+
+
+def calcular(ahora=None):
+    """Recalcula ClienteSegmento de todos los clientes. Retorna {segmento: cantidad}"""
+    from .models import Cliente, ClienteSegmento
+
+    ahora = ahora or timezone.now()
+    filas = {fila['comprador']: fila for fila in compras_por_cliente(ahora - timedelta(days=VENTANA_DIAS))}
+    clientes = list(Cliente.objects.values_list('pk', flat=True))
+
+    # Puntajes entre los clientes con compras: recencia invertida (menos días, más puntaje)
+    con_compras = [pk for pk in clientes if pk in filas]
+    dias = {pk: max((ahora - filas[pk]['ultima']).days, 0) for pk in con_compras}
+    r = dict(zip(con_compras, puntajes([-dias[pk] for pk in con_compras])))
+    f = dict(zip(con_compras, puntajes([filas[pk]['compras'] for pk in con_compras])))
+    m = dict(zip(con_compras, puntajes([filas[pk]['monto'] or Decimal('0') for pk in con_compras])))
+
+    registros = []
+    for pk in clientes:
+        fila = filas.get(pk)
+        if fila is None:
+            registros.append(ClienteSegmento(cliente_id=pk, segmento='sin_compras', calculado_en=ahora))
+            continue
+        registros.append(ClienteSegmento(
+            cliente_id=pk,
+            segmento=segmento(r[pk], f[pk], m[pk], fila['compras_total']),
+            primera_compra=fila['primera'],
+            ultima_compra=fila['ultima'],
+            dias_sin_comprar=dias[pk],
+            compras=fila['compras'],
+            monto=fila['monto'] or 0,
+            compras_total=fila['compras_total'],
+            monto_total=fila['monto_total'] or 0,
+            puntaje_recencia=r[pk],
+            puntaje_frecuencia=f[pk],
+            puntaje_monto=m[pk],
+            calculado_en=ahora,
+        ))
+
+    # Un INSERT ... ON CONFLICT DO UPDATE por cada LOTE clientes
+    with transaction.atomic():
+        ClienteSegmento.objects.bulk_create(
+            registros,
+            batch_size=LOTE,
+            update_conflicts=True,
+            unique_fields=['cliente'],
+            update_fields=[
+                'segmento', 'primera_compra', 'ultima_compra', 'dias_sin_comprar', 'compras', 'monto',
+                'compras_total', 'monto_total', 'puntaje_recencia', 'puntaje_frecuencia', 'puntaje_monto',
+                'calculado_en',
+            ],
+        )
+
+    resumen = {}
+    for registro in registros:
+        resumen[registro.segmento] = resumen.get(registro.segmento, 0) + 1
+    return resumen
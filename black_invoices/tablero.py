@@ -0,0 +1,199 @@
+"""
+Widgets del dashboard.
+
+Cada widget calcula sus datos por separado y se sirve como JSON desde
+DashboardWidgetView; la página del dashboard se muestra de inmediato y
+pide todos los widgets en paralelo. Así una consulta lenta solo retrasa su
+propio widget y un error se ve en ese widget en lugar de mostrarse como cero.
+
+Los datos se guardan en el cache de reportes (cache_reportes) con el TTL de
+cada widget; los que dependen solo de ventas se invalidan además al
+registrarse una venta.
+"""
+from datetime import timedelta
+
+from django.db.models import Sum, Count
+
+from . import cache_reportes
+
+
+class Widget:
+    """
+    calcular(hoy) retorna un diccionario serializable. plantillas asocia cada
+    destino de la página (data-fragmento) con la plantilla que lo dibuja; un
+    widget sin plantillas envía sus datos tal cual (por ejemplo un gráfico).
+    desde(hoy) es la primera fecha de ventas que usa el widget (None = todas).
+    """
+
+    def __init__(self, nombre, calcular, ttl, plantillas=None, desde=None):
+        self.nombre = nombre
+        self.calcular = calcular
+        self.ttl = ttl
+        self.plantillas = plantillas or {}
+        self.desde = desde or (lambda hoy: None)
+
+    def obtener(self, hoy):
+        return cache_reportes.obtener(
+            f'widget_{self.nombre}',
+            lambda: self.calcular(hoy),
+            inicio=self.desde(hoy),
+            ttl=self.ttl,
+            hoy=hoy,
+        )
+
+
+def _inicio_mes(hoy):
+    return hoy.replace(day=1)
+
+
+def _inicio_anio(hoy):
+    return hoy.replace(month=1, day=1)
+
+
+def _inicio_grafico(hoy):
+    return hoy - timedelta(days=14)
+
+
+def ventas(hoy):
+    """Ventas de hoy, del mes y del año (facturas + notas de entrega)"""
+    from .models import Factura, NotaEntrega
+
+    datos = {}
+    for clave, filtro_factura, filtro_nota in (
+        ('total_ventas_hoy', {'fecha_fac__date': hoy}, {'fecha_nota__date': hoy}),
+        ('total_ventas_mes', {'fecha_fac__gte': _inicio_mes(hoy)}, {'fecha_nota__gte': _inicio_mes(hoy)}),
+        ('total_ventas_anio', {'fecha_fac__gte': _inicio_anio(hoy)}, {'fecha_nota__gte': _inicio_anio(hoy)}),
+    ):
+        facturas = Factura.objects.filter(**filtro_factura).aggregate(total=Sum('total_fac'))['total'] or 0
+        notas = NotaEntrega.objects.filter(**filtro_nota).aggregate(total=Sum('total'))['total'] or 0
+        datos[clave] = facturas + notas
+    return datos
+
+
+def ganancias(hoy):
+    """Ganancias realizadas del mes y ganancias de créditos pendientes"""
+    from .models import DetalleGanancia
+
+    return {
+        'ganancias_realizadas_mes': DetalleGanancia.get_ganancias_realizadas(fecha_inicio=_inicio_mes(hoy)),
+        'ganancias_pendientes_total': DetalleGanancia.get_ganancias_pendientes(),
+    }
+
+
+def grafico(hoy):
+    """Ventas facturadas por día de los últimos 15 días, en el formato de Chart.js"""
+    from django.db.models.functions import TruncDay
+    from .models import Factura
+
+    ventas_por_dia = Factura.objects.filter(
+        fecha_fac__date__gte=_inicio_grafico(hoy)
+    ).annotate(
+        dia=TruncDay('fecha_fac')
+    ).values('dia').annotate(
+        total=Sum('total_fac')
+    ).order_by('dia')
+
+    return {
+        'labels': [venta['dia'].strftime('%d/%m') for venta in ventas_por_dia],
+        'data': [float(venta['total']) for venta in ventas_por_dia],
+    }
+
+
+def productos_top(hoy):
+    """Productos más vendidos (histórico) y con más ganancia este mes"""
+    from .models import DetalleFactura, DetalleGanancia
+
+    return {
+        'productos_top': list(DetalleFactura.objects.values(
+            'producto__nombre'
+        ).annotate(
+            total=Sum('cantidad')
+        ).order_by('-total')[:5]),
+        'productos_top_ganancia': list(DetalleGanancia.get_ganancias_por_producto(
+            fecha_inicio=_inicio_mes(hoy), limit=5
+        )),
+    }
+
+
+def empleados(hoy):
+    """Ventas facturadas por empleado este mes"""
+    from .models import Factura
+
+    return {
+        'ventas_empleados': list(Factura.objects.filter(
+            fecha_fac__gte=_inicio_mes(hoy)
+        ).values(
+            'empleado__nombre', 'empleado__apellido'
+        ).annotate(
+            total=Sum('total_fac'),
+            cantidad=Count('id')
+        ).order_by('-total')),
+    }
+
+
+# Umbral fijo mientras no se haya calculado la reposición (calcular_reposicion)
+UMBRAL_STOCK_BAJO = 5
+
+
+def stock_bajo(hoy):
+    """
+    Productos activos en o bajo su punto de reorden (los 5 con menos días de
+    cobertura y el total); sin reposición calculada, los de stock bajo fijo
+    """
+    from .models import Producto, ReposicionProducto
+    from . import reposicion
+
+    if ReposicionProducto.objects.exists():
+        filas = reposicion.a_reponer()
+        return {
+            'total_stock_bajo': filas.count(),
+            'productos_stock_bajo': [
+                {
+                    'pk': fila.producto.pk,
+                    'nombre': fila.producto.nombre,
+                    'stock': fila.stock,
+                    'badge': fila.producto.get_stock_badge_class(),
+                    'dias_cobertura': fila.dias_cobertura,
+                    'cantidad_sugerida': fila.cantidad_sugerida,
+                }
+                for fila in filas[:5]
+            ],
+        }
+
+    productos = Producto.objects.filter(stock__lte=UMBRAL_STOCK_BAJO, activo=True).order_by('stock')
+    return {
+        'total_stock_bajo': productos.count(),
+        'productos_stock_bajo': [
+            {
+                'pk': producto.pk,
+                'nombre': producto.nombre,
+                'stock': producto.stock,
+                'badge': producto.get_stock_badge_class(),
+            }
+            for producto in productos[:5]
+        ],
+    }
+
+
+PLANTILLAS = 'black_invoices/dashboard/'
+
+WIDGETS = {
+    widget.nombre: widget
+    for widget in (
+        Widget('ventas', ventas, ttl=60, desde=_inicio_anio,
+               plantillas={'ventas': PLANTILLAS + 'ventas.html'}),
+        # El stock también cambia por ajustes manuales, que no invalidan el cache;
+        # los puntos de reorden los actualiza calcular_reposicion una vez al día
+        Widget('stock_bajo', stock_bajo, ttl=30,
+               plantillas={'stock_bajo_resumen': PLANTILLAS + 'stock_bajo_resumen.html',
+                           'stock_bajo': PLANTILLAS + 'stock_bajo.html'}),
+        Widget('ganancias', ganancias, ttl=300,
+               plantillas={'ganancias': PLANTILLAS + 'ganancias.html'}),
+        Widget('empleados', empleados, ttl=300, desde=_inicio_mes,
+               plantillas={'empleados': PLANTILLAS + 'empleados.html'}),
+        Widget('grafico', grafico, ttl=300, desde=_inicio_grafico),
+        Widget('productos_top', productos_top, ttl=600,
+               plantillas={'productos_top': PLANTILLAS + 'productos_top.html',
+                           'productos_top_ganancia': PLANTILLAS + 'productos_top_ganancia.html'}),
+    )
+}
@@ -0,0 +1,286 @@
+"""
+Consulta de la tasa USD/VES a proveedores externos.
+
+Todos los proveedores configurados se consultan en paralelo (hilos) y la
+respuesta se elige con una de tres estrategias:
+
+- 'primero': la primera tasa válida que llegue.
+- 'mediana': la mediana de todas las respuestas válidas.
+- 'quorum': la mediana en cuanto QUORUM proveedores coinciden dentro de
+  TOLERANCIA_QUORUM.
+
+El resultado se guarda durante TASA_CACHE_TTL segundos en el alias
+TASA_CACHE, que debe ser compartido entre procesos: cada ejecución de
+actualizar_tasa_cambio es un proceso nuevo. La clave incluye la estrategia,
+el quorum y una huella de las clases y URLs de los proveedores consultados.
+La red nunca se consulta dentro de una transacción: guardar_tasa() abre una
+transacción corta solo para escribir la tasa elegida.
+
+Los proveedores se configuran en settings.TASA_PROVEEDORES como una lista
+de diccionarios {'clase': 'ruta.a.Clase', 'url': ..., 'timeout': ...}.
+"""
+import hashlib
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+ESTRATEGIAS = ('primero', 'mediana', 'quorum')
+TIMEOUT_POR_DEFECTO = 10
+QUORUM = 2
+TOLERANCIA_QUORUM = Decimal('0.01')  # 1%
+CLAVE_CACHE = 'tasas:consulta:{}:{}:{}'
+
+
+class ErrorProveedor(Exception):
+    pass
+
+
+class ProveedorTasa:
+    """
+    Proveedor base. Las subclases definen nombre, url por defecto e
+    interpretar(datos), que recibe el JSON ya decodificado y retorna la tasa
+    como Decimal o None si la respuesta no la trae.
+    """
+    nombre = ''
+    url = ''
+
+    def __init__(self, url=None, timeout=None, nombre=None):
+        self.url = url or self.url
+        self.timeout = timeout or TIMEOUT_POR_DEFECTO
+        self.nombre = nombre or self.nombre
+
+    def descargar(self):
+        import requests
+
+        try:
+            response = requests.get(self.url, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            raise ErrorProveedor(f"Error de conexión: {e}")
+        except ValueError as e:
+            raise ErrorProveedor(f"Respuesta no es JSON: {e}")
+
+    def interpretar(self, datos):
+        raise NotImplementedError
+
+    def obtener(self):
+        datos = self.descargar()
+        try:
+            tasa = self.interpretar(datos)
+        except (KeyError, TypeError, InvalidOperation) as e:
+            raise ErrorProveedor(f"Error al procesar respuesta: {e}")
+        if tasa is None:
+            raise ErrorProveedor("La respuesta no contiene la tasa VES")
+        if not tasa.is_finite() or tasa <= 0:
+            raise ErrorProveedor(f"Tasa inválida: {tasa}")
+        return tasa
+
+
+class ExchangeRateAPI(ProveedorTasa):
+    nombre = 'ExchangeRate-API'
+    url = 'https://api.exchangerate-api.com/v4/latest/USD'
+
+    def interpretar(self, datos):
+        if 'rates' in datos and 'VES' in datos['rates']:
+            return Decimal(str(datos['rates']['VES']))
+        return None
+
+
+class FixerAPI(ProveedorTasa):
+    nombre = 'Fixer.io (Free)'
+    url = 'https://api.fixer.io/latest?base=USD&symbols=VES'
+
+    def interpretar(self, datos):
+        if 'rates' in datos and 'VES' in datos['rates']:
+            return Decimal(str(datos['rates']['VES']))
+        return None
+
+
+class CurrencyAPI(ProveedorTasa):
+    nombre = 'CurrencyAPI (Free)'
+    url = 'https://api.currencyapi.com/v3/latest?apikey=demo&currencies=VES&base_currency=USD'
+
+    def interpretar(self, datos):
+        if 'data' in datos and 'VES' in datos['data'] and 'value' in datos['data']['VES']:
+            return Decimal(str(datos['data']['VES']['value']))
+        return None
+
+
+PROVEEDORES_POR_DEFECTO = [
+    {'clase': 'black_invoices.tasas.ExchangeRateAPI'},
+    {'clase': 'black_invoices.tasas.FixerAPI'},
+    {'clase': 'black_invoices.tasas.CurrencyAPI'},
+]
+
+# Rutas que atiende el comando servidor_tasas_prueba para cada proveedor
+RUTAS_LOCALES = {
+    'black_invoices.tasas.ExchangeRateAPI': '/exchangerate',
+    'black_invoices.tasas.FixerAPI': '/fixer',
+    'black_invoices.tasas.CurrencyAPI': '/currencyapi',
+}
+
+
+def proveedores_configurados(url_local=None):
+    """
+    Instancia los proveedores de settings.TASA_PROVEEDORES. Con url_local
+    (por ejemplo http://127.0.0.1:8765) apuntan al servidor de prueba.
+    """
+    configuracion = getattr(settings, 'TASA_PROVEEDORES', PROVEEDORES_POR_DEFECTO)
+    timeout = getattr(settings, 'TASA_TIMEOUT', TIMEOUT_POR_DEFECTO)
+
+    proveedores = []
+    for datos in configuracion:
+        clase = import_string(datos['clase'])
+        url = datos.get('url')
+        if url_local and datos['clase'] in RUTAS_LOCALES:
+            url = url_local.rstrip('/') + RUTAS_LOCALES[datos['clase']]
+        proveedores.append(clase(
+            url=url,
+            timeout=datos.get('timeout', timeout),
+            nombre=datos.get('nombre'),
+        ))
+    return proveedores
+
+
+def _consultar(proveedor):
+    inicio = time.perf_counter()
+    try:
+        tasa, error = proveedor.obtener(), None
+    except ErrorProveedor as e:
+        tasa, error = None, str(e)
+    except Exception as e:  # un proveedor defectuoso no debe tumbar la consulta
+        tasa, error = None, f"Error inesperado: {e}"
+    return {
+        'proveedor': proveedor.nombre,
+        'tasa': tasa,
+        'error': error,
+        'ms': round((time.perf_counter() - inicio) * 1000),
+    }
+
+
+def _coincidentes(tasas, tolerancia):
+    """
+    Mayor grupo de tasas que distan a lo sumo referencia × tolerancia (límite
+    incluido) de una misma tasa de referencia del conjunto; con empate gana
+    la primera referencia. La tasa elegida es luego la mediana del grupo.
+    """
+    mejor = []
+    for referencia in tasas:
+        grupo = [tasa for tasa in tasas if abs(tasa - referencia) <= referencia * tolerancia]
+        if len(grupo) > len(mejor):
+            mejor = grupo
+    return mejor
+
+
+def _elegir(respuestas, estrategia, quorum):
+    validas = [r for r in respuestas if r['tasa'] is not None]
+    if not validas:
+        return None, None
+
+    if estrategia == 'primero':
+        return validas[0]['tasa'], validas[0]['proveedor']
+
+    if estrategia == 'quorum':
+        grupo = _coincidentes([r['tasa'] for r in validas], TOLERANCIA_QUORUM)
+        if len(grupo) < quorum:
+            return None, None
+        tasa = statistics.median(grupo)
+        fuentes = [r['proveedor'] for r in validas if r['tasa'] in grupo]
+        return tasa, f"Quorum ({', '.join(fuentes)})"
+
+    tasa = statistics.median([r['tasa'] for r in validas])
+    return tasa, f"Mediana ({len(validas)} fuentes)"
+
+
+def _clave_cache(proveedores, estrategia, quorum):
+    huella = hashlib.sha256('\n'.join(sorted(
+        f'{type(p).__module__}.{type(p).__qualname__} {p.url}' for p in proveedores
+    )).encode()).hexdigest()[:16]
+    return CLAVE_CACHE.format(estrategia, quorum, huella)
+
+
+def consultar_tasa(proveedores=None, estrategia='primero', quorum=QUORUM, usar_cache=True):
+    """
+    Consulta los proveedores en paralelo y retorna un diccionario con la tasa
+    elegida ('tasa', None si ninguna sirvió), su 'fuente', las 'respuestas'
+    individuales, 'ms' totales y 'desde_cache'.
+    """
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia desconocida: {estrategia}")
+
+    if proveedores is None:
+        proveedores = proveedores_configurados()
+
+    cache = caches[getattr(settings, 'TASA_CACHE', 'reportes')]
+    clave = _clave_cache(proveedores, estrategia, quorum)
+    if usar_cache:
+        guardado = cache.get(clave)
+        if guardado is not None:
+            return dict(guardado, desde_cache=True)
+
+    inicio = time.perf_counter()
+    respuestas = []
+    tasa = fuente = None
+    limite = max((p.timeout for p in proveedores), default=0) + 1
+
+    executor = ThreadPoolExecutor(max_workers=max(1, len(proveedores)), thread_name_prefix='tasa')
+    try:
+        pendientes = {executor.submit(_consultar, proveedor) for proveedor in proveedores}
+        while pendientes:
+            restante = limite - (time.perf_counter() - inicio)
+            if restante <= 0:
+                break
+            listos, pendientes = wait(pendientes, timeout=restante, return_when=FIRST_COMPLETED)
+            respuestas.extend(futuro.result() for futuro in listos)
+
+            # 'primero' y 'quorum' pueden decidir sin esperar a los lentos
+            if estrategia != 'mediana':
+                tasa, fuente = _elegir(respuestas, estrategia, quorum)
+                if tasa is not None:
+                    break
+    finally:
+        # Sin esperar a los proveedores lentos; sus hilos terminan solos al vencer el timeout
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if tasa is None:
+        tasa, fuente = _elegir(respuestas, estrategia, quorum)
+
+    resultado = {
+        'tasa': tasa,
+        'fuente': fuente,
+        'respuestas': respuestas,
+        'ms': round((time.perf_counter() - inicio) * 1000),
+        'desde_cache': False,
+    }
+    if tasa is not None and usar_cache:
+        cache.set(clave, resultado, getattr(settings, 'TASA_CACHE_TTL', 900))
+    return resultado
+
+
+def guardar_tasa(fecha, tasa, fuente):
+    """Guarda la tasa del día en una transacción corta; retorna (tasa, creada)"""
+    from .models import TasaCambio
+
+    with transaction.atomic():
+        tasa_obj, created = TasaCambio.objects.get_or_create(
+            fecha=fecha,
+            defaults={
+                'tasa_usd_ves': tasa,
+                'fuente': fuente[:50],
+                'activo': True
+            }
+        )
+        if not created:
+            tasa_obj.tasa_usd_ves = tasa
+            tasa_obj.fuente = fuente[:50]
+            tasa_obj.activo = True
+            tasa_obj.save()
+    return tasa_obj, created
@@ -1,3 +1,960 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    comisiones, conciliacion, formatos, ganancias_historicas, libro_ventas, precios, programador, referencias,
+    registro_ventas, reportes, reposicion, segmentos, tasas,
+)
+from .models import (
+    Cliente, ClienteSegmento, ComisionEmpleado, ConfiguracionSistema, DetalleFactura, DetalleGanancia, Empleado, Factura, HistorialPrecio,
+    NivelAcceso, NotaEntrega, PagoVenta, Producto, ReposicionProducto, TasaCambio, UnidadMedida, Ventas,
+)
+
+
+# Los caches compartidos (archivos) no se tocan desde las pruebas
+CACHES_PRUEBAS = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'reportes', 'sesiones')
+}
+
+
+def crear_datos():
+    """Empleado, cliente y dos productos con la configuración por defecto (IVA 16%)"""
+    ConfiguracionSistema.get_config()
+    nivel = NivelAcceso.objects.create(nombre='Vendedor', descripcion='Ventas')
+    empleado = Empleado.objects.create(
+        cedula='V1234567', nombre='Ana', apellido='Pérez', nivel_acceso=nivel
+    )
+    cliente = Cliente.objects.create(
+        tipo_documento='V', numero_documento='12345678', nombre_completo='Cliente Prueba',
+        telefono='04140000000', direccion='Guanare',
+    )
+    unidad = UnidadMedida.objects.create(nombre='Unidades', abreviatura='un')
+    arroz = Producto.objects.create(
+        sku='ARROZ', nombre='Arroz', descripcion='Arroz 1 kg', precio=Decimal('2.50'),
+        precio_compra=Decimal('2.00'), stock=Decimal('100'), unidad_medida=unidad,
+    )
+    harina = Producto.objects.create(
+        sku='HARINA', nombre='Harina', descripcion='Harina 1 kg', precio=Decimal('1.99'),
+        precio_compra=Decimal('1.50'), stock=Decimal('100'), unidad_medida=unidad,
+    )
+    return empleado, cliente, arroz, harina
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ConciliacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        # Nota de 4 × 2.50 = 10.00 + IVA 1.60 = 11.60
+        cls.venta, totales, creada = registro_ventas.registrar(
+            cls.empleado, cls.cliente.pk, [(cls.arroz.pk, Decimal('4'))], credito=True
+        )
+
+    def abono(self, monto, referencia='0001', descripcion='', cedula=''):
+        return {
+            'fila': 2, 'fecha': None, 'referencia': referencia, 'descripcion': descripcion,
+            'cedula': cedula, 'monto_original': Decimal(monto), 'metodo_pago': 'transferencia',
+        }
+
+    def propuesta(self, monto, referencia='0001'):
+        return {'venta_id': self.venta.pk, 'monto': monto, 'metodo_pago': 'transferencia', 'referencia': referencia}
+
+    def test_leer_estado_cuenta_montos_venezolanos(self):
+        archivo = io.StringIO(
+            'Fecha;Referencia;Concepto;Abono\n'
+            '05/09/2025;123;PAGO MOVIL NE 1;1.234,56\n'
+            '05/09/2025;124;Comisión;-5,00\n'
+        )
+        abonos = conciliacion.leer_estado_cuenta(archivo)
+        self.assertEqual(len(abonos), 1)
+        self.assertEqual(abonos[0]['monto_original'], Decimal('1234.56'))
+        self.assertEqual(abonos[0]['metodo_pago'], 'pago_movil')
+
+    def test_coincidencia_por_documento(self):
+        numero = self.venta.nota_entrega.numero_nota
+        propuestas = conciliacion.proponer_coincidencias(
+            [self.abono('11.60', descripcion=f'Pago NE {numero}')], moneda='USD'
+        )
+        self.assertEqual(propuestas[0]['venta_id'], self.venta.pk)
+        self.assertEqual(propuestas[0]['confianza'], 'alta')
+
+    def test_coincidencia_por_cedula_y_monto(self):
+        propuestas = conciliacion.proponer_coincidencias(
+            [self.abono('11.60', cedula='V-12345678'), self.abono('5.00', referencia='0002', cedula='12345678')],
+            moneda='USD',
+        )
+        self.assertEqual(propuestas[0]['venta_id'], self.venta.pk)
+        self.assertEqual(propuestas[0]['confianza'], 'alta')
+        # El primer abono consumió el saldo: el segundo no paga dos veces la misma venta
+        self.assertIsNone(propuestas[1]['venta_id'])
+
+    def test_referencia_repetida_en_el_archivo(self):
+        propuestas = conciliacion.proponer_coincidencias(
+            [self.abono('5.00', cedula='12345678'), self.abono('5.00', cedula='12345678')], moneda='USD'
+        )
+        self.assertEqual(propuestas[0]['venta_id'], self.venta.pk)
+        self.assertEqual(propuestas[1]['motivo'], 'Referencia repetida en el archivo')
+
+    def test_aplicar_pago_parcial(self):
+        resultado = conciliacion.aplicar_pagos([self.propuesta('5.00')])
+        self.assertEqual((resultado['pagos'], resultado['completadas']), (1, 0))
+        venta = Ventas.objects.get(pk=self.venta.pk)
+        self.assertEqual(venta.monto_pagado, Decimal('5.00'))
+        self.assertEqual(venta.status.nombre, 'Pendiente')
+
+    def test_aplicar_pago_dentro_de_la_tolerancia_completa_la_venta(self):
+        resultado = conciliacion.aplicar_pagos([self.propuesta('11.59')])
+        self.assertEqual(resultado['completadas'], 1)
+        self.assertEqual(len(resultado['facturas']), 1)
+        venta = Ventas.objects.get(pk=self.venta.pk)
+        self.assertEqual(venta.status.nombre, 'Completada')
+        self.assertTrue(venta.completada)
+        self.assertIsNotNone(venta.factura_id)
+        self.assertIsNone(venta.nota_entrega_id)
+
+    def test_aplicar_pagos_rechaza_excedente_y_referencias_registradas(self):
+        resultado = conciliacion.aplicar_pagos([self.propuesta('20.00')])
+        self.assertEqual(resultado['pagos'], 0)
+        self.assertEqual(resultado['rechazadas'][0][0], self.venta.pk)
+
+        conciliacion.aplicar_pagos([self.propuesta('5.00')])
+        resultado = conciliacion.aplicar_pagos([self.propuesta('5.00')])
+        self.assertEqual(resultado['pagos'], 0)
+        self.assertEqual(PagoVenta.objects.filter(venta=self.venta).count(), 1)
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ConvertirNotasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        cls.ventas = [
+            registro_ventas.registrar(
+                cls.empleado, cls.cliente.pk, [(cls.arroz.pk, Decimal(n)), (cls.harina.pk, Decimal('1'))], credito=True
+            )[0]
+            for n in ('1', '2', '3')
+        ]
+        ConfiguracionSistema.objects.filter(pk=1).update(numero_factura_actual=50)
+
+    def test_numeracion_consecutiva_en_orden_de_las_notas(self):
+        notas = [venta.nota_entrega for venta in self.ventas]
+        facturas = NotaEntrega.convertir_lote(notas)
+
+        self.assertEqual([f.numero_factura for f in facturas], [50, 51, 52])
+        self.assertEqual(ConfiguracionSistema.get_config().numero_factura_actual, 53)
+        for nota, factura in zip(notas, facturas):
+            nota.refresh_from_db()
+            self.assertTrue(nota.convertida_a_factura)
+            self.assertEqual(nota.factura_generada_id, factura.pk)
+            self.assertEqual((factura.subtotal, factura.iva, factura.total_fac), (nota.subtotal, nota.iva, nota.total))
+            self.assertEqual(DetalleFactura.objects.filter(factura=factura).count(), 2)
+            venta = Ventas.objects.get(factura=factura)
+            self.assertIsNone(venta.nota_entrega_id)
+
+    def test_notas_ya_convertidas_no_consumen_numeros(self):
+        primera = self.ventas[0].nota_entrega
+        NotaEntrega.convertir_lote([primera])
+        primera.refresh_from_db()
+
+        facturas = NotaEntrega.convertir_lote([primera] + [venta.nota_entrega for venta in self.ventas[1:]])
+        self.assertEqual([f.numero_factura for f in facturas], [51, 52])
+        with self.assertRaises(ValueError):
+            primera.convertir_a_factura()
+
+
+class PreciosTests(SimpleTestCase):
+
+    def test_lineas_redondean_mitad_hacia_arriba(self):
+        self.assertEqual(precios.subtotal_linea(Decimal('2.675'), Decimal('1')), Decimal('2.68'))
+        self.assertEqual(precios.subtotal_linea(Decimal('1.99'), Decimal('0.125')), Decimal('0.25'))
+
+    def test_iva_sobre_la_suma_de_lineas_redondeadas(self):
+        totales = precios.totalizar([Decimal('0.05')] * 3, Decimal('16'))
+        self.assertEqual(totales['subtotal'], Decimal('0.15'))
+        self.assertEqual(totales['iva'], Decimal('0.02'))
+        self.assertEqual(totales['total'], Decimal('0.17'))
+        self.assertEqual(precios.totalizar([Decimal('10')], Decimal('16'), aplicar_iva=False)['iva'], Decimal('0.00'))
+
+    def test_totales_documento_en_bolivares(self):
+        totales = precios.totales_documento(Decimal('10.01'), Decimal('1.60'), Decimal('11.61'), Decimal('36.555'))
+        self.assertEqual(totales['subtotal_ves'], Decimal('365.92'))
+        self.assertEqual(totales['iva_ves'], Decimal('58.49'))
+        # El total en Bs es la suma de sus columnas, no 11.61 × tasa (424.40)
+        self.assertEqual(totales['total_ves'], Decimal('424.41'))
+
+        sin_tasa = precios.totales_documento(Decimal('10.01'), Decimal('1.60'), Decimal('11.61'))
+        self.assertIsNone(sin_tasa['total_ves'])
+
+    def test_a_decimal(self):
+        self.assertEqual(precios.a_decimal('1,5'), Decimal('1.50'))
+        self.assertEqual(precios.parsear_cantidad('0.3333'), Decimal('0.333'))
+        for valor in ('abc', 'NaN', 'Infinity'):
+            with self.assertRaises(ValueError):
+                precios.a_decimal(valor)
+
+
+class ProveedorFijo(tasas.ProveedorTasa):
+    """Proveedor que responde sin red con la tasa indicada (o falla si es None)"""
+
+    def __init__(self, tasa, url='http://prueba.local/tasa', nombre='Fijo'):
+        super().__init__(url=url, timeout=1, nombre=nombre)
+        self.tasa = tasa
+        self.consultas = 0
+
+    def descargar(self):
+        self.consultas += 1
+        if self.tasa is None:
+            raise tasas.ErrorProveedor('Sin conexión')
+        return {'rates': {'VES': self.tasa}}
+
+    def interpretar(self, datos):
+        return Decimal(str(datos['rates']['VES']))
+
+
+@override_settings(CACHES=CACHES_PRUEBAS, TASA_CACHE='default')
+class ConsultarTasaTests(SimpleTestCase):
+
+    def setUp(self):
+        from django.core.cache import caches
+        caches['default'].clear()
+
+    def test_mediana_de_las_respuestas_validas(self):
+        proveedores = [ProveedorFijo('100', nombre='A'), ProveedorFijo('104', nombre='B'), ProveedorFijo(None, nombre='C')]
+        resultado = tasas.consultar_tasa(proveedores, estrategia='mediana', usar_cache=False)
+        self.assertEqual(resultado['tasa'], Decimal('102'))
+        self.assertEqual(len(resultado['respuestas']), 3)
+        self.assertEqual([r['error'] for r in resultado['respuestas'] if r['proveedor'] == 'C'], ['Sin conexión'])
+
+    def test_quorum(self):
+        proveedores = [ProveedorFijo('100', nombre='A'), ProveedorFijo('100.5', nombre='B'), ProveedorFijo('130', nombre='C')]
+        resultado = tasas.consultar_tasa(proveedores, estrategia='quorum', usar_cache=False)
+        self.assertEqual(resultado['tasa'], Decimal('100.25'))
+        self.assertIn('Quorum', resultado['fuente'])
+
+        sin_quorum = [ProveedorFijo('100', nombre='A'), ProveedorFijo('130', nombre='C')]
+        self.assertIsNone(tasas.consultar_tasa(sin_quorum, estrategia='quorum', usar_cache=False)['tasa'])
+
+    def test_coincidentes_alrededor_de_una_referencia(self):
+        # El límite es inclusivo y se mide desde una de las tasas, no desde la mediana
+        self.assertEqual(tasas._coincidentes([Decimal('100'), Decimal('101')], Decimal('0.01')),
+                         [Decimal('100'), Decimal('101')])
+        grupo = tasas._coincidentes([Decimal('99'), Decimal('100'), Decimal('101'), Decimal('110')], Decimal('0.01'))
+        self.assertEqual(grupo, [Decimal('99'), Decimal('100'), Decimal('101')])
+
+    def test_tasa_invalida_se_descarta(self):
+        resultado = tasas.consultar_tasa([ProveedorFijo('-5')], usar_cache=False)
+        self.assertIsNone(resultado['tasa'])
+        self.assertIn('Tasa inválida', resultado['respuestas'][0]['error'])
+        with self.assertRaises(ValueError):
+            tasas.consultar_tasa([ProveedorFijo('100')], estrategia='otra')
+
+    def test_cache_por_estrategia_y_proveedores(self):
+        proveedor = ProveedorFijo('100')
+        self.assertFalse(tasas.consultar_tasa([proveedor])['desde_cache'])
+        self.assertTrue(tasas.consultar_tasa([proveedor])['desde_cache'])
+        self.assertEqual(proveedor.consultas, 1)
+
+        # Otra URL u otra estrategia no reutilizan la respuesta guardada
+        otro = ProveedorFijo('200', url='http://127.0.0.1:8765/tasa')
+        self.assertEqual(tasas.consultar_tasa([otro])['tasa'], Decimal('200'))
+        self.assertFalse(tasas.consultar_tasa([proveedor], estrategia='mediana')['desde_cache'])
+        self.assertFalse(tasas.consultar_tasa([proveedor], usar_cache=False)['desde_cache'])
+
+
+class CronTests(SimpleTestCase):
+
+    def test_campos(self):
+        cron = programador.Cron('*/15 9-17 * * 1-5')
+        self.assertEqual(cron.minutos, {0, 15, 30, 45})
+        self.assertEqual(cron.horas, set(range(9, 18)))
+        self.assertEqual(cron.dias_semana, {1, 2, 3, 4, 5})
+        self.assertEqual(programador.Cron('0 0 * * 7').dias_semana, {0})
+        self.assertEqual(programador.Cron('0 0 1-10/3,20 * *').dias, {1, 4, 7, 10, 20})
+
+    def test_expresiones_invalidas(self):
+        for expresion in ('* * * *', '60 * * * *', '0 24 * * *', '5-1 * * * *', '*/0 * * * *', '0 0 0 * *', 'a * * * *'):
+            with self.assertRaises(ValueError, msg=expresion):
+                programador.Cron(expresion)
+
+    def test_dia_o_dia_de_semana(self):
+        cron = programador.Cron('0 0 1 * 1')
+        self.assertTrue(cron.coincide(datetime(2025, 9, 8)))   # lunes
+        self.assertTrue(cron.coincide(datetime(2025, 10, 1)))  # miércoles 1
+        self.assertFalse(cron.coincide(datetime(2025, 9, 9)))
+        # Con un solo campo restringido deben cumplirse ambos
+        self.assertFalse(programador.Cron('0 0 * * 1').coincide(datetime(2025, 10, 1)))
+
+    def test_anterior(self):
+        cron = programador.Cron('0 9,13 * * *')
+        self.assertEqual(cron.anterior(datetime(2025, 9, 5, 12, 30, 45)), datetime(2025, 9, 5, 9, 0))
+        self.assertEqual(cron.anterior(datetime(2025, 9, 5, 13, 0)), datetime(2025, 9, 5, 13, 0))
+        self.assertEqual(cron.anterior(datetime(2025, 9, 5, 8, 0)), datetime(2025, 9, 4, 13, 0))
+        self.assertIsNone(programador.Cron('0 0 30 2 *').anterior(datetime(2025, 9, 5)))
+
+
+    def test_anterior_igual_al_recorrido_minuto_a_minuto(self):
+        def recorrido(cron, momento, dias=programador.DIAS_RECUPERACION):
+            actual = momento.replace(second=0, microsecond=0)
+            limite = actual - timedelta(days=dias)
+            while actual >= limite:
+                if cron.coincide(actual):
+                    return actual
+                actual -= timedelta(minutes=1)
+            return None
+
+        expresiones = [tarea['cron'] for tarea in programador.TAREAS_POR_DEFECTO] + [
+            '0 0 1 * 1', '*/7 3-5 */2 * 1-5', '59 23 31 * *', '15,45 * * 6 7',
+        ]
+        momentos = [datetime(2025, 9, 20, 10, 7, 30), datetime(2025, 9, 1, 0, 19), datetime(2025, 9, 1, 0, 20),
+                    datetime(2025, 3, 1, 0, 0), datetime(2025, 6, 9, 4, 3)]
+        for expresion in expresiones:
+            cron = programador.Cron(expresion)
+            for momento in momentos:
+                self.assertEqual(cron.anterior(momento), recorrido(cron, momento), msg=f'{expresion} {momento}')
+
+
+class TareaTests(SimpleTestCase):
+
+    def momento(self, *args):
+        return timezone.make_aware(datetime(*args))
+
+    def test_vencida_por_cron(self):
+        tarea = programador.Tarea('tasa', 'actualizar_tasa_cambio', cron='0 9,13 * * *')
+        ahora = self.momento(2025, 9, 5, 12, 30)
+        self.assertTrue(tarea.vencida(ahora, None))
+        self.assertTrue(tarea.vencida(ahora, self.momento(2025, 9, 4, 13, 0)))
+        self.assertFalse(tarea.vencida(ahora, self.momento(2025, 9, 5, 9, 0, 2)))
+
+    def test_vencida_por_intervalo(self):
+        tarea = programador.Tarea('copia', 'actualizar_copia_reportes', intervalo=60)
+        ahora = self.momento(2025, 9, 5, 12, 30)
+        self.assertTrue(tarea.vencida(ahora, None))
+        self.assertFalse(tarea.vencida(ahora, ahora - timedelta(seconds=30)))
+        self.assertTrue(tarea.vencida(ahora, ahora - timedelta(seconds=60)))
+
+    def test_intervalo_o_cron(self):
+        with self.assertRaises(ValueError):
+            programador.Tarea('x', 'comando')
+        with self.assertRaises(ValueError):
+            programador.Tarea('x', 'comando', intervalo=60, cron='* * * * *')
+        # Las tareas por defecto se pueden construir
+        self.assertTrue(programador.tareas_configuradas())
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class AjusteStockTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+
+    def stock(self, producto):
+        return Producto.objects.values_list('stock', flat=True).get(pk=producto.pk)
+
+    def test_ajuste_de_lote(self):
+        self.assertEqual(Producto.ajustar_stock_lote({self.arroz.pk: Decimal('-2.5'), self.harina.pk: 10}), 2)
+        self.assertEqual(self.stock(self.arroz), Decimal('97.500'))
+        self.assertEqual(self.stock(self.harina), Decimal('110.000'))
+
+    def test_fuera_de_rango_revierte_todo_el_lote(self):
+        with self.assertRaises(ValidationError):
+            Producto.ajustar_stock_lote({self.arroz.pk: -5, self.harina.pk: -101})
+        self.assertEqual(self.stock(self.arroz), Decimal('100.000'))
+        self.assertEqual(self.stock(self.harina), Decimal('100.000'))
+
+        with self.assertRaises(ValidationError):
+            Producto.ajustar_stock_lote({self.arroz.pk: Producto.STOCK_MAXIMO})
+        self.assertEqual(self.stock(self.arroz), Decimal('100.000'))
+
+    def test_revierte_lotes_anteriores(self):
+        # El producto fuera de rango está en el segundo UPDATE: el primero también se revierte
+        with mock.patch.object(Producto, 'LOTE_STOCK', 1), self.assertRaises(ValidationError):
+            Producto.ajustar_stock_lote({self.arroz.pk: -5, self.harina.pk: -101})
+        self.assertEqual(self.stock(self.arroz), Decimal('100.000'))
+
+    def test_ajustar_stock(self):
+        producto = Producto.objects.get(pk=self.arroz.pk)
+        producto.ajustar_stock(-1)
+        self.assertEqual(producto.stock, Decimal('99.000'))
+        with self.assertRaises(ValidationError):
+            producto.ajustar_stock(-200)
+        self.assertEqual(self.stock(self.arroz), Decimal('99.000'))
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class PreciosVigentesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        cls.enero = timezone.make_aware(datetime(2025, 1, 10, 12))
+        cls.marzo = timezone.make_aware(datetime(2025, 3, 10, 12))
+        HistorialPrecio.objects.bulk_create([
+            HistorialPrecio(
+                producto=cls.arroz, fecha=cls.enero, origen='ajuste',
+                precio_anterior=Decimal('2.00'), precio_nuevo=Decimal('2.25'),
+                precio_compra_anterior=Decimal('1.60'), precio_compra_nuevo=Decimal('1.80'),
+            ),
+            HistorialPrecio(
+                producto=cls.arroz, fecha=cls.marzo, origen='edicion',
+                precio_anterior=Decimal('2.25'), precio_nuevo=Decimal('2.50'),
+                precio_compra_anterior=Decimal('1.80'), precio_compra_nuevo=Decimal('2.00'),
+            ),
+        ])
+
+    def test_precio_que_regia_en_cada_fecha(self):
+        diciembre = timezone.make_aware(datetime(2024, 12, 1))
+        febrero = timezone.make_aware(datetime(2025, 2, 1))
+        abril = timezone.make_aware(datetime(2025, 4, 1))
+        pares = [(self.arroz, diciembre), (self.arroz, febrero), (self.arroz, abril),
+                 (self.arroz, self.enero), (self.harina, diciembre)]
+
+        with self.assertNumQueries(1):
+            vigentes = HistorialPrecio.precios_vigentes(pares)
+
+        self.assertEqual(vigentes[(self.arroz.pk, diciembre)], (Decimal('2.00'), Decimal('1.60')))
+        self.assertEqual(vigentes[(self.arroz.pk, febrero)], (Decimal('2.25'), Decimal('1.80')))
+        self.assertEqual(vigentes[(self.arroz.pk, abril)], (self.arroz.precio, self.arroz.precio_compra))
+        # Un cambio registrado en el mismo instante ya rige
+        self.assertEqual(vigentes[(self.arroz.pk, self.enero)], (Decimal('2.25'), Decimal('1.80')))
+        # Sin cambios: el precio actual
+        self.assertEqual(vigentes[(self.harina.pk, diciembre)], (self.harina.precio, self.harina.precio_compra))
+
+    def test_sin_pares(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(HistorialPrecio.precios_vigentes([]), {})
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class RegistroVentasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        cls.lineas = [(cls.arroz.pk, Decimal('2')), (cls.harina.pk, Decimal('1'))]
+
+    def registrar(self, lineas=None, clave='caja1-000001', **kwargs):
+        return registro_ventas.registrar(self.empleado, self.cliente.pk, lineas or self.lineas, clave=clave, **kwargs)
+
+    def stock(self, producto):
+        return Producto.objects.values_list('stock', flat=True).get(pk=producto.pk)
+
+    def test_venta_de_contado(self):
+        venta, totales, creada = self.registrar()
+        self.assertTrue(creada)
+        # 2 × 2.50 + 1.99 = 6.99 + IVA 1.12
+        self.assertEqual((totales['subtotal'], totales['iva'], totales['total']),
+                         (Decimal('6.99'), Decimal('1.12'), Decimal('8.11')))
+        self.assertEqual(venta.factura.total_fac, Decimal('8.11'))
+        self.assertEqual(venta.monto_pagado, Decimal('8.11'))
+        self.assertEqual(self.stock(self.arroz), Decimal('98.000'))
+        self.assertEqual(venta.detalles_ganancia.count(), 2)
+
+    def test_reintento_con_la_misma_clave(self):
+        original, totales, creada = self.registrar()
+        # El orden y la escritura de las cantidades no cambian el contenido
+        repetida, totales, creada = self.registrar(
+            lineas=[(self.harina.pk, Decimal('1.000')), (self.arroz.pk, Decimal('1')), (self.arroz.pk, Decimal('1'))]
+        )
+        self.assertFalse(creada)
+        self.assertIsNone(totales)
+        self.assertEqual(repetida.pk, original.pk)
+        self.assertEqual(Ventas.objects.count(), 1)
+        self.assertEqual(self.stock(self.arroz), Decimal('98.000'))
+
+    def test_clave_con_otro_contenido(self):
+        original, totales, creada = self.registrar()
+        with self.assertRaises(registro_ventas.ClaveEnConflicto) as error:
+            self.registrar(lineas=[(self.arroz.pk, Decimal('3'))])
+        self.assertEqual(error.exception.venta.pk, original.pk)
+        with self.assertRaises(registro_ventas.ClaveEnConflicto):
+            self.registrar(credito=True)
+
+    def test_duplicado_concurrente(self):
+        original, totales, creada = self.registrar()
+        # Otra petición con la misma clave pasó la búsqueda antes de que la
+        # primera confirmara: el índice único rechaza la segunda venta
+        real = registro_ventas.venta_con_clave
+        with mock.patch.object(registro_ventas, 'venta_con_clave', side_effect=[None, real('caja1-000001')]):
+            venta, totales, creada = self.registrar()
+        self.assertFalse(creada)
+        self.assertEqual(venta.pk, original.pk)
+        self.assertEqual(Ventas.objects.count(), 1)
+        self.assertEqual(self.stock(self.arroz), Decimal('98.000'))
+
+        with mock.patch.object(registro_ventas, 'venta_con_clave', side_effect=[None, real('caja1-000001')]):
+            with self.assertRaises(registro_ventas.ClaveEnConflicto):
+                self.registrar(lineas=[(self.arroz.pk, Decimal('3'))])
+        self.assertEqual(self.stock(self.arroz), Decimal('98.000'))
+
+    def test_error_no_deja_nada_escrito(self):
+        with self.assertRaises(registro_ventas.ErrorVenta):
+            self.registrar(lineas=[(self.arroz.pk, Decimal('1')), (self.harina.pk, Decimal('500'))])
+        self.assertFalse(Ventas.objects.exists())
+        self.assertEqual(self.stock(self.arroz), Decimal('100.000'))
+
+    def test_api(self):
+        user = User.objects.create_user('caja1', password='clave-segura')
+        Empleado.objects.filter(pk=self.empleado.pk).update(user=user)
+        self.client.force_login(user)
+
+        def enviar(**datos):
+            cuerpo = {'clave': 'api-0000001', 'cliente': self.cliente.pk, 'tipo_venta': 'contado',
+                      'lineas': [[self.arroz.pk, '2']], **datos}
+            return self.client.post(reverse('black_invoices:venta_api'), json.dumps(cuerpo), content_type='application/json')
+
+        self.assertEqual(enviar().status_code, 201)
+        respuesta = enviar(lineas=[[self.arroz.pk, '2.000']])
+        self.assertEqual((respuesta.status_code, respuesta.json()['estado']), (200, 'repetida'))
+        self.assertEqual(enviar(lineas=[[self.arroz.pk, '5']]).status_code, 409)
+        self.assertEqual(enviar(clave=None).status_code, 400)
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class LibroVentasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        TasaCambio.objects.create(fecha=date(2025, 8, 20), tasa_usd_ves=Decimal('95'))
+        TasaCambio.objects.create(fecha=date(2025, 9, 4), tasa_usd_ves=Decimal('103.3333'))
+        TasaCambio.objects.create(fecha=date(2025, 10, 1), tasa_usd_ves=Decimal('110'))
+
+        fechas = [
+            datetime(2025, 9, 3, 23, 30),   # 4 de septiembre en UTC, 3 en Caracas
+            datetime(2025, 9, 4, 0, 30),
+            datetime(2025, 9, 10, 10, 0),
+            datetime(2025, 10, 1, 9, 0),    # otro mes
+        ]
+        cls.ventas = []
+        for fecha in fechas:
+            venta = registro_ventas.registrar(
+                cls.empleado, cls.cliente.pk, [(cls.arroz.pk, Decimal('2')), (cls.harina.pk, Decimal('1'))]
+            )[0]
+            Factura.objects.filter(pk=venta.factura_id).update(fecha_fac=timezone.make_aware(fecha))
+            cls.ventas.append(venta)
+        Ventas.objects.filter(pk=cls.ventas[2].pk).update(status=referencias.estado_cancelada())
+
+    def test_tasa_vigente_en_la_fecha_de_cada_factura(self):
+        libro = libro_ventas.LibroVentas(date(2025, 9, 1))
+        filas = list(libro)
+
+        self.assertEqual([fila[1] for fila in filas], [date(2025, 9, 3), date(2025, 9, 4), date(2025, 9, 10)])
+        self.assertEqual([fila[9] for fila in filas], [Decimal('95'), Decimal('103.3333'), Decimal('103.3333')])
+        self.assertEqual(filas[0][10:], [Decimal('664.05'), Decimal('106.40'), Decimal('770.45')])
+        self.assertEqual((libro.facturas, libro.anuladas), (2, 1))
+
+    def test_anuladas_en_cero_y_columnas_que_cuadran(self):
+        libro = libro_ventas.LibroVentas(date(2025, 9, 1))
+        filas = list(libro)
+
+        self.assertEqual(filas[2][5], 'Anulada')
+        self.assertEqual(filas[2][6:9], [Decimal('0')] * 3)
+        for fila in filas + [libro.fila_totales()]:
+            self.assertEqual(fila[8], fila[6] + fila[7])
+            self.assertEqual(fila[12], fila[10] + fila[11])
+        self.assertEqual(libro.totales['total'], Decimal('16.22'))
+
+    def test_sin_tasa_anterior(self):
+        TasaCambio.objects.filter(fecha__lt=date(2025, 9, 4)).delete()
+        filas = list(libro_ventas.LibroVentas(date(2025, 9, 1)))
+        self.assertIsNone(filas[0][9])
+        self.assertIsNone(filas[0][12])
+        self.assertEqual(filas[1][9], Decimal('103.3333'))
+
+    def test_csv(self):
+        lineas = list(libro_ventas.csv_lineas(libro_ventas.LibroVentas(date(2025, 9, 1))))
+        self.assertTrue(lineas[0].startswith('\ufeffN°,Fecha'))
+        self.assertEqual(len(lineas), 5)
+        self.assertIn('03/09/2025', lineas[1])
+        self.assertIn('Totales', lineas[-1])
+
+
+class FormatosTests(SimpleTestCase):
+
+    def test_parsear_monto(self):
+        casos = {
+            '1.234,56': Decimal('1234.56'), '1,234.56': Decimal('1234.56'), '12,5': Decimal('12.5'),
+            'Bs 1.000,00': Decimal('1000.00'), '$ 7.25': Decimal('7.25'), '': None, 'N/A': None,
+        }
+        for texto, esperado in casos.items():
+            self.assertEqual(formatos.parsear_monto(texto), esperado, msg=texto)
+
+    def test_normalizar(self):
+        self.assertEqual(formatos.normalizar('  Precio_de  Compra '), 'precio de compra')
+        self.assertEqual(formatos.normalizar('Cédula/RIF'), 'cedula/rif')
+        self.assertEqual(formatos.normalizar(None), '')
+
+
+class ControlGananciasTests(SimpleTestCase):
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, 'control.json')
+
+    def test_tramos_terminados_fuera_de_orden(self):
+        control = ganancias_historicas.Control(self.ruta, 1, 50, 10)
+        self.assertEqual(list(control.tramos_pendientes())[-1], (41, 51))
+
+        control.marcar(21)
+        control.marcar(31)
+        self.assertEqual((control.continuo, control.terminados), (1, {21, 31}))
+        self.assertEqual([inicio for inicio, fin in control.tramos_pendientes()], [1, 11, 41])
+
+        control.marcar(1)
+        self.assertEqual((control.continuo, control.terminados), (11, {21, 31}))
+        control.marcar(11)
+        self.assertEqual((control.continuo, control.terminados), (41, set()))
+        self.assertFalse(control.terminado())
+        control.marcar(41)
+        self.assertTrue(control.terminado())
+
+    def test_continuar_desde_el_archivo(self):
+        control = ganancias_historicas.Control(self.ruta, 1, 50, 10)
+        control.marcar(1)
+        control.marcar(31)
+
+        cargado = ganancias_historicas.Control.cargar(self.ruta)
+        self.assertEqual((cargado.desde, cargado.hasta, cargado.tamano), (1, 50, 10))
+        self.assertEqual((cargado.continuo, cargado.terminados), (11, {31}))
+        self.assertEqual(list(cargado.tramos_pendientes()), [(11, 21), (21, 31), (41, 51)])
+
+    def test_sin_archivo_o_danado(self):
+        self.assertIsNone(ganancias_historicas.Control.cargar(self.ruta))
+        with open(self.ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write('{"desde": 1,')
+        self.assertIsNone(ganancias_historicas.Control.cargar(self.ruta))
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class GananciasHistoricasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        cls.ventas = [
+            registro_ventas.registrar(cls.empleado, cls.cliente.pk, [(cls.arroz.pk, Decimal('2')), (cls.harina.pk, Decimal('1'))])[0]
+            for _ in range(4)
+        ]
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, 'control.json')
+        # Las ventas 2 y 4 quedan como ventas viejas, sin registros de ganancia
+        DetalleGanancia.objects.filter(venta__in=[self.ventas[1], self.ventas[3]]).delete()
+
+    def test_tramo_omite_ventas_con_registros(self):
+        primera, ultima = self.ventas[0].pk, self.ventas[-1].pk
+        existentes = set(DetalleGanancia.objects.values_list('pk', flat=True))
+
+        resultado = ganancias_historicas.procesar_tramo(primera, ultima + 1)
+
+        self.assertEqual(resultado, {'ventas': 2, 'registros': 4, 'sin_detalles': 0})
+        self.assertEqual(set(DetalleGanancia.objects.filter(pk__in=existentes).values_list('pk', flat=True)), existentes)
+        for venta in self.ventas:
+            self.assertEqual(venta.detalles_ganancia.count(), 2)
+        nuevo = DetalleGanancia.objects.get(venta=self.ventas[1], producto=self.arroz)
+        self.assertEqual((nuevo.precio_venta_unitario, nuevo.precio_compra_unitario), (Decimal('2.50'), Decimal('2.00')))
+
+    def test_ejecutar_continua_desde_el_control(self):
+        primera, ultima = self.ventas[0].pk, self.ventas[-1].pk
+        # Una ejecución anterior terminó el tramo de las dos primeras ventas
+        control = ganancias_historicas.Control(self.ruta, primera, ultima, 2, continuo=primera + 2)
+        control.guardar()
+
+        with mock.patch.object(ganancias_historicas, 'procesar_tramo', wraps=ganancias_historicas.procesar_tramo) as tramo:
+            totales = ganancias_historicas.ejecutar(ganancias_historicas.Control.cargar(self.ruta))
+
+        tramo.assert_called_once_with(primera + 2, ultima + 1, False)
+        self.assertEqual(totales, {'ventas': 1, 'registros': 2, 'sin_detalles': 0, 'tramos': 1})
+        self.assertFalse(self.ventas[1].detalles_ganancia.exists())
+        self.assertTrue(ganancias_historicas.Control.cargar(self.ruta).terminado())
+
+    def test_dry_run_no_escribe(self):
+        call_command('poblar_ganancias_historicas', '--dry-run', '--batch-size', '2', '--control', self.ruta, stdout=io.StringIO())
+        self.assertFalse(os.path.exists(self.ruta))
+        self.assertEqual(ganancias_historicas.pendientes().count(), 2)
+
+        salida = io.StringIO()
+        call_command('poblar_ganancias_historicas', '--batch-size', '2', '--control', self.ruta, stdout=salida)
+        self.assertIn('Registros creados: 4', salida.getvalue())
+        self.assertFalse(os.path.exists(self.ruta))
+        self.assertEqual(ganancias_historicas.pendientes().count(), 0)
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class ReposicionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        venta = registro_ventas.registrar(
+            cls.empleado, cls.cliente.pk, [(cls.arroz.pk, Decimal('2')), (cls.harina.pk, Decimal('1'))]
+        )[0]
+        venta.detalles_ganancia.update(fecha_venta=timezone.make_aware(datetime(2025, 9, 10, 12)))
+
+    def guardar(self, producto, hasta, serie):
+        ReposicionProducto.objects.create(producto=producto, hasta=hasta, serie=serie)
+
+    def serie(self, producto):
+        return ReposicionProducto.objects.get(producto=producto).serie
+
+    def test_calculo_inicial(self):
+        resultado = reposicion.calcular(hasta=date(2025, 9, 10))
+
+        self.assertEqual(resultado, {'productos': 2, 'dias': reposicion.VENTANA_DIAS,
+                                     'desde': date(2025, 6, 13), 'hasta': date(2025, 9, 10)})
+        fila = ReposicionProducto.objects.get(producto=self.arroz)
+        self.assertEqual(len(fila.serie), reposicion.VENTANA_DIAS)
+        self.assertEqual(fila.serie[-1], 2.0)
+        # 2 unidades en 7 días y en 30: la velocidad es el mayor de los promedios
+        self.assertEqual((fila.promedio_7, fila.promedio_30, fila.velocidad),
+                         (Decimal('0.286'), Decimal('0.067'), Decimal('0.286')))
+
+    def test_al_dia_o_fecha_anterior(self):
+        reposicion.calcular(hasta=date(2025, 9, 10))
+        antes = list(ReposicionProducto.objects.values_list('producto_id', 'hasta', 'serie', 'calculado_en'))
+
+        for hasta in (date(2025, 9, 10), date(2025, 9, 1)):
+            self.assertEqual(reposicion.calcular(hasta=hasta)['dias'], 0)
+        self.assertEqual(list(ReposicionProducto.objects.values_list('producto_id', 'hasta', 'serie', 'calculado_en')), antes)
+
+    def test_continua_desde_la_serie_mas_atrasada(self):
+        self.guardar(self.arroz, date(2025, 9, 9), [0.0] * 89 + [1.0])
+        self.guardar(self.harina, date(2025, 9, 7), [0.0] * 90)
+
+        resultado = reposicion.calcular(hasta=date(2025, 9, 10))
+
+        self.assertEqual((resultado['desde'], resultado['dias']), (date(2025, 9, 8), 3))
+        # Cada serie suma solo los días que le faltaban
+        self.assertEqual(self.serie(self.arroz)[-3:], [0.0, 1.0, 2.0])
+        self.assertEqual(self.serie(self.harina)[-4:], [0.0, 0.0, 0.0, 1.0])
+        self.assertTrue(all(len(self.serie(p)) == reposicion.VENTANA_DIAS for p in (self.arroz, self.harina)))
+
+    def test_producto_nuevo(self):
+        self.guardar(self.arroz, date(2025, 9, 9), [0.0] * 90)
+
+        resultado = reposicion.calcular(hasta=date(2025, 9, 10))
+
+        self.assertEqual((resultado['productos'], resultado['dias']), (2, 1))
+        serie = self.serie(self.harina)
+        self.assertEqual((len(serie), serie[-1], sum(serie)), (reposicion.VENTANA_DIAS, 1.0, 1.0))
+
+    def test_ventana_completa_si_el_hueco_es_grande(self):
+        hasta = date(2025, 9, 10)
+        self.guardar(self.arroz, hasta - timedelta(days=reposicion.VENTANA_DIAS), [5.0] * 90)
+        self.guardar(self.harina, hasta - timedelta(days=1), [5.0] * 90)
+
+        resultado = reposicion.calcular(hasta=hasta)
+
+        self.assertEqual(resultado['dias'], reposicion.VENTANA_DIAS)
+        self.assertEqual(sum(self.serie(self.arroz)), 2.0)
+        self.assertEqual(sum(self.serie(self.harina)), 1.0)
+
+    def test_no_retrocede_series_mas_adelantadas(self):
+        adelantada = [0.0] * 88 + [3.0, 4.0]
+        self.guardar(self.arroz, date(2025, 9, 12), adelantada)
+        self.guardar(self.harina, date(2025, 9, 8), [0.0] * 90)
+
+        resultado = reposicion.calcular(hasta=date(2025, 9, 10))
+
+        self.assertEqual(resultado['productos'], 1)
+        arroz = ReposicionProducto.objects.get(producto=self.arroz)
+        self.assertEqual((arroz.hasta, arroz.serie), (date(2025, 9, 12), adelantada))
+        self.assertEqual(ReposicionProducto.objects.get(producto=self.harina).hasta, date(2025, 9, 10))
+
+        # Un cálculo completo sí rehace la serie hasta la fecha pedida
+        reposicion.calcular(hasta=date(2025, 9, 10), completo=True)
+        arroz.refresh_from_db()
+        self.assertEqual((arroz.hasta, arroz.serie[-1], sum(arroz.serie)), (date(2025, 9, 10), 2.0, 2.0))
+
+
+class PuntajesTests(SimpleTestCase):
+
+    def test_quintiles_en_el_orden_recibido(self):
+        self.assertEqual(segmentos.puntajes([50, 10, 40, 20, 30]), [5, 1, 4, 2, 3])
+        self.assertEqual(segmentos.puntajes(list(range(10))), [1, 1, 2, 2, 3, 3, 4, 4, 5, 5])
+
+    def test_empates_reciben_el_puntaje_menor(self):
+        self.assertEqual(segmentos.puntajes([1, 2, 2, 3, 4]), [1, 2, 2, 4, 5])
+        self.assertEqual(segmentos.puntajes([7, 7, 7, 7]), [1, 1, 1, 1])
+        self.assertEqual(segmentos.puntajes([0, 0, 0, 3]), [1, 1, 1, 4])
+
+    def test_uno_o_ningun_valor(self):
+        self.assertEqual(segmentos.puntajes([42]), [1])
+        self.assertEqual(segmentos.puntajes([]), [])
+
+    def test_reglas_en_orden(self):
+        self.assertEqual(segmentos.segmento(5, 5, 5, 0), 'sin_compras')
+        self.assertEqual(segmentos.segmento(5, 5, 5, 1), 'campeones')
+        self.assertEqual(segmentos.segmento(4, 1, 1, 1), 'nuevos')
+        self.assertEqual(segmentos.segmento(4, 4, 1, 2), 'leales')
+        self.assertEqual(segmentos.segmento(3, 1, 1, 2), 'activos')
+        self.assertEqual(segmentos.segmento(2, 5, 1, 9), 'en_riesgo')
+        self.assertEqual(segmentos.segmento(2, 1, 1, 1), 'decayendo')
+        self.assertEqual(segmentos.segmento(1, 1, 1, 1), 'inactivos')
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class SegmentosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.sin_compras, cls.arroz, cls.harina = crear_datos()
+        cls.ahora = timezone.make_aware(datetime(2025, 9, 30, 12))
+        # Días desde cada compra (todas de 1 arroz, 2.90 con IVA)
+        compras = {
+            'campeon': [1, 5, 20],
+            'nuevo': [2],
+            'leal': [10, 30],
+            'decayendo': [200],
+            'fuera_de_ventana': [400],
+        }
+        cls.clientes = {}
+        for numero, (nombre, dias) in enumerate(compras.items(), start=1):
+            cliente = Cliente.objects.create(
+                tipo_documento='V', numero_documento=f'2000000{numero}', nombre_completo=nombre,
+                telefono='04140000000', direccion='Guanare',
+            )
+            cls.clientes[nombre] = cliente
+            for atras in dias:
+                venta = registro_ventas.registrar(cls.empleado, cliente.pk, [(cls.arroz.pk, Decimal('1'))])[0]
+                Ventas.objects.filter(pk=venta.pk).update(fecha_venta=cls.ahora - timedelta(days=atras))
+
+    def segmento(self, cliente):
+        return ClienteSegmento.objects.get(cliente=cliente)
+
+    def test_segmentos(self):
+        resumen = segmentos.calcular(ahora=self.ahora)
+
+        self.assertEqual(resumen, {'campeones': 1, 'nuevos': 1, 'leales': 1, 'decayendo': 1,
+                                   'inactivos': 1, 'sin_compras': 1})
+        for nombre, esperado in (('campeon', 'campeones'), ('nuevo', 'nuevos'), ('leal', 'leales'),
+                                 ('decayendo', 'decayendo'), ('fuera_de_ventana', 'inactivos')):
+            self.assertEqual(self.segmento(self.clientes[nombre]).segmento, esperado, msg=nombre)
+        self.assertEqual(self.segmento(self.sin_compras).segmento, 'sin_compras')
+
+    def test_empate_en_frecuencia_y_monto(self):
+        segmentos.calcular(ahora=self.ahora)
+        nuevo, decayendo = self.segmento(self.clientes['nuevo']), self.segmento(self.clientes['decayendo'])
+        self.assertEqual((nuevo.puntaje_frecuencia, nuevo.puntaje_monto), (2, 2))
+        self.assertEqual((decayendo.puntaje_frecuencia, decayendo.puntaje_monto), (2, 2))
+
+    def test_sin_compras_en_la_ventana(self):
+        segmentos.calcular(ahora=self.ahora)
+        fila = self.segmento(self.clientes['fuera_de_ventana'])
+        self.assertEqual((fila.compras, fila.monto, fila.compras_total, fila.monto_total),
+                         (0, Decimal('0'), 1, Decimal('2.90')))
+        self.assertEqual((fila.puntaje_recencia, fila.puntaje_frecuencia, fila.puntaje_monto), (1, 1, 1))
+        self.assertEqual(fila.dias_sin_comprar, 400)
+
+    def test_un_solo_cliente_con_compras(self):
+        Ventas.objects.exclude(factura__cliente=self.clientes['nuevo']).delete()
+        resumen = segmentos.calcular(ahora=self.ahora)
+        # Sin otros clientes con quienes comparar, todos los puntajes son 1
+        fila = self.segmento(self.clientes['nuevo'])
+        self.assertEqual((fila.puntaje_recencia, fila.puntaje_frecuencia, fila.puntaje_monto), (1, 1, 1))
+        self.assertEqual(fila.segmento, 'inactivos')
+        self.assertEqual(resumen, {'inactivos': 1, 'sin_compras': 5})
+
+
+@override_settings(CACHES=CACHES_PRUEBAS, COMISIONES={'base': 'ventas', 'tramos': [(0, 1), (5, 2)]})
+class ComisionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.empleado, cls.cliente, cls.arroz, cls.harina = crear_datos()
+        # Monto vendido sin IVA: 2 × 2.50 + 1.99 = 6.99
+        lineas = [(cls.arroz.pk, Decimal('2')), (cls.harina.pk, Decimal('1'))]
+        cls.vieja = registro_ventas.registrar(cls.empleado, cls.cliente.pk, lineas)[0]
+        cls.vieja.detalles_ganancia.update(fecha_venta=timezone.make_aware(datetime(2025, 8, 15, 12)))
+        cls.actual = registro_ventas.registrar(cls.empleado, cls.cliente.pk, lineas)[0]
+
+    def test_porcentaje_del_tramo_mas_alto_alcanzado(self):
+        tramos = [(0, 1), (2000, 2), (5000, 3)]
+        for monto, esperado in ((Decimal('0'), 1), (Decimal('1999.99'), 1), (Decimal('2000'), 2),
+                                (Decimal('4999.99'), 2), (Decimal('5000'), 3), (Decimal('80000'), 3)):
+            self.assertEqual(comisiones.porcentaje(monto, tramos), Decimal(esperado), msg=monto)
+        self.assertEqual(comisiones.porcentaje(Decimal('3000'), [(5000, 3), (0, 1), (2000, 2.5)]), Decimal('2.5'))
+        self.assertEqual(comisiones.porcentaje(Decimal('500'), [(1000, 1)]), Decimal('0'))
+
+    def test_mes_cerrado_congelado(self):
+        agosto = date(2025, 8, 1)
+        filas, congelado = comisiones.estado_cuenta(agosto)
+
+        self.assertTrue(congelado)
+        self.assertEqual(len(filas), 1)
+        self.assertEqual((filas[0].monto_ventas, filas[0].porcentaje_comision, filas[0].comision),
+                         (Decimal('6.99'), Decimal('2'), Decimal('0.14')))
+        self.assertEqual(ComisionEmpleado.objects.count(), 1)
+        self.assertEqual(comisiones.congelar(), 0)
+
+        # Ni las cancelaciones ni los tramos nuevos cambian un mes congelado
+        Ventas.objects.filter(pk=self.vieja.pk).update(status=referencias.estado_cancelada())
+        with self.settings(COMISIONES={'base': 'ventas', 'tramos': [(0, 5)]}):
+            filas, congelado = comisiones.estado_cuenta(agosto)
+        self.assertEqual((filas[0].ventas, filas[0].canceladas, filas[0].comision), (1, 0, Decimal('0.14')))
+
+    def test_mes_en_curso_se_calcula_al_consultar(self):
+        filas, congelado = comisiones.estado_cuenta(reportes.mes_actual())
+        self.assertFalse(congelado)
+        self.assertEqual((filas[0].ventas, filas[0].comision), (1, Decimal('0.14')))
+        self.assertFalse(ComisionEmpleado.objects.filter(periodo=reportes.mes_actual()).exists())
+
+        Ventas.objects.filter(pk=self.actual.pk).update(status=referencias.estado_cancelada())
+        filas, congelado = comisiones.estado_cuenta(reportes.mes_actual())
+        self.assertEqual((filas[0].ventas, filas[0].canceladas, filas[0].monto_cancelado, filas[0].comision),
+                         (0, 1, Decimal('6.99'), Decimal('0.00')))
+
+    def test_empleado_no_numerico(self):
+        user = User.objects.create_user('admin', password='clave-segura')
+        NivelAcceso.objects.filter(pk=self.empleado.nivel_acceso_id).update(nombre='Administrador')
+        Empleado.objects.filter(pk=self.empleado.pk).update(user=user)
+        self.client.force_login(user)
+
+        pagina = reverse('black_invoices:reporte_comisiones')
+        self.assertEqual(self.client.get(pagina, {'empleado': self.empleado.pk}).status_code, 200)
+        self.assertEqual(self.client.get(pagina, {'empleado': 'abc'}).status_code, 404)
+        exportar = reverse('black_invoices:reporte_comisiones_exportar', args=['csv'])
+        self.assertEqual(self.client.get(exportar, {'empleado': '1 OR 1=1'}).status_code, 404)
+
+        lineas = b''.join(self.client.get(exportar, {'periodo': '2025-08'}).streaming_content).decode().splitlines()
+        self.assertTrue(lineas[0].startswith('\ufeffPeríodo,Empleado'))
+        self.assertEqual(lineas[1], '08/2025,Ana Pérez,1,3.000,6.99,1.49,0,0.00,2.00,0.14')
+
+
+class ReportesTests(SimpleTestCase):
+
+    def test_meses(self):
+        self.assertEqual(reportes.inicio_mes(date(2025, 9, 17)), date(2025, 9, 1))
+        self.assertEqual(reportes.mes_siguiente(date(2025, 11, 1)), date(2025, 12, 1))
+        self.assertEqual(reportes.mes_siguiente(date(2025, 12, 1)), date(2026, 1, 1))
+        with mock.patch.object(timezone, 'localdate', return_value=date(2026, 2, 28)):
+            self.assertEqual(reportes.ultimos_meses(3), [date(2026, 2, 1), date(2026, 1, 1), date(2025, 12, 1)])
+
+    def test_momento_en_hora_local(self):
+        inicio = reportes.momento(date(2025, 9, 1))
+        self.assertEqual(timezone.localtime(inicio), timezone.make_aware(datetime(2025, 9, 1)))
+        # Caracas está 4 horas detrás de UTC
+        self.assertEqual(inicio.utcoffset(), timedelta(hours=-4))
+
+    def test_csv_lineas(self):
+        lineas = list(reportes.csv_lineas(['Nombre', 'Monto'], [['Pérez, Ana', '1.50'], ['Luis', '2']]))
+        self.assertEqual(lineas, ['\ufeffNombre,Monto\r\n', '"Pérez, Ana",1.50\r\n', 'Luis,2\r\n'])
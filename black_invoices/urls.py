@@ -5,15 +5,20 @@ app_name = 'black_invoices'
 
 urlpatterns = [
     path('', views.DashboardView.as_view(), name='inicio'),
+    path('dashboard/widgets/<str:nombre>/', views.DashboardWidgetView.as_view(), name='dashboard_widget'),
+    path('eventos/', views.EventosView.as_view(), name='eventos'),
     
     path('facturas/', views.FacturaListView.as_view(), name='factura_list'),
     path('facturas/<int:pk>/pdf/', views.FacturaPDFView.as_view(), name='factura_pdf'),
     path('facturas/<int:pk>/', views.FacturaDetailView.as_view(), name='factura_detail'),
+    path('facturas/libro-ventas/', views.LibroVentasView.as_view(), name='libro_ventas'),
+    path('facturas/libro-ventas/<str:formato>/', views.LibroVentasExportarView.as_view(), name='libro_ventas_exportar'),
 
     # path('facturas/crear/', views.FacturaCreateView.as_view(), name='factura_create'),
     # # Clientes
     path('clientes/', views.ClienteListView.as_view(), name='cliente_list'),
     path('clientes/<int:pk>/', views.ClienteDetailView.as_view(), name='cliente_detail'),
+    path('clientes/segmentos/', views.ClienteSegmentosView.as_view(), name='cliente_segmentos'),
     path('clientes/editar/<int:pk>/', views.ClienteUpdateView.as_view(), name='cliente_update'),
     path('clientes/eliminar/<int:pk>/', views.ClienteDeleteView.as_view(), name='cliente_delete'),
     #Productos
@@ -22,6 +27,8 @@ urlpatterns = [
     path('productos/', views.ProductoListView.as_view(), name='producto_list'),
     path('productos/crear/', views.ProductoCreateView.as_view(), name='producto_create'),
     path('productos/<int:pk>/stock/', views.ProductoStockUpdateView.as_view(), name='producto_stock'),
+    path('productos/importar/', views.ImportarCatalogoView.as_view(), name='importar_catalogo'),
+    path('productos/ajustar-precios/', views.AjustePreciosView.as_view(), name='ajuste_precios'),
     
 
     path('clientes/crear/', views.ClienteCreateView.as_view(), name='cliente_create'),
@@ -33,6 +40,7 @@ urlpatterns = [
     path('ventas/<int:pk>/cancelar/', views.cancelar_venta, name='cancelar_venta'),
     path('ventas/pendientes/', views.VentasPendientesView.as_view(), name='ventas_pendientes'),
     path('ventas/<int:pk>/pago/', views.RegistrarPagoView.as_view(), name='registrar_pago'),
+    path('ventas/conciliacion/', views.ConciliacionBancariaView.as_view(), name='conciliacion_bancaria'),
 
     # # Empleados
     # Empleados
@@ -52,15 +60,25 @@ urlpatterns = [
     path('configuracion/importar-datos/', views.import_database_view, name='importar_datos'),
     path('productos/mas-vendidos/', views.ProductosMasVendidosView.as_view(), name='productos_mas_vendidos'),
     path('productos/mas-vendidos/pdf', views.ProductosMasVendidosPDFView.as_view(), name='productos_mas_vendidos_pdf'),
+    path('productos/reposicion/', views.ReporteReposicionView.as_view(), name='reporte_reposicion'),
     path('configuracion/tasa-cambio/', views.TasaCambioListView.as_view(), name='tasa_cambio_list'),
     path('configuracion/tasa-cambio/crear/', views.TasaCambioCreateView.as_view(), name='tasa_cambio_create'),
     path('configuracion/tasa-cambio/editar/<int:pk>/', views.TasaCambioUpdateView.as_view(), name='tasa_cambio_update'),
     path('configuracion/tasa-cambio/manual/', views.TasaCambioManualView.as_view(), name='tasa_cambio_manual'),
+    path('configuracion/tareas/', views.TareasProgramadasView.as_view(), name='tareas_programadas'),
+    path('configuracion/respaldos/', views.RespaldosView.as_view(), name='respaldos'),
+    path('configuracion/respaldos/<str:nombre>/descargar/', views.RespaldoDescargarView.as_view(), name='respaldo_descargar'),
     path('api/productos/buscar/', views.ProductoSearchAPIView.as_view(), name='producto_search_api'),
+    path('api/productos/cambios/', views.CatalogoCambiosAPIView.as_view(), name='catalogo_cambios_api'),
+    path('api/clientes/cedula/', views.buscar_cliente_por_cedula, name='cliente_cedula_api'),
+    path('api/tasa/', views.TasaActualAPIView.as_view(), name='tasa_actual_api'),
+    path('api/ventas/', views.VentaAPIView.as_view(), name='venta_api'),
     path('nota-entrega/<int:pk>/pdf/', views.NotaEntregaPDFView.as_view(), name='nota_entrega_pdf'),
     
     # Reportes de ganancias
     path('reportes/ganancias/', views.ReporteGananciasView.as_view(), name='reporte_ganancias'),
+    path('reportes/comisiones/', views.EstadoCuentaComisionesView.as_view(), name='reporte_comisiones'),
+    path('reportes/comisiones/<str:formato>/', views.ComisionesExportarView.as_view(), name='reporte_comisiones_exportar'),
 
 # URL para editar perfil
 
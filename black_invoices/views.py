@@ -1,6 +1,10 @@
 from datetime import date, datetime
 from decimal import Decimal
+import hashlib
 import json
+import logging
+import time
+import uuid
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -14,29 +18,37 @@ from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views import View
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DetailView, DeleteView, FormView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
 from black_invoices.forms.user_profile_form import UserProfileForm
 from .models import *
-from .forms.producto_forms import ProductoForm
+from .forms.producto_forms import ProductoForm, ImportarCatalogoForm, AjustePreciosForm
 from .forms.cliente_forms import ClienteForm
 from .forms.empleado_form import EmpleadoForm, AsignarUsuarioEmpleadoForm, CrearUsuarioForm
 from .forms.ventas_form import FacturaForm, DetalleFacturaFormSet
+from .forms.conciliacion_forms import EstadoCuentaForm
+from . import (
+    ajuste_precios, cache_reportes, catalogo, comisiones, copia_reportes, conciliacion, libro_ventas, precios,
+    referencias, registro_ventas, reportes, reposicion, segmentos, tablero,
+)
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core import serializers
 from django.db.models import Sum, Count, F, Max, Avg
-from django.db.models.functions import TruncMonth, TruncDay
-from datetime import datetime, timedelta
-from django.http import HttpResponse
+from django.db.models.functions import TruncMonth
+from datetime import datetime
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.platypus import Table, TableStyle
 import io
 from .mixins import EmpleadoRolMixin
+from .middleware import empleado_actual
 import os
 from django.conf import settings
 from django.core.files.storage import FileSystemStorage
@@ -44,171 +56,100 @@ from .models import *
 from django.db.models import Case, When, F, DecimalField, Value
 from decimal import Decimal
 
+logger_tablero = logging.getLogger('black_invoices.tablero')
+logger_ventas = logging.getLogger('black_invoices.ventas')
+
 ###################     Dashboard       #################
 class DashboardView(LoginRequiredMixin, TemplateView):
+    """Página del dashboard; los widgets se piden en paralelo a DashboardWidgetView"""
     template_name = 'black_invoices/home.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['titulo'] = 'Dashboard'
+        context['widgets'] = [
+            {
+                'nombre': widget.nombre,
+                'url': reverse('black_invoices:dashboard_widget', args=[widget.nombre]),
+                'destinos': list(widget.plantillas) or [widget.nombre],
+            }
+            for widget in tablero.WIDGETS.values()
+        ]
+        return context
 
-        # Fechas para filtros
-        hoy = datetime.now().date()
-        inicio_mes = hoy.replace(day=1)
-        inicio_anio = hoy.replace(month=1, day=1)
 
-        # Estadísticas generales
-        context['total_ventas_hoy'] = Factura.objects.filter(
-            fecha_fac__date=hoy
-        ).aggregate(total=Sum('total_fac'))['total'] or 0
+class DashboardWidgetView(LoginRequiredMixin, View):
+    """
+    Un widget del dashboard como JSON: {'fragmentos': {destino: html}, 'datos': ...}.
+    Responde 304 si el navegador ya tiene la misma versión (ETag).
+    """
 
-        context['total_ventas_mes'] = Factura.objects.filter(
-            fecha_fac__gte=inicio_mes
-        ).aggregate(total=Sum('total_fac'))['total'] or 0
+    def get(self, request, nombre):
+        widget = tablero.WIDGETS.get(nombre)
+        if widget is None:
+            raise Http404('Widget desconocido')
 
-        context['total_ventas_anio'] = Factura.objects.filter(
-            fecha_fac__gte=inicio_anio
-        ).aggregate(total=Sum('total_fac'))['total'] or 0
+        inicio = time.perf_counter()
+        try:
+            datos = widget.obtener(datetime.now().date())
+            cuerpo = {
+                'fragmentos': {
+                    destino: render_to_string(plantilla, datos, request)
+                    for destino, plantilla in widget.plantillas.items()
+                },
+                'datos': None if widget.plantillas else datos,
+            }
+        except Exception:
+            logger_tablero.exception('Widget %s falló después de %.1f ms', nombre, (time.perf_counter() - inicio) * 1000)
+            return JsonResponse({'error': 'Error al calcular este widget'}, status=500)
+
+        contenido = json.dumps(cuerpo, cls=DjangoJSONEncoder)
+        etag = '"%s"' % hashlib.md5(contenido.encode()).hexdigest()
+        duracion = (time.perf_counter() - inicio) * 1000
+        logger_tablero.info('Widget %s: %.1f ms', nombre, duracion)
+
+        if etag in request.headers.get('If-None-Match', ''):
+            respuesta = HttpResponseNotModified()
+        else:
+            respuesta = HttpResponse(contenido, content_type='application/json')
+        respuesta['ETag'] = etag
+        respuesta['Server-Timing'] = f'widget;dur={duracion:.1f}'
+        # El navegador siempre revalida: las ventas nuevas deben verse al recargar
+        patch_cache_control(respuesta, private=True, no_cache=True)
+        return respuesta
 
-        # Productos más vendidos
-        context['productos_top'] = DetalleFactura.objects.values(
-            'producto__nombre'
-        ).annotate(
-            total=Sum('cantidad')
-        ).order_by('-total')[:5]
 
-        # Ventas por empleado este mes
-        context['ventas_empleados'] = Factura.objects.filter(
-            fecha_fac__gte=inicio_mes
-        ).values(
-            'empleado__nombre', 'empleado__apellido'
-        ).annotate(
-            total=Sum('total_fac'),
-            cantidad=Count('id')
-        ).order_by('-total')
-
-        # Datos para gráfico de ventas por día (últimos 15 días)
-        quince_dias_atras = hoy - timedelta(days=14)
-        ventas_por_dia = Factura.objects.filter(
-            fecha_fac__date__gte=quince_dias_atras
-        ).annotate(
-            dia=TruncDay('fecha_fac')
-        ).values('dia').annotate(
-            total=Sum('total_fac')
-        ).order_by('dia')
-
-        # Formatear para Chart.js
-        labels = []
-        datos = []
-
-        for venta in ventas_por_dia:
-            labels.append(venta['dia'].strftime('%d/%m'))
-            datos.append(float(venta['total']))
-
-        context['chart_labels'] = labels
-        context['chart_data'] = datos
-
-        # Alertas de stock bajo
-        context['productos_stock_bajo'] = Producto.objects.filter(
-            stock__lte=5,  # Umbral configurable
-            activo=True
-        ).order_by('stock')
-
-        # =================== MÉTRICAS DE GANANCIAS CORREGIDAS ===================
-        from .models import DetalleGanancia, NotaEntrega
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        try:
-            # Verificar datos en DetalleGanancia
-            total_registros = DetalleGanancia.objects.count()
-            print(f"DEBUG DASHBOARD: Total registros DetalleGanancia: {total_registros}")
-            
-            # Ganancias realizadas (ventas de contado + créditos pagados)
-            ganancias_hoy = DetalleGanancia.get_ganancias_realizadas(
-                fecha_inicio=hoy, fecha_fin=hoy
-            )
-            print(f"DEBUG DASHBOARD: Ganancias hoy: {ganancias_hoy}")
-            context['ganancias_realizadas_hoy'] = ganancias_hoy
-            
-            ganancias_mes = DetalleGanancia.get_ganancias_realizadas(
-                fecha_inicio=inicio_mes
-            )
-            print(f"DEBUG DASHBOARD: Ganancias mes: {ganancias_mes}")
-            context['ganancias_realizadas_mes'] = ganancias_mes
-            
-            ganancias_anio = DetalleGanancia.get_ganancias_realizadas(
-                fecha_inicio=inicio_anio
-            )
-            print(f"DEBUG DASHBOARD: Ganancias año: {ganancias_anio}")
-            context['ganancias_realizadas_anio'] = ganancias_anio
-            
-            # Ganancias pendientes (ventas a crédito no pagadas)
-            pendientes_total = DetalleGanancia.get_ganancias_pendientes()
-            print(f"DEBUG DASHBOARD: Ganancias pendientes total: {pendientes_total}")
-            context['ganancias_pendientes_total'] = pendientes_total
-            
-            pendientes_mes = DetalleGanancia.get_ganancias_pendientes(
-                fecha_inicio=inicio_mes
-            )
-            print(f"DEBUG DASHBOARD: Ganancias pendientes mes: {pendientes_mes}")
-            context['ganancias_pendientes_mes'] = pendientes_mes
-            
-            # Ganancias totales (realizadas + pendientes)
-            context['ganancias_totales_mes'] = ganancias_mes + pendientes_mes
-            context['ganancias_totales_anio'] = ganancias_anio + pendientes_total
-            
-            # ✅ NUEVO: Margen promedio del mes
-            margen_promedio_mes = DetalleGanancia.objects.filter(
-                fecha_venta__gte=inicio_mes,
-                venta__credito=False  # Solo ventas completadas de contado
-            ).aggregate(
-                promedio=Avg('margen_porcentaje')
-            )['promedio'] or Decimal('0.00')
-            
-            context['margen_promedio_mes'] = float(margen_promedio_mes)
-            print(f"DEBUG DASHBOARD: Margen promedio mes: {margen_promedio_mes}")
-            
-            print(f"DEBUG DASHBOARD: ✅ Métricas de ganancias calculadas correctamente")
-            
-        except Exception as e:
-            print(f"ERROR DASHBOARD: Falló cálculo de ganancias: {e}")
-            # Fallback seguro con valores en cero
-            context['ganancias_realizadas_hoy'] = Decimal('0.00')
-            context['ganancias_realizadas_mes'] = Decimal('0.00')
-            context['ganancias_realizadas_anio'] = Decimal('0.00')
-            context['ganancias_pendientes_total'] = Decimal('0.00')
-            context['ganancias_pendientes_mes'] = Decimal('0.00')
-            context['ganancias_totales_mes'] = Decimal('0.00')
-            context['ganancias_totales_anio'] = Decimal('0.00')
-            context['margen_promedio_mes'] = 0.0
-        
-        # Top productos por ganancia (este mes)
-        context['productos_top_ganancia'] = DetalleGanancia.get_ganancias_por_producto(
-            fecha_inicio=inicio_mes, limit=5
+class EventosView(View):
+    """
+    Flujo Server-Sent Events con las ventas, pagos y cancelaciones que se
+    confirman (ver eventos.py). Solo funciona bajo ASGI (uvicorn/daphne):
+    bajo WSGI cada conexión ocuparía un worker, así que responde 204 y el
+    navegador deja de reconectar; las páginas siguen funcionando sin
+    actualizaciones en vivo.
+    """
+
+    async def get(self, request):
+        from django.core.handlers.asgi import ASGIRequest
+        from django.http import HttpResponseForbidden, StreamingHttpResponse
+        from . import eventos
+
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponseForbidden()
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(status=204)
+
+        ultimo_id = request.headers.get('Last-Event-ID', '')
+        respuesta = StreamingHttpResponse(
+            eventos.transmitir(int(ultimo_id) if ultimo_id.isdigit() else None),
+            content_type='text/event-stream',
         )
-        
-        # Incluir ventas a crédito en totales (notas de entrega)
-        ventas_credito_hoy = NotaEntrega.objects.filter(
-            fecha_nota__date=hoy
-        ).aggregate(total=Sum('total'))['total'] or 0
-        
-        ventas_credito_mes = NotaEntrega.objects.filter(
-            fecha_nota__gte=inicio_mes
-        ).aggregate(total=Sum('total'))['total'] or 0
-        
-        ventas_credito_anio = NotaEntrega.objects.filter(
-            fecha_nota__gte=inicio_anio
-        ).aggregate(total=Sum('total'))['total'] or 0
-        
-        # Totales combinados (facturas + notas de entrega)
-        context['total_ventas_hoy'] += ventas_credito_hoy
-        context['total_ventas_mes'] += ventas_credito_mes
-        context['total_ventas_anio'] += ventas_credito_anio
+        respuesta['Cache-Control'] = 'no-cache'
+        # Evita que un proxy (nginx) acumule los eventos antes de enviarlos
+        respuesta['X-Accel-Buffering'] = 'no'
+        return respuesta
 
-        return context
 
-        return context
 class BaseListView(LoginRequiredMixin, ListView):
     template_name = 'lista_generica.html'
     context_object_name = 'objetos'
@@ -295,6 +236,51 @@ class ClienteDetailView(LoginRequiredMixin, DetailView):
 
         return context
 
+class ClienteSegmentosView(LoginRequiredMixin, ListView):
+    """
+    Clientes por segmento RFM (ver segmentos.py), filtrables por segmento y
+    texto y ordenables por columna. Solo lee ClienteSegmento.
+    """
+    template_name = 'black_invoices/clientes/cliente_segmentos.html'
+    context_object_name = 'filas'
+    paginate_by = 50
+    ordenes = {
+        'nombre': 'cliente__nombre_completo',
+        'recencia': 'dias_sin_comprar',
+        'compras': '-compras',
+        'monto': '-monto',
+        'monto_total': '-monto_total',
+        'puntaje': '-puntaje_recencia',
+    }
+
+    def get_queryset(self):
+        filas = ClienteSegmento.objects.select_related('cliente')
+        segmento = self.request.GET.get('segmento', '')
+        if segmento in dict(ClienteSegmento.SEGMENTO_CHOICES):
+            filas = filas.filter(segmento=segmento)
+        texto = self.request.GET.get('q', '').strip()
+        if texto:
+            filas = filas.filter(Q(cliente__cedula__istartswith=texto) | Q(cliente__nombre_completo__icontains=texto))
+        orden = self.ordenes.get(self.request.GET.get('orden'), '-monto')
+        if orden == '-puntaje_recencia':
+            return filas.order_by('-puntaje_recencia', '-puntaje_frecuencia', '-puntaje_monto')
+        return filas.order_by(orden, 'cliente__nombre_completo')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['titulo'] = 'Segmentos de Clientes'
+        conteos = dict(ClienteSegmento.objects.values_list('segmento').annotate(total=Count('id')).order_by())
+        context['segmentos'] = [
+            {'clave': clave, 'nombre': nombre, 'total': conteos.get(clave, 0)}
+            for clave, nombre in ClienteSegmento.SEGMENTO_CHOICES
+        ]
+        context['segmento'] = self.request.GET.get('segmento', '')
+        context['q'] = self.request.GET.get('q', '').strip()
+        context['orden'] = self.request.GET.get('orden', 'monto')
+        context['calculado_en'] = ClienteSegmento.objects.aggregate(fecha=Max('calculado_en'))['fecha']
+        context['ventana_dias'] = segmentos.VENTANA_DIAS
+        return context
+
 class ClienteUpdateView(LoginRequiredMixin, UpdateView):
     model = Cliente
     form_class = ClienteForm
@@ -354,11 +340,15 @@ class ClienteDeleteView(EmpleadoRolMixin, DeleteView):
         )
         return super().form_invalid(form)
 
-# Función de búsqueda avanzada (opcional para AJAX)
-def buscar_cliente_por_cedula(request):
+# Función de búsqueda avanzada (opcional para AJAX); async, ver ProductoSearchAPIView
+async def buscar_cliente_por_cedula(request):
     """
     Función para búsqueda AJAX de cliente por cédula
     """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Sesión requerida'}, status=403)
+
     if request.method == 'GET' and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         cedula = request.GET.get('cedula', '')
 
@@ -366,7 +356,7 @@ def buscar_cliente_por_cedula(request):
             try:
                 # Normalizar cédula
                 cedula_normalizada = cedula.replace('-', '').upper()
-                cliente = Cliente.objects.get(cedula=cedula_normalizada)
+                cliente = await Cliente.objects.aget(cedula=cedula_normalizada)
 
                 data = {
                     'encontrado': True,
@@ -428,11 +418,19 @@ class ProductoStockUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
     def form_valid(self, form):
-        # Guardar stock anterior para mensaje
-        stock_anterior = self.object.stock
+        from django.core.exceptions import ValidationError
 
-        # Guardar formulario
-        response = super().form_valid(form)
+        # Guardar stock anterior para mensaje (el formulario ya asignó el nuevo)
+        stock_anterior = Producto.objects.values_list('stock', flat=True).get(pk=self.object.pk)
+        stock_nuevo = form.cleaned_data['stock']
+
+        # Solo cambia el stock: se ajusta la diferencia sin save()/full_clean()
+        self.object.stock = stock_anterior
+        try:
+            self.object.ajustar_stock(stock_nuevo - stock_anterior)
+        except ValidationError as e:
+            form.add_error('stock', e.message_dict['stock'])
+            return self.form_invalid(form)
 
         # Mostrar mensaje con el cambio
         messages.success(
@@ -440,7 +438,7 @@ class ProductoStockUpdateView(LoginRequiredMixin, UpdateView):
             f'Stock de {self.object.nombre} actualizado de {stock_anterior} a {self.object.stock}'
         )
 
-        return response
+        return redirect(self.get_success_url())
 
 # En views.py, añade estas clases
 
@@ -481,9 +479,194 @@ class ProductoUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
     def form_valid(self, form):
+        # Para el historial de precios (ajuste_precios.conectar_senales)
+        form.instance.empleado_historial = empleado_actual(self.request)
         messages.success(self.request, f'Producto {self.object.nombre} actualizado exitosamente.')
         return super().form_valid(form)
-class ProductosMasVendidosView(LoginRequiredMixin, ListView):
+
+
+class ImportarCatalogoView(EmpleadoRolMixin, FormView):
+    """
+    Importa una lista de precios (CSV o XLSX): primero muestra los productos
+    nuevos, los cambios y los errores; al confirmar vuelve a validar el
+    mismo archivo y lo aplica en lote (ver catalogo.py).
+    """
+    template_name = 'black_invoices/productos/importar_catalogo.html'
+    form_class = ImportarCatalogoForm
+    roles_permitidos = ['Administrador', 'Supervisor']
+    session_key = 'catalogo_archivo'
+    limite_vista_previa = 100
+    etiquetas = {
+        'nombre': 'Nombre',
+        'descripcion': 'Descripción',
+        'precio': 'Precio',
+        'precio_compra': 'Precio compra',
+        'stock': 'Stock',
+        'unidad_medida_id': 'Unidad',
+        'activo': 'Activo',
+    }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['titulo'] = 'Importar Catálogo'
+        return context
+
+    def get(self, request, *args, **kwargs):
+        self._descartar(request.session.pop(self.session_key, None))
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        if 'confirmar' in request.POST:
+            return self.confirmar(request)
+        return super().post(request, *args, **kwargs)
+
+    def _descartar(self, guardado):
+        if guardado and os.path.exists(guardado['ruta']):
+            os.remove(guardado['ruta'])
+
+    def _preparar(self, guardado):
+        with open(guardado['ruta'], 'rb') as archivo:
+            return catalogo.preparar(catalogo.leer_filas(archivo, guardado['nombre']))
+
+    def form_valid(self, form):
+        import tempfile
+
+        self._descartar(self.request.session.pop(self.session_key, None))
+        subido = form.cleaned_data['archivo']
+        descriptor, ruta = tempfile.mkstemp(prefix='catalogo_', suffix=os.path.splitext(subido.name)[1])
+        with os.fdopen(descriptor, 'wb') as destino:
+            for bloque in subido.chunks():
+                destino.write(bloque)
+        guardado = {'ruta': ruta, 'nombre': subido.name}
+
+        try:
+            plan = self._preparar(guardado)
+        except (ValueError, UnicodeDecodeError) as e:
+            self._descartar(guardado)
+            form.add_error('archivo', str(e))
+            return self.form_invalid(form)
+        self.request.session[self.session_key] = guardado
+
+        unidades = dict(UnidadMedida.objects.values_list('id', 'abreviatura'))
+        limite = self.limite_vista_previa
+        context = self.get_context_data(form=form)
+        context['plan'] = plan
+        context['nombre_archivo'] = subido.name
+        context['nuevos'] = [
+            {**valores, 'unidad': unidades.get(valores.get('unidad_medida_id'), '')}
+            for valores in plan['crear'][:limite]
+        ]
+        context['cambios'] = [
+            {
+                'sku': actualizacion['sku'],
+                'nombre': actualizacion['nombre'],
+                'cambios': [
+                    (
+                        self.etiquetas[campo],
+                        unidades.get(anterior, anterior) if campo == 'unidad_medida_id' else anterior,
+                        unidades.get(nuevo, nuevo) if campo == 'unidad_medida_id' else nuevo,
+                    )
+                    for campo, (anterior, nuevo) in actualizacion['cambios'].items()
+                ],
+            }
+            for actualizacion in plan['actualizar'][:limite]
+        ]
+        context['errores'] = plan['errores'][:limite]
+        context['limite'] = limite
+        return self.render_to_response(context)
+
+    def confirmar(self, request):
+        guardado = request.session.pop(self.session_key, None)
+        if not guardado or not os.path.exists(guardado['ruta']):
+            messages.error(request, 'La vista previa expiró. Vuelva a cargar el archivo.')
+            return redirect('black_invoices:importar_catalogo')
+
+        try:
+            # Se valida otra vez: el catálogo pudo cambiar desde la vista previa
+            plan = self._preparar(guardado)
+            resultado = catalogo.aplicar(plan, empleado=empleado_actual(request), detalle=guardado['nombre'])
+        except Exception as e:
+            messages.error(request, f'Error al importar el catálogo: {str(e)}')
+            return redirect('black_invoices:importar_catalogo')
+        finally:
+            self._descartar(guardado)
+
+        messages.success(
+            request,
+            f"Catálogo importado: {resultado['creados']} producto(s) nuevo(s) y "
+            f"{resultado['actualizados']} actualizado(s)."
+        )
+        if plan['errores']:
+            messages.warning(request, f"{len(plan['errores'])} fila(s) con errores no se importaron.")
+        return redirect('black_invoices:producto_list')
+
+
+class AjustePreciosView(EmpleadoRolMixin, FormView):
+    """
+    Ajuste masivo de precios: el formulario muestra primero los productos
+    que cambian; al confirmar se recalcula con los mismos datos y se aplica
+    en lote con historial (ver ajuste_precios.py).
+    """
+    template_name = 'black_invoices/productos/ajuste_precios.html'
+    form_class = AjustePreciosForm
+    roles_permitidos = ['Administrador', 'Supervisor']
+    limite_vista_previa = 200
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['titulo'] = 'Ajuste de Precios'
+        context['limites'] = Producto.get_limites_validacion()
+        return context
+
+    def form_valid(self, form):
+        regla = form.cleaned_data['ajuste']
+
+        if 'confirmar' in self.request.POST:
+            try:
+                cambios = ajuste_precios.aplicar(form.productos(), regla, empleado_actual(self.request))
+            except Exception as e:
+                messages.error(self.request, f'Error al ajustar los precios: {str(e)}')
+                return redirect('black_invoices:ajuste_precios')
+            messages.success(self.request, f'Precios actualizados en {len(cambios)} producto(s): {regla.descripcion}.')
+            return redirect('black_invoices:producto_list')
+
+        cambios = ajuste_precios.calcular(form.productos(), regla)
+        context = self.get_context_data(form=form)
+        context['regla'] = regla
+        context['cambios'] = cambios[:self.limite_vista_previa]
+        context['total_cambios'] = len(cambios)
+        context['total_limitados'] = sum(1 for cambio in cambios if cambio['limitado'])
+        context['total_bajo_costo'] = sum(1 for cambio in cambios if cambio['bajo_costo'])
+        context['limite'] = self.limite_vista_previa
+        return self.render_to_response(context)
+
+
+def productos_mas_vendidos(fecha_inicio=None, fecha_fin=None):
+    """Productos facturados en el período (sin ventas canceladas), del más vendido al menos vendido"""
+    def calcular():
+        filtros = {}
+        if fecha_inicio:
+            filtros['factura__fecha_fac__date__gte'] = fecha_inicio
+        if fecha_fin:
+            filtros['factura__fecha_fac__date__lte'] = fecha_fin
+        return list(DetalleFactura.objects.filter(
+            **filtros
+        ).exclude(
+            factura__ventas__status__vent_cancelada=True  # Excluir ventas canceladas
+        ).values(
+            'producto__id',
+            'producto__nombre',
+            'producto__precio'
+        ).annotate(
+            total_vendido=Sum('cantidad'),
+            total_ingresos=Sum(F('cantidad') * F('producto__precio')),
+            numero_ventas=Count('factura', distinct=True)
+        ).order_by('-total_vendido'))
+
+    return cache_reportes.obtener('productos_mas_vendidos', calcular, inicio=fecha_inicio, fin=fecha_fin)
+
+
+class ProductosMasVendidosView(copia_reportes.CopiaReportesMixin, LoginRequiredMixin, ListView):
     model = Producto
     template_name = 'black_invoices/productos/productos_mas_vendidos.html'
     context_object_name = 'productos'
@@ -497,12 +680,11 @@ class ProductosMasVendidosView(LoginRequiredMixin, ListView):
         fecha_fin = self.request.GET.get('fecha_fin')
 
         # Filtros base
-        filtros = {}
+        fecha_inicio_obj = fecha_fin_obj = None
 
         if fecha_inicio:
             try:
                 fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
-                filtros['factura__fecha_fac__date__gte'] = fecha_inicio_obj
                 context['fecha_inicio'] = fecha_inicio
             except ValueError:
                 pass
@@ -510,7 +692,6 @@ class ProductosMasVendidosView(LoginRequiredMixin, ListView):
         if fecha_fin:
             try:
                 fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
-                filtros['factura__fecha_fac__date__lte'] = fecha_fin_obj
                 context['fecha_fin'] = fecha_fin
             except ValueError:
                 pass
@@ -518,31 +699,18 @@ class ProductosMasVendidosView(LoginRequiredMixin, ListView):
         # Si no hay filtros de fecha, usar el mes actual por defecto
         if not fecha_inicio and not fecha_fin:
             hoy = datetime.now().date()
-            inicio_mes = hoy.replace(day=1)
-            filtros['factura__fecha_fac__date__gte'] = inicio_mes
-            context['periodo_default'] = f"Mes actual ({inicio_mes.strftime('%B %Y')})"
+            fecha_inicio_obj = hoy.replace(day=1)
+            context['periodo_default'] = f"Mes actual ({fecha_inicio_obj.strftime('%B %Y')})"
 
         # Consulta principal: productos más vendidos
-        productos_vendidos = DetalleFactura.objects.filter(
-            **filtros
-        ).exclude(
-            factura__ventas__status__vent_cancelada=True  # Excluir ventas canceladas
-        ).values(
-            'producto__id',
-            'producto__nombre',
-            'producto__precio'
-        ).annotate(
-            total_vendido=Sum('cantidad'),
-            total_ingresos=Sum(F('cantidad') * F('producto__precio')),
-            numero_ventas=Count('factura', distinct=True)
-        ).order_by('-total_vendido')
+        productos_vendidos = productos_mas_vendidos(fecha_inicio_obj, fecha_fin_obj)
 
         context['productos_vendidos'] = productos_vendidos
 
         # Estadísticas adicionales
         if productos_vendidos:
             context['producto_top'] = productos_vendidos[0]
-            context['total_productos_diferentes'] = productos_vendidos.count()
+            context['total_productos_diferentes'] = len(productos_vendidos)
             context['total_unidades_vendidas'] = sum(p['total_vendido'] for p in productos_vendidos)
             context['total_ingresos_productos'] = sum(p['total_ingresos'] for p in productos_vendidos)
         else:
@@ -553,6 +721,38 @@ class ProductosMasVendidosView(LoginRequiredMixin, ListView):
 
         return context
 
+class ReporteReposicionView(LoginRequiredMixin, ListView):
+    """
+    Productos a reponer según su velocidad de venta (ver reposicion.py); con
+    ?todos=1 muestra todos los productos activos. Lee la tabla calculada por
+    calcular_reposicion, con el stock actual.
+    """
+    template_name = 'black_invoices/productos/reporte_reposicion.html'
+    context_object_name = 'filas'
+    paginate_by = 50
+
+    def get_queryset(self):
+        if self.request.GET.get('todos'):
+            filas = ReposicionProducto.con_stock().filter(producto__activo=True).order_by(
+                '-reponer', 'dias_cobertura', 'producto__nombre'
+            )
+        else:
+            filas = reposicion.a_reponer()
+        texto = self.request.GET.get('q', '').strip()
+        if texto:
+            filas = filas.filter(Q(producto__sku__istartswith=texto) | Q(producto__nombre__icontains=texto))
+        return filas
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['titulo'] = 'Reporte de Reposición'
+        context['todos'] = bool(self.request.GET.get('todos'))
+        context['q'] = self.request.GET.get('q', '').strip()
+        context['parametros'] = reposicion.parametros()
+        context['calculado_hasta'] = ReposicionProducto.objects.aggregate(hasta=Max('hasta'))['hasta']
+        context['total_reponer'] = reposicion.a_reponer().count()
+        return context
+
 ########################        EMPLEADOS       #############
 class EmpleadoListView(EmpleadoRolMixin, ListView):
     model = Empleado
@@ -799,6 +999,71 @@ class FacturaDetailView(LoginRequiredMixin, DetailView):
 
         return context
 
+
+class LibroVentasView(EmpleadoRolMixin, TemplateView):
+    """Resumen del Libro de Ventas de un mes y enlaces de descarga (ver libro_ventas.py)"""
+    template_name = 'black_invoices/facturas/libro_ventas.html'
+    roles_permitidos = ['Administrador', 'Secretaria', 'Supervisor']
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        periodo = _periodo_solicitado(self.request)
+        context['titulo'] = f'Libro de Ventas {periodo:%m/%Y}'
+        context['periodo'] = periodo
+
+        context['periodos'] = reportes.ultimos_meses(24)
+
+        emitida = Q(ventas__status__vent_cancelada=False) | Q(ventas__isnull=True)
+        context['resumen'] = libro_ventas.LibroVentas(periodo).consulta().order_by().aggregate(
+            facturas=Count('id', filter=emitida),
+            anuladas=Count('id', filter=~emitida),
+            subtotal=Sum('subtotal', filter=emitida),
+            iva=Sum('iva', filter=emitida),
+            total=Sum('total_fac', filter=emitida),
+        )
+        context['sin_tasa'] = not libro_ventas.LibroVentas(periodo).tasas()[0]
+        context['xlsx_disponible'] = libro_ventas.openpyxl is not None
+        return context
+
+
+class LibroVentasExportarView(EmpleadoRolMixin, View):
+    """Libro de Ventas del mes (?periodo=AAAA-MM) en CSV, XLSX o PDF"""
+    roles_permitidos = ['Administrador', 'Secretaria', 'Supervisor']
+    tipos = {
+        'csv': 'text/csv; charset=utf-8',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        'pdf': 'application/pdf',
+    }
+
+    def get(self, request, formato):
+        import tempfile
+        from django.http import FileResponse, Http404, StreamingHttpResponse
+
+        if formato not in self.tipos:
+            raise Http404('Formato no soportado')
+        periodo = _periodo_solicitado(request)
+        libro = libro_ventas.LibroVentas(periodo)
+        nombre = f'Libro_Ventas_{periodo:%Y_%m}.{formato}'
+
+        if formato == 'csv':
+            respuesta = StreamingHttpResponse(libro_ventas.csv_lineas(libro), content_type=self.tipos['csv'])
+            respuesta['Content-Disposition'] = f'attachment; filename="{nombre}"'
+            return respuesta
+
+        # En memoria hasta 1 MB; los meses grandes se escriben en disco
+        archivo = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        try:
+            if formato == 'xlsx':
+                libro_ventas.escribir_xlsx(libro, archivo)
+            else:
+                libro_ventas.escribir_pdf(libro, archivo, ConfiguracionSistema.get_config())
+        except ValueError as e:
+            archivo.close()
+            messages.error(request, str(e))
+            return redirect(f"{reverse('black_invoices:libro_ventas')}?periodo={periodo:%Y-%m}")
+        archivo.seek(0)
+        return FileResponse(archivo, as_attachment=True, filename=nombre, content_type=self.tipos[formato])
+
 def ingresar(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -839,345 +1104,73 @@ class VentaCreateView(LoginRequiredMixin, View):
                 {'id': 'contado', 'nombre': 'Contado'},
                 {'id': 'credito', 'nombre': 'Crédito'}
             ],
-            'tasa_cambio': tasa_actual.tasa_usd_ves if tasa_actual else 1
+            'tasa_cambio': tasa_actual.tasa_usd_ves if tasa_actual else 1,
+            # Un doble envío del formulario repite la clave y no duplica la venta
+            'clave_idempotencia': uuid.uuid4().hex,
         }
         return render(request, self.template_name, context)
 
     def post(self, request):
-        # ✅ LOGGING MEJORADO PARA DEBUG
-        import time
         start_time = time.time()
-        print(f"DEBUG VENTA: Iniciando creación de venta - Timestamp: {start_time}")
-        
-        try:
-            with transaction.atomic():
-                # 1. Verificar que el usuario tenga empleado asociado
-                if not hasattr(request.user, 'empleado'):
-                    messages.error(request, 'No tienes un perfil de empleado asociado.')
-                    return redirect('black_invoices:venta_create')
 
-                # 2. Obtener cliente y método de pago
-                cliente_id = request.POST.get('cliente')
-                metodo_pago = request.POST.get('metodo_pag')
-
-                if not cliente_id:
-                    messages.error(request, 'Debe seleccionar un cliente.')
-                    return redirect('black_invoices:venta_create')
+        # Líneas del formset form-{i}-producto / form-{i}-cantidad
+        total_forms = int(request.POST.get('form-TOTAL_FORMS', 0))
+        lineas = []
+        for i in range(total_forms):
+            producto_id = request.POST.get(f'form-{i}-producto')
+            cantidad_str = request.POST.get(f'form-{i}-cantidad')
+            if producto_id and cantidad_str:
+                lineas.append([producto_id, cantidad_str])
 
-                # ✅ 3. RECOPILAR DETALLES DE PRODUCTOS - OPTIMIZADO
-                productos = []
-                total_forms = int(request.POST.get('form-TOTAL_FORMS', 0))
-                
-                print(f"DEBUG VENTA: Total forms detectados: {total_forms}")
-                
-                # Procesamiento optimizado por lotes
-                batch_size = 50  # Procesar de 50 en 50 para ventas muy grandes
-                
-                for batch_start in range(0, total_forms, batch_size):
-                    batch_end = min(batch_start + batch_size, total_forms)
-                    batch_time = time.time()
-                    
-                    print(f"DEBUG VENTA: Procesando lote {batch_start}-{batch_end}")
-                    
-                    for i in range(batch_start, batch_end):
-                        producto_id = request.POST.get(f'form-{i}-producto')
-                        cantidad_str = request.POST.get(f'form-{i}-cantidad')
-
-                        if producto_id and cantidad_str:
-                            try:
-                                cantidad = float(cantidad_str)
-                                if cantidad > 0:
-                                    productos.append({
-                                        'id': producto_id,
-                                        'cantidad': cantidad
-                                    })
-                            except ValueError:
-                                print(f"DEBUG VENTA: Valor inválido en form-{i}: {cantidad_str}")
-                                continue
-                    
-                    batch_time_elapsed = time.time() - batch_time
-                    print(f"DEBUG VENTA: Lote {batch_start}-{batch_end} procesado en {batch_time_elapsed:.2f}s")
-
-                if not productos:
-                    messages.error(request, 'Debe agregar al menos un producto a la venta.')
-                    return redirect('black_invoices:venta_create')
-                
-                print(f"DEBUG VENTA: Total productos válidos: {len(productos)}")
-
-                # ✅ 4. VALIDACIÓN PREVIA DE STOCK - OPTIMIZADA
-                print("DEBUG VENTA: Iniciando validación de stock...")
-                stock_validation_time = time.time()
-                
-                # Obtener todos los productos de una vez para evitar múltiples queries
-                producto_ids = [prod['id'] for prod in productos]
-                productos_db = {
-                    str(p.id): p for p in Producto.objects.filter(
-                        id__in=producto_ids
-                    ).select_related('unidad_medida')
-                }
-                
-                # Validar stock de todos los productos
-                stock_errors = []
-                for prod in productos:
-                    producto_db = productos_db.get(prod['id'])
-                    if not producto_db:
-                        stock_errors.append(f"Producto ID {prod['id']} no encontrado")
-                        continue
-                        
-                    if prod['cantidad'] > producto_db.stock:
-                        stock_errors.append(
-                            f"Stock insuficiente para {producto_db.nombre}. "
-                            f"Disponible: {producto_db.stock}, solicitado: {prod['cantidad']}"
-                        )
-                
-                if stock_errors:
-                    for error in stock_errors[:5]:  # Mostrar máximo 5 errores
-                        messages.error(request, error)
-                    if len(stock_errors) > 5:
-                        messages.error(request, f"Y {len(stock_errors) - 5} errores más de stock...")
-                    return redirect('black_invoices:venta_create')
-                
-                stock_validation_elapsed = time.time() - stock_validation_time
-                print(f"DEBUG VENTA: Validación de stock completada en {stock_validation_elapsed:.2f}s")
-
-                # 4. Determinar tipo de venta
-                cliente = Cliente.objects.get(pk=cliente_id)
-                es_credito = request.POST.get('tipo_venta') == 'credito'
-
-                # 5. Crear estados necesarios
-                if es_credito:
-                    estado, created = StatusVentas.objects.get_or_create(
-                        nombre="Pendiente",
-                        defaults={
-                            'vent_espera': True,
-                            'vent_cancelada': False
-                        }
-                    )
-                else:
-                    estado, created = StatusVentas.objects.get_or_create(
-                        nombre="Completada",
-                        defaults={
-                            'vent_espera': False,
-                            'vent_cancelada': False
-                        }
-                    )
-
-                if es_credito:
-                    # ==================== FLUJO CRÉDITO: NOTA DE ENTREGA ====================
-                    print("DEBUG VENTA: Creando nota de entrega...")
-                    nota_creation_time = time.time()
-                    
-                    # Crear nota de entrega
-                    config = ConfiguracionSistema.get_config()
-                    nota = NotaEntrega.objects.create(
-                        cliente=cliente,
-                        empleado=request.user.empleado,
-                        numero_nota=config.get_siguiente_numero_nota_entrega()
-                    )
-
-                    # ✅ PROCESAR PRODUCTOS EN LOTES PARA NOTAS DE ENTREGA - CORREGIDO
-                    detalles_batch = []
-                    stock_updates = []
-                    
-                    for i, prod in enumerate(productos):
-                        producto_db = productos_db[prod['id']]
-                        cantidad = Decimal(str(prod['cantidad']))
-
-                        # ✅ CALCULAR SUBTOTAL MANUALMENTE ANTES DE BULK_CREATE
-                        subtotal = cantidad * producto_db.precio
-
-                        # Preparar detalle para creación en lote
-                        detalles_batch.append(DetalleNotaEntrega(
-                            nota_entrega=nota,
-                            producto=producto_db,
-                            cantidad=cantidad,
-                            precio_unitario=producto_db.precio,
-                            subtotal_linea=subtotal  # ✅ ASIGNAR SUBTOTAL MANUALMENTE
-                        ))
-                        
-                        # Preparar actualización de stock
-                        stock_updates.append({
-                            'producto': producto_db,
-                            'nueva_cantidad': producto_db.stock - cantidad
-                        })
-                        
-                        # Crear en lotes de 100 para evitar memoria excesiva
-                        if len(detalles_batch) >= 100 or i == len(productos) - 1:
-                            DetalleNotaEntrega.objects.bulk_create(detalles_batch)
-                            
-                            # Actualizar stock en lote
-                            for stock_update in stock_updates:
-                                stock_update['producto'].stock = stock_update['nueva_cantidad']
-                                
-                            Producto.objects.bulk_update(
-                                [su['producto'] for su in stock_updates], 
-                                ['stock']
-                            )
-                            
-                            # Limpiar lotes
-                            detalles_batch = []
-                            stock_updates = []
-                            
-                            print(f"DEBUG VENTA: Procesado lote hasta producto {i+1}/{len(productos)}")
-
-                    # Calcular totales de la nota
-                    nota.calcular_totales()
-
-                    # Crear venta referenciando nota de entrega
-                    venta = Ventas.objects.create(
-                        empleado=request.user.empleado,
-                        nota_entrega=nota,
-                        status=estado,
-                        credito=True,
-                        monto_pagado=0
-                    )
-                    
-                    nota_creation_elapsed = time.time() - nota_creation_time
-                    print(f"DEBUG VENTA: Nota de entrega creada en {nota_creation_elapsed:.2f}s")
-
-                    # Mensaje específico para crédito
-                    tasa_actual = TasaCambio.get_tasa_actual()
-                    if tasa_actual:
-                        total_bs = nota.total * tasa_actual.tasa_usd_ves
-                        messages.success(
-                            request,
-                            f'Venta a crédito #{venta.id} creada exitosamente. '
-                            f'Nota de Entrega #{nota.numero_nota} generada. '
-                            f'Total: ${nota.total:,.2f} ({total_bs:,.2f} Bs). '
-                            f'Al completar el pago se generará la Factura Fiscal.'
-                        )
-                    else:
-                        messages.success(
-                            request,
-                            f'Venta a crédito #{venta.id} creada exitosamente. '
-                            f'Nota de Entrega #{nota.numero_nota} generada. '
-                            f'Total: ${nota.total:,.2f}.'
-                        )
-
-                else:
-                    # ==================== FLUJO CONTADO: FACTURA DIRECTA ====================
-                    print("DEBUG VENTA: Creando factura...")
-                    factura_creation_time = time.time()
-                    
-                    # Crear factura inmediatamente
-                    factura = Factura(
-                        cliente=cliente,
-                        empleado=request.user.empleado,
-                        metodo_pag=metodo_pago
-                    )
-                    factura.save()
+        try:
+            lineas = registro_ventas.leer_lineas(lineas)
+            venta, totales, creada = registro_ventas.registrar(
+                empleado_actual(request),
+                request.POST.get('cliente'),
+                lineas,
+                credito=request.POST.get('tipo_venta') == 'credito',
+                metodo_pago=request.POST.get('metodo_pag'),
+                clave=registro_ventas.validar_clave(request.POST.get('clave_idempotencia')),
+            )
+        except registro_ventas.ErrorVenta as e:
+            for error in e.errores[:5]:  # Mostrar máximo 5 errores
+                messages.error(request, error)
+            if len(e.errores) > 5:
+                messages.error(request, f"Y {len(e.errores) - 5} errores más de stock...")
+            return redirect('black_invoices:venta_create')
+        except Exception as e:
+            logger_ventas.exception('Error al registrar la venta después de %.2f s', time.time() - start_time)
+            messages.error(request, f"Error al crear la venta: {str(e)}")
+            return redirect('black_invoices:venta_create')
 
-                    # Obtener tipo de factura
-                    try:
-                        tipo_factura = TipoFactura.objects.get(credito_fac=False, contado_fac=True)
-                    except TipoFactura.DoesNotExist:
-                        tipo_factura = TipoFactura.objects.create(
-                            credito_fac=False,
-                            contado_fac=True
-                        )
+        if not creada:
+            # Doble envío o reintento del mismo formulario
+            messages.info(request, f'La venta #{venta.id} ya estaba registrada.')
+            return redirect('black_invoices:venta_detail', pk=venta.id)
 
-                    # ✅ PROCESAR PRODUCTOS EN LOTES PARA FACTURAS - CORREGIDO
-                    detalles_batch = []
-                    stock_updates = []
-                    
-                    for i, prod in enumerate(productos):
-                        producto_db = productos_db[prod['id']]
-                        cantidad = Decimal(str(prod['cantidad']))
-
-                        # ✅ CALCULAR SUBTOTAL MANUALMENTE ANTES DE BULK_CREATE
-                        subtotal = producto_db.precio * cantidad
-
-                        # Preparar detalle para creación en lote
-                        detalles_batch.append(DetalleFactura(
-                            factura=factura,
-                            producto=producto_db,
-                            cantidad=cantidad,
-                            tipo_factura=tipo_factura,
-                            sub_total=subtotal  # ✅ ASIGNAR SUBTOTAL MANUALMENTE
-                        ))
-                        
-                        # Preparar actualización de stock
-                        stock_updates.append({
-                            'producto': producto_db,
-                            'nueva_cantidad': producto_db.stock - cantidad
-                        })
-                        
-                        # Crear en lotes de 100
-                        if len(detalles_batch) >= 100 or i == len(productos) - 1:
-                            DetalleFactura.objects.bulk_create(detalles_batch)
-                            
-                            # Actualizar stock en lote
-                            for stock_update in stock_updates:
-                                stock_update['producto'].stock = stock_update['nueva_cantidad']
-                                
-                            Producto.objects.bulk_update(
-                                [su['producto'] for su in stock_updates], 
-                                ['stock']
-                            )
-                            
-                            # Limpiar lotes
-                            detalles_batch = []
-                            stock_updates = []
-                            
-                            print(f"DEBUG VENTA: Procesado lote hasta producto {i+1}/{len(productos)}")
-
-                    # Calcular totales de la factura
-                    factura.calcular_total_mejorado()
-
-                    # Crear venta referenciando factura
-                    venta = Ventas.objects.create(
-                        empleado=request.user.empleado,
-                        factura=factura,
-                        status=estado,
-                        credito=False,
-                        monto_pagado=factura.total_fac
-                    )
-                    
-                    factura_creation_elapsed = time.time() - factura_creation_time
-                    print(f"DEBUG VENTA: Factura creada en {factura_creation_elapsed:.2f}s")
+        total_bs = f" ({totales['total_ves']:,.2f} Bs)" if totales['total_ves'] is not None else ''
+        if venta.credito:
+            nota = venta.nota_entrega
+            messages.success(
+                request,
+                f'Venta a crédito #{venta.id} creada exitosamente. '
+                f'Nota de Entrega #{nota.numero_nota} generada. '
+                f'Total: ${nota.total:,.2f}{total_bs}.'
+                + (' Al completar el pago se generará la Factura Fiscal.' if total_bs else '')
+            )
+        else:
+            factura = venta.factura
+            messages.success(
+                request,
+                f'Venta #{venta.id} completada exitosamente. '
+                f'Factura Fiscal #{factura.numero_factura} generada. '
+                f'Total: ${factura.total_fac:,.2f}{total_bs}. Pago recibido.'
+            )
 
-                    # Mensaje específico para contado
-                    tasa_actual = TasaCambio.get_tasa_actual()
-                    if tasa_actual:
-                        total_bs = factura.total_fac * tasa_actual.tasa_usd_ves
-                        messages.success(
-                            request,
-                            f'Venta #{venta.id} completada exitosamente. '
-                            f'Factura Fiscal #{factura.numero_factura} generada. '
-                            f'Total: ${factura.total_fac:,.2f} ({total_bs:,.2f} Bs). '
-                            f'Pago recibido.'
-                        )
-                    else:
-                        messages.success(
-                            request,
-                            f'Venta #{venta.id} completada exitosamente. '
-                            f'Factura Fiscal #{factura.numero_factura} generada. '
-                            f'Total: ${factura.total_fac:,.2f}. Pago recibido.'
-                        )
-                
-                # ✅ CREAR REGISTROS DE GANANCIA OPTIMIZADO
-                print("DEBUG VENTA: Creando registros de ganancia...")
-                ganancia_time = time.time()
-                
-                venta.crear_registros_ganancia()
-                
-                ganancia_elapsed = time.time() - ganancia_time
-                print(f"DEBUG VENTA: Registros de ganancia creados en {ganancia_elapsed:.2f}s")
+        logger_ventas.info('Venta #%s registrada en %.2f s (%s líneas)', venta.id, time.time() - start_time, len(lineas))
+        return redirect('black_invoices:venta_detail', pk=venta.id)
 
-                total_elapsed = time.time() - start_time
-                print(f"DEBUG VENTA: ✅ Venta creada exitosamente en {total_elapsed:.2f}s total")
-                print(f"DEBUG VENTA: Productos procesados: {len(productos)}")
-                
-                # ✅ REDIRECCIÓN GARANTIZADA A DETALLE DE VENTA
-                return redirect('black_invoices:venta_detail', pk=venta.id)
 
-        except Exception as e:
-            total_elapsed = time.time() - start_time
-            print(f"ERROR VENTA: Error después de {total_elapsed:.2f}s: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            messages.error(request, f"Error al crear la venta: {str(e)}")
-            return redirect('black_invoices:venta_create')
 class VentaListView(LoginRequiredMixin, ListView):
     model = Ventas
     template_name = 'black_invoices/ventas/ventas_list.html'
@@ -1315,6 +1308,75 @@ class RegistrarPagoView(EmpleadoRolMixin, UpdateView):
             messages.error(request, f'Error al procesar el pago: {str(e)}')
             return self.get(request, *args, **kwargs)
 
+class ConciliacionBancariaView(EmpleadoRolMixin, FormView):
+    """Importa un estado de cuenta y registra en lote los abonos confirmados"""
+    template_name = 'black_invoices/ventas/conciliacion_bancaria.html'
+    form_class = EstadoCuentaForm
+    roles_permitidos = ['Administrador', 'Secretaria', 'Supervisor']
+    session_key = 'conciliacion_propuestas'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['titulo'] = 'Conciliación Bancaria'
+        return context
+
+    def get(self, request, *args, **kwargs):
+        request.session.pop(self.session_key, None)
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, *args, **kwargs):
+        if 'confirmar' in request.POST:
+            return self.confirmar(request)
+        return super().post(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        try:
+            abonos = conciliacion.leer_estado_cuenta(
+                form.cleaned_data['archivo'],
+                metodo_por_defecto=form.cleaned_data['metodo_pago']
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            form.add_error('archivo', str(e))
+            return self.form_invalid(form)
+
+        propuestas = conciliacion.proponer_coincidencias(abonos, moneda=form.cleaned_data['moneda'])
+        self.request.session[self.session_key] = propuestas
+
+        context = self.get_context_data(form=form)
+        context['propuestas'] = propuestas
+        context['total_coincidencias'] = sum(1 for p in propuestas if p['venta_id'])
+        return self.render_to_response(context)
+
+    def confirmar(self, request):
+        propuestas = request.session.pop(self.session_key, None)
+        if not propuestas:
+            messages.error(request, 'La vista previa expiró. Vuelva a cargar el estado de cuenta.')
+            return redirect('black_invoices:conciliacion_bancaria')
+
+        seleccion = set(request.POST.getlist('seleccion'))
+        confirmadas = [p for p in propuestas if p['venta_id'] and str(p['fila']) in seleccion]
+        if not confirmadas:
+            messages.warning(request, 'No se seleccionó ningún abono para registrar.')
+            return redirect('black_invoices:conciliacion_bancaria')
+
+        try:
+            resultado = conciliacion.aplicar_pagos(confirmadas)
+        except Exception as e:
+            messages.error(request, f'Error al registrar los abonos: {str(e)}')
+            return redirect('black_invoices:conciliacion_bancaria')
+
+        mensaje = (
+            f"{resultado['pagos']} pago(s) registrado(s). "
+            f"{resultado['completadas']} venta(s) completada(s)."
+        )
+        if resultado['facturas']:
+            mensaje += f" Facturas generadas: {', '.join(f'#{n}' for n in resultado['facturas'])}."
+        messages.success(request, mensaje)
+        for venta_id, motivo in resultado['rechazadas']:
+            messages.warning(request, f'Venta #{venta_id}: {motivo}')
+
+        return redirect('black_invoices:ventas_pendientes')
+
 class VentaDetailView(LoginRequiredMixin, DetailView):
     model = Ventas
     template_name = 'black_invoices/ventas/venta_detail.html'
@@ -1358,7 +1420,7 @@ def cancelar_venta(request, pk):
         else:
             try:
                 # Obtener empleado que realiza la cancelación
-                empleado_cancelador = request.user.empleado
+                empleado_cancelador = empleado_actual(request)
 
                 # Usar el método correcto del modelo con transacciones atómicas
                 venta.cancelar_venta()
@@ -1514,7 +1576,7 @@ class VentaUpdateView(LoginRequiredMixin, View):
                     return redirect('black_invoices:venta_detail', pk=pk)
                 
                 # Verificar que el usuario tenga empleado asociado
-                if not hasattr(request.user, 'empleado'):
+                if empleado_actual(request) is None:
                     messages.error(request, 'No tienes un perfil de empleado asociado.')
                     return redirect('black_invoices:venta_detail', pk=pk)
 
@@ -1579,12 +1641,9 @@ class VentaUpdateView(LoginRequiredMixin, View):
                         
                         producto_id = int(producto_id)
                         
-                        # ✅ NORMALIZAR FORMATO: Reemplazar comas por puntos antes de convertir a float
-                        cantidad_str = cantidad_str.replace(',', '.')
-                        precio_str = precio_str.replace(',', '.')
-                        
-                        cantidad = float(cantidad_str) if cantidad_str else 0
-                        precio = float(precio_str) if precio_str else 0
+                        # ✅ NORMALIZAR FORMATO: acepta coma decimal, sin pasar por float
+                        cantidad = precios.parsear_cantidad(cantidad_str) if cantidad_str else 0
+                        precio = precios.a_decimal(precio_str) if precio_str else 0
                         
                         if producto_id > 0 and cantidad > 0:
                             productos_nuevos.append({
@@ -1636,11 +1695,7 @@ class VentaUpdateView(LoginRequiredMixin, View):
                     venta.monto_pagado = 0
                     
                     # Establecer estado pendiente
-                    estado_pendiente, _ = StatusVentas.objects.get_or_create(
-                        nombre="Pendiente",
-                        defaults={'vent_espera': True, 'vent_cancelada': False}
-                    )
-                    venta.status = estado_pendiente
+                    venta.status = referencias.estado_pendiente()
                 else:
                     # Crear o actualizar factura
                     factura = self._actualizar_factura(venta, cliente, metodo_pago, productos_nuevos)
@@ -1652,11 +1707,7 @@ class VentaUpdateView(LoginRequiredMixin, View):
                     venta.monto_pagado = factura.total_fac
                     
                     # Establecer estado completado
-                    estado_completado, _ = StatusVentas.objects.get_or_create(
-                        nombre="Completada",
-                        defaults={'vent_espera': False, 'vent_cancelada': False}
-                    )
-                    venta.status = estado_completado
+                    venta.status = referencias.estado_completada()
                 
                 venta.save()
                 
@@ -1679,12 +1730,22 @@ class VentaUpdateView(LoginRequiredMixin, View):
         """Obtiene los productos y cantidades actuales de la venta"""
         detalles = {}
         if venta.factura:
-            for detalle in venta.factura.detallefactura_set.all():
-                detalles[str(detalle.producto.id)] = float(detalle.cantidad)
+            for producto_id, cantidad in venta.factura.detallefactura_set.values_list('producto_id', 'cantidad'):
+                detalles[str(producto_id)] = cantidad
         elif venta.nota_entrega:
-            for detalle in venta.nota_entrega.detalles_nota.all():
-                detalles[str(detalle.producto.id)] = float(detalle.cantidad)
+            for producto_id, cantidad in venta.nota_entrega.detalles_nota.values_list('producto_id', 'cantidad'):
+                detalles[str(producto_id)] = cantidad
         return detalles
+
+    def _calcular_lineas(self, productos):
+        """Calcula líneas y totales de la venta editada con una sola consulta de productos"""
+        productos_db = Producto.objects.in_bulk([prod['id'] for prod in productos])
+        tasa_actual = TasaCambio.get_tasa_actual()
+        return precios.calcular_con_config(
+            [(productos_db[prod['id']], prod['cantidad']) for prod in productos],
+            ConfiguracionSistema.get_config(),
+            tasa_actual.tasa_usd_ves if tasa_actual else None
+        )
     
     def _actualizar_factura(self, venta, cliente, metodo_pago, productos):
         """Crea o actualiza la factura de la venta"""
@@ -1692,34 +1753,32 @@ class VentaUpdateView(LoginRequiredMixin, View):
         if venta.factura:
             venta.factura.delete()
         
+        # Los totales se calculan en memoria antes de guardar
+        totales = self._calcular_lineas(productos)
+
         # Crear nueva factura
         factura = Factura.objects.create(
             cliente=cliente,
             empleado=venta.empleado,
-            metodo_pag=metodo_pago
+            metodo_pag=metodo_pago,
+            subtotal=totales['subtotal'],
+            iva=totales['iva'],
+            total_fac=totales['total']
         )
         
         # Crear detalles
-        tipo_factura, _ = TipoFactura.objects.get_or_create(
-            contado_fac=True,
-            defaults={'credito_fac': False}
-        )
+        tipo_factura = referencias.tipo_factura(credito=False)
         
-        for prod in productos:
-            producto = Producto.objects.get(pk=prod['id'])
-            # ✅ CONVERTIR CANTIDAD A DECIMAL
-            cantidad_decimal = Decimal(str(prod['cantidad']))
-            
-            DetalleFactura.objects.create(
+        DetalleFactura.objects.bulk_create([
+            DetalleFactura(
                 factura=factura,
                 tipo_factura=tipo_factura,
-                producto=producto,
-                cantidad=cantidad_decimal,
-                sub_total=producto.precio * cantidad_decimal
+                producto=linea['producto'],
+                cantidad=linea['cantidad'],
+                sub_total=linea['subtotal']
             )
-        
-        # Calcular totales
-        factura.calcular_total_mejorado()
+            for linea in totales['lineas']
+        ])
         
         return factura
     
@@ -1729,30 +1788,31 @@ class VentaUpdateView(LoginRequiredMixin, View):
         if venta.nota_entrega:
             venta.nota_entrega.delete()
         
+        # Los totales se calculan en memoria antes de guardar
+        totales = self._calcular_lineas(productos)
+
         # Crear nueva nota de entrega
         config = ConfiguracionSistema.get_config()
         nota = NotaEntrega.objects.create(
             numero_nota=config.get_siguiente_numero_nota_entrega(),
             cliente=cliente,
-            empleado=venta.empleado
+            empleado=venta.empleado,
+            subtotal=totales['subtotal'],
+            iva=totales['iva'],
+            total=totales['total']
         )
         
         # Crear detalles
-        for prod in productos:
-            producto = Producto.objects.get(pk=prod['id'])
-            # ✅ CONVERTIR CANTIDAD A DECIMAL
-            cantidad_decimal = Decimal(str(prod['cantidad']))
-            
-            DetalleNotaEntrega.objects.create(
+        DetalleNotaEntrega.objects.bulk_create([
+            DetalleNotaEntrega(
                 nota_entrega=nota,
-                producto=producto,
-                cantidad=cantidad_decimal,
-                precio_unitario=producto.precio,
-                subtotal_linea=cantidad_decimal * producto.precio  # ✅ CALCULAR SUBTOTAL MANUALMENTE
+                producto=linea['producto'],
+                cantidad=linea['cantidad'],
+                precio_unitario=linea['precio'],
+                subtotal_linea=linea['subtotal']
             )
-        
-        # Calcular totales
-        nota.calcular_totales()
+            for linea in totales['lineas']
+        ])
         
         return nota
     
@@ -1818,7 +1878,7 @@ class VentaUpdateView(LoginRequiredMixin, View):
         except NameError:
             # Si no existe el modelo VentaHistorial, simplemente registrar en log
             print(f"HISTORIAL: {descripcion} por {usuario.username}")
-class ReporteGananciasView(LoginRequiredMixin, TemplateView):
+class ReporteGananciasView(copia_reportes.CopiaReportesMixin, LoginRequiredMixin, TemplateView):
     """Vista para reportes detallados de ganancias"""
     template_name = 'black_invoices/reportes/ganancias_report.html'
 
@@ -1853,11 +1913,21 @@ class ReporteGananciasView(LoginRequiredMixin, TemplateView):
         
         context['fecha_inicio'] = fecha_inicio
         context['fecha_fin'] = fecha_fin
-        
+
+        context.update(cache_reportes.obtener(
+            'ganancias',
+            lambda: self._calcular(fecha_inicio, fecha_fin),
+            inicio=fecha_inicio, fin=fecha_fin
+        ))
+        return context
+
+    def _calcular(self, fecha_inicio, fecha_fin):
+        context = {}
+
         # Ganancias por producto en el período
-        context['ganancias_por_producto'] = DetalleGanancia.get_ganancias_por_producto(
+        context['ganancias_por_producto'] = list(DetalleGanancia.get_ganancias_por_producto(
             fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, limit=50
-        )
+        ))
         
         # Resumen de ganancias
         context['total_ganancias_realizadas'] = DetalleGanancia.get_ganancias_realizadas(
@@ -1904,10 +1974,132 @@ class ReporteGananciasView(LoginRequiredMixin, TemplateView):
             margen_promedio=Avg('margen_porcentaje')
         ).order_by('-total_ganancia')
         
-        context['ganancias_por_empleado'] = ganancias_por_empleado
+        context['ganancias_por_empleado'] = list(ganancias_por_empleado)
         
         return context
 
+def _periodo_solicitado(request):
+    """Mes de ?periodo=AAAA-MM (por defecto el mes en curso)"""
+    try:
+        return datetime.strptime(request.GET.get('periodo', ''), '%Y-%m').date()
+    except ValueError:
+        return reportes.mes_actual()
+
+
+def _estados_cuenta(request):
+    """(título, comisiones, congelado) del empleado (?empleado=) o del mes solicitado"""
+    empleado_id = request.GET.get('empleado')
+    if empleado_id:
+        if not empleado_id.isdigit():
+            raise Http404('Empleado no válido')
+        empleado = get_object_or_404(Empleado, pk=empleado_id)
+        return f'Comisiones de {empleado.nombre_completo}', comisiones.historial(empleado), None
+    periodo = _periodo_solicitado(request)
+    filas, congelado = comisiones.estado_cuenta(periodo)
+    return f'Comisiones {periodo:%m/%Y}', filas, congelado
+
+
+class EstadoCuentaComisionesView(EmpleadoRolMixin, TemplateView):
+    """
+    Ventas, ganancia, cancelaciones y comisión por empleado de un mes (ver
+    comisiones.py), o los últimos meses de un empleado con ?empleado=
+    """
+    template_name = 'black_invoices/reportes/comisiones.html'
+    roles_permitidos = ['Administrador', 'Supervisor']
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['titulo'], context['comisiones'], context['congelado'] = _estados_cuenta(self.request)
+        context['totales'] = comisiones.totales(context['comisiones'])
+        context['parametros'] = comisiones.parametros()
+        context['periodo'] = _periodo_solicitado(self.request)
+        context['empleado_id'] = self.request.GET.get('empleado', '')
+        context['empleados'] = Empleado.objects.order_by('apellido', 'nombre')
+
+        context['periodos'] = reportes.ultimos_meses(12)
+        return context
+
+
+class ComisionesExportarView(EmpleadoRolMixin, View):
+    """Estado de cuenta de comisiones (mismos filtros que la página) en CSV o PDF"""
+    roles_permitidos = ['Administrador', 'Supervisor']
+    encabezados = [
+        'Período', 'Empleado', 'Ventas', 'Unidades', 'Monto vendido', 'Ganancia',
+        'Canceladas', 'Monto cancelado', 'Comisión %', 'Comisión',
+    ]
+
+    def get(self, request, formato):
+        if formato not in ('csv', 'pdf'):
+            raise Http404('Formato no soportado')
+        titulo, filas, congelado = _estados_cuenta(request)
+        nombre = titulo.replace(' ', '_').replace('/', '_')
+        if formato == 'csv':
+            return self._csv(filas, nombre)
+        return self._pdf(titulo, filas, congelado, nombre)
+
+    def _filas(self, filas):
+        for c in filas:
+            yield [
+                f'{c.periodo:%m/%Y}', c.empleado.nombre_completo, c.ventas, f'{c.unidades:.3f}',
+                f'{c.monto_ventas:.2f}', f'{c.ganancia:.2f}', c.canceladas, f'{c.monto_cancelado:.2f}',
+                f'{c.porcentaje_comision:.2f}', f'{c.comision:.2f}',
+            ]
+
+    def _csv(self, filas, nombre):
+        from django.http import StreamingHttpResponse
+
+        lineas = reportes.csv_lineas(self.encabezados, self._filas(filas))
+        respuesta = StreamingHttpResponse(lineas, content_type='text/csv; charset=utf-8')
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
+        return respuesta
+
+    def _pdf(self, titulo, filas, congelado, nombre):
+        import tempfile
+        from django.http import FileResponse
+        from reportlab.lib.pagesizes import landscape
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+        estilos = getSampleStyleSheet()
+        totales = comisiones.totales(filas)
+        datos = [self.encabezados] + list(self._filas(filas)) + [[
+            'Total', '', totales['ventas'], f"{totales['unidades']:.3f}", f"{totales['monto_ventas']:.2f}",
+            f"{totales['ganancia']:.2f}", totales['canceladas'], f"{totales['monto_cancelado']:.2f}",
+            '', f"{totales['comision']:.2f}",
+        ]]
+        tabla = Table(datos, repeatRows=1)
+        tabla.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ]))
+
+        if congelado:
+            estado = 'Período cerrado'
+        elif congelado is None:
+            estado = 'Últimos meses; el mes en curso puede cambiar'
+        else:
+            estado = 'Mes en curso: los montos pueden cambiar hasta el cierre'
+        contenido = [
+            Paragraph('CORPORACION AGRICOLA DOÑA CLARA, C.A.', estilos['Heading2']),
+            Paragraph(titulo, estilos['Heading3']),
+            Paragraph(f"{estado}. Generado: {datetime.now():%d/%m/%Y %H:%M}", estilos['Normal']),
+            Spacer(1, 12),
+            tabla,
+        ]
+
+        # El documento se arma en un archivo temporal (en memoria hasta 1 MB) y
+        # se envía por bloques
+        archivo = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        SimpleDocTemplate(archivo, pagesize=landscape(letter), title=titulo).build(contenido)
+        archivo.seek(0)
+        return FileResponse(archivo, as_attachment=True, filename=f'{nombre}.pdf', content_type='application/pdf')
+
+
 class UserProfileUpdateView(LoginRequiredMixin, UpdateView):
     model = Empleado
     form_class = UserProfileForm
@@ -2229,6 +2421,7 @@ class FacturaPDFView(LoginRequiredMixin, View):
         config = ConfiguracionSistema.get_config()
         tasa_actual = TasaCambio.get_tasa_actual()
         tasa_usd_ves = tasa_actual.tasa_usd_ves if tasa_actual else Decimal('1.0')
+        totales = precios.totales_documento(factura.subtotal, factura.iva, factura.total_fac, tasa_usd_ves)
 
         def draw_header(page_num, total_pages):
             """Dibuja el header en cada página"""
@@ -2274,12 +2467,12 @@ class FacturaPDFView(LoginRequiredMixin, View):
             return ["#", "Código", "Producto", "Cant.", "Garantía", "Precio", "Precio Bs", "Total"]
 
         # --- Preparar datos de productos ---
-        detalles = factura.detallefactura_set.all()
+        detalles = factura.detallefactura_set.select_related('producto__unidad_medida')
         productos_data = []
 
         for idx, detalle in enumerate(detalles, 1):
             codigo = str(detalle.producto.id)
-            precio_bs = detalle.producto.precio * tasa_usd_ves
+            precio_bs = precios.a_bolivares(detalle.producto.precio, tasa_usd_ves)
             
             productos_data.append([
                 str(idx),
@@ -2387,9 +2580,9 @@ class FacturaPDFView(LoginRequiredMixin, View):
                 if totals_y > 120:  # Necesitamos al menos 120 puntos para totales + footer
                     # --- Sección de totales ---
                     p.setFont("Helvetica", 8)
-                    subtotal_bs = factura.subtotal * tasa_usd_ves
-                    iva_bs = factura.iva * tasa_usd_ves
-                    total_bs = factura.total_fac * tasa_usd_ves
+                    subtotal_bs = totales['subtotal_ves']
+                    iva_bs = totales['iva_ves']
+                    total_bs = totales['total_ves']
 
                     # Subtotal
                     p.drawString(430, totals_y, "SUBTOTAL")
@@ -2432,9 +2625,9 @@ class FacturaPDFView(LoginRequiredMixin, View):
                     # Dibujar totales en la nueva página
                     totals_y = height - 200
                     p.setFont("Helvetica", 8)
-                    subtotal_bs = factura.subtotal * tasa_usd_ves
-                    iva_bs = factura.iva * tasa_usd_ves
-                    total_bs = factura.total_fac * tasa_usd_ves
+                    subtotal_bs = totales['subtotal_ves']
+                    iva_bs = totales['iva_ves']
+                    total_bs = totales['total_ves']
 
                     # Subtotal
                     p.drawString(430, totals_y, "SUBTOTAL")
@@ -2542,7 +2735,7 @@ class NotaEntregaPDFView(LoginRequiredMixin, View):
             return ["#", "Código", "Producto", "Cant.", "Unidad", "Precio", "Total"]
 
         # --- Preparar datos de productos ---
-        detalles = nota.detalles_nota.all()
+        detalles = nota.detalles_nota.select_related('producto__unidad_medida')
         productos_data = []
 
         for idx, detalle in enumerate(detalles, 1):
@@ -2718,11 +2911,15 @@ import os # Para manejar archivos temporales
 from django.conf import settings # Para la carpeta de archivos temporales
 from .forms.backup_forms import DatabaseImportForm # Importar el nuevo formulario
 from django.core.files.storage import FileSystemStorage
+@copia_reportes.vista_reporte
 def export_database_view(request):
     try:
         # Usaremos un buffer en memoria para no escribir al disco innecesariamente en el servidor
         buffer = io.StringIO()
-        call_command('dumpdata', 'black_invoices', indent=2, stdout=buffer) # Solo datos de black_invoices
+        # dumpdata usa la base indicada sin consultar el router: con la copia de
+        # reportes disponible se exporta desde ella y no se bloquea la caja
+        base = copia_reportes.ALIAS if copia_reportes.en_uso() else 'default'
+        call_command('dumpdata', 'black_invoices', indent=2, stdout=buffer, database=base) # Solo datos de black_invoices
         # Si quieres TODO: call_command('dumpdata', indent=2, stdout=buffer, exclude=['contenttypes', 'auth.Permission'])
 
         buffer.seek(0)
@@ -2732,7 +2929,13 @@ def export_database_view(request):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         response['Content-Disposition'] = f'attachment; filename="backup_corporacion_agricola_{timestamp}.json"'
 
-        messages.success(request, "Exportación de datos completada exitosamente.")
+        if base != 'default':
+            messages.success(
+                request,
+                f"Exportación de datos completada exitosamente (datos al {copia_reportes.fecha_copia():%d/%m/%Y %H:%M})."
+            )
+        else:
+            messages.success(request, "Exportación de datos completada exitosamente.")
         return response
     except Exception as e:
         messages.error(request, f"Error durante la exportación de datos: {str(e)}")
@@ -2805,27 +3008,25 @@ def import_database_view(request):
 
 from reportlab.lib.units import inch # Para márgenes más intuitivos
 
-class ProductosMasVendidosPDFView(LoginRequiredMixin, View):
+class ProductosMasVendidosPDFView(copia_reportes.CopiaReportesMixin, LoginRequiredMixin, View):
     def get(self, request):
         try:
             # ... (tu código para obtener filtros y productos_vendidos es el mismo) ...
             fecha_inicio = request.GET.get('fecha_inicio')
             fecha_fin = request.GET.get('fecha_fin')
 
-            filtros = {}
+            fecha_inicio_obj = fecha_fin_obj = None
             periodo_texto = "Período no especificado" # Default
 
             if fecha_inicio:
                 try:
                     fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
-                    filtros['factura__fecha_fac__date__gte'] = fecha_inicio_obj
                     periodo_texto = f"Desde: {fecha_inicio_obj.strftime('%d/%m/%Y')} "
                 except ValueError: pass
 
             if fecha_fin:
                 try:
                     fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
-                    filtros['factura__fecha_fac__date__lte'] = fecha_fin_obj
                     if fecha_inicio: # Si ya hay texto de inicio
                         periodo_texto += f"Hasta: {fecha_fin_obj.strftime('%d/%m/%Y')}"
                     else:
@@ -2837,23 +3038,12 @@ class ProductosMasVendidosPDFView(LoginRequiredMixin, View):
                 inicio_mes = hoy.replace(day=1)
                 # Por defecto, si no hay filtro, podrías querer el mes actual o todo.
                 # Aquí asumo mes actual si no se especifica nada.
-                filtros['factura__fecha_fac__date__gte'] = inicio_mes
-                filtros['factura__fecha_fac__date__lte'] = hoy # Hasta hoy
+                fecha_inicio_obj = inicio_mes
+                fecha_fin_obj = hoy # Hasta hoy
                 periodo_texto = f"Período: {inicio_mes.strftime('%B %Y')}"
 
 
-            productos_vendidos = DetalleFactura.objects.filter(
-                **filtros
-            ).exclude(
-                factura__ventas__status__vent_cancelada=True
-            ).values(
-                'producto__nombre',
-                'producto__precio'
-            ).annotate(
-                total_vendido=Sum('cantidad'),
-                total_ingresos=Sum(F('cantidad') * F('producto__precio')),
-                numero_ventas=Count('factura', distinct=True)
-            ).order_by('-total_vendido')[:20]
+            productos_vendidos = productos_mas_vendidos(fecha_inicio_obj, fecha_fin_obj)[:20]
 
 
             buffer = io.BytesIO()
@@ -2897,6 +3087,11 @@ class ProductosMasVendidosPDFView(LoginRequiredMixin, View):
             p.drawString(margin_left, current_y, periodo_texto)
             fecha_actual_str = datetime.now().strftime("%d/%m/%Y %H:%M")
             p.drawRightString(width - margin_right, current_y, f"Generado: {fecha_actual_str}")
+            datos_al = copia_reportes.fecha_copia() if copia_reportes.en_uso() else None
+            if datos_al:
+                current_y -= 14
+                p.setFont("Helvetica", 9)
+                p.drawRightString(width - margin_right, current_y, f"Datos al: {datos_al.strftime('%d/%m/%Y %H:%M')}")
             current_y -= 30 # Espacio
 
             # --- Estadísticas generales (RESUMEN) ---
@@ -2916,7 +3111,7 @@ class ProductosMasVendidosPDFView(LoginRequiredMixin, View):
                 p.drawString(margin_left, current_y, f"Unidades vendidas (Top 1): {producto_top['total_vendido']}")
                 current_y = resumen_y_start # Volver al Y del inicio de la segunda columna de resumen
 
-                p.drawString(margin_left + content_width / 2, current_y, f"Total productos diferentes (Top 20): {productos_vendidos.count()}")
+                p.drawString(margin_left + content_width / 2, current_y, f"Total productos diferentes (Top 20): {len(productos_vendidos)}")
                 current_y -= 15
                 p.drawString(margin_left + content_width / 2, current_y, f"Total unidades vendidas (Top 20): {total_unidades}")
                 current_y -= 15
@@ -3103,7 +3298,7 @@ class TasaCambioManualView(EmpleadoRolMixin, CreateView):
             if existing_tasa:
                 # Si existe, actualizar los valores en lugar de crear nueva
                 existing_tasa.tasa_usd_ves = form.cleaned_data['tasa_usd_ves']
-                existing_tasa.fuente = f'Manual - {self.request.user.empleado.nombre}'
+                existing_tasa.fuente = f'Manual - {empleado_actual(self.request).nombre}'
                 existing_tasa.activo = True
                 existing_tasa.save()
                 
@@ -3117,7 +3312,7 @@ class TasaCambioManualView(EmpleadoRolMixin, CreateView):
             else:
                 # Si no existe, crear nueva
                 form.instance.fecha = hoy
-                form.instance.fuente = f'Manual - {self.request.user.empleado.nombre}'
+                form.instance.fuente = f'Manual - {empleado_actual(self.request).nombre}'
                 form.instance.activo = True
                 
                 messages.success(
@@ -3127,43 +3322,230 @@ class TasaCambioManualView(EmpleadoRolMixin, CreateView):
                 return super().form_valid(form)
 
 
+class TareasProgramadasView(EmpleadoRolMixin, TemplateView):
+    """Estado de las tareas del programador (último resultado, duración y salida)"""
+    template_name = 'black_invoices/configuracion/tareas_programadas.html'
+    roles_permitidos = ['Administrador']
+
+    def get_context_data(self, **kwargs):
+        from . import programador
+
+        context = super().get_context_data(**kwargs)
+        estados = {e.nombre: e for e in EjecucionTarea.objects.all()}
+        context['titulo'] = 'Tareas Programadas'
+        context['tareas'] = [
+            {'tarea': tarea, 'estado': estados.get(tarea.nombre)}
+            for tarea in programador.tareas_configuradas()
+        ]
+        return context
+
+
+
+class RespaldosView(EmpleadoRolMixin, TemplateView):
+    """Respaldos en caliente de la base de datos: crear, verificar, descargar y restaurar"""
+    template_name = 'black_invoices/configuracion/respaldos.html'
+    roles_permitidos = ['Administrador']
+
+    def get_context_data(self, **kwargs):
+        from . import respaldos
+
+        context = super().get_context_data(**kwargs)
+        context['titulo'] = 'Respaldos de la Base de Datos'
+        context['respaldos'] = respaldos.listar_respaldos()
+        context['directorio'] = respaldos.directorio_respaldos()
+        context['retencion'] = getattr(settings, 'RESPALDOS_RETENCION', respaldos.RETENCION_POR_DEFECTO)
+        return context
+
+    def post(self, request, *args, **kwargs):
+        from . import respaldos
+
+        accion = request.POST.get('accion')
+        nombre = request.POST.get('nombre', '')
+        try:
+            if accion == 'crear':
+                resultado = respaldos.crear_respaldo()
+                eliminados = respaldos.rotar()
+                messages.success(
+                    request,
+                    f"Respaldo {resultado['nombre']} creado en {resultado['segundos']} s. "
+                    f"Eliminados por rotación: {len(eliminados)}."
+                )
+            elif accion == 'verificar':
+                respaldos.verificar_respaldo(nombre)
+                messages.success(request, f'El respaldo {nombre} pasó la verificación de integridad.')
+            elif accion == 'restaurar':
+                previo = respaldos.restaurar(nombre)
+                messages.warning(
+                    request,
+                    f"Base de datos restaurada desde {nombre}. El estado anterior quedó en "
+                    f"{previo['nombre']}."
+                )
+            else:
+                messages.error(request, 'Acción no válida.')
+        except respaldos.ErrorRespaldo as e:
+            messages.error(request, str(e))
+        return redirect('black_invoices:respaldos')
+
+
+class RespaldoDescargarView(EmpleadoRolMixin, View):
+    roles_permitidos = ['Administrador']
+
+    def get(self, request, nombre):
+        from django.http import FileResponse, Http404
+        from . import respaldos
+
+        try:
+            respaldo = respaldos.obtener_respaldo(nombre)
+        except respaldos.ErrorRespaldo:
+            raise Http404('Respaldo no encontrado')
+        return FileResponse(open(respaldo['ruta'], 'rb'), as_attachment=True, filename=respaldo['nombre'])
+
+
 # En views.py - Agregar esta nueva vista
 from django.http import JsonResponse
 from django.views import View
 from django.db.models import Q
 
+# Consultas de los formularios (Select2, búsqueda por cédula, tasa, catálogo).
+# Son vistas async: bajo ASGI (ver black_system/asgi.py) no ocupan un worker
+# por cada tecla y no compiten con el registro de ventas. Bajo WSGI siguen
+# funcionando. Medición: python manage.py benchmark_consultas.
+
+LIMITE_CAMBIOS_CATALOGO = 500
+
+
+def _producto_json(p):
+    return {
+        'id': p.id,
+        'text': f"{p.sku} - {p.nombre}",
+        'nombre': p.nombre,
+        'sku': p.sku,
+        'precio': float(p.precio),
+        'stock': float(p.stock),
+        'unidad': p.unidad_medida.abreviatura if p.unidad_medida else 'UN',
+        'precio_formateado': f"${p.precio:,.2f}",
+        'stock_formateado': f"{p.stock:,.1f}"
+    }
+
+
 class ProductoSearchAPIView(View):
-    def get(self, request):
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Sesión requerida'}, status=403)
+
         query = request.GET.get('q', '').strip()
 
-        # Buscar productos activos con stock
-        if query and len(query) >= 1:
-            # Búsqueda por query
-            productos = Producto.objects.filter(
-                Q(nombre__icontains=query) | Q(sku__icontains=query),
-                activo=True,
-                stock__gt=0
-            ).select_related('unidad_medida')[:10]
-        else:
-            # Sin query, mostrar los primeros 10 productos
-            productos = Producto.objects.filter(
-                activo=True,
-                stock__gt=0
-            ).select_related('unidad_medida')[:10]
+        # Buscar productos activos con stock (sin query, los primeros 10)
+        productos = Producto.objects.filter(activo=True, stock__gt=0).select_related('unidad_medida')
+        if query:
+            productos = productos.filter(Q(nombre__icontains=query) | Q(sku__icontains=query))
 
         # Formatear datos para Select2
-        data = []
-        for p in productos:
-            data.append({
-                'id': p.id,
-                'text': f"{p.sku} - {p.nombre}",
-                'nombre': p.nombre,
-                'sku': p.sku,
-                'precio': float(p.precio),
-                'stock': float(p.stock),
-                'unidad': p.unidad_medida.abreviatura if p.unidad_medida else 'UN',
-                'precio_formateado': f"${p.precio:,.2f}",
-                'stock_formateado': f"{p.stock:,.1f}"
-            })
+        data = [_producto_json(p) async for p in productos[:10]]
+        return JsonResponse({'results': data})
+
+
+class TasaActualAPIView(View):
+    """Tasa de cambio activa: {'tasa', 'fecha', 'fuente'} (tasa None si no hay)"""
+
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Sesión requerida'}, status=403)
+
+        tasa = await TasaCambio.objects.filter(activo=True).afirst()
+        if tasa is None:
+            return JsonResponse({'tasa': None, 'fecha': None, 'fuente': None})
+        return JsonResponse({'tasa': str(tasa.tasa_usd_ves), 'fecha': tasa.fecha, 'fuente': tasa.fuente})
+
+
+class CatalogoCambiosAPIView(View):
+    """
+    Productos modificados después del cursor ?desde=<fecha ISO>|<id>, en orden,
+    de a LIMITE_CAMBIOS_CATALOGO: {'productos', 'cursor', 'completo'}. Sin
+    cursor retorna el catálogo completo por páginas; los inactivos se
+    incluyen para que el cliente los quite.
+    """
+
+    async def get(self, request):
+        from django.utils.dateparse import parse_datetime
+
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'error': 'Sesión requerida'}, status=403)
+
+        productos = Producto.objects.select_related('unidad_medida').order_by('updated_at', 'id')
+        desde = request.GET.get('desde', '')
+        if desde:
+            fecha, _, ultimo_id = desde.partition('|')
+            fecha = parse_datetime(fecha)
+            if fecha is None or not ultimo_id.isdigit():
+                return JsonResponse({'error': "Cursor inválido: use '<fecha ISO>|<id>'"}, status=400)
+            productos = productos.filter(
+                Q(updated_at__gt=fecha) | Q(updated_at=fecha, id__gt=int(ultimo_id))
+            )
+
+        cambios = [p async for p in productos[:LIMITE_CAMBIOS_CATALOGO + 1]]
+        completo = len(cambios) <= LIMITE_CAMBIOS_CATALOGO
+        cambios = cambios[:LIMITE_CAMBIOS_CATALOGO]
+        cursor = f'{cambios[-1].updated_at.isoformat()}|{cambios[-1].id}' if cambios else desde
+        return JsonResponse({
+            'productos': [{**_producto_json(p), 'activo': p.activo} for p in cambios],
+            'cursor': cursor,
+            'completo': completo,
+        })
 
-        return JsonResponse({'results': data})
\ No newline at end of file
+
+class VentaAPIView(View):
+    """
+    Registro de ventas en JSON. Cuerpo: una venta o {'ventas': [...]} con
+    hasta registro_ventas.MAXIMO_VENTAS. Cada venta: {'clave', 'cliente',
+    'tipo_venta' ('contado' o 'credito'), 'metodo_pag', 'lineas': [[producto,
+    cantidad], ...]}. La clave es obligatoria. Cada venta se registra en su
+    propia transacción; una clave ya usada con el mismo contenido retorna la
+    venta original con estado 'repetida' y con otro contenido, 'conflicto'
+    (409).
+    """
+
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Sesión requerida'}, status=403)
+        try:
+            datos = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'JSON inválido'}, status=400)
+
+        lote = isinstance(datos, dict) and 'ventas' in datos
+        ventas = datos['ventas'] if lote else [datos]
+        if not isinstance(ventas, list) or not all(isinstance(venta, dict) for venta in ventas):
+            return JsonResponse({'error': "Envíe una venta o {'ventas': [...]}"}, status=400)
+        if len(ventas) > registro_ventas.MAXIMO_VENTAS:
+            return JsonResponse(
+                {'error': f'Se admiten hasta {registro_ventas.MAXIMO_VENTAS} ventas por petición'}, status=400
+            )
+
+        empleado = empleado_actual(request)
+        resultados = [self.registrar(empleado, venta) for venta in ventas]
+        if lote:
+            return JsonResponse({'resultados': resultados})
+        estado = {'creada': 201, 'repetida': 200, 'conflicto': 409}.get(resultados[0]['estado'], 400)
+        return JsonResponse(resultados[0], status=estado)
+
+    def registrar(self, empleado, datos):
+        clave = datos.get('clave')
+        try:
+            clave = registro_ventas.validar_clave(clave, obligatoria=True)
+            venta, totales, creada = registro_ventas.registrar(
+                empleado,
+                datos.get('cliente'),
+                registro_ventas.leer_lineas(datos.get('lineas')),
+                credito=datos.get('tipo_venta') == 'credito',
+                metodo_pago=datos.get('metodo_pag'),
+                clave=clave,
+            )
+        except registro_ventas.ClaveEnConflicto as e:
+            return {'clave': clave, 'estado': 'conflicto', 'venta': e.venta.pk, 'errores': e.errores}
+        except registro_ventas.ErrorVenta as e:
+            return {'clave': clave, 'estado': 'rechazada', 'errores': e.errores}
+        return registro_ventas.resumen(venta, 'creada' if creada else 'repetida')
@@ -5,6 +5,18 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+Servidor recomendado (perfil ASGI): las consultas de los formularios
+(api/productos/buscar/, api/productos/cambios/, api/clientes/cedula/,
+api/tasa/) y los eventos en vivo son vistas async y no ocupan un worker
+mientras esperan:
+
+    BLACK_SYSTEM_PERFIL=produccion uvicorn black_system.asgi:application \
+        --host 0.0.0.0 --port 8000 --workers 2
+
+o con gunicorn: gunicorn black_system.asgi:application -k uvicorn.workers.UvicornWorker -w 2.
+Todo el MIDDLEWARE debe admitir modo async (verificar_perfil lo comprueba);
+uno solo síncrono hace pasar cada petición por un hilo.
 """
 
 import os
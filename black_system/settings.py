@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +47,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'black_invoices.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'black_invoices.context_processors.principal',
             ],
         },
     },
@@ -85,6 +88,19 @@ DATABASES = {
     }
 }
 
+# Copia de solo lectura para reportes (opcional; ver black_invoices/copia_reportes.py).
+# Con BLACK_SYSTEM_COPIA_REPORTES=<ruta> los reportes de ganancias, productos más
+# vendidos y la exportación leen de esa copia, que actualizar_copia_reportes
+# refresca, y no compiten con las ventas por el archivo principal.
+COPIA_REPORTES = os.environ.get('BLACK_SYSTEM_COPIA_REPORTES') or None
+if COPIA_REPORTES:
+    DATABASES['copia_reportes'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{COPIA_REPORTES}?mode=ro',
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['black_invoices.copia_reportes.RouterReportes']
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -132,6 +148,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 BCV_API_URL = 'https://api.exchangerate-api.com/v4/latest/USD'
 BCV_API_TIMEOUT = 30
 
+# Proveedores de tasa consultados en paralelo (ver black_invoices/tasas.py).
+# Para cambiarlos: TASA_PROVEEDORES = [{'clase': 'black_invoices.tasas.ExchangeRateAPI', 'url': ...}, ...]
+TASA_TIMEOUT = 10  # segundos por proveedor
+TASA_CACHE_TTL = 900  # segundos que se reutiliza la última consulta
+# Alias compartido entre procesos: cada ejecución del comando es un proceso nuevo
+TASA_CACHE = 'reportes'
+
 # Configuración de archivos media
 STATIC_URL = '/static/'
 #MEDIA_ROOT = BASE_DIR / 's'
@@ -150,6 +173,16 @@ LOGGING = {
             'handlers': ['console'],
             'level': 'INFO',
         },
+        # Tiempo de cálculo de cada widget del dashboard
+        'black_invoices.tablero': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+        # Ventas registradas desde el formulario (tiempo y errores)
+        'black_invoices.ventas': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
     },
 }
 
@@ -175,5 +208,156 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800
 SESSION_COOKIE_AGE = 86400  # 24 horas
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 
+# El usuario se carga con su empleado y nivel de acceso en una sola consulta.
+# ModelBackend se mantiene para las sesiones iniciadas antes del cambio.
+AUTHENTICATION_BACKENDS = [
+    'black_invoices.middleware.EmpleadoBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Segundos que se reutiliza el usuario cargado por sesión (0 = sin cache).
+# Se guarda en el alias PRINCIPAL_CACHE, que debe ser compartido entre
+# procesos para que la invalidación llegue a todos (LocMemCache se rechaza).
+PRINCIPAL_CACHE_SEGUNDOS = 0
+PRINCIPAL_CACHE = 'sesiones'
+
+# 'reportes' guarda resultados de reportes y sus versiones de datos. Debe ser
+# compartido entre procesos (archivos, base de datos, Redis o Memcached)
+# para que la invalidación de un proceso llegue a los demás.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reportes': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'reportes',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Sesiones fuera de la tabla django_session, para que cada petición no lea
+# (y al iniciar sesión o guardar una vista previa no escriba) el mismo
+# archivo SQLite que registra las ventas. BLACK_SYSTEM_SESIONES elige:
+#   'cached_db' (por defecto): se leen del cache 'sesiones'; se escriben en
+#               el cache y en la base (sobreviven a un reinicio del cache)
+#   'cache':    solo el cache 'sesiones', sin consultas a SQLite
+#   'cookies':  cookie firmada; las vistas previas de importación,
+#               conciliación y ajuste de precios deben caber en 4 KB
+#   'db':       la tabla django_session, como antes
+# El cache 'sesiones' es de archivos (compartido entre procesos). Con
+# BLACK_SYSTEM_CACHE_SESIONES=redis://host:6379/0 usa Redis (requiere el
+# paquete redis) y con 'locmem' la memoria del proceso (un solo proceso).
+# Medición: python manage.py benchmark_sesiones. Limpieza: purgar_sesiones.
+SESIONES = os.environ.get('BLACK_SYSTEM_SESIONES', 'cached_db')
+MOTORES_SESION = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+if SESIONES not in MOTORES_SESION:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f"BLACK_SYSTEM_SESIONES debe ser uno de: {', '.join(MOTORES_SESION)}")
+SESSION_ENGINE = MOTORES_SESION[SESIONES]
+SESSION_CACHE_ALIAS = 'sesiones'
+
+_cache_sesiones = os.environ.get('BLACK_SYSTEM_CACHE_SESIONES', '')
+if _cache_sesiones.startswith(('redis://', 'rediss://', 'unix://')):
+    CACHES['sesiones'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': _cache_sesiones,
+    }
+elif _cache_sesiones == 'locmem':
+    CACHES['sesiones'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sesiones',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+else:
+    CACHES['sesiones'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': _cache_sesiones or BASE_DIR / 'cache' / 'sesiones',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+
+# Los mensajes viajan en una cookie; solo los que no caben en ella pasan a
+# la sesión (y con las opciones anteriores, al cache, no a SQLite)
+MESSAGE_STORAGE = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
+# Segundos que se guardan los reportes de períodos abiertos y cerrados
+# (las escrituras los invalidan antes; ver black_invoices/cache_reportes.py)
+REPORTES_CACHE_TTL = 600
+REPORTES_CACHE_TTL_CERRADO = 30 * 24 * 3600
+
+# Respaldos en caliente de SQLite (python manage.py respaldar_bd)
+RESPALDOS_DIR = BASE_DIR / 'respaldos'
+RESPALDOS_RETENCION = {'horarios': 24, 'diarios': 7, 'mensuales': 12}
+
+# Avance de poblar_ganancias_historicas: si la carga se interrumpe, la próxima
+# ejecución continúa desde el primer tramo de ventas no terminado
+GANANCIAS_CONTROL = BASE_DIR / 'cache' / 'poblar_ganancias_historicas.json'
+
+# Reposición (python manage.py calcular_reposicion): punto de reorden = velocidad
+# de venta × (dias_entrega + dias_seguridad); al reponer se sugiere llegar a
+# velocidad × (dias_entrega + dias_cobertura)
+REPOSICION = {'dias_entrega': 7, 'dias_seguridad': 3, 'dias_cobertura': 30}
+
+# Comisiones de los empleados por mes (reportes/comisiones/). base: 'ventas'
+# (monto vendido sin impuestos) o 'ganancia'. tramos: (monto mínimo del mes,
+# porcentaje); se aplica a toda la base el del tramo más alto alcanzado
+COMISIONES = {'base': 'ventas', 'tramos': [(0, 1), (2000, 2), (5000, 3)]}
+
+# Actualizaciones en vivo por Server-Sent Events (requiere ASGI: uvicorn o daphne
+# con black_system.asgi:application). Cada proceso consulta los eventos nuevos
+# cada EVENTOS_INTERVALO segundos y se conservan EVENTOS_RETENCION segundos.
+EVENTOS_INTERVALO = 1
+EVENTOS_RETENCION = 3600
+
 # Timeout para consultas de base de datos complejas
-DATABASE_QUERY_TIMEOUT = 30
\ No newline at end of file
+DATABASE_QUERY_TIMEOUT = 30
+
+
+# ===============================
+# PERFIL DE PRODUCCIÓN
+# ===============================
+# Se activa con BLACK_SYSTEM_PERFIL=produccion y requiere DJANGO_SECRET_KEY.
+# Después de activarlo:
+#   python manage.py collectstatic --noinput
+#   python manage.py verificar_perfil
+
+PERFIL = os.environ.get('BLACK_SYSTEM_PERFIL', 'desarrollo')
+
+STATIC_ROOT = os.environ.get('BLACK_SYSTEM_STATIC_ROOT', str(BASE_DIR / 'staticfiles'))
+
+# Servir STATIC_ROOT desde Django (solo si no hay un servidor web que lo haga)
+SERVIR_ESTATICOS = False
+ESTATICOS_MAX_AGE = 31536000  # 1 año, para archivos con hash en el nombre
+
+if PERFIL == 'produccion':
+    DEBUG = False
+    # La clave de desarrollo está en el repositorio: con ella cualquiera
+    # podría firmar sesiones válidas
+    if not os.environ.get('DJANGO_SECRET_KEY'):
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured('El perfil de producción requiere la variable DJANGO_SECRET_KEY')
+    SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+    # Plantillas compiladas una sola vez por proceso
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+    # Nombres con hash + copias .gz/.br generadas en collectstatic
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'black_invoices.estaticos.ManifestComprimidoStorage'},
+    }
+
+    # Comprime HTML y JSON generados por las vistas (no los eventos en vivo)
+    MIDDLEWARE = ['black_invoices.middleware.GZipSinEventosMiddleware'] + MIDDLEWARE
+
+    SERVIR_ESTATICOS = os.environ.get('BLACK_SYSTEM_SERVIR_ESTATICOS', '0') == '1'